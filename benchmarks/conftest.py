@@ -0,0 +1,66 @@
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from harness import BenchRecorder
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "provider-server"))
+sys.path.insert(0, str(ROOT / "requestor-server"))
+sys.path.insert(0, str(ROOT / "discovery-server"))
+sys.path.insert(0, str(ROOT / "port-checker-server"))
+
+# Same safe service environment as the test suites; nothing touches ~/.golem
+os.environ.setdefault("GOLEM_PROVIDER_SKIP_BOOTSTRAP", "1")
+os.environ.setdefault(
+    "GOLEM_PROVIDER_ETHEREUM_PRIVATE_KEY",
+    "0xaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa",
+)
+_tmp = tempfile.mkdtemp(prefix="golem-bench-")
+os.environ.setdefault("GOLEM_PROVIDER_SSH_KEY_DIR", os.path.join(_tmp, "ssh"))
+os.environ.setdefault("GOLEM_PROVIDER_VM_DATA_DIR", os.path.join(_tmp, "vms"))
+os.environ.setdefault("GOLEM_PROVIDER_CLOUD_INIT_DIR", os.path.join(_tmp, "cloud-init"))
+os.environ.setdefault("GOLEM_PROVIDER_PROXY_STATE_DIR", os.path.join(_tmp, "proxy"))
+os.environ.setdefault("GOLEM_PROVIDER_MULTIPASS_BINARY_PATH", sys.executable)
+os.environ.setdefault("GOLEM_PROVIDER_PUBLIC_IP", "127.0.0.1")
+os.environ.setdefault("GOLEM_DISCOVERY_DATABASE_DIR", os.path.join(_tmp, "discovery"))
+
+
+_recorder = BenchRecorder()
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--bench-json",
+        action="store",
+        default=None,
+        help="Write benchmark results to this JSON file for comparison across runs",
+    )
+
+
+@pytest.fixture(scope="session")
+def bench() -> BenchRecorder:
+    return _recorder
+
+
+def _fmt(value) -> str:
+    if isinstance(value, float):
+        return f"{value:.4f}"
+    return str(value)
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    if not _recorder.results:
+        return
+    terminalreporter.section("benchmark results")
+    for entry in _recorder.results:
+        metrics = ", ".join(f"{k}={_fmt(v)}" for k, v in entry.items() if k != "name")
+        terminalreporter.write_line(f"{entry['name']}: {metrics}")
+    path = config.getoption("--bench-json")
+    if path:
+        Path(path).write_text(json.dumps(_recorder.results, indent=2))
+        terminalreporter.write_line(f"results written to {path}")
@@ -0,0 +1,112 @@
+"""Advertisement query latency as the table grows.
+
+Every dataset holds the same number of matching rows, so an indexed query
+should take about the same time at 1k and at 100k advertisements while a
+JSON-scan predicate grows with the table.
+"""
+import os
+import random
+import sqlite3
+import statistics
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+
+SIZES = [int(n) for n in os.environ.get("GOLEM_BENCH_AD_SIZES", "1000,10000,100000").split(",")]
+MATCHING = 100
+REPEATS = 20
+_TS_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+
+def _populate(db_path, size: int) -> None:
+    rng = random.Random(size)
+    fresh = datetime.utcnow().strftime(_TS_FORMAT)
+    stale = (datetime.utcnow() - timedelta(hours=1)).strftime(_TS_FORMAT)
+    countries = ["US", "DE", "PL", "SE", "FR", "GB", "JP", "BR", "IN", "CA"]
+    rows = []
+    for i in range(size):
+        special = i < MATCHING
+        cpu = 128 if special else rng.randint(1, 64)
+        memory, storage = cpu * 2, cpu * 20
+        rows.append(
+            (
+                f"0x{i:040x}",
+                f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}",
+                "ZZ" if special else rng.choice(countries),
+                "arm64" if special else "x86_64",
+                f'{{"cpu": {cpu}, "memory": {memory}, "storage": {storage}}}',
+                cpu,
+                memory,
+                storage,
+                fresh,
+                # A slice of expired rows still waiting for the cleanup loop
+                stale if i % 10 == 9 and not special else fresh,
+            )
+        )
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO advertisements (provider_id, ip_address, country, platform, resources, "
+        "cpu, memory, storage, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+    conn.commit()
+    conn.close()
+
+
+async def _median_ms(run) -> float:
+    timings = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        await run()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+@pytest.mark.parametrize("size", SIZES)
+async def bench_find_by_requirements(size, tmp_path, monkeypatch, bench):
+    import discovery.db.session as sess
+    from discovery.db.models import Advertisement
+    from discovery.db.repository import AdvertisementRepository
+    from sqlalchemy import select
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from sqlalchemy.orm import sessionmaker
+
+    db_path = tmp_path / "discovery.db"
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}", connect_args={"check_same_thread": False})
+    monkeypatch.setattr(sess, "engine", engine)
+    await sess.init_db()
+    _populate(db_path, size)
+
+    Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    try:
+        async with Session() as session:
+            repo = AdvertisementRepository(session)
+            results = {}
+            for name, kwargs in {
+                "by_cpu": {"cpu": 128},
+                "by_country_platform": {"country": "ZZ", "platform": "arm64"},
+                "by_memory_storage": {"memory": 256, "storage": 2560},
+            }.items():
+                found = await repo.find_by_requirements(**kwargs)
+                assert len(found) == MATCHING
+                results[f"{name}_ms"] = await _median_ms(lambda: repo.find_by_requirements(**kwargs))
+
+            async def json_scan():
+                # The pre-index predicate, kept as a reference point
+                cutoff = datetime.utcnow() - timedelta(minutes=5)
+                query = select(Advertisement).where(
+                    Advertisement.resources["cpu"].as_integer() >= 128, Advertisement.updated_at >= cutoff
+                )
+                return (await session.execute(query)).scalars().all()
+
+            assert len(await json_scan()) == MATCHING
+            results["json_scan_by_cpu_ms"] = await _median_ms(json_scan)
+    finally:
+        await engine.dispose()
+
+    bench.record(f"discovery.find_by_requirements[{size}]", rows=size, matching=MATCHING, **results)
+    if size >= 10_000:
+        assert results["by_cpu_ms"] < results["json_scan_by_cpu_ms"]
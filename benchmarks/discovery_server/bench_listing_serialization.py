@@ -0,0 +1,91 @@
+"""Cost of serializing large advertisement listings.
+
+``validated`` is the previous response path (``response_model`` validation and
+``jsonable_encoder``); ``fast`` is the current ``GET /advertisements`` route
+joining cached per-entry JSON, with and without gzip, and ``revalidated`` is a
+conditional request answered with 304.
+"""
+import random
+import statistics
+import time
+from typing import List
+
+import pytest
+
+from harness import asgi_request
+
+from .bench_search_load import _populate
+
+pytest.importorskip("aiosqlite")
+
+VARIANTS = ["validated", "fast", "fast+gzip", "revalidated"]
+
+
+def _baseline_app(index):
+    from discovery.api.models import AdvertisementResponse
+    from fastapi import FastAPI
+
+    baseline = FastAPI()
+
+    @baseline.get("/api/v1/advertisements", response_model=List[AdvertisementResponse])
+    async def list_advertisements():
+        return await index.find_by_requirements()
+
+    return baseline
+
+
+@pytest.mark.parametrize("rows", [1000, 10000])
+@pytest.mark.parametrize("variant", VARIANTS)
+async def bench_listing_serialization(rows, variant, tmp_path, monkeypatch, bench):
+    import discovery.db.session as sess
+    from discovery.api import routes
+    from discovery.db.index import AdvertisementIndex
+    from discovery.main import app
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from sqlalchemy.orm import sessionmaker
+
+    db_path = tmp_path / "discovery.db"
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}", connect_args={"check_same_thread": False})
+    monkeypatch.setattr(sess, "engine", engine)
+    await sess.init_db()
+    _populate(db_path, rows, random.Random(rows))
+    index = AdvertisementIndex(sessionmaker(engine, class_=AsyncSession, expire_on_commit=False))
+    await index.load()
+
+    async def get_repository():
+        return index
+
+    app.dependency_overrides[routes.get_repository] = get_repository
+    target = _baseline_app(index) if variant == "validated" else app
+    headers = {"Accept-Encoding": "gzip"} if variant == "fast+gzip" else {}
+    expected = 304 if variant == "revalidated" else 200
+    requests = 50 if rows <= 1000 else 10
+    latencies = []
+    try:
+        if variant == "revalidated":
+            _, response_headers, _ = await asgi_request(app, "GET", "/api/v1/advertisements", client="198.51.100.1")
+            headers = {"If-None-Match": response_headers["etag"]}
+        else:
+            # Warm up: the first listing encodes every entry once
+            await asgi_request(target, "GET", "/api/v1/advertisements", client="198.51.100.1")
+        for i in range(requests):
+            started = time.perf_counter()
+            # A distinct client per request keeps the rate limiter out of the way
+            status, response_headers, body = await asgi_request(
+                target, "GET", "/api/v1/advertisements", headers=headers, client=f"203.0.113.{i + 1}"
+            )
+            latencies.append(time.perf_counter() - started)
+            assert status == expected
+    finally:
+        app.dependency_overrides.clear()
+        await engine.dispose()
+
+    bench.record(
+        f"discovery.listing[{variant},{rows}]",
+        rows=rows,
+        requests=requests,
+        requests_per_s=requests / sum(latencies),
+        p50_ms=statistics.median(latencies) * 1000,
+        response_bytes=len(body),
+        content_encoding=response_headers.get("content-encoding", "identity"),
+    )
@@ -0,0 +1,50 @@
+"""Short run of the discovery load generator against a locally started server.
+
+``loadgen.py`` is the full tool (``python -m discovery_server.loadgen``); this
+keeps a small baseline scenario in the benchmark suite.
+"""
+import os
+
+import pytest
+
+from .loadgen import LoadGenerator, LocalServer
+
+pytest.importorskip("aiosqlite")
+pytest.importorskip("uvicorn")
+
+PROVIDERS = int(os.environ.get("GOLEM_BENCH_LOAD_PROVIDERS", "500"))
+SEARCHERS = int(os.environ.get("GOLEM_BENCH_LOAD_SEARCHERS", "10"))
+DURATION = float(os.environ.get("GOLEM_BENCH_LOAD_SECONDS", "20"))
+# Much shorter than the provider default so a short run sees repeated heartbeats
+INTERVAL = float(os.environ.get("GOLEM_BENCH_LOAD_INTERVAL", "5"))
+
+
+async def bench_discovery_load(tmp_path, bench):
+    async with LocalServer(tmp_path) as server:
+        generator = LoadGenerator(
+            server.url,
+            providers=PROVIDERS,
+            searchers=SEARCHERS,
+            duration=DURATION,
+            interval=INTERVAL,
+            sample_interval=DURATION / 4,
+            db_path=server.db_path,
+        )
+        report = await generator.run()
+
+    metrics = {}
+    for name, op in report["operations"].items():
+        metrics[f"{name}_per_s"] = op["per_s"]
+        metrics[f"{name}_p50_ms"] = op["p50_ms"]
+        metrics[f"{name}_p99_ms"] = op["p99_ms"]
+    bench.record(
+        "discovery.load",
+        providers=PROVIDERS,
+        searchers=SEARCHERS,
+        interval_s=INTERVAL,
+        db_bytes=report["db_bytes"],
+        db_bytes_over_time=[sample["db_bytes"] for sample in report["timeline"]],
+        **metrics,
+    )
+    assert all(op["errors"] == 0 for op in report["operations"].values())
+    assert report["operations"]["search"]["count"] > 0
@@ -0,0 +1,160 @@
+"""Search-heavy load against the discovery API, served from SQLite or from memory.
+
+Requests go through the full ASGI app (middleware, validation, serialization)
+from many simulated clients at once; 95% are filtered searches returning a
+few dozen providers each and the rest are provider heartbeats.
+"""
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import statistics
+import time
+from datetime import datetime
+
+import pytest
+
+from harness import LoopLagProbe, asgi_request
+
+pytest.importorskip("aiosqlite")
+
+ADVERTISEMENTS = int(os.environ.get("GOLEM_BENCH_ADS", "5000"))
+REQUESTS = int(os.environ.get("GOLEM_BENCH_REQUESTS", "2000"))
+CONCURRENCY = 32
+COUNTRIES = [f"{chr(65 + i // 26)}{chr(65 + i % 26)}" for i in range(200)]
+PLATFORMS = ["x86_64", "arm64"]
+
+
+def _populate(db_path, count: int, rng: random.Random) -> None:
+    now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S.%f")
+    rows = []
+    for i in range(count):
+        cpu = rng.randint(1, 64)
+        resources = {"cpu": cpu, "memory": cpu * 2, "storage": cpu * 20}
+        rows.append(
+            (
+                f"0x{i:040x}",
+                f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}",
+                rng.choice(COUNTRIES),
+                rng.choice(PLATFORMS),
+                json.dumps(resources),
+                cpu,
+                cpu * 2,
+                cpu * 20,
+                now,
+                now,
+            )
+        )
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO advertisements (provider_id, ip_address, country, platform, resources, "
+        "cpu, memory, storage, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+    conn.commit()
+    conn.close()
+
+
+def _workload(count: int, rng: random.Random):
+    """(method, path, params, body, headers, client) tuples for the run."""
+    requests = []
+    for i in range(REQUESTS):
+        client = f"192.0.{i % 250}.{rng.randint(1, 250)}"
+        if rng.random() < 0.05:
+            provider = f"0x{rng.randrange(count):040x}"
+            cpu = rng.randint(1, 64)
+            body = {
+                "ip_address": "10.1.2.3",
+                "country": rng.choice(COUNTRIES),
+                "platform": rng.choice(PLATFORMS),
+                "resources": {"cpu": cpu, "memory": cpu * 2, "storage": cpu * 20},
+            }
+            headers = {"X-Provider-ID": provider, "X-Provider-Signature": "sig"}
+            requests.append(("POST", "/api/v1/advertisements", None, body, headers, client))
+            continue
+        params = rng.choice(
+            [
+                {"country": rng.choice(COUNTRIES)},
+                {"country": rng.choice(COUNTRIES), "platform": rng.choice(PLATFORMS)},
+                {"cpu": 64, "platform": rng.choice(PLATFORMS)},
+                {"cpu": rng.randint(8, 32), "country": rng.choice(COUNTRIES)},
+            ]
+        )
+        requests.append(("GET", "/api/v1/advertisements", params, None, None, client))
+    return requests
+
+
+async def _run(app, workload):
+    queue = list(reversed(workload))
+    latencies = []
+    statuses = {}
+
+    async def worker():
+        while queue:
+            method, path, params, body, headers, client = queue.pop()
+            started = time.perf_counter()
+            status, _, _ = await asgi_request(app, method, path, params, body, headers, client)
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+    return time.perf_counter() - started, sorted(latencies), statuses
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "memory"])
+async def bench_search_heavy_load(backend, tmp_path, monkeypatch, bench):
+    import discovery.db.session as sess
+    from discovery.api import routes
+    from discovery.db.index import AdvertisementIndex
+    from discovery.db.repository import AdvertisementRepository
+    from discovery.main import app
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from sqlalchemy.orm import sessionmaker
+
+    db_path = tmp_path / "discovery.db"
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}", connect_args={"check_same_thread": False})
+    monkeypatch.setattr(sess, "engine", engine)
+    await sess.init_db()
+    rng = random.Random(ADVERTISEMENTS)
+    _populate(db_path, ADVERTISEMENTS, rng)
+    Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    index = AdvertisementIndex(Session)
+    if backend == "memory":
+        await index.load()
+
+        async def get_repository():
+            return index
+
+    else:
+
+        async def get_repository():
+            # The pre-index request path: one session and SQL round trip per request
+            async with Session() as session:
+                yield AdvertisementRepository(session)
+
+    app.dependency_overrides[routes.get_repository] = get_repository
+    try:
+        workload = _workload(ADVERTISEMENTS, rng)
+        async with LoopLagProbe() as lag:
+            elapsed, latencies, statuses = await _run(app, workload)
+            flushed = await index.flush()
+    finally:
+        app.dependency_overrides.clear()
+        await engine.dispose()
+
+    bench.record(
+        f"discovery.search_load[{backend}]",
+        advertisements=ADVERTISEMENTS,
+        requests=len(workload),
+        concurrency=CONCURRENCY,
+        wall_s=elapsed,
+        requests_per_s=len(workload) / elapsed,
+        p50_ms=statistics.median(latencies) * 1000,
+        p99_ms=latencies[int(len(latencies) * 0.99)] * 1000,
+        flushed_writes=flushed,
+        loop_max_lag_s=lag.max_lag,
+    )
+    assert statuses == {200: len(workload)}
@@ -0,0 +1,374 @@
+"""Load generator for a running discovery server.
+
+Simulates ``providers`` providers that post an advertisement and then refresh
+it every ``interval`` seconds (a ``PATCH`` heartbeat with the last content
+hash, falling back to a full ``POST`` like the provider's advertiser does), and
+``searchers`` requestors issuing mixed filtered searches back to back. Every
+``sample_interval`` seconds it records throughput, latency percentiles and the
+size of the SQLite files, so growth and slowdowns over a run are visible.
+
+By default a server is started on a free local port with a fresh database and
+the rate limit lifted; pass ``--url`` to load an already running one instead::
+
+    cd benchmarks
+    python -m discovery_server.loadgen --providers 2000 --searchers 50 --duration 120
+
+Only the standard library is used on the client side, so the numbers do not
+depend on an HTTP client's own overhead or connection pooling.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+DISCOVERY_DIR = Path(__file__).resolve().parents[2] / "discovery-server"
+API = "/api/v1/advertisements"
+COUNTRIES = [f"{chr(65 + i // 26)}{chr(65 + i % 26)}" for i in range(50)]
+PLATFORMS = ["x86_64", "arm64"]
+
+
+class HttpConnection:
+    """Minimal HTTP/1.1 keep-alive client connection over asyncio streams."""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def request(
+        self, method: str, path: str, body: Optional[dict] = None, headers: Optional[Dict[str, str]] = None
+    ) -> Tuple[int, Dict[str, str], bytes]:
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        payload = json.dumps(body).encode() if body is not None else b""
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}", f"Content-Length: {len(payload)}"]
+        if body is not None:
+            lines.append("Content-Type: application/json")
+        lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        self._writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + payload)
+        try:
+            return await self._read_response()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            await self.close()
+            raise
+
+    async def _read_response(self) -> Tuple[int, Dict[str, str], bytes]:
+        status_line = await self._reader.readuntil(b"\r\n")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await self._reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if headers.get("transfer-encoding") == "chunked":
+            chunks = []
+            while True:
+                size = int((await self._reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                chunk = await self._reader.readexactly(size + 2)
+                if size == 0:
+                    break
+                chunks.append(chunk[:-2])
+            body = b"".join(chunks)
+        else:
+            body = await self._reader.readexactly(int(headers.get("content-length", "0")))
+        if headers.get("connection") == "close":
+            await self.close()
+        return status, headers, body
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            self._reader = None
+
+
+@dataclass
+class OperationStats:
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+
+    def add(self, latency: float, ok: bool) -> None:
+        self.latencies.append(latency)
+        if not ok:
+            self.errors += 1
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class LoadGenerator:
+    """Drives provider and searcher traffic against ``base_url`` for ``duration`` seconds."""
+
+    def __init__(
+        self,
+        base_url: str,
+        providers: int,
+        searchers: int,
+        duration: float,
+        interval: float,
+        sample_interval: float = 5.0,
+        db_path: Optional[Path] = None,
+        seed: int = 0,
+    ):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 80
+        self.providers = providers
+        self.searchers = searchers
+        self.duration = duration
+        self.interval = interval
+        self.sample_interval = sample_interval
+        self.db_path = db_path
+        self.rng = random.Random(seed)
+        self.stats: Dict[str, OperationStats] = {}
+        self.timeline: List[Dict] = []
+        self._deadline = 0.0
+
+    def _record(self, operation: str, started: float, ok: bool) -> None:
+        self.stats.setdefault(operation, OperationStats()).add(time.perf_counter() - started, ok)
+
+    async def _sleep(self, seconds: float) -> None:
+        await asyncio.sleep(max(0.0, min(seconds, self._deadline - time.monotonic())))
+
+    def _advertisement(self, rng: random.Random) -> dict:
+        cpu = rng.choice([1, 2, 4, 8, 16, 32])
+        return {
+            "ip_address": f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}",
+            "country": rng.choice(COUNTRIES),
+            "platform": rng.choice(PLATFORMS),
+            "resources": {"cpu": cpu, "memory": cpu * 4, "storage": cpu * 50},
+            "pricing": {
+                "usd_per_core_month": round(rng.uniform(1, 10), 2),
+                "usd_per_gb_ram_month": round(rng.uniform(0.5, 5), 2),
+                "usd_per_gb_storage_month": round(rng.uniform(0.01, 0.2), 3),
+            },
+        }
+
+    def _search_params(self, rng: random.Random) -> dict:
+        return rng.choice(
+            [
+                {"country": rng.choice(COUNTRIES)},
+                {"country": rng.choice(COUNTRIES), "platform": rng.choice(PLATFORMS)},
+                {"cpu": rng.choice([8, 16, 32]), "platform": rng.choice(PLATFORMS)},
+                {"cpu": rng.choice([2, 4]), "memory": 16, "storage": 200, "country": rng.choice(COUNTRIES)},
+            ]
+        )
+
+    async def _provider(self, number: int) -> None:
+        rng = random.Random(self.rng.random())
+        provider_id = f"0x{number:040x}"
+        headers = {"X-Provider-ID": provider_id, "X-Provider-Signature": "loadgen"}
+        advertisement = self._advertisement(rng)
+        content_hash = None
+        # Spread first posts over one interval, like providers started at random times
+        await self._sleep(rng.uniform(0, self.interval))
+        while time.monotonic() < self._deadline:
+            conn = HttpConnection(self.host, self.port)
+            try:
+                if content_hash is not None:
+                    started = time.perf_counter()
+                    status, _, _ = await conn.request(
+                        "PATCH", f"{API}/{provider_id}", headers={**headers, "If-Match": f'"{content_hash}"'}
+                    )
+                    self._record("heartbeat", started, status == 204)
+                    if status != 204:
+                        content_hash = None
+                if content_hash is None:
+                    started = time.perf_counter()
+                    status, _, body = await conn.request("POST", API, body=advertisement, headers=headers)
+                    self._record("post", started, status == 200)
+                    if status == 200:
+                        content_hash = json.loads(body).get("content_hash")
+            except (OSError, asyncio.IncompleteReadError):
+                self._record("post" if content_hash is None else "heartbeat", started, False)
+            finally:
+                await conn.close()
+            await self._sleep(self.interval)
+
+    async def _searcher(self) -> None:
+        rng = random.Random(self.rng.random())
+        conn = HttpConnection(self.host, self.port)
+        try:
+            while time.monotonic() < self._deadline:
+                path = f"{API}?{urlencode(self._search_params(rng))}"
+                started = time.perf_counter()
+                try:
+                    status, _, _ = await conn.request("GET", path)
+                    self._record("search", started, status == 200)
+                except (OSError, asyncio.IncompleteReadError):
+                    self._record("search", started, False)
+        finally:
+            await conn.close()
+
+    def _db_bytes(self) -> Optional[int]:
+        if self.db_path is None:
+            return None
+        files = (self.db_path, Path(f"{self.db_path}-wal"), Path(f"{self.db_path}-shm"))
+        return sum(path.stat().st_size for path in files if path.exists())
+
+    async def _sampler(self, started: float) -> None:
+        seen = {name: 0 for name in ("search", "post", "heartbeat")}
+        while time.monotonic() < self._deadline:
+            await asyncio.sleep(self.sample_interval)
+            sample = {"t_s": round(time.monotonic() - started, 1), "db_bytes": self._db_bytes()}
+            for name in seen:
+                latencies = self.stats.get(name, OperationStats()).latencies
+                window = latencies[seen[name]:]
+                seen[name] = len(latencies)
+                sample[f"{name}_per_s"] = len(window) / self.sample_interval
+                sample[f"{name}_p99_ms"] = percentile(window, 0.99) * 1000
+            self.timeline.append(sample)
+
+    async def run(self) -> Dict:
+        started = time.monotonic()
+        self._deadline = started + self.duration
+        tasks = [self._provider(i) for i in range(self.providers)]
+        tasks += [self._searcher() for _ in range(self.searchers)]
+        await asyncio.gather(self._sampler(started), *tasks)
+        return self.report(time.monotonic() - started)
+
+    def report(self, elapsed: float) -> Dict:
+        operations = {}
+        for name, stats in sorted(self.stats.items()):
+            operations[name] = {
+                "count": len(stats.latencies),
+                "errors": stats.errors,
+                "per_s": len(stats.latencies) / elapsed,
+                "p50_ms": percentile(stats.latencies, 0.5) * 1000,
+                "p99_ms": percentile(stats.latencies, 0.99) * 1000,
+            }
+        return {
+            "providers": self.providers,
+            "searchers": self.searchers,
+            "interval_s": self.interval,
+            "wall_s": elapsed,
+            "db_bytes": self._db_bytes(),
+            "operations": operations,
+            "timeline": self.timeline,
+        }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class LocalServer:
+    """A discovery server subprocess on a free port with its own database directory."""
+
+    def __init__(self, database_dir: Path, workers: int = 1, env: Optional[Dict[str, str]] = None):
+        self.database_dir = Path(database_dir)
+        self.workers = workers
+        self.port = _free_port()
+        self.env = env or {}
+        self.process: Optional[subprocess.Popen] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    @property
+    def db_path(self) -> Path:
+        return self.database_dir / "discovery.db"
+
+    async def __aenter__(self) -> "LocalServer":
+        env = {
+            **os.environ,
+            "GOLEM_DISCOVERY_DATABASE_DIR": str(self.database_dir),
+            # One IP sends all the traffic; the limiter would reject nearly all of it
+            "GOLEM_DISCOVERY_RATE_LIMIT_PER_MINUTE": str(10**9),
+            **self.env,
+        }
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "discovery:app", "--host", "127.0.0.1",
+             "--port", str(self.port), "--workers", str(self.workers), "--log-level", "warning"],
+            cwd=DISCOVERY_DIR,
+            env=env,
+        )
+        deadline = time.monotonic() + 30
+        while True:
+            conn = HttpConnection("127.0.0.1", self.port)
+            try:
+                if (await conn.request("GET", "/health"))[0] == 200:
+                    return self
+            except (OSError, asyncio.IncompleteReadError):
+                pass
+            finally:
+                await conn.close()
+            if self.process.poll() is not None or time.monotonic() > deadline:
+                await self.__aexit__()
+                raise RuntimeError("discovery server did not start")
+            await asyncio.sleep(0.1)
+
+    async def __aexit__(self, *exc) -> None:
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self.process.wait, 10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+async def _main(args) -> Dict:
+    options = dict(
+        providers=args.providers,
+        searchers=args.searchers,
+        duration=args.duration,
+        interval=args.interval,
+        sample_interval=args.sample_interval,
+        seed=args.seed,
+    )
+    if args.url:
+        return await LoadGenerator(args.url, db_path=args.db_path, **options).run()
+    with tempfile.TemporaryDirectory(prefix="golem-discovery-load-") as database_dir:
+        async with LocalServer(Path(database_dir), workers=args.workers) as server:
+            return await LoadGenerator(server.url, db_path=server.db_path, **options).run()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", help="Load this server instead of starting one")
+    parser.add_argument("--db-path", type=Path, help="SQLite file to watch when using --url")
+    parser.add_argument("--workers", type=int, default=1, help="Workers of the started server")
+    parser.add_argument("--providers", type=int, default=1000)
+    parser.add_argument("--searchers", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds to run")
+    parser.add_argument("--interval", type=float, default=240.0,
+                        help="Seconds between a provider's advertisements (provider default: 240)")
+    parser.add_argument("--sample-interval", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", type=Path, help="Also write the report to this file")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(_main(args))
+    for sample in report["timeline"]:
+        print(" ".join(f"{key}={value:.1f}" if isinstance(value, float) else f"{key}={value}"
+                       for key, value in sample.items()))
+    for name, op in report["operations"].items():
+        print(f"{name}: count={op['count']} errors={op['errors']} per_s={op['per_s']:.1f} "
+              f"p50_ms={op['p50_ms']:.2f} p99_ms={op['p99_ms']:.2f}")
+    print(f"db_bytes={report['db_bytes']}")
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Measurement helpers shared by the benchmark suites."""
+import asyncio
+import json
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlencode
+
+
+class LoopLagProbe:
+    """Measures how long the event loop is blocked while a benchmark runs.
+
+    A probe task sleeps for ``interval`` seconds in a loop; any extra delay
+    before it wakes up is time the loop spent running something else without
+    yielding.
+    """
+
+    def __init__(self, interval: float = 0.005, blocked_threshold: float = 0.02):
+        self.interval = interval
+        self.blocked_threshold = blocked_threshold
+        self.max_lag = 0.0
+        self.blocked = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _probe(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = loop.time() - started - self.interval
+            self.max_lag = max(self.max_lag, lag)
+            if lag >= self.blocked_threshold:
+                self.blocked += lag
+
+    async def __aenter__(self) -> "LoopLagProbe":
+        self._task = asyncio.create_task(self._probe())
+        await asyncio.sleep(0)
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        # Let the probe wake once so a stall that lasted until the end is recorded
+        await asyncio.sleep(self.interval)
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+class BenchRecorder:
+    """Collects benchmark results for the terminal summary and ``--bench-json``."""
+
+    def __init__(self):
+        self.results: List[Dict] = []
+
+    def record(self, name: str, **metrics) -> Dict:
+        entry = {"name": name, **metrics}
+        self.results.append(entry)
+        return entry
+
+
+class Stopwatch:
+    def __enter__(self) -> "Stopwatch":
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.elapsed = time.perf_counter() - self.started
+
+
+async def asgi_request(app, method, path, params=None, body=None, headers=None, client="127.0.0.1"):
+    """Minimal in-process HTTP request against an ASGI app; returns (status, headers, body)."""
+    payload = json.dumps(body).encode() if body is not None else b""
+    raw_headers = [(b"host", b"discovery"), (b"content-type", b"application/json")]
+    raw_headers += [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": urlencode(params or {}).encode(),
+        "root_path": "",
+        "headers": raw_headers,
+        "client": (client, 50000),
+        "server": ("discovery", 80),
+    }
+    done = asyncio.Event()
+    sent = False
+    status = None
+    response_headers = {}
+    chunks = []
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": payload, "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            response_headers.update((k.decode().lower(), v.decode()) for k, v in message.get("headers", []))
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                done.set()
+
+    await app(scope, receive, send)
+    return status, response_headers, b"".join(chunks)
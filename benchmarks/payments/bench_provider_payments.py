@@ -0,0 +1,109 @@
+import asyncio
+import json
+
+from harness import LoopLagProbe, Stopwatch
+
+
+class _VMService:
+    def __init__(self):
+        self.deleted = []
+
+    async def delete_vm(self, vm_id):
+        self.deleted.append(vm_id)
+
+    async def get_vm_status(self, vm_id):
+        from provider.vm.models import VMNotFoundError
+
+        raise VMNotFoundError(vm_id)
+
+
+async def _stream_map(tmp_path, stream_ids):
+    from provider.payments.stream_map import StreamMap
+
+    stream_map = StreamMap(tmp_path / "streams.json")
+    for sid in stream_ids:
+        await stream_map.set(f"vm-{sid}", sid)
+    return stream_map
+
+
+async def bench_stream_monitor_pass(chain, stream_ids, rpc, bench, tmp_path):
+    """One monitor wakeup with every stream due, as right after a provider restart."""
+    from provider.payments.blockchain_service import StreamPaymentReader
+    from provider.payments.monitor import StreamMonitor
+
+    stream_map = await _stream_map(tmp_path, stream_ids)
+    monitor = StreamMonitor(
+        stream_map=stream_map,
+        vm_service=_VMService(),
+        reader=StreamPaymentReader(chain.rpc_url, chain.contract.address),
+        client=None,
+        settings={"STREAM_MONITOR_ENABLED": True, "STREAM_WITHDRAW_ENABLED": False},
+    )
+    rpc.reset()
+    async with LoopLagProbe() as lag:
+        with Stopwatch() as sw:
+            checked = await monitor._check_due(asyncio.Semaphore(8))
+    stats = rpc.snapshot()
+    bench.record(
+        "provider.stream_monitor.pass",
+        streams=len(stream_ids),
+        wall_s=sw.elapsed,
+        loop_max_lag_s=lag.max_lag,
+        loop_blocked_s=lag.blocked,
+        **stats,
+    )
+    assert checked == len(stream_ids)
+    # The whole pass shares one chain timestamp
+    assert stats["rpc_by_method"].get("eth_getBlockByNumber", 0) == 1
+
+
+async def bench_list_stream_statuses(chain, stream_ids, rpc, bench, tmp_path):
+    """The ``GET /payments/streams`` handler over every mapped stream."""
+    from provider.api.routes import list_stream_statuses
+
+    stream_map = await _stream_map(tmp_path, stream_ids)
+    settings = {
+        "STREAM_PAYMENT_ADDRESS": chain.contract.address,
+        "POLYGON_RPC_URL": chain.rpc_url,
+        "PROVIDER_ID": chain.provider_account.address,
+    }
+    rpc.reset()
+    async with LoopLagProbe() as lag:
+        with Stopwatch() as sw:
+            statuses = await list_stream_statuses(settings=settings, stream_map=stream_map)
+    bench.record(
+        "provider.api.list_stream_statuses",
+        streams=len(stream_ids),
+        wall_s=sw.elapsed,
+        loop_max_lag_s=lag.max_lag,
+        loop_blocked_s=lag.blocked,
+        **rpc.snapshot(),
+    )
+    assert len(statuses) == len(stream_ids)
+    assert all(s.verified for s in statuses)
+
+
+def bench_streams_earnings(chain, stream_ids, rpc, bench, tmp_path, monkeypatch):
+    """``golem-provider streams earnings --json`` over every mapped stream."""
+    from typer.testing import CliRunner
+
+    from provider.config import settings
+    from provider.main import cli
+
+    (tmp_path / "streams.json").write_text(json.dumps({f"vm-{sid}": sid for sid in stream_ids}))
+    monkeypatch.setattr(settings, "VM_DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "POLYGON_RPC_URL", chain.rpc_url)
+    monkeypatch.setattr(settings, "STREAM_PAYMENT_ADDRESS", chain.contract.address)
+
+    rpc.reset()
+    with Stopwatch() as sw:
+        result = CliRunner().invoke(cli, ["streams", "earnings", "--json"])
+    bench.record(
+        "provider.cli.streams_earnings",
+        streams=len(stream_ids),
+        wall_s=sw.elapsed,
+        **rpc.snapshot(),
+    )
+    assert result.exit_code == 0, result.output
+    out = json.loads(result.output[result.output.index("{"):])
+    assert len(out["streams"]) == len(stream_ids)
@@ -0,0 +1,52 @@
+import asyncio
+
+from harness import LoopLagProbe, Stopwatch
+
+from .chain import ZERO_ADDRESS
+
+
+async def bench_requestor_monitor_tick(chain, stream_ids, rpc, bench, tmp_path, monkeypatch):
+    """One auto-topup tick over a fleet where every fourth stream is low on runway."""
+    from requestor.config import config
+    from requestor.payments.monitor import RequestorStreamMonitor
+    from requestor.services.database_service import DatabaseService
+
+    monkeypatch.setattr(config, "polygon_rpc_url", chain.rpc_url)
+    monkeypatch.setattr(config, "stream_payment_address", chain.contract.address)
+    monkeypatch.setattr(config, "glm_token_address", ZERO_ADDRESS)
+    monkeypatch.setattr(config, "ethereum_private_key", chain.keys["requestor"])
+
+    db = DatabaseService(tmp_path / "requestor.db")
+    await db.init()
+    for sid in stream_ids:
+        await db.save_vm(f"vm-{sid}", "127.0.0.1", f"id-{sid}", {"stream_id": sid})
+
+    before = {sid: chain.contract.functions.streams(sid).call()[4] for sid in stream_ids}
+    monitor = RequestorStreamMonitor(db)
+    min_remaining = target = 3600
+
+    rpc.reset()
+    async with LoopLagProbe() as lag:
+        with Stopwatch() as read_sw:
+            await monitor._check_streams(min_remaining, target)
+        reads = rpc.snapshot()
+        topups = list(monitor._topups.values())
+        with Stopwatch() as topup_sw:
+            await asyncio.gather(*topups)
+    stats = rpc.snapshot()
+    bench.record(
+        "requestor.stream_monitor.tick",
+        streams=len(stream_ids),
+        topups=len(topups),
+        read_wall_s=read_sw.elapsed,
+        read_rpc_round_trips=reads["rpc_round_trips"],
+        topup_wall_s=topup_sw.elapsed,
+        loop_max_lag_s=lag.max_lag,
+        loop_blocked_s=lag.blocked,
+        **stats,
+    )
+
+    low = [sid for i, sid in enumerate(stream_ids) if i % 4 == 0]
+    assert len(topups) == len(low)
+    after = {sid: chain.contract.functions.streams(sid).call()[4] for sid in low}
+    assert all(after[sid] > before[sid] for sid in low)
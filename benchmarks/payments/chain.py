@@ -0,0 +1,263 @@
+"""Local chain stand-in for payment benchmarks.
+
+Deploys ``contracts/contracts/StreamPayment.sol`` either to an in-process
+eth-tester chain or to an external anvil/hardhat node (``GOLEM_BENCH_RPC_URL``)
+and counts every JSON-RPC call the services make against it.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from eth_account import Account
+from web3 import Web3
+from web3.providers.rpc import HTTPProvider
+
+ROOT = Path(__file__).resolve().parents[2]
+CONTRACT_SOURCE = ROOT / "contracts" / "contracts" / "StreamPayment.sol"
+HARDHAT_ARTIFACT = ROOT / "contracts" / "artifacts" / "contracts" / "StreamPayment.sol" / "StreamPayment.json"
+SOLC_VERSION = "0.8.20"
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+# Default funded accounts of anvil and the hardhat node (oracle, requestor, provider)
+DEV_KEYS = (
+    "0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80",
+    "0x59c6995e998f97a5a0044966f0945389dc9e86dae88c7a8412f4603b6b78690d",
+    "0x5de4111afa1a4b94908f83103eb1f1706367c2e68ca870fc3fb9a804cdab365a",
+)
+
+
+class ContractUnavailable(RuntimeError):
+    """Raised when no compiled StreamPayment contract can be produced."""
+
+
+class RpcStats:
+    """Thread-safe counters of JSON-RPC calls and network round trips."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls: Counter = Counter()
+        self.round_trips = 0
+
+    def record(self, methods: List[str]) -> None:
+        with self._lock:
+            self.round_trips += 1
+            self.calls.update(methods)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.calls.clear()
+            self.round_trips = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "rpc_calls": sum(self.calls.values()),
+                "rpc_round_trips": self.round_trips,
+                "rpc_by_method": dict(self.calls),
+            }
+
+
+class CountingHTTPProvider(HTTPProvider):
+    def __init__(self, endpoint_uri: str, stats: RpcStats, **kwargs):
+        super().__init__(endpoint_uri, **kwargs)
+        self.stats = stats
+
+    def make_request(self, method, params):
+        self.stats.record([method])
+        return super().make_request(method, params)
+
+    def make_batch_request(self, batch_requests):
+        self.stats.record([method for method, _ in batch_requests])
+        return super().make_batch_request(batch_requests)
+
+
+def _counting_tester_provider(tester, stats: RpcStats):
+    from web3 import EthereumTesterProvider
+    from web3.middleware import Web3Middleware, combine_middleware
+    from web3.providers.base import JSONBaseProvider
+
+    local = threading.local()
+
+    class CountRequests(Web3Middleware):
+        """Counts requests the client sends, not the ones eth-tester's own middleware adds."""
+
+        def wrap_make_request(self, make_request):
+            def middleware(method, params):
+                depth = getattr(local, "depth", 0)
+                if depth == 0 and not getattr(local, "batching", False):
+                    stats.record([method])
+                local.depth = depth + 1
+                try:
+                    return make_request(method, params)
+                finally:
+                    local.depth = depth
+
+            return middleware
+
+    # JSONBaseProvider marks the provider as batch-capable for web3's batch_requests()
+    class CountingTesterProvider(EthereumTesterProvider, JSONBaseProvider):
+        """eth-tester provider that is safe to share across threads and accepts batches."""
+
+        def __init__(self):
+            super().__init__(tester)
+            self.stats = stats
+            self._chain_lock = threading.RLock()
+
+        def make_request(self, method, params):
+            with self._chain_lock:
+                return super().make_request(method, params)
+
+        def request_func(self, w3, middleware_onion):
+            middleware = (
+                middleware_onion.as_tuple_of_middleware() + (CountRequests,) + tuple(self._middleware)
+            )
+            if self._request_func_cache[0] != middleware:
+                self._request_func_cache = (
+                    middleware,
+                    combine_middleware(middleware=middleware, w3=w3, provider_request_fn=self.make_request),
+                )
+            return self._request_func_cache[-1]
+
+        def batch_request_func(self, w3, middleware_onion):
+            single = self.request_func(w3, middleware_onion)
+
+            def _batch(requests):
+                # eth-tester has no batch endpoint; count the batch as one round trip
+                stats.record([method for method, _ in requests])
+                local.batching = True
+                try:
+                    return [single(method, params) for method, params in requests]
+                finally:
+                    local.batching = False
+
+            return _batch
+
+    return CountingTesterProvider()
+
+
+def load_contract() -> Tuple[list, str]:
+    """Return ``(abi, bytecode)`` of StreamPayment.
+
+    Uses ``GOLEM_BENCH_CONTRACT_ARTIFACT`` or the hardhat build output
+    (``npm run build`` in ``contracts/``) when present, otherwise compiles the
+    source with py-solc-x.
+    """
+    override = os.environ.get("GOLEM_BENCH_CONTRACT_ARTIFACT")
+    for path in ([Path(override)] if override else []) + [HARDHAT_ARTIFACT]:
+        if path.exists():
+            artifact = json.loads(path.read_text())
+            return artifact["abi"], artifact["bytecode"]
+    try:
+        import solcx
+    except ImportError as e:
+        raise ContractUnavailable(
+            "install py-solc-x or run `npm run build` in contracts/ to compile StreamPayment"
+        ) from e
+    try:
+        if SOLC_VERSION not in {str(v) for v in solcx.get_installed_solc_versions()}:
+            solcx.install_solc(SOLC_VERSION)
+        compiled = solcx.compile_files(
+            [str(CONTRACT_SOURCE)], output_values=["abi", "bin"], solc_version=SOLC_VERSION
+        )
+    except Exception as e:
+        raise ContractUnavailable(f"could not compile StreamPayment with solc {SOLC_VERSION}: {e}") from e
+    contract = compiled[f"{CONTRACT_SOURCE}:StreamPayment"]
+    return contract["abi"], contract["bin"]
+
+
+class LocalChain:
+    """A funded local chain with StreamPayment deployed and helpers to seed streams."""
+
+    def __init__(self, provider, time_travel: Callable[[int], None], keys=DEV_KEYS):
+        self.provider = provider
+        self.stats: RpcStats = provider.stats
+        self.web3 = Web3(provider)
+        self._time_travel = time_travel
+        self.oracle, self.requestor, self.provider_account = (Account.from_key(k) for k in keys)
+        self.keys = {
+            "oracle": keys[0],
+            "requestor": keys[1],
+            "provider": keys[2],
+        }
+        self.rpc_url = getattr(provider, "endpoint_uri", None) or "http://golem-bench.invalid"
+        self.contract = None
+
+    @classmethod
+    def in_process(cls) -> "LocalChain":
+        from eth_tester import EthereumTester, PyEVMBackend
+
+        backend = PyEVMBackend()
+        tester = EthereumTester(backend)
+        keys = tuple(k.to_hex() for k in backend.account_keys[:3])
+        provider = _counting_tester_provider(tester, RpcStats())
+
+        def time_travel(seconds: int) -> None:
+            latest = tester.get_block_by_number("latest")["timestamp"]
+            tester.time_travel(int(latest) + int(seconds))
+
+        return cls(provider, time_travel, keys)
+
+    @classmethod
+    def from_url(cls, url: str) -> "LocalChain":
+        provider = CountingHTTPProvider(url, RpcStats())
+
+        def time_travel(seconds: int) -> None:
+            provider.make_request("evm_increaseTime", [int(seconds)])
+            provider.make_request("evm_mine", [])
+
+        return cls(provider, time_travel)
+
+    def http_provider(self, endpoint_uri: Optional[str] = None, **_kwargs):
+        """Stand-in for ``Web3.HTTPProvider`` so services talk to this chain."""
+        return self.provider
+
+    def now(self) -> int:
+        return int(self.web3.eth.get_block("latest")["timestamp"])
+
+    def advance(self, seconds: int) -> None:
+        self._time_travel(seconds)
+
+    def _transact(self, key: str, fn, value: int = 0, nonce: Optional[int] = None):
+        account = Account.from_key(key)
+        tx = fn.build_transaction(
+            {
+                "from": account.address,
+                "value": int(value),
+                "nonce": nonce if nonce is not None else self.web3.eth.get_transaction_count(account.address, "pending"),
+                "gas": 500_000,
+                "chainId": self.web3.eth.chain_id,
+            }
+        )
+        signed = account.sign_transaction(tx)
+        return self.web3.eth.send_raw_transaction(signed.raw_transaction)
+
+    def deploy(self) -> str:
+        abi, bytecode = load_contract()
+        factory = self.web3.eth.contract(abi=abi, bytecode=bytecode)
+        tx_hash = self._transact(self.keys["oracle"], factory.constructor(self.oracle.address))
+        receipt = self.web3.eth.wait_for_transaction_receipt(tx_hash)
+        self.contract = self.web3.eth.contract(address=receipt.contractAddress, abi=abi)
+        return receipt.contractAddress
+
+    def seed_streams(self, runways: List[int], rate_per_second: int = 10**9) -> List[int]:
+        """Open one native-ETH stream per entry in ``runways`` (seconds of funding)."""
+        first = int(self.contract.functions.nextStreamId().call()) + 1
+        nonce = self.web3.eth.get_transaction_count(self.requestor.address, "pending")
+        last = None
+        for i, runway in enumerate(runways):
+            deposit = int(runway) * int(rate_per_second)
+            fn = self.contract.functions.createStream(
+                ZERO_ADDRESS, self.provider_account.address, deposit, int(rate_per_second)
+            )
+            last = self._transact(self.keys["requestor"], fn, value=deposit, nonce=nonce + i)
+        if last is not None:
+            self.web3.eth.wait_for_transaction_receipt(last)
+        ids = list(range(first, first + len(runways)))
+        if ids and int(self.contract.functions.nextStreamId().call()) != ids[-1]:
+            raise RuntimeError("stream seeding did not create the expected stream ids")
+        return ids
@@ -0,0 +1,44 @@
+import os
+
+import pytest
+
+pytest.importorskip("web3")
+
+from .chain import ContractUnavailable, LocalChain
+
+# Number of streams seeded for the session; raise to 1000+ for fleet-sized runs
+STREAM_COUNT = int(os.environ.get("GOLEM_BENCH_STREAMS", "200"))
+# Seconds of funding per stream; every fourth stream is close to running out
+LOW_RUNWAY = 600
+HIGH_RUNWAY = 2 * 24 * 3600
+
+
+@pytest.fixture(scope="session")
+def chain() -> LocalChain:
+    url = os.environ.get("GOLEM_BENCH_RPC_URL")
+    if url:
+        chain = LocalChain.from_url(url)
+    else:
+        pytest.importorskip("eth_tester", reason="install eth-tester[py-evm] or set GOLEM_BENCH_RPC_URL")
+        chain = LocalChain.in_process()
+    try:
+        chain.deploy()
+    except ContractUnavailable as e:
+        pytest.skip(str(e))
+    return chain
+
+
+@pytest.fixture(scope="session")
+def stream_ids(chain):
+    runways = [LOW_RUNWAY if i % 4 == 0 else HIGH_RUNWAY for i in range(STREAM_COUNT)]
+    return chain.seed_streams(runways)
+
+
+@pytest.fixture
+def rpc(chain, monkeypatch):
+    """Route every ``Web3.HTTPProvider`` the services build to the local chain."""
+    from web3 import Web3
+
+    monkeypatch.setattr(Web3, "HTTPProvider", staticmethod(chain.http_provider))
+    chain.stats.reset()
+    return chain.stats
@@ -0,0 +1,159 @@
+"""Port checker under increasing concurrency, against local fakes.
+
+Each scenario sends a fixed number of requests through the full ASGI app,
+``concurrency`` at a time, for every level in
+``GOLEM_BENCH_PORT_CHECKER_CONCURRENCY``:
+
+- ``proxy.discovery``: ``/proxy/provider/{id}/status`` resolved through discovery
+- ``proxy.golem_base``: the same resolved through a stub Golem Base client
+- ``proxy.stream``: a large body (``GOLEM_BENCH_PROXY_BLOB_BYTES``) streamed through the proxy
+- ``check_ports.cold``: ``/check-ports`` with the result cache disabled
+- ``check_ports.cached``: ``/check-ports`` repeating the same ports, served from
+  a cache warmed by one request beforehand
+
+Providers, discovery and check targets are local (see ``fakes.py``).
+"""
+import asyncio
+import contextlib
+import importlib
+import os
+import statistics
+import time
+
+import pytest
+
+from harness import LoopLagProbe, asgi_request
+
+pytest.importorskip("aiohttp")
+
+from .fakes import FakeProviders, PortTargets, ResourceSampler, StubGolemBase  # noqa: E402
+
+CONCURRENCY = [int(c) for c in os.environ.get("GOLEM_BENCH_PORT_CHECKER_CONCURRENCY", "1,16,64,256").split(",")]
+PROXY_REQUESTS = int(os.environ.get("GOLEM_BENCH_PROXY_REQUESTS", "1000"))
+STREAM_REQUESTS = int(os.environ.get("GOLEM_BENCH_PROXY_STREAM_REQUESTS", "100"))
+BLOB_BYTES = int(os.environ.get("GOLEM_BENCH_PROXY_BLOB_BYTES", str(1024 * 1024)))
+CHECK_REQUESTS = int(os.environ.get("GOLEM_BENCH_CHECK_REQUESTS", "200"))
+CHECK_PORTS = int(os.environ.get("GOLEM_BENCH_CHECK_PORTS", "64"))
+PROVIDERS = int(os.environ.get("GOLEM_BENCH_FAKE_PROVIDERS", "8"))
+# Simulated latency of each provider response and each Golem Base RPC call
+PROVIDER_LATENCY = float(os.environ.get("GOLEM_BENCH_PROVIDER_LATENCY", "0.005"))
+GOLEM_BASE_LATENCY = float(os.environ.get("GOLEM_BENCH_GOLEM_BASE_LATENCY", "0.05"))
+
+SCENARIOS = ["proxy.discovery", "proxy.golem_base", "proxy.stream", "check_ports.cold", "check_ports.cached"]
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def _drive(send, requests, concurrency):
+    """Run ``send(i)`` for i in range(requests), ``concurrency`` at a time."""
+    remaining = iter(range(requests))
+    latencies = []
+    statuses = {}
+
+    async def worker():
+        for i in remaining:
+            started = time.perf_counter()
+            status = await send(i)
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return sorted(latencies), statuses, time.perf_counter() - started
+
+
+def _load_app(monkeypatch, providers):
+    monkeypatch.setenv("PORT_CHECKER_PROXY_TOKEN", "bench")
+    monkeypatch.setenv("PORT_CHECKER_PROXY_ALLOWED_PORTS", "*")
+    monkeypatch.setenv("PORT_CHECKER_ALLOW_LOCAL_IPS", "true")
+    monkeypatch.setenv("DISCOVERY_API_URL", providers.discovery_url)
+    monkeypatch.setenv("GOLEM_BASE_RPC_URL", "http://golem-base.invalid")
+    monkeypatch.setenv("GOLEM_BASE_WS_URL", "ws://golem-base.invalid")
+    return importlib.reload(importlib.import_module("port_checker.main"))
+
+
+@pytest.mark.parametrize("concurrency", CONCURRENCY)
+@pytest.mark.parametrize("scenario", SCENARIOS)
+async def bench_port_checker_load(scenario, concurrency, monkeypatch, bench):
+    async with contextlib.AsyncExitStack() as stack:
+        providers = await stack.enter_async_context(FakeProviders(PROVIDERS, latency=PROVIDER_LATENCY))
+        m = _load_app(monkeypatch, providers)
+        golem_base = StubGolemBase(GOLEM_BASE_LATENCY)
+        targets = None
+        headers = {"X-Proxy-Token": "bench"}
+        extra = {}
+
+        if scenario == "proxy.golem_base":
+            if not m._HAS_GOLEM_BASE:
+                pytest.skip("golem-base-sdk is not installed")
+
+            async def create_client(rpc_url, ws_url):
+                return golem_base
+
+            monkeypatch.setattr(m, "_create_golem_base_client", create_client)
+
+        if scenario.startswith("proxy."):
+            if scenario != "proxy.golem_base":
+                headers["X-Proxy-Source"] = "discovery"
+            path = "/status" if scenario != "proxy.stream" else "/blob"
+            requests = STREAM_REQUESTS if scenario == "proxy.stream" else PROXY_REQUESTS
+
+            async def send(i):
+                params = {"port": providers.port_of(i)}
+                if scenario == "proxy.stream":
+                    params["size"] = BLOB_BYTES
+                # One provider id per fake server, so lookups repeat as they would in practice
+                status, _, body = await asgi_request(
+                    m.app, "GET", f"/proxy/provider/0xbench{i % PROVIDERS}{path}", params, headers=headers
+                )
+                if scenario == "proxy.stream":
+                    assert len(body) == BLOB_BYTES
+                return status
+
+        else:
+            targets = await stack.enter_async_context(
+                PortTargets(CHECK_PORTS // 2, CHECK_PORTS - CHECK_PORTS // 2)
+            )
+            if scenario == "check_ports.cold":
+                monkeypatch.setattr(m, "port_checks", m.PortChecker(ttl=0, negative_ttl=0, retries=1))
+            requests = CHECK_REQUESTS
+            payload = {"provider_ip": "127.0.0.1", "ports": targets.ports, "compact": True}
+
+            async def send(i):
+                # A distinct client per request stays clear of any rate limit
+                status, _, _ = await asgi_request(
+                    m.app, "POST", "/check-ports", body=payload, client=f"10.0.{i // 250}.{i % 250 + 1}"
+                )
+                return status
+
+            if scenario == "check_ports.cached":
+                await send(requests)
+
+        upstream_ports = set(providers.ports) | set(targets.open_ports if targets is not None else [])
+        try:
+            async with ResourceSampler(upstream_ports) as resources, LoopLagProbe() as lag:
+                latencies, statuses, elapsed = await _drive(send, requests, concurrency)
+        finally:
+            await m.close_http_session()
+            await m.close_golem_base_clients()
+
+        if scenario == "proxy.golem_base":
+            extra["golem_base_queries"] = golem_base.queries
+        if scenario.startswith("check_ports"):
+            extra["ports_per_request"] = CHECK_PORTS
+
+    bench.record(
+        f"port_checker.{scenario}[c={concurrency}]",
+        requests=requests,
+        concurrency=concurrency,
+        requests_per_s=requests / elapsed,
+        p50_ms=statistics.median(latencies) * 1000,
+        p95_ms=_percentile(latencies, 0.95) * 1000,
+        p99_ms=_percentile(latencies, 0.99) * 1000,
+        loop_max_lag_s=lag.max_lag,
+        **resources.metrics(),
+        **extra,
+    )
+    assert statuses == {200: requests}
@@ -0,0 +1,107 @@
+"""Throughput of the port-checker provider proxy.
+
+Requests go through the full ASGI app to ``/proxy/provider/{id}/status`` with
+the discovery source, so each one is a discovery lookup plus the proxied call,
+both against a local aiohttp server. ``pooled`` is the app-wide keep-alive
+session; ``per_request`` opens a new session and connection per request, as
+the proxy did before.
+"""
+import asyncio
+import importlib
+import os
+import statistics
+import time
+
+import pytest
+
+from harness import LoopLagProbe, asgi_request
+
+aiohttp = pytest.importorskip("aiohttp")
+from aiohttp import web  # noqa: E402
+
+REQUESTS = int(os.environ.get("GOLEM_BENCH_PROXY_REQUESTS", "1000"))
+CONCURRENCY = 16
+
+
+async def _start_upstream():
+    """One local server acting as both discovery and the provider."""
+    routes = web.RouteTableDef()
+
+    @routes.get("/api/v1/advertisements/{provider_id}")
+    async def advertisement(request):
+        return web.json_response({"provider_id": request.match_info["provider_id"], "ip_address": "127.0.0.1"})
+
+    @routes.get("/status")
+    async def status(request):
+        return web.json_response({"status": "ok"})
+
+    upstream = web.Application()
+    upstream.add_routes(routes)
+    runner = web.AppRunner(upstream, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner, site._server.sockets[0].getsockname()[1]
+
+
+@pytest.mark.parametrize("pooling", ["per_request", "pooled"])
+async def bench_provider_proxy(pooling, monkeypatch, bench):
+    runner, port = await _start_upstream()
+    monkeypatch.setenv("PORT_CHECKER_PROXY_TOKEN", "bench")
+    monkeypatch.setenv("PORT_CHECKER_PROXY_ALLOWED_PORTS", "*")
+    monkeypatch.setenv("PORT_CHECKER_ALLOW_LOCAL_IPS", "true")
+    monkeypatch.setenv("DISCOVERY_API_URL", f"http://127.0.0.1:{port}/api/v1")
+    m = importlib.reload(importlib.import_module("port_checker.main"))
+
+    sessions = []
+    if pooling == "per_request":
+
+        def fresh_session():
+            # A new session per call whose connections close after use
+            session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=None, connect=m.CONNECT_TIMEOUT, sock_read=m.READ_TIMEOUT),
+                connector=aiohttp.TCPConnector(force_close=True),
+            )
+            sessions.append(session)
+            return session
+
+        monkeypatch.setattr(m, "_get_http_session", fresh_session)
+
+    path = "/proxy/provider/0xbench/status"
+    params = {"port": port}
+    headers = {"X-Proxy-Token": "bench", "X-Proxy-Source": "discovery"}
+    remaining = REQUESTS
+    latencies = []
+    statuses = {}
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            status, _, _ = await asgi_request(m.app, "GET", path, params, headers=headers)
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    try:
+        async with LoopLagProbe() as lag:
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+            elapsed = time.perf_counter() - started
+    finally:
+        await m.close_http_session()
+        for session in sessions:
+            await session.close()
+        await runner.cleanup()
+
+    latencies.sort()
+    bench.record(
+        f"port_checker.proxy[{pooling}]",
+        requests=REQUESTS,
+        concurrency=CONCURRENCY,
+        requests_per_s=REQUESTS / elapsed,
+        p50_ms=statistics.median(latencies) * 1000,
+        p99_ms=latencies[int(len(latencies) * 0.99)] * 1000,
+        loop_max_lag_s=lag.max_lag,
+    )
+    assert statuses == {200: REQUESTS}
@@ -0,0 +1,242 @@
+"""Local stand-ins for everything the port checker talks to.
+
+- ``FakeProviders`` runs provider HTTP servers on loopback that also answer
+  discovery's advertisement lookups with ``127.0.0.1``.
+- ``StubGolemBase`` is a Golem Base client answering provider queries after a
+  simulated RPC latency.
+- ``PortTargets`` opens listeners (accessible ports) and reserves closed ports
+  (refused connections) for ``/check-ports``.
+- ``ResourceSampler`` tracks this process's resident memory and its open
+  connections to the fake servers while a benchmark runs.
+"""
+import asyncio
+import os
+import socket
+import types
+from typing import Dict, List, Optional, Set
+
+from aiohttp import web
+
+BLOB_CHUNK = 64 * 1024
+
+
+class FakeProviders:
+    """``count`` provider servers on loopback, each also serving discovery lookups.
+
+    Providers answer ``GET /status`` with a small JSON document and
+    ``GET /blob?size=N`` with an N byte body written in 64 KiB chunks, after
+    ``latency`` seconds.
+    """
+
+    def __init__(self, count: int = 4, latency: float = 0.0):
+        self.count = count
+        self.latency = latency
+        self.ports: List[int] = []
+        self.requests = 0
+        self._runners: List[web.AppRunner] = []
+
+    def _app(self) -> web.Application:
+        routes = web.RouteTableDef()
+
+        @routes.get("/api/v1/advertisements/{provider_id}")
+        async def advertisement(request):
+            return web.json_response({"provider_id": request.match_info["provider_id"], "ip_address": "127.0.0.1"})
+
+        @routes.get("/status")
+        async def status(request):
+            self.requests += 1
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            return web.json_response({"status": "ok", "vms": 3})
+
+        @routes.get("/blob")
+        async def blob(request):
+            self.requests += 1
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            size = int(request.query.get("size", "0"))
+            resp = web.StreamResponse(headers={"Content-Type": "application/octet-stream"})
+            resp.content_length = size
+            await resp.prepare(request)
+            chunk = b"x" * BLOB_CHUNK
+            while size > 0:
+                await resp.write(chunk[:size])
+                size -= BLOB_CHUNK
+            await resp.write_eof()
+            return resp
+
+        app = web.Application()
+        app.add_routes(routes)
+        return app
+
+    def port_of(self, provider_index: int) -> int:
+        return self.ports[provider_index % self.count]
+
+    @property
+    def discovery_url(self) -> str:
+        return f"http://127.0.0.1:{self.ports[0]}/api/v1"
+
+    async def __aenter__(self) -> "FakeProviders":
+        for _ in range(self.count):
+            runner = web.AppRunner(self._app(), access_log=None)
+            await runner.setup()
+            site = web.TCPSite(runner, "127.0.0.1", 0)
+            await site.start()
+            self._runners.append(runner)
+            self.ports.append(site._server.sockets[0].getsockname()[1])
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        for runner in self._runners:
+            await runner.cleanup()
+
+
+class StubGolemBase:
+    """Golem Base client resolving every provider to ``127.0.0.1`` after ``latency`` seconds per call."""
+
+    def __init__(self, latency: float = 0.05):
+        self.latency = latency
+        self.queries = 0
+
+    async def query_entities(self, query):
+        self.queries += 1
+        await asyncio.sleep(self.latency)
+        return [types.SimpleNamespace(entity_key="0x" + "00" * 32)]
+
+    async def get_entity_metadata(self, _entity_key):
+        await asyncio.sleep(self.latency)
+        return types.SimpleNamespace(
+            string_annotations=[types.SimpleNamespace(key="golem_ip_address", value="127.0.0.1")],
+            expires_at_block=None,
+        )
+
+    async def disconnect(self):
+        return None
+
+
+class PortTargets:
+    """``open_count`` listening ports plus ``closed_count`` ports nothing listens on."""
+
+    def __init__(self, open_count: int, closed_count: int):
+        self.open_count = open_count
+        self.closed_count = closed_count
+        self.open_ports: List[int] = []
+        self.closed_ports: List[int] = []
+        self._servers: List[asyncio.AbstractServer] = []
+
+    @property
+    def ports(self) -> List[int]:
+        return self.open_ports + self.closed_ports
+
+    async def __aenter__(self) -> "PortTargets":
+        for _ in range(self.open_count):
+            server = await asyncio.start_server(self._accept, "127.0.0.1", 0)
+            self._servers.append(server)
+            self.open_ports.append(server.sockets[0].getsockname()[1])
+        # Bound and released at once, so connecting is refused
+        reserved = []
+        for _ in range(self.closed_count):
+            sock = socket.socket()
+            sock.bind(("127.0.0.1", 0))
+            reserved.append(sock)
+        self.closed_ports = [sock.getsockname()[1] for sock in reserved]
+        for sock in reserved:
+            sock.close()
+        return self
+
+    @staticmethod
+    def _accept(reader, writer) -> None:
+        writer.close()
+
+    async def __aexit__(self, *exc) -> None:
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+
+
+def _rss_bytes() -> Optional[int]:
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def _socket_inodes() -> Set[str]:
+    inodes = set()
+    for fd in os.listdir("/proc/self/fd"):
+        try:
+            target = os.readlink(f"/proc/self/fd/{fd}")
+        except OSError:
+            continue
+        if target.startswith("socket:["):
+            inodes.add(target[8:-1])
+    return inodes
+
+
+def connections_to(ports: Set[int]) -> Optional[int]:
+    """Established connections this process holds to any of ``ports``, on Linux."""
+    try:
+        inodes = _socket_inodes()
+        count = 0
+        for table in ("/proc/net/tcp", "/proc/net/tcp6"):
+            if not os.path.exists(table):
+                continue
+            with open(table) as fh:
+                next(fh)
+                for line in fh:
+                    fields = line.split()
+                    remote_port = int(fields[2].rsplit(":", 1)[1], 16)
+                    # State 01 is ESTABLISHED
+                    if fields[3] == "01" and remote_port in ports and fields[9] in inodes:
+                        count += 1
+        return count
+    except OSError:
+        return None
+
+
+class ResourceSampler:
+    """Samples resident memory and connections to ``ports`` every ``interval`` seconds."""
+
+    def __init__(self, ports: Set[int], interval: float = 0.05):
+        self.ports = set(ports)
+        self.interval = interval
+        self.rss_start = _rss_bytes()
+        self.rss_peak = self.rss_start
+        self.connections_peak: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def sample(self) -> None:
+        rss = _rss_bytes()
+        if rss is not None:
+            self.rss_peak = max(self.rss_peak or 0, rss)
+        connections = connections_to(self.ports)
+        if connections is not None:
+            self.connections_peak = max(self.connections_peak or 0, connections)
+
+    async def _run(self) -> None:
+        while True:
+            self.sample()
+            await asyncio.sleep(self.interval)
+
+    def metrics(self) -> Dict[str, Optional[float]]:
+        mib = 1024 * 1024
+        return {
+            "rss_peak_mib": self.rss_peak / mib if self.rss_peak is not None else None,
+            "rss_growth_mib": (self.rss_peak - self.rss_start) / mib if self.rss_start is not None else None,
+            "upstream_connections_peak": self.connections_peak,
+        }
+
+    async def __aenter__(self) -> "ResourceSampler":
+        self._task = asyncio.create_task(self._run())
+        await asyncio.sleep(0)
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self.sample()
@@ -1,7 +1,9 @@
 from .routes import router
 from .models import (
     AdvertisementCreate,
+    AdvertisementMatch,
     AdvertisementResponse,
+    PriceEstimate,
     ResourceRequirements,
     ErrorResponse
 )
@@ -9,7 +11,9 @@ from .models import (
 __all__ = [
     "router",
     "AdvertisementCreate",
+    "AdvertisementMatch",
     "AdvertisementResponse",
+    "PriceEstimate",
     "ResourceRequirements",
     "ErrorResponse"
 ]
@@ -0,0 +1,122 @@
+"""Sorting, cursor pagination and cache validators for advertisement listings.
+
+Pages are cut by keyset: every sort order is an ascending tuple ending in the
+provider ID, and the cursor is the key of the last entry returned. Inserts and
+deletes between requests therefore never shift or repeat entries. Heartbeats
+move ``updated_at`` at any time, so the ``updated_at`` orders are not paged:
+``limit`` only truncates them.
+
+Listing ETags are weak and derived from the index's market version and the
+normalized query, so a conditional request is answered before any searching
+or sorting. Heartbeats (which only move ``updated_at``) change them only when
+the listing shows or sorts by ``updated_at``.
+"""
+import base64
+import bisect
+import hashlib
+import json
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+
+from ..db.models import estimate_monthly_cost
+
+SORT_FIELDS = ("price", "-price", "updated_at", "-updated_at", "provider_id")
+# Orders that heartbeats cannot change, so a cursor resumes them exactly
+CURSOR_SORTS = ("price", "-price", "provider_id")
+
+# Hours per month used for hourly estimates, matching the requestor CLI
+HOURS_PER_MONTH = 730.0
+
+_GLM_PRICES = ("glm_per_core_month", "glm_per_gb_ram_month", "glm_per_gb_storage_month")
+
+SortKey = Tuple[int, float, str]
+
+
+def price_estimate(ad, cost: float, spec: dict) -> dict:
+    """Estimate for ``spec`` costing ``cost`` USD a month, shaped like the requestor's."""
+    pricing = ad.pricing or {}
+    glm_per_month = None
+    try:
+        glm_per_month = sum(
+            float(pricing[field]) * spec[resource]
+            for field, resource in zip(_GLM_PRICES, ("cpu", "memory", "storage"))
+        )
+    except (KeyError, TypeError, ValueError):
+        pass
+    return {
+        "usd_per_month": round(cost, 4),
+        "usd_per_hour": round(cost / HOURS_PER_MONTH, 6),
+        "glm_per_month": round(glm_per_month, 8) if glm_per_month is not None else None,
+    }
+
+
+def sort_key(ad, sort: str, spec: dict) -> SortKey:
+    """Ascending key for ``sort``; entries without a value go last."""
+    if sort in ("price", "-price"):
+        value = estimate_monthly_cost(ad, **spec)
+    elif sort in ("updated_at", "-updated_at"):
+        value = ad.updated_at.timestamp()
+    else:
+        value = 0.0
+    if value is None:
+        return (1, 0.0, ad.provider_id)
+    return (0, -value if sort.startswith("-") else value, ad.provider_id)
+
+
+def encode_cursor(key: SortKey) -> str:
+    raw = json.dumps(list(key), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> SortKey:
+    """Parse a cursor from ``encode_cursor``; raises ValueError if it is malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        missing, value, provider_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return (int(missing), float(value), str(provider_id))
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def paginate(
+    ads: Iterable[Any],
+    sort: str,
+    spec: dict,
+    limit: Optional[int] = None,
+    cursor: Optional[SortKey] = None,
+) -> Tuple[List[Any], Optional[str]]:
+    """Return the page of ``ads`` after ``cursor`` and the cursor of the next page.
+
+    There is no next cursor for sorts outside ``CURSOR_SORTS``.
+    """
+    # Keys end in the provider ID, so they are unique and never tie
+    keyed = sorted(((sort_key(ad, sort, spec), ad) for ad in ads), key=lambda item: item[0])
+    keys = [key for key, _ in keyed]
+    start = bisect.bisect_right(keys, cursor) if cursor is not None else 0
+    end = len(keyed) if limit is None else start + limit
+    page = keyed[start:end]
+    next_cursor = None
+    if sort in CURSOR_SORTS and page and end < len(keyed):
+        next_cursor = encode_cursor(page[-1][0])
+    return [ad for _, ad in page], next_cursor
+
+
+def listing_etag(query: Sequence[Tuple[str, Any]], version: str) -> str:
+    """Weak ETag of a listing: its normalized query and the market version."""
+    digest = hashlib.sha256(json.dumps([version, sorted(query)], default=str).encode())
+    return f'W/"{digest.hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of ``etag`` against an If-None-Match header."""
+    if not if_none_match:
+        return False
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
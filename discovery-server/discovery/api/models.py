@@ -55,10 +55,24 @@ class AdvertisementResponse(BaseModel):
     pricing: Optional[Dict]
     created_at: datetime
     updated_at: datetime
+    content_hash: Optional[str] = Field(
+        None,
+        description="Hash of the advertised content; send it as If-Match to refresh without reposting"
+    )
 
     class Config:
         orm_mode = True
 
+class PriceEstimate(BaseModel):
+    """Estimated cost of a spec at a provider's prices."""
+    usd_per_month: float
+    usd_per_hour: float
+    glm_per_month: Optional[float]
+
+class AdvertisementMatch(AdvertisementResponse):
+    """Advertisement ranked by the estimated cost of the requested spec."""
+    estimate: PriceEstimate
+
 class ErrorResponse(BaseModel):
     """Model for error responses."""
     code: str
@@ -1,12 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, Header
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, Depends, HTTPException, Request, Header, Response
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 from datetime import datetime
 
-from ..db.session import get_db
-from ..db.repository import AdvertisementRepository
+from ..config import settings
+from ..db.session import AsyncSessionLocal
+from ..db.index import AdvertisementIndex
+from .listing import CURSOR_SORTS, SORT_FIELDS, decode_cursor, etag_matches, listing_etag, paginate, price_estimate
+from .serialization import advertisement_dict, dumps, encode_advertisements
+from .watch import advertisement_events
 from .models import (
     AdvertisementCreate,
+    AdvertisementMatch,
     AdvertisementResponse,
     ResourceRequirements,
     ErrorResponse
@@ -14,9 +19,12 @@ from .models import (
 
 router = APIRouter(prefix="/api/v1")
 
-async def get_repository(session: AsyncSession = Depends(get_db)) -> AdvertisementRepository:
+# Live advertisements are served from memory and persisted in the background
+advertisement_index = AdvertisementIndex(AsyncSessionLocal, change_log_size=settings.WATCH_CHANGE_LOG_SIZE)
+
+async def get_repository() -> AdvertisementIndex:
     """Dependency for getting the advertisement repository."""
-    return AdvertisementRepository(session)
+    return advertisement_index
 
 async def verify_provider_headers(
     x_provider_id: str = Header(...),
@@ -45,7 +53,7 @@ async def verify_provider_headers(
 async def create_advertisement(
     advertisement: AdvertisementCreate,
     provider_id: str = Depends(verify_provider_headers),
-    repo: AdvertisementRepository = Depends(get_repository)
+    repo: AdvertisementIndex = Depends(get_repository)
 ) -> AdvertisementResponse:
     """Create or update a provider advertisement."""
     try:
@@ -67,22 +75,44 @@ async def create_advertisement(
             }
         )
 
+def _invalid_listing(message: str) -> HTTPException:
+    return HTTPException(
+        status_code=400,
+        detail={
+            "code": "ADV_006",
+            "message": message
+        }
+    )
+
 @router.get(
     "/advertisements",
     response_model=List[AdvertisementResponse],
     responses={
+        304: {"description": "Listing unchanged since the ETag sent in If-None-Match"},
         400: {"model": ErrorResponse}
     }
 )
 async def list_advertisements(
+    request: Request,
     cpu: Optional[int] = None,
     memory: Optional[int] = None,
     storage: Optional[int] = None,
     country: Optional[str] = None,
     platform: Optional[str] = None,
-    repo: AdvertisementRepository = Depends(get_repository)
-) -> List[AdvertisementResponse]:
-    """List all active advertisements matching the criteria."""
+    sort: str = "provider_id",
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    repo: AdvertisementIndex = Depends(get_repository)
+) -> Response:
+    """List all active advertisements matching the criteria.
+
+    ``sort=price`` orders by the monthly USD price of the requested cpu/memory/
+    storage (one unit of each one not requested). With ``limit`` set, the
+    ``X-Next-Cursor`` and ``Link`` headers point to the next page. ``fields``
+    is a comma-separated list of response fields to return.
+    """
     try:
         # Validate requirements if provided
         if any(v is not None and v < 1 for v in [cpu, memory, storage]):
@@ -93,6 +123,33 @@ async def list_advertisements(
                     "message": "Resource requirements must be >= 1"
                 }
             )
+        if sort not in SORT_FIELDS:
+            raise _invalid_listing(f"sort must be one of: {', '.join(SORT_FIELDS)}")
+        if limit is not None and not 1 <= limit <= settings.LISTING_MAX_PAGE_SIZE:
+            raise _invalid_listing(f"limit must be between 1 and {settings.LISTING_MAX_PAGE_SIZE}")
+        include = None
+        if fields:
+            include = {name.strip() for name in fields.split(",") if name.strip()}
+            unknown = include - set(AdvertisementResponse.__fields__)
+            if unknown:
+                raise _invalid_listing(f"Unknown fields: {', '.join(sorted(unknown))}")
+        if cursor and sort not in CURSOR_SORTS:
+            raise _invalid_listing(f"cursor is only supported with sort: {', '.join(CURSOR_SORTS)}")
+        try:
+            after = decode_cursor(cursor) if cursor else None
+        except ValueError as e:
+            raise _invalid_listing(str(e))
+
+        # Heartbeats only matter to listings that show or sort by updated_at
+        heartbeats = sort.endswith("updated_at") or include is None or "updated_at" in include
+        headers = {
+            "ETag": listing_etag(request.query_params.multi_items(), repo.version(heartbeats=heartbeats)),
+            # Clients may keep the listing but must revalidate it with If-None-Match
+            "Cache-Control": "no-cache",
+        }
+        # Unchanged market, same query: nothing to search
+        if etag_matches(if_none_match, headers["ETag"]):
+            return Response(status_code=304, headers=headers)
 
         advertisements = await repo.find_by_requirements(
             cpu=cpu,
@@ -101,7 +158,13 @@ async def list_advertisements(
             country=country,
             platform=platform,
         )
-        return advertisements
+        spec = {"cpu": cpu or 1, "memory": memory or 1, "storage": storage or 1}
+        page, next_cursor = paginate(advertisements, sort, spec, limit=limit, cursor=after)
+        if next_cursor:
+            headers["X-Next-Cursor"] = next_cursor
+            headers["Link"] = f'<{request.url.include_query_params(cursor=next_cursor)}>; rel="next"'
+
+        return Response(encode_advertisements(page, include), media_type="application/json", headers=headers)
     except HTTPException:
         raise
     except Exception as e:
@@ -113,6 +176,85 @@ async def list_advertisements(
             }
         )
 
+@router.get(
+    "/advertisements/match",
+    response_model=List[AdvertisementMatch],
+    responses={
+        400: {"model": ErrorResponse}
+    }
+)
+async def match_advertisements(
+    cpu: int,
+    memory: int,
+    storage: int,
+    country: Optional[str] = None,
+    platform: Optional[str] = None,
+    limit: int = 10,
+    repo: AdvertisementIndex = Depends(get_repository)
+) -> Response:
+    """Cheapest providers able to run the spec, by estimated monthly USD cost.
+
+    Providers without complete USD pricing are left out.
+    """
+    if any(v < 1 for v in [cpu, memory, storage]):
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "code": "ADV_002",
+                "message": "Resource requirements must be >= 1"
+            }
+        )
+    if not 1 <= limit <= settings.LISTING_MAX_PAGE_SIZE:
+        raise _invalid_listing(f"limit must be between 1 and {settings.LISTING_MAX_PAGE_SIZE}")
+
+    spec = {"cpu": cpu, "memory": memory, "storage": storage}
+    matches = await repo.find_cheapest(
+        cpu=cpu, memory=memory, storage=storage, country=country, platform=platform, limit=limit
+    )
+    content = [
+        {**advertisement_dict(ad), "estimate": price_estimate(ad, cost, spec)}
+        for ad, cost in matches
+    ]
+    return Response(dumps(content), media_type="application/json")
+
+@router.get(
+    "/advertisements/watch",
+    responses={
+        200: {"content": {"text/event-stream": {}}, "description": "Stream of advertisement changes"},
+        400: {"model": ErrorResponse}
+    }
+)
+async def watch_advertisements(
+    cpu: Optional[int] = None,
+    memory: Optional[int] = None,
+    storage: Optional[int] = None,
+    country: Optional[str] = None,
+    platform: Optional[str] = None,
+    since: Optional[str] = None,
+    last_event_id: Optional[str] = Header(None),
+    repo: AdvertisementIndex = Depends(get_repository)
+) -> StreamingResponse:
+    """Stream changes of advertisements matching the criteria as server-sent events.
+
+    Reconnect with the last event id (``Last-Event-ID`` header or ``since``) to
+    resume without a full resync.
+    """
+    if any(v is not None and v < 1 for v in [cpu, memory, storage]):
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "code": "ADV_002",
+                "message": "Resource requirements must be >= 1"
+            }
+        )
+    filters = dict(cpu=cpu, memory=memory, storage=storage, country=country, platform=platform)
+    return StreamingResponse(
+        advertisement_events(repo, filters, last_event_id or since, settings.WATCH_KEEPALIVE_SECONDS),
+        media_type="text/event-stream",
+        # Keep proxies from buffering or caching the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get(
     "/advertisements/{provider_id}",
     response_model=AdvertisementResponse,
@@ -123,7 +265,7 @@ async def list_advertisements(
 )
 async def get_advertisement(
     provider_id: str,
-    repo: AdvertisementRepository = Depends(get_repository)
+    repo: AdvertisementIndex = Depends(get_repository)
 ) -> AdvertisementResponse:
     """Get a specific advertisement by provider ID."""
     advertisement = await repo.get_by_id(provider_id)
@@ -137,6 +279,59 @@ async def get_advertisement(
         )
     return advertisement
 
+@router.patch(
+    "/advertisements/{provider_id}",
+    status_code=204,
+    responses={
+        401: {"model": ErrorResponse},
+        404: {"model": ErrorResponse},
+        412: {"model": ErrorResponse}
+    }
+)
+async def refresh_advertisement(
+    provider_id: str,
+    if_match: str = Header(...),
+    current_provider: str = Depends(verify_provider_headers),
+    repo: AdvertisementIndex = Depends(get_repository)
+) -> Response:
+    """Refresh an unchanged advertisement without resending it.
+
+    ``If-Match`` carries the ``content_hash`` returned by the last full POST.
+    On 404 or 412 the provider must POST the full advertisement again.
+    """
+    if provider_id != current_provider:
+        raise HTTPException(
+            status_code=401,
+            detail={
+                "code": "AUTH_004",
+                "message": "Not authorized to refresh this advertisement"
+            }
+        )
+
+    advertisement = await repo.get_by_id(provider_id)
+    if not advertisement:
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "code": "ADV_004",
+                "message": "Advertisement not found"
+            }
+        )
+    expected = if_match.strip()
+    if expected.startswith("W/"):
+        expected = expected[2:]
+    if expected.strip('"') != advertisement.content_hash:
+        raise HTTPException(
+            status_code=412,
+            detail={
+                "code": "ADV_005",
+                "message": "Advertisement content changed; post the full advertisement"
+            }
+        )
+
+    await repo.touch(provider_id)
+    return Response(status_code=204, headers={"ETag": f'"{advertisement.content_hash}"'})
+
 @router.delete(
     "/advertisements/{provider_id}",
     responses={
@@ -147,7 +342,7 @@ async def get_advertisement(
 async def delete_advertisement(
     provider_id: str,
     current_provider: str = Depends(verify_provider_headers),
-    repo: AdvertisementRepository = Depends(get_repository)
+    repo: AdvertisementIndex = Depends(get_repository)
 ) -> dict:
     """Delete an advertisement."""
     # Verify provider owns the advertisement
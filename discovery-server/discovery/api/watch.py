@@ -0,0 +1,79 @@
+"""Server-sent event stream of advertisement changes.
+
+A watch starts with a snapshot of the matching advertisements (``upsert``
+events followed by ``synced``), then streams ``upsert``, ``delete`` and
+``expire`` deltas. Every event id is a resume token: reconnecting with it in
+``Last-Event-ID`` (or ``since``) continues where the stream stopped. When the
+token can no longer be honoured (the change log moved on, or another worker or
+process issued it) a ``reset`` event precedes a fresh snapshot.
+
+An advertisement that stops matching the filters is reported as ``delete``.
+"""
+import json
+from typing import AsyncIterator, Dict, Optional
+
+from ..db.index import AdvertisementChange, AdvertisementIndex, matches_requirements
+from .serialization import advertisement_dict
+
+
+def _token(index: AdvertisementIndex, sequence: int) -> str:
+    return f"{index.stream_id}-{sequence}"
+
+
+def _parse_token(index: AdvertisementIndex, token: Optional[str]) -> Optional[int]:
+    """Sequence number encoded in ``token`` if this index issued it."""
+    stream_id, _, sequence = (token or "").rpartition("-")
+    if stream_id != index.stream_id or not sequence.isdigit():
+        return None
+    return int(sequence)
+
+
+def _event(kind: str, token: str, data: dict) -> str:
+    return f"id: {token}\nevent: {kind}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+def _delta(change: AdvertisementChange, filters: Dict) -> Optional[tuple]:
+    """(kind, data) to send for ``change`` to a watcher using ``filters``, if any."""
+    ad = change.advertisement
+    if change.kind == AdvertisementChange.UPSERT:
+        if matches_requirements(ad, **filters):
+            return change.kind, advertisement_dict(ad)
+        if change.previous is not None and matches_requirements(change.previous, **filters):
+            return AdvertisementChange.DELETE, {"provider_id": ad.provider_id}
+        return None
+    if matches_requirements(ad, **filters):
+        return change.kind, {"provider_id": ad.provider_id}
+    return None
+
+
+async def advertisement_events(
+    index: AdvertisementIndex,
+    filters: Dict,
+    resume: Optional[str] = None,
+    keepalive: float = 15.0,
+) -> AsyncIterator[str]:
+    """Yield SSE frames for changes of advertisements matching ``filters``."""
+    sequence = _parse_token(index, resume)
+    changes = index.changes_since(sequence) if sequence is not None else None
+    needs_reset = resume is not None
+    while True:
+        if changes is None:
+            if needs_reset:
+                yield _event("reset", _token(index, index.sequence), {})
+            # Nothing awaits between reading the sequence and the snapshot, so they agree
+            sequence = index.sequence
+            token = _token(index, sequence)
+            for ad in await index.find_by_requirements(**filters):
+                yield _event(AdvertisementChange.UPSERT, token, advertisement_dict(ad))
+            yield _event("synced", token, {})
+        else:
+            for change in changes:
+                sequence = change.sequence
+                delta = _delta(change, filters)
+                if delta is not None:
+                    yield _event(delta[0], _token(index, sequence), delta[1])
+        if not await index.wait_for_changes(sequence, keepalive):
+            yield ": keepalive\n\n"
+        # A consumer that fell behind the change log gets a fresh snapshot
+        changes = index.changes_since(sequence)
+        needs_reset = True
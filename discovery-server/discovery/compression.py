@@ -0,0 +1,90 @@
+"""Response compression for the discovery API.
+
+``CompressionMiddleware`` compresses complete responses of at least
+``minimum_size`` bytes with Brotli when the client accepts it and the optional
+``brotli`` package is installed, and with gzip otherwise. Streamed responses
+(such as the ``/advertisements/watch`` event stream) pass through untouched so
+events are never held back in a compressor buffer.
+"""
+import gzip
+from typing import Dict, List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+
+def _choose_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = set()
+    for item in accept_encoding.lower().split(","):
+        coding, _, params = item.partition(";")
+        params = params.replace(" ", "")
+        try:
+            quality = float(params[2:]) if params.startswith("q=") else 1.0
+        except ValueError:
+            quality = 0.0
+        if quality > 0:
+            accepted.add(coding.strip())
+    if "br" in accepted and brotli is not None:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+class CompressionMiddleware:
+    """Compress HTTP responses the client is willing to accept compressed."""
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Dict, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = _choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: List[Dict] = []
+        passthrough = False
+
+        async def send_compressed(message: Dict) -> None:
+            nonlocal passthrough
+            if message["type"] == "http.response.start":
+                start.append(message)
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+            response_start = start[0]
+            headers = MutableHeaders(raw=response_start["headers"])
+            body = message.get("body", b"")
+            if (
+                message.get("more_body", False)
+                or len(body) < self.minimum_size
+                or "content-encoding" in headers
+            ):
+                # Streams and small or already encoded bodies are sent as they are
+                passthrough = True
+                await send(response_start)
+                await send(message)
+                return
+            if encoding == "br":
+                body = brotli.compress(body, quality=self.brotli_quality)
+            else:
+                body = gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            await send(response_start)
+            await send({"type": "http.response.body", "body": body, "more_body": False})
+
+        await self.app(scope, receive, send_compressed)
@@ -29,11 +29,15 @@ class Settings(BaseSettings):
     DEBUG: bool = False
     HOST: str = "0.0.0.0"  # Listen on all interfaces by default
     PORT: int = 9001       # Default Golem Discovery port
+    WORKERS: int = 1       # Uvicorn worker processes
     
     # Database Settings - SQLite by default in ~/.golem/discovery
     DATABASE_DIR: str = str(Path.home() / ".golem" / "discovery")
     DATABASE_NAME: str = "discovery.db"
     DATABASE_URL: Optional[str] = None  # Will be auto-generated if not provided
+    DATABASE_POOL_SIZE: int = 5         # Pooled connections per worker (file databases)
+    DATABASE_MAX_OVERFLOW: int = 10     # Extra connections allowed under load
+    DATABASE_BUSY_TIMEOUT_MS: int = 5000  # Wait this long for another worker's write lock
 
     @validator("DATABASE_URL", pre=True)
     def assemble_db_url(cls, v: Optional[str], values: dict) -> str:
@@ -52,10 +56,20 @@ class Settings(BaseSettings):
     
     # Rate Limiting - Protect against abuse
     RATE_LIMIT_PER_MINUTE: int = 100  # 100 requests per minute per IP
+    RATE_LIMIT_MAX_CLIENTS: int = 100_000  # Client buckets kept in memory
+    RATE_LIMIT_REDIS_URL: Optional[str] = None  # Share the limit across workers via Redis
+
+    # Response Compression - gzip, or Brotli when the optional 'brotli' package is installed
+    RESPONSE_COMPRESSION: bool = True
+    RESPONSE_COMPRESSION_MIN_SIZE: int = 1024  # Smaller responses are sent uncompressed
     
     # Advertisement Settings
     ADVERTISEMENT_EXPIRY_MINUTES: int = 5    # Providers must refresh every 5 minutes
     CLEANUP_INTERVAL_SECONDS: int = 60       # Clean expired entries every minute
+    WRITE_BEHIND_INTERVAL_SECONDS: float = 1.0  # Persist in-memory changes every second
+    LISTING_MAX_PAGE_SIZE: int = 1000        # Upper bound for the listing 'limit' parameter
+    WATCH_CHANGE_LOG_SIZE: int = 10_000      # Changes kept for watchers resuming a stream
+    WATCH_KEEPALIVE_SECONDS: float = 15.0    # Idle time before a watch stream sends a keepalive
 
     class Config:
         """Pydantic configuration"""
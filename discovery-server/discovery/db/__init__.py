@@ -1,11 +1,15 @@
 from .models import Advertisement, Base
 from .repository import AdvertisementRepository
+from .index import AdvertisementChange, AdvertisementIndex, IndexedAdvertisement
 from .session import init_db, cleanup_db, get_db, AsyncSessionLocal
 
 __all__ = [
     "Advertisement",
     "Base",
     "AdvertisementRepository",
+    "AdvertisementChange",
+    "AdvertisementIndex",
+    "IndexedAdvertisement",
     "init_db",
     "cleanup_db",
     "get_db",
@@ -0,0 +1,493 @@
+import asyncio
+import bisect
+import heapq
+import itertools
+import secrets
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import PRICE_COLUMNS, advertisement_content_hash, estimate_monthly_cost
+from .repository import AdvertisementRepository, _price_value, _resource_value
+
+RESOURCE_KEYS = ("cpu", "memory", "storage")
+
+
+_COLUMNS = (
+    "provider_id",
+    "ip_address",
+    "country",
+    "platform",
+    "resources",
+    "cpu",
+    "memory",
+    "storage",
+    "pricing",
+    "created_at",
+    "updated_at",
+)
+
+
+class IndexedAdvertisement:
+    """Live advertisement held in memory; attribute-compatible with the ORM model."""
+
+    # Per-unit USD prices are parsed from ``pricing`` for ranking by cost;
+    # ``encoded`` caches the API's JSON for this entry as (updated_at, bytes)
+    __slots__ = _COLUMNS + tuple(column for _, column in PRICE_COLUMNS) + ("content_hash", "encoded")
+
+    def __init__(
+        self,
+        provider_id: str,
+        ip_address: str,
+        country: str,
+        resources: Dict[str, Any],
+        pricing: Optional[Dict[str, Any]] = None,
+        platform: Optional[str] = None,
+        created_at: Optional[datetime] = None,
+        updated_at: Optional[datetime] = None,
+    ):
+        now = datetime.utcnow()
+        self.provider_id = provider_id
+        self.ip_address = ip_address
+        self.country = country
+        self.platform = platform
+        self.resources = resources
+        self.cpu = _resource_value(resources, "cpu")
+        self.memory = _resource_value(resources, "memory")
+        self.storage = _resource_value(resources, "storage")
+        self.pricing = pricing
+        for _, column in PRICE_COLUMNS:
+            setattr(self, column, _price_value(pricing, column))
+        self.created_at = created_at or now
+        self.updated_at = updated_at or now
+        self.content_hash = advertisement_content_hash(ip_address, country, platform, resources, pricing)
+        self.encoded = None
+
+    @classmethod
+    def from_model(cls, ad) -> "IndexedAdvertisement":
+        return cls(
+            provider_id=ad.provider_id,
+            ip_address=ad.ip_address,
+            country=ad.country,
+            resources=ad.resources,
+            pricing=ad.pricing,
+            platform=ad.platform,
+            created_at=ad.created_at,
+            updated_at=ad.updated_at,
+        )
+
+    def as_row(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in _COLUMNS}
+
+    def __repr__(self):
+        return f"<IndexedAdvertisement(provider_id={self.provider_id}, ip={self.ip_address})>"
+
+
+class AdvertisementChange:
+    """Entry of the index change log.
+
+    ``advertisement`` is the new entry for upserts and the removed one for
+    deletes and expiries; ``previous`` is the entry an upsert replaced.
+    """
+
+    UPSERT = "upsert"
+    DELETE = "delete"
+    EXPIRE = "expire"
+
+    __slots__ = ("sequence", "kind", "advertisement", "previous")
+
+    def __init__(
+        self,
+        sequence: int,
+        kind: str,
+        advertisement: IndexedAdvertisement,
+        previous: Optional[IndexedAdvertisement] = None,
+    ):
+        self.sequence = sequence
+        self.kind = kind
+        self.advertisement = advertisement
+        self.previous = previous
+
+
+def matches_requirements(
+    ad: IndexedAdvertisement,
+    cpu: Optional[int] = None,
+    memory: Optional[int] = None,
+    storage: Optional[int] = None,
+    country: Optional[str] = None,
+    platform: Optional[str] = None,
+) -> bool:
+    """Whether ``ad`` satisfies the listing filters (freshness aside)."""
+    minimums = {key: value for key, value in zip(RESOURCE_KEYS, (cpu, memory, storage)) if value is not None}
+    return _matches(ad, country, platform, minimums)
+
+
+def _matches(ad, country: Optional[str], platform: Optional[str], minimums: Dict[str, int]) -> bool:
+    if country is not None and ad.country != country:
+        return False
+    if platform is not None and ad.platform != platform:
+        return False
+    return not any(getattr(ad, key) is None or getattr(ad, key) < minimum for key, minimum in minimums.items())
+
+
+class AdvertisementIndex:
+    """In-memory index of live advertisements with write-behind persistence.
+
+    Searches and heartbeats are answered from memory. Changes are queued and
+    written to the database in batches by ``flush``, which the app runs
+    periodically and on shutdown; ``load`` restores live entries on startup.
+
+    With several workers each keeps its own index; ``sync`` applies what the
+    others persisted since the previous call (deletes through the tombstones
+    they leave), re-reading ``sync_overlap`` worth of history to catch rows
+    whose write-behind landed late.
+
+    Content changes, deletes and expiries are numbered and kept in a bounded
+    change log so watchers can follow the market incrementally; heartbeats are
+    not logged. Sequence numbers are only meaningful together with
+    ``stream_id``, which differs per process; ``version`` combines both.
+
+    Exposes the same methods as ``AdvertisementRepository`` so routes can use
+    either.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        expiry: timedelta = timedelta(minutes=5),
+        sync_overlap: timedelta = timedelta(seconds=5),
+        change_log_size: int = 10_000,
+    ):
+        self._session_factory = session_factory
+        self._expiry = expiry
+        self._sync_overlap = sync_overlap
+        self._synced_at: Optional[datetime] = None
+        self._ads: Dict[str, IndexedAdvertisement] = {}
+        # Sorted (value, provider_id) pairs per resource for range lookups
+        self._by_resource: Dict[str, List[Tuple[int, str]]] = {key: [] for key in RESOURCE_KEYS}
+        self._by_country: Dict[str, Set[str]] = {}
+        self._by_platform: Dict[str, Set[str]] = {}
+        # provider_id -> entry to write, or None to delete
+        self._pending: Dict[str, Optional[IndexedAdvertisement]] = {}
+        # provider_id -> new updated_at for heartbeats of unchanged, stored entries
+        self._touched: Dict[str, datetime] = {}
+        self.stream_id = secrets.token_hex(4)
+        self._sequence = 0
+        # Bumped whenever an entry's updated_at moves without a content change
+        self._refreshes = 0
+        self._changes: Deque[AdvertisementChange] = deque(maxlen=change_log_size)
+        self._waiters: List[asyncio.Future] = []
+        # No entry expires before this time (a lower bound; heartbeats only push it later)
+        self._next_expiry: Optional[datetime] = None
+
+    def __len__(self) -> int:
+        return len(self._ads)
+
+    @property
+    def pending_writes(self) -> int:
+        return len(self._pending) + len(self._touched)
+
+    @property
+    def sequence(self) -> int:
+        """Sequence number of the latest logged change."""
+        return self._sequence
+
+    def version(self, heartbeats: bool = False) -> str:
+        """Token that changes whenever the live advertisements or their content change.
+
+        Entries that outlived the expiry are expired first, so the token also
+        changes when one drops out of the listing. Heartbeats only change it
+        with ``heartbeats`` set, for views that show or sort by ``updated_at``.
+        """
+        if self._next_expiry is not None and datetime.utcnow() >= self._next_expiry:
+            self.expire()
+        if heartbeats:
+            return f"{self.stream_id}:{self._sequence}:{self._refreshes}"
+        return f"{self.stream_id}:{self._sequence}"
+
+    def _publish(
+        self, kind: str, ad: IndexedAdvertisement, previous: Optional[IndexedAdvertisement] = None
+    ) -> None:
+        self._sequence += 1
+        self._changes.append(AdvertisementChange(self._sequence, kind, ad, previous))
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def changes_since(self, sequence: int) -> Optional[List[AdvertisementChange]]:
+        """Logged changes after ``sequence``; None if some were already dropped."""
+        if sequence == self._sequence:
+            return []
+        if sequence > self._sequence or not self._changes or self._changes[0].sequence > sequence + 1:
+            return None
+        return list(itertools.islice(self._changes, sequence + 1 - self._changes[0].sequence, None))
+
+    async def wait_for_changes(self, sequence: int, timeout: float) -> bool:
+        """Wait up to ``timeout`` seconds for a change after ``sequence``."""
+        if self._sequence > sequence:
+            return True
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+        return self._sequence > sequence
+
+    def _add(self, ad: IndexedAdvertisement) -> None:
+        self._ads[ad.provider_id] = ad
+        expires_at = ad.updated_at + self._expiry
+        if self._next_expiry is None or expires_at < self._next_expiry:
+            self._next_expiry = expires_at
+        for key in RESOURCE_KEYS:
+            value = getattr(ad, key)
+            if value is not None:
+                bisect.insort(self._by_resource[key], (value, ad.provider_id))
+        self._by_country.setdefault(ad.country, set()).add(ad.provider_id)
+        if ad.platform is not None:
+            self._by_platform.setdefault(ad.platform, set()).add(ad.provider_id)
+
+    def _remove(self, provider_id: str) -> Optional[IndexedAdvertisement]:
+        ad = self._ads.pop(provider_id, None)
+        if ad is None:
+            return None
+        for key in RESOURCE_KEYS:
+            value = getattr(ad, key)
+            if value is not None:
+                entries = self._by_resource[key]
+                del entries[bisect.bisect_left(entries, (value, provider_id))]
+        _discard(self._by_country, ad.country, provider_id)
+        if ad.platform is not None:
+            _discard(self._by_platform, ad.platform, provider_id)
+        return ad
+
+    async def load(self) -> int:
+        """Replace the index contents with the live advertisements in the database.
+
+        Changes not yet flushed are kept on top of what was loaded.
+        """
+        started = datetime.utcnow()
+        async with self._session_factory() as session:
+            rows = await AdvertisementRepository(session).list_active()
+        previous = dict(self._ads)
+        self._ads.clear()
+        for entries in self._by_resource.values():
+            entries.clear()
+        self._by_country.clear()
+        self._by_platform.clear()
+        for row in rows:
+            if row.provider_id not in self._pending:
+                self._add(IndexedAdvertisement.from_model(row))
+        for ad in self._pending.values():
+            if ad is not None:
+                self._add(ad)
+        for provider_id, refreshed_at in self._touched.items():
+            ad = self._ads.get(provider_id)
+            if ad is not None and ad.updated_at < refreshed_at:
+                ad.updated_at = refreshed_at
+        self._synced_at = started
+        self._refreshes += 1
+
+        # Log what the reload changed for watchers
+        cutoff = started - self._expiry
+        for provider_id, old in previous.items():
+            if provider_id not in self._ads:
+                self._publish(AdvertisementChange.EXPIRE if old.updated_at < cutoff else AdvertisementChange.DELETE, old)
+        for provider_id, ad in self._ads.items():
+            old = previous.get(provider_id)
+            if old is None or old.content_hash != ad.content_hash:
+                self._publish(AdvertisementChange.UPSERT, ad, old)
+        return len(self._ads)
+
+    async def sync(self) -> int:
+        """Apply advertisements other workers persisted since the last sync or load."""
+        started = datetime.utcnow()
+        since = self._synced_at - self._sync_overlap if self._synced_at is not None else None
+        async with self._session_factory() as session:
+            repo = AdvertisementRepository(session)
+            rows = await repo.list_active(updated_since=since)
+            # A first sync reads every live row, so earlier deletes are already absent
+            deleted = await repo.list_deleted(since) if since is not None else []
+        self._synced_at = started
+        applied = 0
+        for row in rows:
+            if row.provider_id in self._pending:
+                continue  # our own change is newer
+            current = self._ads.get(row.provider_id)
+            if current is not None and current.updated_at >= row.updated_at:
+                continue
+            ad = IndexedAdvertisement.from_model(row)
+            self._remove(row.provider_id)
+            self._add(ad)
+            if current is None or current.content_hash != ad.content_hash:
+                self._publish(AdvertisementChange.UPSERT, ad, current)
+            else:
+                self._refreshes += 1
+            applied += 1
+        for provider_id, deleted_at in deleted:
+            if provider_id in self._pending:
+                continue
+            current = self._ads.get(provider_id)
+            if current is None or current.updated_at > deleted_at:
+                continue  # already gone, or re-advertised after the delete
+            self._remove(provider_id)
+            self._touched.pop(provider_id, None)
+            self._publish(AdvertisementChange.DELETE, current)
+            applied += 1
+        return applied
+
+    async def upsert_advertisement(
+        self,
+        provider_id: str,
+        ip_address: str,
+        country: str,
+        resources: Dict[str, Any],
+        pricing: Optional[Dict[str, Any]] = None,
+        platform: Optional[str] = None,
+    ) -> IndexedAdvertisement:
+        """Create or update a provider advertisement."""
+        current = self._ads.get(provider_id)
+        content_hash = advertisement_content_hash(ip_address, country, platform, resources, pricing)
+        if current is not None and current.content_hash == content_hash:
+            # Same content re-posted: only the timestamp changes
+            await self.touch(provider_id)
+            return current
+        ad = IndexedAdvertisement(
+            provider_id=provider_id,
+            ip_address=ip_address,
+            country=country,
+            resources=resources,
+            pricing=pricing,
+            platform=platform,
+            created_at=current.created_at if current is not None else None,
+        )
+        self._remove(provider_id)
+        self._add(ad)
+        self._touched.pop(provider_id, None)
+        self._pending[provider_id] = ad
+        self._publish(AdvertisementChange.UPSERT, ad, current)
+        return ad
+
+    async def touch(self, provider_id: str) -> bool:
+        """Mark an unchanged advertisement as refreshed."""
+        ad = self._ads.get(provider_id)
+        if ad is None:
+            return False
+        ad.updated_at = datetime.utcnow()
+        self._refreshes += 1
+        if provider_id not in self._pending:
+            self._touched[provider_id] = ad.updated_at
+        return True
+
+    async def find_by_requirements(
+        self,
+        cpu: Optional[int] = None,
+        memory: Optional[int] = None,
+        storage: Optional[int] = None,
+        country: Optional[str] = None,
+        platform: Optional[str] = None,
+    ) -> List[IndexedAdvertisement]:
+        """Find providers matching resource requirements."""
+        minimums = {key: value for key, value in zip(RESOURCE_KEYS, (cpu, memory, storage)) if value is not None}
+
+        # Start from the smallest candidate set, then check the other filters
+        candidates = None
+        if country is not None:
+            candidates = self._by_country.get(country, ())
+        if platform is not None:
+            by_platform = self._by_platform.get(platform, ())
+            if candidates is None or len(by_platform) < len(candidates):
+                candidates = by_platform
+        for key, minimum in minimums.items():
+            entries = self._by_resource[key]
+            start = bisect.bisect_left(entries, (minimum,))
+            if candidates is None or len(entries) - start < len(candidates):
+                candidates = [provider_id for _, provider_id in entries[start:]]
+        if candidates is None:
+            candidates = self._ads.keys()
+
+        cutoff = datetime.utcnow() - self._expiry
+        results = []
+        for provider_id in candidates:
+            ad = self._ads[provider_id]
+            if ad.updated_at >= cutoff and _matches(ad, country, platform, minimums):
+                results.append(ad)
+        return results
+
+    async def find_cheapest(
+        self,
+        cpu: int,
+        memory: int,
+        storage: int,
+        country: Optional[str] = None,
+        platform: Optional[str] = None,
+        limit: int = 10,
+    ) -> List[Tuple[IndexedAdvertisement, float]]:
+        """Cheapest matching providers for a spec as (advertisement, monthly USD cost)."""
+        candidates = await self.find_by_requirements(cpu, memory, storage, country, platform)
+        priced = []
+        for ad in candidates:
+            cost = estimate_monthly_cost(ad, cpu, memory, storage)
+            if cost is not None:
+                priced.append((cost, ad.provider_id, ad))
+        return [(ad, cost) for cost, _, ad in heapq.nsmallest(limit, priced)]
+
+    async def get_by_id(self, provider_id: str) -> Optional[IndexedAdvertisement]:
+        """Get advertisement by provider ID."""
+        return self._ads.get(provider_id)
+
+    async def delete(self, provider_id: str) -> bool:
+        """Delete an advertisement."""
+        ad = self._remove(provider_id)
+        if ad is None:
+            return False
+        self._touched.pop(provider_id, None)
+        self._pending[provider_id] = None
+        self._publish(AdvertisementChange.DELETE, ad)
+        return True
+
+    def expire(self) -> int:
+        """Drop advertisements that were not refreshed in time from memory."""
+        cutoff = datetime.utcnow() - self._expiry
+        expired = [provider_id for provider_id, ad in self._ads.items() if ad.updated_at < cutoff]
+        for provider_id in expired:
+            self._publish(AdvertisementChange.EXPIRE, self._remove(provider_id))
+        oldest = min((ad.updated_at for ad in self._ads.values()), default=None)
+        self._next_expiry = oldest + self._expiry if oldest is not None else None
+        return len(expired)
+
+    async def flush(self) -> int:
+        """Write queued changes to the database; returns the number written."""
+        if not self._pending and not self._touched:
+            return 0
+        batch, self._pending = self._pending, {}
+        touched, self._touched = self._touched, {}
+        upserts = [ad.as_row() for ad in batch.values() if ad is not None]
+        deletes = [provider_id for provider_id, ad in batch.items() if ad is None]
+        try:
+            async with self._session_factory() as session:
+                repo = AdvertisementRepository(session)
+                await repo.upsert_many(upserts)
+                await repo.delete_many(deletes)
+                await repo.touch_many(touched)
+        except Exception:
+            # Keep the batch unless a newer change for the same provider arrived
+            for provider_id, ad in batch.items():
+                self._pending.setdefault(provider_id, ad)
+            for provider_id, refreshed_at in touched.items():
+                if provider_id not in self._pending:
+                    self._touched.setdefault(provider_id, refreshed_at)
+            raise
+        return len(batch) + len(touched)
+
+def _discard(buckets: Dict[str, Set[str]], key: str, provider_id: str) -> None:
+    bucket = buckets[key]
+    bucket.discard(provider_id)
+    if not bucket:
+        del buckets[key]
@@ -0,0 +1,54 @@
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from sqlalchemy import delete
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import LeaderLease
+
+
+class LeaderLock:
+    """Database lease that lets one of several workers run a task.
+
+    ``acquire`` takes the lease if it is free or expired, or renews it when this
+    worker already holds it. Call it again before ``ttl`` runs out; if the
+    holder stops renewing (crash, shutdown), another worker takes over.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        name: str,
+        ttl: timedelta,
+        holder: Optional[str] = None,
+    ):
+        self._session_factory = session_factory
+        self.name = name
+        self.ttl = ttl
+        self.holder = holder or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    async def acquire(self) -> bool:
+        """Take or renew the lease; returns whether this worker is the leader."""
+        now = datetime.utcnow()
+        stmt = insert(LeaderLease).values(name=self.name, holder=self.holder, expires_at=now + self.ttl)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['name'],
+            set_={'holder': stmt.excluded.holder, 'expires_at': stmt.excluded.expires_at},
+            where=(LeaderLease.holder == self.holder) | (LeaderLease.expires_at < now),
+        )
+        async with self._session_factory() as session:
+            result = await session.execute(stmt)
+            await session.commit()
+        return result.rowcount == 1
+
+    async def release(self) -> None:
+        """Give up the lease so another worker can take over right away."""
+        async with self._session_factory() as session:
+            await session.execute(
+                delete(LeaderLease).where(LeaderLease.name == self.name, LeaderLease.holder == self.holder)
+            )
+            await session.commit()
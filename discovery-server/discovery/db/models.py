@@ -1,11 +1,53 @@
-from sqlalchemy import Column, String, Integer, DateTime, JSON, ForeignKey
+from sqlalchemy import Column, String, Integer, DateTime, JSON, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from datetime import datetime
+from typing import Any, Dict, Optional
+import hashlib
+import json
 
 Base = declarative_base()
 
+def advertisement_content_hash(
+    ip_address: str,
+    country: str,
+    platform: Optional[str],
+    resources: Dict[str, Any],
+    pricing: Optional[Dict[str, Any]],
+) -> str:
+    """Stable hash of everything a provider advertises; heartbeats must present it."""
+    payload = json.dumps(
+        {
+            "ip_address": ip_address,
+            "country": country,
+            "platform": platform,
+            "resources": resources,
+            "pricing": pricing,
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+# Resource each per-unit USD price column applies to
+PRICE_COLUMNS = (
+    ("cpu", "usd_per_core_month"),
+    ("memory", "usd_per_gb_ram_month"),
+    ("storage", "usd_per_gb_storage_month"),
+)
+
+def estimate_monthly_cost(ad, cpu: int, memory: int, storage: int) -> Optional[float]:
+    """Monthly USD cost of a spec at the advertisement's per-unit prices, if all are set."""
+    spec = {"cpu": cpu, "memory": memory, "storage": storage}
+    total = 0.0
+    for resource, column in PRICE_COLUMNS:
+        price = getattr(ad, column)
+        if price is None:
+            return None
+        total += price * spec[resource]
+    return total
+
 class Advertisement(Base):
     """Provider advertisement model."""
     __tablename__ = "advertisements"
@@ -15,13 +57,28 @@ class Advertisement(Base):
     country = Column(String(2), nullable=False)  # ISO 3166-1 alpha-2
     platform = Column(String(32), nullable=True)  # e.g., x86_64, arm64
     resources = Column(JSON, nullable=False)  # CPU, memory, storage
+    # Copies of resources['cpu'|'memory'|'storage'] so requirement filters can use indexes
+    cpu = Column(Integer, nullable=True, index=True)
+    memory = Column(Integer, nullable=True, index=True)
+    storage = Column(Integer, nullable=True, index=True)
     pricing = Column(JSON, nullable=True)  # Optional pricing info
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
-    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
+    __table_args__ = (
+        Index("ix_advertisements_country_platform_updated_at", "country", "platform", "updated_at"),
+    )
 
     def __repr__(self):
         return f"<Advertisement(provider_id={self.provider_id}, ip={self.ip_address})>"
 
+    @property
+    def content_hash(self) -> str:
+        """Hash of the advertised content, see advertisement_content_hash."""
+        return advertisement_content_hash(
+            self.ip_address, self.country, self.platform, self.resources, self.pricing
+        )
+
     @property
     def is_expired(self) -> bool:
         """Check if advertisement has expired (older than 5 minutes)."""
@@ -29,3 +86,20 @@ class Advertisement(Base):
             return True
         age = datetime.utcnow() - self.updated_at
         return age.total_seconds() > 300  # 5 minutes
+
+
+class AdvertisementTombstone(Base):
+    """Record of a deleted advertisement, so other workers can drop it incrementally."""
+    __tablename__ = "advertisement_tombstones"
+
+    provider_id = Column(String, primary_key=True)
+    deleted_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+
+class LeaderLease(Base):
+    """Lease naming the worker process that runs a singleton background task."""
+    __tablename__ = "leader_leases"
+
+    name = Column(String, primary_key=True)
+    holder = Column(String, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
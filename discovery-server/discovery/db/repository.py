@@ -1,10 +1,26 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
+from sqlalchemy import bindparam, select, delete, func, update
 from sqlalchemy.dialects.sqlite import insert
 from datetime import datetime, timedelta
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 
-from .models import Advertisement
+from .models import Advertisement, AdvertisementTombstone
+
+# Rows per multi-row INSERT, well under SQLite's bound parameter limit
+_UPSERT_BATCH_SIZE = 500
+
+
+def _resource_value(resources: Dict[str, Any], key: str) -> Optional[int]:
+    try:
+        return int(resources[key])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def _price_value(pricing: Optional[Dict[str, Any]], key: str) -> Optional[float]:
+    try:
+        return float(pricing[key])
+    except (KeyError, TypeError, ValueError):
+        return None
 
 class AdvertisementRepository:
     def __init__(self, session: AsyncSession):
@@ -26,6 +42,9 @@ class AdvertisementRepository:
             country=country,
             platform=platform,
             resources=resources,
+            cpu=_resource_value(resources, 'cpu'),
+            memory=_resource_value(resources, 'memory'),
+            storage=_resource_value(resources, 'storage'),
             pricing=pricing,
             updated_at=datetime.utcnow()
         )
@@ -38,6 +57,9 @@ class AdvertisementRepository:
                 'country': stmt.excluded.country,
                 'platform': stmt.excluded.platform,
                 'resources': stmt.excluded.resources,
+                'cpu': stmt.excluded.cpu,
+                'memory': stmt.excluded.memory,
+                'storage': stmt.excluded.storage,
                 'pricing': stmt.excluded.pricing,
                 'updated_at': stmt.excluded.updated_at
             }
@@ -65,11 +87,11 @@ class AdvertisementRepository:
         
         # Add resource requirements
         if cpu is not None:
-            query = query.where(Advertisement.resources['cpu'].as_integer() >= cpu)
+            query = query.where(Advertisement.cpu >= cpu)
         if memory is not None:
-            query = query.where(Advertisement.resources['memory'].as_integer() >= memory)
+            query = query.where(Advertisement.memory >= memory)
         if storage is not None:
-            query = query.where(Advertisement.resources['storage'].as_integer() >= storage)
+            query = query.where(Advertisement.storage >= storage)
             
         # Add country filter if specified
         if country is not None:
@@ -77,18 +99,98 @@ class AdvertisementRepository:
         if platform is not None:
             query = query.where(Advertisement.platform == platform)
             
-        # Only return non-expired advertisements
+        # Only return non-expired advertisements. Cleanup keeps nearly every
+        # row fresh, so tell the planner to prefer the requirement indexes.
         five_minutes_ago = datetime.utcnow() - timedelta(minutes=5)
-        query = query.where(Advertisement.updated_at >= five_minutes_ago)
+        query = query.where(func.likely(Advertisement.updated_at >= five_minutes_ago))
         
         result = await self.session.execute(query)
         return result.scalars().all()
 
+    async def list_active(self, updated_since: Optional[datetime] = None) -> List[Advertisement]:
+        """List all non-expired advertisements, optionally only those updated since a time."""
+        cutoff = datetime.utcnow() - timedelta(minutes=5)
+        if updated_since is not None and updated_since > cutoff:
+            cutoff = updated_since
+        result = await self.session.execute(
+            select(Advertisement).where(Advertisement.updated_at >= cutoff)
+        )
+        return result.scalars().all()
+
+    async def upsert_many(self, rows: List[Dict[str, Any]]) -> None:
+        """Write complete advertisement rows in batches, keeping created_at of existing rows."""
+        for start in range(0, len(rows), _UPSERT_BATCH_SIZE):
+            stmt = insert(Advertisement).values(rows[start:start + _UPSERT_BATCH_SIZE])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['provider_id'],
+                set_={
+                    column: getattr(stmt.excluded, column)
+                    for column in rows[0]
+                    if column not in ('provider_id', 'created_at')
+                }
+            )
+            await self.session.execute(stmt)
+        await self.session.commit()
+
+    async def delete_many(self, provider_ids: List[str]) -> int:
+        """Delete advertisements by provider ID, leaving a tombstone for each."""
+        if not provider_ids:
+            return 0
+        result = await self.session.execute(
+            delete(Advertisement).where(Advertisement.provider_id.in_(provider_ids))
+        )
+        deleted_at = datetime.utcnow()
+        for start in range(0, len(provider_ids), _UPSERT_BATCH_SIZE):
+            stmt = insert(AdvertisementTombstone).values(
+                [{'provider_id': pid, 'deleted_at': deleted_at} for pid in provider_ids[start:start + _UPSERT_BATCH_SIZE]]
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['provider_id'], set_={'deleted_at': stmt.excluded.deleted_at}
+            )
+            await self.session.execute(stmt)
+        await self.session.commit()
+        return result.rowcount
+
+    async def list_deleted(self, since: datetime) -> List[Tuple[str, datetime]]:
+        """Provider IDs deleted since a time, with when they were deleted."""
+        result = await self.session.execute(
+            select(AdvertisementTombstone.provider_id, AdvertisementTombstone.deleted_at)
+            .where(AdvertisementTombstone.deleted_at >= since)
+        )
+        return [(provider_id, deleted_at) for provider_id, deleted_at in result.all()]
+
+    async def touch(self, provider_id: str) -> bool:
+        """Mark an unchanged advertisement as refreshed."""
+        result = await self.session.execute(
+            update(Advertisement)
+            .where(Advertisement.provider_id == provider_id)
+            .values(updated_at=datetime.utcnow())
+        )
+        await self.session.commit()
+        return result.rowcount > 0
+
+    async def touch_many(self, refreshed: Dict[str, datetime]) -> None:
+        """Set updated_at for many advertisements in one statement."""
+        if not refreshed:
+            return
+        table = Advertisement.__table__
+        await self.session.execute(
+            table.update()
+            .where(table.c.provider_id == bindparam('pid'))
+            .values(updated_at=bindparam('refreshed_at')),
+            [{'pid': pid, 'refreshed_at': ts} for pid, ts in refreshed.items()],
+        )
+        await self.session.commit()
+
     async def cleanup_expired(self) -> int:
         """Remove expired advertisements (older than 5 minutes)."""
         five_minutes_ago = datetime.utcnow() - timedelta(minutes=5)
         stmt = delete(Advertisement).where(Advertisement.updated_at < five_minutes_ago)
         result = await self.session.execute(stmt)
+        # Tombstones only need to outlive the sync window of other workers
+        await self.session.execute(
+            delete(AdvertisementTombstone).where(AdvertisementTombstone.deleted_at < five_minutes_ago)
+        )
         await self.session.commit()
         return result.rowcount
 
@@ -1,5 +1,10 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+import asyncio
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from typing import AsyncGenerator
 from pathlib import Path
 
@@ -9,13 +14,40 @@ from .models import Base
 # Create database directory if it doesn't exist
 Path(settings.DATABASE_DIR).mkdir(parents=True, exist_ok=True)
 
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Let several worker processes share one SQLite file."""
+    cursor = dbapi_connection.cursor()
+    # Readers no longer block the writer, and commits skip the per-transaction fsync
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={settings.DATABASE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
+def _create_engine(url: str) -> AsyncEngine:
+    """Create the async engine; file-backed SQLite gets a connection pool and WAL."""
+    options = {}
+    parsed = make_url(url)
+    is_sqlite = parsed.get_backend_name() == "sqlite"
+    if is_sqlite and parsed.database not in (None, "", ":memory:"):
+        # aiosqlite would otherwise open a new connection (and thread) per session
+        options.update(
+            poolclass=AsyncAdaptedQueuePool,
+            pool_size=settings.DATABASE_POOL_SIZE,
+            max_overflow=settings.DATABASE_MAX_OVERFLOW,
+        )
+    new_engine = create_async_engine(
+        url,
+        echo=settings.DEBUG,
+        # SQLite specific configs
+        connect_args={"check_same_thread": False},
+        **options
+    )
+    if is_sqlite:
+        event.listen(new_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    return new_engine
+
 # Create async engine
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=settings.DEBUG,
-    # SQLite specific configs
-    connect_args={"check_same_thread": False}
-)
+engine = _create_engine(settings.DATABASE_URL)
 
 # Create async session factory
 AsyncSessionLocal = sessionmaker(
@@ -28,10 +60,18 @@ AsyncSessionLocal = sessionmaker(
 
 async def init_db():
     """Initialize database tables and apply lightweight migrations."""
-    async with engine.begin() as conn:
-        # Create tables if not exist
-        await conn.run_sync(Base.metadata.create_all)
+    # Workers starting together may race to create the tables; retry once they exist
+    for attempt in range(3):
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            break
+        except OperationalError:
+            if attempt == 2:
+                raise
+            await asyncio.sleep(0.1)
 
+    async with engine.begin() as conn:
         # Lightweight migrations for SQLite: add missing columns
         try:
             url = str(engine.url)
@@ -41,6 +81,22 @@ async def init_db():
                 cols = [row[1] for row in res.fetchall()]  # second field is name
                 if 'platform' not in cols:
                     await conn.exec_driver_sql("ALTER TABLE advertisements ADD COLUMN platform TEXT NULL")
+                # Ensure indexed resource columns exist and are filled from the resources JSON
+                for col in ('cpu', 'memory', 'storage'):
+                    if col not in cols:
+                        await conn.exec_driver_sql(f"ALTER TABLE advertisements ADD COLUMN {col} INTEGER NULL")
+                        await conn.exec_driver_sql(
+                            f"UPDATE advertisements SET {col} = CAST(json_extract(resources, '$.{col}') AS INTEGER)"
+                        )
+                # Ranking by cost is done in memory; the old price index only slowed writes
+                await conn.exec_driver_sql("DROP INDEX IF EXISTS ix_advertisements_prices")
+                # Indexes are only created with the table; add any missing on older databases
+                await conn.run_sync(
+                    lambda sync_conn: [
+                        index.create(sync_conn, checkfirst=True)
+                        for index in Base.metadata.tables['advertisements'].indexes
+                    ]
+                )
         except Exception:
             # Do not fail startup if migration probing fails; better to continue
             pass
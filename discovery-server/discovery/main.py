@@ -1,15 +1,15 @@
 import asyncio
 import logging
-from fastapi import FastAPI, Request
+from datetime import timedelta
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from typing import Callable
-import time
 
 from .config import settings
-from .api.routes import router
-from .api.models import ErrorResponse
+from .api.routes import router, advertisement_index
+from .compression import CompressionMiddleware
+from .ratelimit import RateLimitMiddleware, create_rate_limit_backend
 from .db.session import init_db, cleanup_db
+from .db.leader import LeaderLock
 from .db.repository import AdvertisementRepository
 from .db.session import AsyncSessionLocal
 
@@ -32,62 +32,61 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Rate limiting middleware
-from starlette.middleware.base import BaseHTTPMiddleware
-
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app, requests_per_minute: int = 100):
-        super().__init__(app)
-        self.requests_per_minute = requests_per_minute
-        self.requests = {}
-
-    async def dispatch(self, request: Request, call_next: Callable):
-        # Get client IP
-        client_ip = request.client.host
-
-        # Check rate limit
-        current_time = time.time()
-        if client_ip in self.requests:
-            requests = [t for t in self.requests[client_ip] 
-                       if current_time - t < 60]  # Last minute
-            if len(requests) >= self.requests_per_minute:
-                return JSONResponse(
-                    status_code=429,
-                    content=ErrorResponse(
-                        code="RATE_001",
-                        message="Rate limit exceeded"
-                    ).dict()
-                )
-            self.requests[client_ip] = requests + [current_time]
-        else:
-            self.requests[client_ip] = [current_time]
-
-        return await call_next(request)
+# Compress large responses such as advertisement listings
+if settings.RESPONSE_COMPRESSION:
+    app.add_middleware(CompressionMiddleware, minimum_size=settings.RESPONSE_COMPRESSION_MIN_SIZE)
 
 # Add rate limiting
 app.add_middleware(
     RateLimitMiddleware,
-    requests_per_minute=settings.RATE_LIMIT_PER_MINUTE
+    requests_per_minute=settings.RATE_LIMIT_PER_MINUTE,
+    backend=create_rate_limit_backend(
+        settings.RATE_LIMIT_PER_MINUTE,
+        redis_url=settings.RATE_LIMIT_REDIS_URL,
+        max_clients=settings.RATE_LIMIT_MAX_CLIENTS,
+    ),
 )
 
 # Include API routes
 app.include_router(router)  # Remove prefix as it's already set in the router
 
+# With several workers only the lease holder deletes expired rows
+cleanup_leader = LeaderLock(
+    AsyncSessionLocal,
+    "cleanup_expired_advertisements",
+    ttl=timedelta(seconds=3 * settings.CLEANUP_INTERVAL_SECONDS),
+)
+
 # Background task for cleaning up expired advertisements
 async def cleanup_expired_advertisements():
     """Periodically remove expired advertisements."""
     while True:
         try:
-            async with AsyncSessionLocal() as session:
-                repo = AdvertisementRepository(session)
-                removed = await repo.cleanup_expired()
-                if removed > 0:
-                    logger.info(f"Removed {removed} expired advertisements")
+            # Deletes made by other workers arrive through sync
+            advertisement_index.expire()
+            if settings.WORKERS == 1 or await cleanup_leader.acquire():
+                async with AsyncSessionLocal() as session:
+                    repo = AdvertisementRepository(session)
+                    removed = await repo.cleanup_expired()
+                    if removed > 0:
+                        logger.info(f"Removed {removed} expired advertisements")
         except Exception as e:
             logger.error(f"Error cleaning up advertisements: {e}")
         
         await asyncio.sleep(settings.CLEANUP_INTERVAL_SECONDS)
 
+# Background task for persisting in-memory advertisement changes
+async def flush_advertisements():
+    """Periodically write queued advertisement changes to the database."""
+    while True:
+        await asyncio.sleep(settings.WRITE_BEHIND_INTERVAL_SECONDS)
+        try:
+            await advertisement_index.flush()
+            if settings.WORKERS > 1:
+                await advertisement_index.sync()
+        except Exception as e:
+            logger.error(f"Error persisting advertisements: {e}")
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize application on startup."""
@@ -96,8 +95,13 @@ async def startup_event():
         await init_db()
         logger.info("Database initialized")
 
-        # Start cleanup task
+        # Serve live advertisements from memory
+        loaded = await advertisement_index.load()
+        logger.info(f"Loaded {loaded} advertisements")
+
+        # Start cleanup and persistence tasks
         asyncio.create_task(cleanup_expired_advertisements())
+        asyncio.create_task(flush_advertisements())
         logger.info("Advertisement cleanup task started")
     except Exception as e:
         logger.error(f"Error during startup: {e}")
@@ -106,6 +110,15 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     """Clean up resources on shutdown."""
+    try:
+        await advertisement_index.flush()
+    except Exception as e:
+        logger.error(f"Error persisting advertisements on shutdown: {e}")
+    if settings.WORKERS > 1:
+        try:
+            await cleanup_leader.release()
+        except Exception as e:
+            logger.error(f"Error releasing cleanup lease: {e}")
     try:
         await cleanup_db()
         logger.info("Database connection closed")
@@ -125,6 +138,7 @@ def start():
         host=settings.HOST,
         port=settings.PORT,
         reload=settings.DEBUG,
+        workers=settings.WORKERS,
         log_level="info" if settings.DEBUG else "warning"
     )
 
@@ -0,0 +1,145 @@
+"""Per-client rate limiting for the discovery API.
+
+``RateLimitMiddleware`` is a plain ASGI middleware that asks a backend whether
+a client may make another request:
+
+- ``MemoryRateLimitBackend`` keeps a token bucket per client IP in one process,
+  bounded by LRU/idle eviction.
+- ``RedisRateLimitBackend`` keeps sliding-window counters in Redis so several
+  workers share one limit. Requires the optional ``redis`` package.
+"""
+import logging
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse
+
+from .api.models import ErrorResponse
+
+logger = logging.getLogger(__name__)
+
+WINDOW_SECONDS = 60
+
+
+class MemoryRateLimitBackend:
+    """Token bucket per client: bursts up to the limit, refills evenly over a minute.
+
+    A bucket left idle for a full window is back at capacity, which is the same
+    as having no bucket, so such entries are dropped. The table never holds more
+    than ``max_clients`` entries; the least recently seen client goes first.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int,
+        max_clients: int = 100_000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.capacity = float(requests_per_minute)
+        self.refill_per_second = requests_per_minute / WINDOW_SECONDS
+        self.max_clients = max_clients
+        self._clock = clock
+        # client -> [tokens, last_seen], least recently seen first
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    async def allow(self, client: str) -> bool:
+        now = self._clock()
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = [self.capacity, now]
+        else:
+            bucket[0] = min(self.capacity, bucket[0] + (now - bucket[1]) * self.refill_per_second)
+            bucket[1] = now
+            self._buckets.move_to_end(client)
+        allowed = bucket[0] >= 1
+        if allowed:
+            bucket[0] -= 1
+        self._evict(now)
+        return allowed
+
+    def _evict(self, now: float) -> None:
+        buckets = self._buckets
+        while buckets:
+            _, (_, last_seen) = next(iter(buckets.items()))
+            if len(buckets) <= self.max_clients and now - last_seen < WINDOW_SECONDS:
+                break
+            buckets.popitem(last=False)
+
+
+class RedisRateLimitBackend:
+    """Sliding-window counter in Redis, shared by every worker using the same server.
+
+    The request count of the previous window is weighted by how much of it still
+    overlaps the sliding minute. Redis errors let the request through: losing
+    rate limiting for a moment is better than failing discovery lookups.
+    """
+
+    def __init__(
+        self,
+        client,
+        requests_per_minute: int,
+        prefix: str = "golem-discovery:ratelimit:",
+        clock: Callable[[], float] = time.time,
+    ):
+        self.client = client
+        self.limit = requests_per_minute
+        self.prefix = prefix
+        self._clock = clock
+
+    async def allow(self, client: str) -> bool:
+        now = self._clock()
+        window = int(now // WINDOW_SECONDS)
+        key = f"{self.prefix}{client}:{window}"
+        try:
+            async with self.client.pipeline(transaction=True) as pipe:
+                pipe.incr(key)
+                pipe.expire(key, 2 * WINDOW_SECONDS)
+                pipe.get(f"{self.prefix}{client}:{window - 1}")
+                current, _, previous = await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Rate limit backend unavailable, allowing request: {e}")
+            return True
+        overlap = 1 - (now % WINDOW_SECONDS) / WINDOW_SECONDS
+        return int(previous or 0) * overlap + int(current) <= self.limit
+
+
+def create_rate_limit_backend(
+    requests_per_minute: int, redis_url: Optional[str] = None, max_clients: int = 100_000
+):
+    """Build the Redis backend when a URL is configured, else the in-process one."""
+    if not redis_url:
+        return MemoryRateLimitBackend(requests_per_minute, max_clients=max_clients)
+    try:
+        import redis.asyncio as aioredis
+    except ImportError as e:
+        raise RuntimeError(
+            "GOLEM_DISCOVERY_RATE_LIMIT_REDIS_URL is set but the 'redis' package is not installed"
+        ) from e
+    return RedisRateLimitBackend(aioredis.from_url(redis_url), requests_per_minute)
+
+
+class RateLimitMiddleware:
+    """Reject HTTP requests over the per-client limit with 429 RATE_001."""
+
+    def __init__(self, app, requests_per_minute: int = 100, backend=None):
+        self.app = app
+        self.backend = backend or MemoryRateLimitBackend(requests_per_minute)
+
+    async def __call__(self, scope: Dict, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        client = scope.get("client")
+        if not await self.backend.allow(client[0] if client else "unknown"):
+            response = JSONResponse(
+                status_code=429,
+                content=jsonable_encoder(ErrorResponse(code="RATE_001", message="Rate limit exceeded")),
+            )
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
@@ -13,6 +13,7 @@ def main():
         host=settings.HOST,
         port=settings.PORT,
         reload=settings.DEBUG,
+        workers=settings.WORKERS,
         log_level="info" if settings.DEBUG else "warning"
     )
 
@@ -0,0 +1,403 @@
+import os
+import pytest
+import pytest_asyncio
+from datetime import datetime, timedelta
+
+
+@pytest_asyncio.fixture
+async def session_factory(tmp_path):
+    os.environ["GOLEM_DISCOVERY_DATABASE_URL"] = "sqlite+aiosqlite:///:memory:"
+    from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+    from sqlalchemy.orm import sessionmaker
+    from discovery.db.models import Base
+
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'discovery.sqlite'}", connect_args={"check_same_thread": False}
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    await engine.dispose()
+
+
+async def _stored(session_factory):
+    from discovery.db.models import Advertisement
+    from sqlalchemy import select
+
+    async with session_factory() as session:
+        rows = (await session.execute(select(Advertisement))).scalars().all()
+    return {row.provider_id: row for row in rows}
+
+
+@pytest.mark.asyncio
+async def test_index_answers_searches_from_memory(session_factory):
+    from discovery.db.index import AdvertisementIndex
+
+    index = AdvertisementIndex(session_factory)
+    await index.upsert_advertisement("PA", "10.0.0.1", "US", {"cpu": 2, "memory": 4, "storage": 10}, platform="arm64")
+    await index.upsert_advertisement("PB", "10.0.0.2", "SE", {"cpu": 4, "memory": 8, "storage": 20}, platform="x86_64")
+    await index.upsert_advertisement("PC", "10.0.0.3", "SE", {"cpu": 8, "memory": 16, "storage": 40})
+
+    async def ids(**kwargs):
+        return {ad.provider_id for ad in await index.find_by_requirements(**kwargs)}
+
+    assert await ids() == {"PA", "PB", "PC"}
+    assert await ids(cpu=3) == {"PB", "PC"}
+    assert await ids(memory=8, storage=30) == {"PC"}
+    assert await ids(country="SE") == {"PB", "PC"}
+    assert await ids(country="SE", cpu=1) == {"PB", "PC"}
+    assert await ids(country="SE", platform="x86_64") == {"PB"}
+    assert await ids(platform="arm64", cpu=4) == set()
+    assert await ids(country="SE", platform="arm64") == set()
+    assert await ids(cpu=2, country="US", platform="x86_64") == set()
+    assert await ids(cpu=100) == set()
+    assert await ids(country="PL") == set()
+    assert await ids(platform="riscv") == set()
+
+    # Nothing reaches the database until flush
+    assert await _stored(session_factory) == {}
+    assert index.pending_writes == 3
+
+
+@pytest.mark.asyncio
+async def test_index_updates_and_deletes_keep_lookups_consistent(session_factory):
+    from discovery.db.index import AdvertisementIndex
+
+    index = AdvertisementIndex(session_factory)
+    first = await index.upsert_advertisement("PA", "10.0.0.1", "US", {"cpu": 2, "memory": 4, "storage": 10})
+
+    # Re-posting unchanged content refreshes in place
+    again = await index.upsert_advertisement("PA", "10.0.0.1", "US", {"cpu": 2, "memory": 4, "storage": 10})
+    assert again is first
+
+    # Any change, pricing included, replaces the entry and its content hash
+    priced = await index.upsert_advertisement(
+        "PA", "10.0.0.1", "US", {"cpu": 2, "memory": 4, "storage": 10}, pricing={"usd_per_core_month": 1}
+    )
+    assert priced is not first and priced.pricing == {"usd_per_core_month": 1}
+    assert priced.content_hash != first.content_hash
+    assert priced.created_at == first.created_at
+
+    # Changed resources and platform move the entry between buckets
+    moved = await index.upsert_advertisement("PA", "10.0.0.1", "DE", {"cpu": 16, "memory": 4, "storage": 10}, platform="arm64")
+    assert moved.created_at == first.created_at
+    assert [ad.provider_id for ad in await index.find_by_requirements(cpu=16, country="DE", platform="arm64")] == ["PA"]
+    assert await index.find_by_requirements(country="US") == []
+    assert await index.get_by_id("PA") is moved
+    assert "IndexedAdvertisement(provider_id=PA" in repr(moved)
+
+    assert await index.delete("PA") is True
+    assert await index.delete("PA") is False
+    assert await index.get_by_id("PA") is None
+    assert await index.find_by_requirements(cpu=1) == []
+    assert len(index) == 0
+
+
+@pytest.mark.asyncio
+async def test_index_skips_and_expires_stale_entries(session_factory):
+    from discovery.db.index import AdvertisementIndex
+
+    index = AdvertisementIndex(session_factory)
+    await index.upsert_advertisement("OLD", "10.0.0.1", "US", {"cpu": 2, "memory": 4, "storage": 10}, platform="arm64")
+    await index.upsert_advertisement("NEW", "10.0.0.2", "US", {"cpu": 2, "memory": 4, "storage": 10})
+    (await index.get_by_id("OLD")).updated_at = datetime.utcnow() - timedelta(minutes=10)
+
+    assert [ad.provider_id for ad in await index.find_by_requirements(country="US")] == ["NEW"]
+    assert index.expire() == 1
+    assert len(index) == 1
+    assert await index.find_by_requirements(platform="arm64") == []
+
+
+@pytest.mark.asyncio
+async def test_version_changes_with_content_and_optionally_heartbeats(session_factory):
+    from discovery.db.index import AdvertisementIndex
+
+    index = AdvertisementIndex(session_factory)
+    empty = index.version()
+    await index.upsert_advertisement("PA", "10.0.0.1", "US", {"cpu": 2, "memory": 4, "storage": 10})
+    await index.upsert_advertisement("PB", "10.0.0.2", "US", {"cpu": 2, "memory": 4, "storage": 10})
+    added = index.version()
+    assert added != empty
+
+    shown = index.version(heartbeats=True)
+    assert await index.touch("PA")
+    await index.upsert_advertisement("PA", "10.0.0.1", "US", {"cpu": 2, "memory": 4, "storage": 10})
+    assert index.version() == added
+    assert index.version(heartbeats=True) != shown
+
+    assert await index.delete("PB")
+    deleted = index.version()
+    assert deleted != added
+
+    # An entry past the expiry changes the version on its own
+    (await index.get_by_id("PA")).updated_at = datetime.utcnow() - timedelta(minutes=10)
+    index._next_expiry = datetime.utcnow()
+    assert index.version() != deleted
+    assert len(index) == 0
+
+
+@pytest.mark.asyncio
+async def test_flush_writes_batches_and_load_restores(session_factory):
+    from discovery.db.index import AdvertisementIndex
+
+    index = AdvertisementIndex(session_factory)
+    assert await index.flush() == 0
+    for i in range(3):
+        await index.upsert_advertisement(f"P{i}", f"10.0.0.{i}", "US", {"cpu": i + 1, "memory": 4, "storage": 10})
+    assert await index.flush() == 3
+    stored = await _stored(session_factory)
+    assert set(stored) == {"P0", "P1", "P2"}
+    assert stored["P2"].cpu == 3
+    created = stored["P0"].created_at
+
+    # Updates keep created_at; deletes are persisted too
+    await index.upsert_advertisement("P0", "10.0.0.9", "SE", {"cpu": 8, "memory": 4, "storage": 10}, platform="arm64")
+    await index.delete("P1")
+    assert await index.flush() == 2
+    stored = await _stored(session_factory)
+    assert set(stored) == {"P0", "P2"}
+    assert stored["P0"].ip_address == "10.0.0.9" and stored["P0"].cpu == 8
+    assert stored["P0"].created_at == created
+
+    # A restarted server recovers the live advertisements from the database
+    restarted = AdvertisementIndex(session_factory)
+    assert await restarted.load() == 2
+    assert [ad.provider_id for ad in await restarted.find_by_requirements(cpu=4, platform="arm64")] == ["P0"]
+
+    # Reloading keeps changes that were not flushed yet
+    await restarted.upsert_advertisement("NEW", "10.0.0.5", "US", {"cpu": 1, "memory": 1, "storage": 1})
+    await restarted.delete("P2")
+    assert await restarted.load() == 2
+    assert await restarted.get_by_id("NEW") is not None
+    assert await restarted.get_by_id("P2") is None
+
+
+@pytest.mark.asyncio
+async def test_sync_applies_changes_from_other_workers(session_factory):
+    from discovery.db.index import AdvertisementIndex
+
+    worker_a = AdvertisementIndex(session_factory)
+    worker_b = AdvertisementIndex(session_factory)
+    await worker_a.upsert_advertisement("PA", "10.0.0.1", "US", {"cpu": 2, "memory": 4, "storage": 10})
+    await worker_a.flush()
+
+    # A worker that never loaded reads everything live
+    assert await worker_b.sync() == 1
+    assert [ad.provider_id for ad in await worker_b.find_by_requirements(country="US")] == ["PA"]
+
+    # Only newer rows are applied; rows re-read within the overlap are skipped
+    assert await worker_b.sync() == 0
+    await worker_a.upsert_advertisement("PA", "10.0.0.1", "SE", {"cpu": 8, "memory": 4, "storage": 10})
+    await worker_a.flush()
+    assert await worker_b.sync() == 1
+    assert [ad.provider_id for ad in await worker_b.find_by_requirements(cpu=8, country="SE")] == ["PA"]
+
+    # A heartbeat from another worker moves updated_at only
+    version, shown = worker_b.version(), worker_b.version(heartbeats=True)
+    await worker_a.touch("PA")
+    await worker_a.flush()
+    assert await worker_b.sync() == 1
+    assert worker_b.version() == version and worker_b.version(heartbeats=True) != shown
+
+    # A local change that is not flushed yet wins over the database
+    await worker_b.upsert_advertisement("PA", "10.0.0.1", "DE", {"cpu": 8, "memory": 4, "storage": 10})
+    await worker_a.upsert_advertisement("PA", "10.0.0.1", "PL", {"cpu": 8, "memory": 4, "storage": 10})
+    await worker_a.flush()
+    assert await worker_b.sync() == 0
+    assert (await worker_b.get_by_id("PA")).country == "DE"
+
+
+@pytest.mark.asyncio
+async def test_sync_applies_deletes_from_other_workers(session_factory):
+    from discovery.db.index import AdvertisementIndex
+    from discovery.db.models import AdvertisementTombstone
+    from discovery.db.repository import AdvertisementRepository
+    from sqlalchemy import select
+
+    res = {"cpu": 2, "memory": 4, "storage": 10}
+    worker_a = AdvertisementIndex(session_factory)
+    worker_b = AdvertisementIndex(session_factory)
+    for pid in ("PA", "PB", "PC"):
+        await worker_a.upsert_advertisement(pid, "10.0.0.1", "US", res)
+    await worker_a.flush()
+    assert await worker_b.sync() == 3
+
+    await worker_a.delete("PA")
+    await worker_a.delete("PB")
+    await worker_a.flush()
+    # PB is advertised again through worker B before it syncs
+    await worker_b.upsert_advertisement("PB", "10.0.0.2", "US", res)
+    assert await worker_b.sync() == 1
+    assert await worker_b.get_by_id("PA") is None
+    assert (await worker_b.get_by_id("PB")).ip_address == "10.0.0.2"
+    assert await worker_b.get_by_id("PC") is not None
+
+    # Re-advertised after the delete elsewhere: the newer row wins over the tombstone
+    await worker_b.flush()
+    assert await worker_a.sync() == 1
+    assert (await worker_a.get_by_id("PB")).ip_address == "10.0.0.2"
+    assert await worker_b.sync() == 0
+
+    # Cleanup prunes tombstones once they are older than the expiry window
+    async with session_factory() as session:
+        await session.execute(
+            AdvertisementTombstone.__table__.update().values(deleted_at=datetime.utcnow() - timedelta(minutes=10))
+        )
+        await session.commit()
+        await AdvertisementRepository(session).cleanup_expired()
+        assert (await session.execute(select(AdvertisementTombstone))).scalars().all() == []
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_requeues_without_overwriting_newer_changes(session_factory):
+    from discovery.db.index import AdvertisementIndex
+
+    class FailingSession:
+        async def __aenter__(self):
+            raise RuntimeError("db down")
+
+        async def __aexit__(self, *exc):
+            return False
+
+    index = AdvertisementIndex(lambda: FailingSession())
+    await index.upsert_advertisement("PA", "10.0.0.1", "US", {"cpu": 2, "memory": 4, "storage": 10})
+    await index.upsert_advertisement("PB", "10.0.0.2", "US", {"cpu": 2, "memory": 4, "storage": 10})
+    with pytest.raises(RuntimeError):
+        await index.flush()
+    assert index.pending_writes == 2
+
+    index._session_factory = session_factory
+    await index.delete("PB")
+    assert await index.flush() == 2
+    assert set(await _stored(session_factory)) == {"PA"}
+
+
+@pytest.mark.asyncio
+async def test_get_db_yields_session():
+    os.environ["GOLEM_DISCOVERY_DATABASE_URL"] = "sqlite+aiosqlite:///:memory:"
+    from discovery.db.session import get_db
+
+    agen = get_db()
+    session = await agen.__anext__()
+    assert session is not None
+    await agen.aclose()
+
+
+@pytest.mark.asyncio
+async def test_touch_persists_only_the_timestamp(session_factory):
+    from discovery.db.index import AdvertisementIndex
+    from discovery.db.repository import AdvertisementRepository
+
+    index = AdvertisementIndex(session_factory)
+    assert await index.touch("nobody") is False
+    await index.upsert_advertisement("PA", "10.0.0.1", "US", {"cpu": 2, "memory": 4, "storage": 10})
+    await index.upsert_advertisement("PB", "10.0.0.2", "US", {"cpu": 2, "memory": 4, "storage": 10})
+
+    # Touching an entry that was never stored keeps the full write queued
+    assert await index.touch("PA") is True
+    assert index.pending_writes == 2
+    assert await index.flush() == 2
+
+    # Heartbeats of stored entries become timestamp-only updates
+    before = (await _stored(session_factory))["PA"].updated_at
+    assert await index.touch("PA") is True
+    await index.upsert_advertisement("PB", "10.0.0.2", "US", {"cpu": 2, "memory": 4, "storage": 10})
+    assert index._touched.keys() == {"PA", "PB"} and index._pending == {}
+
+    # A restart-style reload keeps the newer in-memory timestamps
+    refreshed = (await index.get_by_id("PA")).updated_at
+    await index.load()
+    assert (await index.get_by_id("PA")).updated_at == refreshed
+
+    # A full change or delete supersedes a queued touch
+    await index.upsert_advertisement("PB", "10.0.0.9", "US", {"cpu": 2, "memory": 4, "storage": 10})
+    assert "PB" not in index._touched
+    assert await index.flush() == 2
+    stored = await _stored(session_factory)
+    assert stored["PA"].updated_at == refreshed > before
+    assert stored["PB"].ip_address == "10.0.0.9"
+
+    await index.touch("PA")
+    await index.delete("PA")
+    assert index._touched == {}
+
+    # The database repository offers the same refresh
+    async with session_factory() as session:
+        repo = AdvertisementRepository(session)
+        assert await repo.touch("PB") is True
+        assert await repo.touch("nobody") is False
+        await repo.touch_many({})
+        stored = await repo.get_by_id("PB")
+        assert stored.content_hash == (await index.get_by_id("PB")).content_hash
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_requeues_touches(session_factory):
+    from discovery.db.index import AdvertisementIndex
+
+    index = AdvertisementIndex(session_factory)
+    await index.upsert_advertisement("PA", "10.0.0.1", "US", {"cpu": 2, "memory": 4, "storage": 10})
+    await index.upsert_advertisement("PB", "10.0.0.2", "US", {"cpu": 2, "memory": 4, "storage": 10})
+    await index.flush()
+    await index.touch("PA")
+    await index.touch("PB")
+
+    class FailingSession:
+        async def __aenter__(self):
+            raise RuntimeError("db down")
+
+        async def __aexit__(self, *exc):
+            return False
+
+    index._session_factory = lambda: FailingSession()
+    with pytest.raises(RuntimeError):
+        await index.flush()
+    assert index._touched.keys() == {"PA", "PB"}
+
+    # A full write queued meanwhile is not shadowed by the requeued touch
+    index._touched.clear()
+    await index.touch("PA")
+    await index.upsert_advertisement("PB", "10.0.0.9", "US", {"cpu": 2, "memory": 4, "storage": 10})
+    with pytest.raises(RuntimeError):
+        await index.flush()
+    assert index._touched.keys() == {"PA"} and index._pending.keys() == {"PB"}
+
+
+@pytest.mark.asyncio
+async def test_find_cheapest_ranks_by_spec_cost(session_factory):
+    from discovery.db.index import AdvertisementIndex
+
+    def pricing(core, ram, storage=0.1):
+        return {"usd_per_core_month": core, "usd_per_gb_ram_month": ram, "usd_per_gb_storage_month": storage}
+
+    index = AdvertisementIndex(session_factory)
+    res = {"cpu": 8, "memory": 16, "storage": 100}
+    await index.upsert_advertisement("CPU-CHEAP", "10.0.0.1", "US", res, pricing(1.0, 4.0))
+    await index.upsert_advertisement("RAM-CHEAP", "10.0.0.2", "US", res, pricing(4.0, 1.0))
+    await index.upsert_advertisement("TIE", "10.0.0.3", "US", res, pricing(4.0, 1.0))
+    await index.upsert_advertisement("UNPRICED", "10.0.0.4", "US", res)
+    await index.upsert_advertisement("PARTIAL", "10.0.0.5", "US", res, {"usd_per_core_month": 0.1})
+    await index.upsert_advertisement("SMALL", "10.0.0.6", "US", {"cpu": 1, "memory": 1, "storage": 1}, pricing(0, 0))
+    await index.upsert_advertisement("ELSEWHERE", "10.0.0.7", "DE", res, pricing(0.5, 0.5))
+
+    # CPU-heavy specs favour cheap cores, memory-heavy specs cheap RAM
+    cpu_heavy = await index.find_cheapest(cpu=8, memory=2, storage=10, country="US")
+    ram_heavy = await index.find_cheapest(cpu=2, memory=16, storage=10, country="US", limit=2)
+    assert [(ad.provider_id, cost) for ad, cost in cpu_heavy] == [
+        ("CPU-CHEAP", pytest.approx(8 + 8 + 1)),
+        ("RAM-CHEAP", pytest.approx(32 + 2 + 1)),
+        ("TIE", pytest.approx(32 + 2 + 1)),
+    ]
+    assert [ad.provider_id for ad, _ in ram_heavy] == ["RAM-CHEAP", "TIE"]
+    assert [ad.provider_id for ad, _ in await index.find_cheapest(1, 1, 1, platform="arm64")] == []
+    assert [ad.provider_id for ad, _ in await index.find_cheapest(1, 1, 1, limit=1)] == ["SMALL"]
+
+    # Partial pricing is never ranked
+    partial = await index.get_by_id("PARTIAL")
+    assert (partial.usd_per_core_month, partial.usd_per_gb_ram_month) == (0.1, None)
+
+    # Prices are parsed again from pricing when entries are loaded
+    await index.flush()
+    restarted = AdvertisementIndex(session_factory)
+    await restarted.load()
+    assert [ad.provider_id for ad, _ in await restarted.find_cheapest(8, 2, 10, country="US", limit=1)] == ["CPU-CHEAP"]
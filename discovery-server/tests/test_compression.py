@@ -0,0 +1,118 @@
+import asyncio
+import gzip
+import os
+
+import pytest
+
+os.environ["GOLEM_DISCOVERY_DATABASE_URL"] = "sqlite+aiosqlite:///:memory:"
+
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, Response, StreamingResponse
+
+from discovery import compression
+from discovery.compression import CompressionMiddleware
+
+BIG = "advertisement " * 200
+
+
+def _app(minimum_size=100):
+    app = Starlette()
+
+    @app.route("/big")
+    async def big(request):
+        return PlainTextResponse(BIG)
+
+    @app.route("/small")
+    async def small(request):
+        return PlainTextResponse("ok")
+
+    @app.route("/encoded")
+    async def encoded(request):
+        return Response(gzip.compress(BIG.encode()), headers={"Content-Encoding": "gzip"})
+
+    @app.route("/stream")
+    async def stream(request):
+        async def events():
+            yield "data: 1\n\n" * 100
+            yield "data: 2\n\n" * 100
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return CompressionMiddleware(app, minimum_size=minimum_size)
+
+
+async def _get(app, path, accept=None):
+    """Call the app directly so bodies are seen exactly as sent: (headers, body)."""
+    headers = [(b"accept-encoding", accept.encode())] if accept is not None else []
+    scope = {"type": "http", "method": "GET", "path": path, "query_string": b"", "headers": headers}
+    messages = []
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.sleep(10)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    response_headers = {k.decode().lower(): v.decode() for k, v in messages[0]["headers"]}
+    return response_headers, b"".join(m.get("body", b"") for m in messages[1:])
+
+
+@pytest.mark.asyncio
+async def test_gzip_compresses_large_responses_only():
+    app = _app()
+    headers, body = await _get(app, "/big", "gzip, deflate")
+    assert headers["content-encoding"] == "gzip"
+    assert headers["vary"] == "Accept-Encoding"
+    assert int(headers["content-length"]) == len(body) < len(BIG)
+    assert gzip.decompress(body).decode() == BIG
+
+    for path, accept in [("/small", "gzip"), ("/big", "identity"), ("/big", "gzip;q=0"), ("/big", "gzip;q=x")]:
+        headers, body = await _get(app, path, accept)
+        assert "content-encoding" not in headers
+    headers, body = await _get(app, "/big")
+    assert body.decode() == BIG
+
+
+@pytest.mark.asyncio
+async def test_streams_and_encoded_bodies_pass_through():
+    app = _app()
+    headers, body = await _get(app, "/stream", "gzip")
+    assert "content-encoding" not in headers
+    assert body.decode() == "data: 1\n\n" * 100 + "data: 2\n\n" * 100
+
+    headers, body = await _get(app, "/encoded", "gzip")
+    assert gzip.decompress(body).decode() == BIG
+
+
+@pytest.mark.asyncio
+async def test_brotli_is_preferred_when_available(monkeypatch):
+    class FakeBrotli:
+        @staticmethod
+        def compress(body, quality):
+            return b"br:" + body[:10]
+
+    app = _app()
+    monkeypatch.setattr(compression, "brotli", None)
+    assert (await _get(app, "/big", "br, gzip"))[0]["content-encoding"] == "gzip"
+    monkeypatch.setattr(compression, "brotli", FakeBrotli)
+    headers, body = await _get(app, "/big", "br, gzip")
+    assert headers["content-encoding"] == "br"
+    assert body == b"br:" + BIG.encode()[:10]
+
+
+@pytest.mark.asyncio
+async def test_non_http_scopes_pass_through():
+    seen = []
+
+    async def app(scope, receive, send):
+        seen.append(scope["type"])
+
+    await CompressionMiddleware(app)({"type": "lifespan"}, None, None)
+    assert seen == ["lifespan"]
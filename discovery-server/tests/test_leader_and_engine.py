@@ -0,0 +1,97 @@
+import os
+import pytest
+import pytest_asyncio
+from datetime import timedelta
+
+
+@pytest_asyncio.fixture
+async def file_engine(tmp_path):
+    os.environ["GOLEM_DISCOVERY_DATABASE_URL"] = "sqlite+aiosqlite:///:memory:"
+    from discovery.db.session import _create_engine
+
+    engine = _create_engine(f"sqlite+aiosqlite:///{tmp_path / 'discovery.sqlite'}")
+    yield engine
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_file_engine_uses_wal_pool_and_busy_timeout(file_engine):
+    from discovery.config import settings
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+    assert isinstance(file_engine.pool, AsyncAdaptedQueuePool)
+    assert file_engine.pool.size() == settings.DATABASE_POOL_SIZE
+    async with file_engine.connect() as conn:
+        assert (await conn.exec_driver_sql("PRAGMA journal_mode")).scalar() == "wal"
+        assert (await conn.exec_driver_sql("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert (await conn.exec_driver_sql("PRAGMA busy_timeout")).scalar() == settings.DATABASE_BUSY_TIMEOUT_MS
+
+
+def test_memory_engine_keeps_default_pool():
+    os.environ["GOLEM_DISCOVERY_DATABASE_URL"] = "sqlite+aiosqlite:///:memory:"
+    from discovery.db.session import _create_engine
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+    engine = _create_engine("sqlite+aiosqlite:///:memory:")
+    assert not isinstance(engine.pool, AsyncAdaptedQueuePool)
+
+
+@pytest.mark.asyncio
+async def test_init_db_retries_when_another_worker_creates_tables(file_engine, monkeypatch):
+    import discovery.db.session as sess
+    from discovery.db.models import Base
+    from sqlalchemy.exc import OperationalError
+
+    monkeypatch.setattr(sess, "engine", file_engine)
+    original = Base.metadata.create_all
+    calls = []
+
+    def racing_create_all(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 1:
+            raise OperationalError("CREATE TABLE advertisements", {}, Exception("table advertisements already exists"))
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(Base.metadata, "create_all", racing_create_all)
+    await sess.init_db()
+    assert len(calls) == 2
+
+    def always_failing(*args, **kwargs):
+        raise OperationalError("CREATE TABLE advertisements", {}, Exception("disk I/O error"))
+
+    monkeypatch.setattr(Base.metadata, "create_all", always_failing)
+    with pytest.raises(OperationalError):
+        await sess.init_db()
+
+
+@pytest.mark.asyncio
+async def test_leader_lock_elects_one_worker_and_fails_over(file_engine):
+    from discovery.db.leader import LeaderLock
+    from discovery.db.models import Base
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from sqlalchemy.orm import sessionmaker
+
+    async with file_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    Session = sessionmaker(file_engine, class_=AsyncSession, expire_on_commit=False)
+
+    first = LeaderLock(Session, "cleanup", ttl=timedelta(minutes=1))
+    second = LeaderLock(Session, "cleanup", ttl=timedelta(minutes=1))
+    assert first.holder != second.holder
+
+    assert await first.acquire() is True
+    assert await second.acquire() is False
+    assert await first.acquire() is True  # renewal
+
+    # Other task names are independent
+    assert await LeaderLock(Session, "other", ttl=timedelta(minutes=1)).acquire() is True
+
+    # Releasing hands over immediately
+    await first.release()
+    assert await second.acquire() is True
+    assert await first.acquire() is False
+
+    # An expired lease can be taken over
+    stale = LeaderLock(Session, "expiring", ttl=timedelta(seconds=-1), holder="crashed")
+    assert await stale.acquire() is True
+    assert await LeaderLock(Session, "expiring", ttl=timedelta(minutes=1)).acquire() is True
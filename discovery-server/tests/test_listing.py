@@ -0,0 +1,99 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+os.environ["GOLEM_DISCOVERY_DATABASE_URL"] = "sqlite+aiosqlite:///:memory:"
+
+from discovery.api.listing import (
+    decode_cursor,
+    encode_cursor,
+    etag_matches,
+    listing_etag,
+    paginate,
+    price_estimate,
+    sort_key,
+)
+from discovery.db.index import IndexedAdvertisement
+from discovery.db.models import estimate_monthly_cost
+
+SPEC = {"cpu": 2, "memory": 4, "storage": 10}
+
+
+def _ad(pid, core=None, ram=1.0, storage=0.1, updated_at=None):
+    pricing = None
+    if core is not None:
+        pricing = {"usd_per_core_month": core, "usd_per_gb_ram_month": ram, "usd_per_gb_storage_month": storage}
+    return IndexedAdvertisement(
+        pid, "1.2.3.4", "US", {"cpu": 8, "memory": 16, "storage": 100}, pricing=pricing, updated_at=updated_at
+    )
+
+
+def test_monthly_cost_needs_every_rate():
+    assert estimate_monthly_cost(_ad("a", core=5.0), **SPEC) == pytest.approx(5.0 * 2 + 1.0 * 4 + 0.1 * 10)
+    assert estimate_monthly_cost(_ad("a"), **SPEC) is None
+    assert estimate_monthly_cost(_ad("a", core="n/a"), **SPEC) is None
+
+
+def test_price_estimate_matches_requestor_rounding():
+    ad = _ad("a", core=5.0)
+    assert price_estimate(ad, 15.0, SPEC) == {"usd_per_month": 15.0, "usd_per_hour": 0.020548, "glm_per_month": None}
+    ad.pricing.update(glm_per_core_month=1, glm_per_gb_ram_month=0.5, glm_per_gb_storage_month=0.01)
+    assert price_estimate(ad, 15.0, SPEC)["glm_per_month"] == pytest.approx(4.1)
+
+
+def test_sort_keys_put_unpriced_entries_last_in_both_directions():
+    cheap, dear, unpriced = _ad("c", core=1.0), _ad("d", core=9.0), _ad("u")
+    ascending = sorted([unpriced, dear, cheap], key=lambda ad: sort_key(ad, "price", SPEC))
+    descending = sorted([unpriced, cheap, dear], key=lambda ad: sort_key(ad, "-price", SPEC))
+    assert [ad.provider_id for ad in ascending] == ["c", "d", "u"]
+    assert [ad.provider_id for ad in descending] == ["d", "c", "u"]
+
+    now = datetime.utcnow()
+    older, newer = _ad("o", updated_at=now - timedelta(seconds=5)), _ad("n", updated_at=now)
+    assert sort_key(newer, "-updated_at", SPEC) < sort_key(older, "-updated_at", SPEC)
+    assert sort_key(older, "provider_id", SPEC) == (0, 0.0, "o")
+
+
+def test_cursor_round_trip_and_rejects_garbage():
+    key = (0, 12.5, "0xabc")
+    assert decode_cursor(encode_cursor(key)) == key
+    for bad in ("!!!", encode_cursor((0, 1.0))[:-2], "e30"):
+        with pytest.raises(ValueError):
+            decode_cursor(bad)
+
+
+def test_paginate_walks_every_entry_once_despite_concurrent_changes():
+    ads = [_ad(f"p{i:02d}", core=float(i % 4)) for i in range(10)]
+    seen = []
+    page, cursor = paginate(ads, "price", SPEC, limit=4)
+    seen += page
+    # An entry sorting before the cursor appears and one already seen disappears
+    ads = [ad for ad in ads if ad is not page[0]] + [_ad("p00a", core=0.0)]
+    while cursor:
+        page, cursor = paginate(ads, "price", SPEC, limit=4, cursor=decode_cursor(cursor))
+        seen += page
+    ids = [ad.provider_id for ad in seen]
+    assert len(ids) == len(set(ids)) == 10
+    assert "p00a" not in ids
+
+    everything, cursor = paginate(ads, "provider_id", SPEC)
+    assert cursor is None and len(everything) == 10
+
+
+def test_listing_etag_follows_version_and_normalized_query():
+    etag = listing_etag([("sort", "price"), ("cpu", "2")], "s:1")
+    assert etag.startswith('W/"')
+    assert listing_etag([("cpu", "2"), ("sort", "price")], "s:1") == etag
+    assert listing_etag([("sort", "price"), ("cpu", "2")], "s:2") != etag
+    assert listing_etag([("sort", "-price"), ("cpu", "2")], "s:1") != etag
+
+
+def test_etag_matches_uses_weak_comparison():
+    etag = 'W/"abc"'
+    assert etag_matches('"abc"', etag)
+    assert etag_matches('"zzz", W/"abc"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"zzz"', etag)
+    assert not etag_matches(None, etag)
+    assert etag_matches('W/"abc"', '"abc"')
@@ -0,0 +1,190 @@
+import sys
+import types
+import pytest
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_is_a_token_bucket():
+    from discovery.ratelimit import MemoryRateLimitBackend
+
+    clock = FakeClock()
+    backend = MemoryRateLimitBackend(60, clock=clock)
+
+    # Full burst, then rejected until tokens refill at one per second
+    assert all([await backend.allow("1.1.1.1") for _ in range(60)])
+    assert await backend.allow("1.1.1.1") is False
+    clock.now += 0.5
+    assert await backend.allow("1.1.1.1") is False
+    clock.now += 0.5
+    assert await backend.allow("1.1.1.1") is True
+    assert await backend.allow("1.1.1.1") is False
+
+    # Other clients have their own bucket
+    assert await backend.allow("2.2.2.2") is True
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_evicts_idle_and_least_recent_clients():
+    from discovery.ratelimit import MemoryRateLimitBackend
+
+    clock = FakeClock()
+    backend = MemoryRateLimitBackend(1, max_clients=2, clock=clock)
+    assert await backend.allow("a") is True
+    assert await backend.allow("b") is True
+    assert await backend.allow("a") is False  # "a" is now the most recent
+    assert await backend.allow("c") is True
+    assert len(backend) == 2
+    assert await backend.allow("a") is False  # kept, still limited
+    assert await backend.allow("b") is True  # evicted, starts over
+
+    # A full window of inactivity drops the bucket entirely
+    clock.now += 60
+    assert await backend.allow("d") is True
+    assert len(backend) == 1
+
+
+class FakePipeline:
+    def __init__(self, store, fail=False):
+        self.store = store
+        self.fail = fail
+        self.ops = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def incr(self, key):
+        self.ops.append(("incr", key))
+
+    def expire(self, key, seconds):
+        self.ops.append(("expire", key, seconds))
+
+    def get(self, key):
+        self.ops.append(("get", key))
+
+    async def execute(self):
+        if self.fail:
+            raise ConnectionError("redis down")
+        results = []
+        for op in self.ops:
+            if op[0] == "incr":
+                self.store[op[1]] = self.store.get(op[1], 0) + 1
+                results.append(self.store[op[1]])
+            elif op[0] == "expire":
+                results.append(True)
+            else:
+                value = self.store.get(op[1])
+                results.append(str(value).encode() if value is not None else None)
+        return results
+
+
+class FakeRedis:
+    def __init__(self, fail=False):
+        self.store = {}
+        self.fail = fail
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self.store, self.fail)
+
+
+@pytest.mark.asyncio
+async def test_redis_backend_uses_shared_sliding_window():
+    from discovery.ratelimit import RedisRateLimitBackend
+
+    redis = FakeRedis()
+    clock = FakeClock(6000.0)  # start of a window
+    # Two workers sharing one Redis enforce a single limit
+    worker_a = RedisRateLimitBackend(redis, 3, clock=clock)
+    worker_b = RedisRateLimitBackend(redis, 3, clock=clock)
+    assert await worker_a.allow("1.1.1.1") is True
+    assert await worker_b.allow("1.1.1.1") is True
+    assert await worker_a.allow("1.1.1.1") is True
+    assert await worker_b.allow("1.1.1.1") is False
+
+    # Halfway into the next window half of the previous count still applies
+    clock.now += 90
+    assert await worker_a.allow("1.1.1.1") is True  # 4 * 0.5 + 1 = 3
+    assert await worker_a.allow("1.1.1.1") is False
+
+
+@pytest.mark.asyncio
+async def test_redis_backend_allows_when_redis_fails():
+    from discovery.ratelimit import RedisRateLimitBackend
+
+    backend = RedisRateLimitBackend(FakeRedis(fail=True), 1)
+    assert await backend.allow("1.1.1.1") is True
+    assert await backend.allow("1.1.1.1") is True
+
+
+def test_create_rate_limit_backend(monkeypatch):
+    from discovery.ratelimit import MemoryRateLimitBackend, RedisRateLimitBackend, create_rate_limit_backend
+
+    backend = create_rate_limit_backend(10, max_clients=5)
+    assert isinstance(backend, MemoryRateLimitBackend) and backend.max_clients == 5
+
+    monkeypatch.setitem(sys.modules, "redis", None)
+    with pytest.raises(RuntimeError):
+        create_rate_limit_backend(10, redis_url="redis://localhost")
+
+    fake_asyncio = types.SimpleNamespace(from_url=lambda url: ("client", url))
+    monkeypatch.setitem(sys.modules, "redis", types.SimpleNamespace(asyncio=fake_asyncio))
+    monkeypatch.setitem(sys.modules, "redis.asyncio", fake_asyncio)
+    backend = create_rate_limit_backend(10, redis_url="redis://localhost")
+    assert isinstance(backend, RedisRateLimitBackend)
+    assert backend.client == ("client", "redis://localhost") and backend.limit == 10
+
+
+def test_middleware_passes_through_non_http_and_uses_backend():
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from discovery.ratelimit import RateLimitMiddleware
+
+    seen = []
+
+    class RecordingBackend:
+        async def allow(self, client):
+            seen.append(client)
+            return len(seen) < 2
+
+    app = FastAPI()
+
+    @app.get("/")
+    def root():
+        return {"ok": True}
+
+    app.add_middleware(RateLimitMiddleware, backend=RecordingBackend())
+
+    # Lifespan events reach the app without touching the limiter
+    with TestClient(app) as client:
+        assert client.get("/").status_code == 200
+        assert client.get("/").status_code == 429
+    assert seen == ["testclient", "testclient"]
+
+
+@pytest.mark.asyncio
+async def test_middleware_handles_missing_client_address():
+    from discovery.ratelimit import RateLimitMiddleware
+
+    calls = []
+
+    async def app(scope, receive, send):
+        calls.append(scope["path"])
+
+    class RecordingBackend:
+        async def allow(self, client):
+            calls.append(client)
+            return True
+
+    middleware = RateLimitMiddleware(app, backend=RecordingBackend())
+    await middleware({"type": "http", "path": "/x"}, None, None)
+    assert calls == ["unknown", "/x"]
@@ -68,3 +68,57 @@ async def test_repository_filters_and_cleanup():
         # Now both should be gone
         all_rows = (await session.execute(select(Advertisement))).scalars().all()
         assert all_rows == []
+
+
+@pytest.mark.asyncio
+async def test_repository_materializes_resource_columns_for_indexed_filters():
+    os.environ["GOLEM_DISCOVERY_DATABASE_URL"] = "sqlite+aiosqlite:///:memory:"
+
+    from discovery.db.session import AsyncSessionLocal, init_db
+    from discovery.db.repository import AdvertisementRepository, _resource_value
+    from discovery.db.models import Advertisement
+    from sqlalchemy import select
+
+    await init_db()
+
+    assert _resource_value({"cpu": "4"}, "cpu") == 4
+    assert _resource_value({"cpu": "many"}, "cpu") is None
+    assert _resource_value({}, "memory") is None
+
+    async with AsyncSessionLocal() as session:
+        repo = AdvertisementRepository(session)
+        await repo.upsert_advertisement(
+            provider_id="PZ",
+            ip_address="10.0.0.3",
+            country="DE",
+            resources={"cpu": 2, "memory": 4, "storage": 10},
+        )
+        # Re-advertising with new resources refreshes the columns
+        await repo.upsert_advertisement(
+            provider_id="PZ",
+            ip_address="10.0.0.3",
+            country="DE",
+            resources={"cpu": 8, "memory": 16, "storage": 100},
+        )
+        ad = (await session.execute(select(Advertisement).where(Advertisement.provider_id == "PZ"))).scalar_one()
+        assert (ad.cpu, ad.memory, ad.storage) == (8, 16, 100)
+        assert [a.provider_id for a in await repo.find_by_requirements(cpu=8, memory=16, storage=100)] == ["PZ"]
+        assert await repo.find_by_requirements(cpu=9) == []
+
+        # Requirement and country filters are answered from indexes, not a JSON scan
+        compiled = (
+            select(Advertisement)
+            .where(Advertisement.cpu >= 4)
+            .compile(compile_kwargs={"literal_binds": True})
+        )
+        plan = (await session.execute(f"EXPLAIN QUERY PLAN {compiled}")).fetchall()
+        assert any("USING INDEX" in str(row[-1]) for row in plan)
+        compiled = (
+            select(Advertisement)
+            .where(Advertisement.country == "DE")
+            .compile(compile_kwargs={"literal_binds": True})
+        )
+        plan = (await session.execute(f"EXPLAIN QUERY PLAN {compiled}")).fetchall()
+        assert any("ix_advertisements_country_platform_updated_at" in str(row[-1]) for row in plan)
+
+        assert await repo.delete("PZ") is True
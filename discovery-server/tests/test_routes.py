@@ -137,6 +137,9 @@ def test_list_route_handles_repo_exception(monkeypatch):
     from discovery.api import routes
 
     class BoomRepo:
+        def version(self, heartbeats=False):
+            return "boom:0"
+
         async def find_by_requirements(self, **kwargs):
             raise RuntimeError("boom")
 
@@ -149,3 +152,195 @@ def test_list_route_handles_repo_exception(monkeypatch):
         assert r.status_code == 400
         assert r.json()["detail"]["code"] == "ADV_003"
     app.dependency_overrides.clear()
+
+
+def test_list_route_revalidates_without_searching():
+    os.environ["GOLEM_DISCOVERY_DATABASE_URL"] = "sqlite+aiosqlite:///:memory:"
+    from discovery.main import app
+    from discovery.api import routes
+    from discovery.api.listing import listing_etag
+
+    class UnchangedRepo:
+        def version(self, heartbeats=False):
+            return "s:7"
+
+        async def find_by_requirements(self, **kwargs):
+            raise AssertionError("a matching If-None-Match must not search")
+
+    app.dependency_overrides[routes.get_repository] = lambda: UnchangedRepo()
+    with TestClient(app) as client:
+        etag = listing_etag([("country", "NO"), ("sort", "price")], "s:7")
+        r = client.get("/api/v1/advertisements?sort=price&country=NO", headers={"If-None-Match": etag})
+        assert r.status_code == 304
+        assert r.headers["ETag"] == etag
+    app.dependency_overrides.clear()
+
+
+def test_heartbeat_refreshes_unchanged_advertisement(app_client: TestClient):
+    body = {
+        "ip_address": "4.4.4.4",
+        "country": "PL",
+        "resources": {"cpu": 2, "memory": 4, "storage": 50},
+        "pricing": {"usd_per_core_month": 5.0},
+    }
+    r = app_client.post("/api/v1/advertisements", json=body, headers=_headers("provH"))
+    content_hash = r.json()["content_hash"]
+    assert content_hash
+    updated_at = r.json()["updated_at"]
+
+    # The hash is stable for identical content and changes with it
+    again = app_client.post("/api/v1/advertisements", json=body, headers=_headers("provH"))
+    assert again.json()["content_hash"] == content_hash
+
+    r = app_client.patch(
+        "/api/v1/advertisements/provH", headers={**_headers("provH"), "If-Match": f'"{content_hash}"'}
+    )
+    assert r.status_code == 204
+    assert r.headers["ETag"] == f'"{content_hash}"'
+    assert app_client.get("/api/v1/advertisements/provH").json()["updated_at"] > updated_at
+
+    # Weak and unquoted validators are accepted too
+    r = app_client.patch(
+        "/api/v1/advertisements/provH", headers={**_headers("provH"), "If-Match": f'W/"{content_hash}"'}
+    )
+    assert r.status_code == 204
+
+    # Stale hash: the provider must send the full advertisement
+    r = app_client.patch("/api/v1/advertisements/provH", headers={**_headers("provH"), "If-Match": "stale"})
+    assert r.status_code == 412
+    assert r.json()["detail"]["code"] == "ADV_005"
+
+    # Other providers cannot refresh it, and unknown ads are 404
+    r = app_client.patch("/api/v1/advertisements/provH", headers={**_headers("other"), "If-Match": content_hash})
+    assert r.status_code == 401
+    r = app_client.patch("/api/v1/advertisements/ghost", headers={**_headers("ghost"), "If-Match": content_hash})
+    assert r.status_code == 404
+
+    changed = app_client.post(
+        "/api/v1/advertisements", json={**body, "pricing": {"usd_per_core_month": 6.0}}, headers=_headers("provH")
+    )
+    assert changed.json()["content_hash"] != content_hash
+
+    app_client.delete("/api/v1/advertisements/provH", headers=_headers("provH"))
+
+
+def test_listing_sorts_paginates_projects_and_revalidates(app_client: TestClient):
+    prices = {"provS1": 3.0, "provS2": 1.0, "provS3": 2.0}
+    for pid, core in prices.items():
+        body = {
+            "ip_address": "5.5.5.5",
+            "country": "NO",
+            "resources": {"cpu": 4, "memory": 8, "storage": 100},
+            "pricing": {"usd_per_core_month": core, "usd_per_gb_ram_month": 1.0, "usd_per_gb_storage_month": 0.1},
+        }
+        assert app_client.post("/api/v1/advertisements", json=body, headers=_headers(pid)).status_code == 200
+    app_client.post(
+        "/api/v1/advertisements",
+        json={"ip_address": "5.5.5.6", "country": "NO", "resources": {"cpu": 4, "memory": 8, "storage": 100}},
+        headers=_headers("provS0"),
+    )
+
+    r = app_client.get("/api/v1/advertisements?country=NO&cpu=2&sort=price&limit=2&fields=provider_id,pricing")
+    assert r.status_code == 200
+    assert [ad["provider_id"] for ad in r.json()] == ["provS2", "provS3"]
+    assert set(r.json()[0]) == {"provider_id", "pricing"}
+    assert r.headers["Cache-Control"] == "no-cache"
+    cursor = r.headers["X-Next-Cursor"]
+    assert f"cursor={cursor}" in r.headers["Link"] and r.headers["Link"].endswith('rel="next"')
+
+    # The unpriced provider sorts last on the final page
+    r = app_client.get(f"/api/v1/advertisements?country=NO&cpu=2&sort=price&limit=2&cursor={cursor}")
+    assert [ad["provider_id"] for ad in r.json()] == ["provS1", "provS0"]
+    assert "X-Next-Cursor" not in r.headers
+
+    # Unchanged listings revalidate to 304; heartbeats only count where updated_at is shown
+    r = app_client.get("/api/v1/advertisements?country=NO&fields=provider_id,pricing")
+    assert [ad["provider_id"] for ad in r.json()] == ["provS0", "provS1", "provS2", "provS3"]
+    etag = r.headers["ETag"]
+    full_etag = app_client.get("/api/v1/advertisements?country=NO").headers["ETag"]
+    content_hash = app_client.get("/api/v1/advertisements/provS1").json()["content_hash"]
+    app_client.patch("/api/v1/advertisements/provS1", headers={**_headers("provS1"), "If-Match": content_hash})
+    r = app_client.get("/api/v1/advertisements?country=NO&fields=provider_id,pricing", headers={"If-None-Match": etag})
+    assert r.status_code == 304 and r.content == b""
+    assert r.headers["ETag"] == etag
+    r = app_client.get("/api/v1/advertisements?country=NO", headers={"If-None-Match": full_etag})
+    assert r.status_code == 200 and r.headers["ETag"] != full_etag
+
+    app_client.delete("/api/v1/advertisements/provS2", headers=_headers("provS2"))
+    r = app_client.get("/api/v1/advertisements?country=NO&fields=provider_id,pricing", headers={"If-None-Match": etag})
+    assert r.status_code == 200 and r.headers["ETag"] != etag
+
+    for pid in ("provS0", "provS1", "provS3"):
+        app_client.delete(f"/api/v1/advertisements/{pid}", headers=_headers(pid))
+
+
+def test_heartbeat_between_pages_of_updated_at_listing(app_client: TestClient):
+    body = {"ip_address": "5.5.6.6", "country": "IS", "resources": {"cpu": 1, "memory": 1, "storage": 1}}
+    for pid in ("provU1", "provU2", "provU3"):
+        assert app_client.post("/api/v1/advertisements", json=body, headers=_headers(pid)).status_code == 200
+
+    r = app_client.get("/api/v1/advertisements?country=IS&sort=-updated_at&limit=2&fields=provider_id")
+    assert [ad["provider_id"] for ad in r.json()] == ["provU3", "provU2"]
+    # Heartbeats reorder this listing, so it offers no cursor to resume from
+    assert "X-Next-Cursor" not in r.headers and "Link" not in r.headers
+    etag = r.headers["ETag"]
+
+    content_hash = app_client.get("/api/v1/advertisements/provU1").json()["content_hash"]
+    app_client.patch("/api/v1/advertisements/provU1", headers={**_headers("provU1"), "If-Match": content_hash})
+    r = app_client.get(
+        "/api/v1/advertisements?country=IS&sort=-updated_at&limit=2&fields=provider_id",
+        headers={"If-None-Match": etag},
+    )
+    assert r.status_code == 200 and r.headers["ETag"] != etag
+    assert [ad["provider_id"] for ad in r.json()] == ["provU1", "provU3"]
+
+    cursor = app_client.get("/api/v1/advertisements?country=IS&sort=provider_id&limit=2").headers["X-Next-Cursor"]
+    r = app_client.get(f"/api/v1/advertisements?country=IS&sort=updated_at&cursor={cursor}")
+    assert r.status_code == 400 and r.json()["detail"]["code"] == "ADV_006"
+
+    for pid in ("provU1", "provU2", "provU3"):
+        app_client.delete(f"/api/v1/advertisements/{pid}", headers=_headers(pid))
+
+
+@pytest.mark.parametrize(
+    "query",
+    ["sort=cheapest", "limit=0", "limit=100000", "fields=provider_id,secret", "cursor=not-a-cursor"],
+)
+def test_listing_rejects_invalid_parameters(app_client: TestClient, query):
+    r = app_client.get(f"/api/v1/advertisements?{query}")
+    assert r.status_code == 400
+    assert r.json()["detail"]["code"] == "ADV_006"
+
+
+def test_match_returns_cheapest_providers_with_estimates(app_client: TestClient):
+    for pid, core in (("provM1", 3.0), ("provM2", 1.0), ("provM3", 2.0)):
+        body = {
+            "ip_address": "6.6.6.6",
+            "country": "FI",
+            "resources": {"cpu": 4, "memory": 8, "storage": 100},
+            "pricing": {
+                "usd_per_core_month": core,
+                "usd_per_gb_ram_month": 1.0,
+                "usd_per_gb_storage_month": 0.1,
+                "glm_per_core_month": core * 2,
+                "glm_per_gb_ram_month": 2.0,
+                "glm_per_gb_storage_month": 0.2,
+            },
+        }
+        app_client.post("/api/v1/advertisements", json=body, headers=_headers(pid))
+
+    r = app_client.get("/api/v1/advertisements/match?cpu=2&memory=4&storage=10&country=FI&limit=2")
+    assert r.status_code == 200
+    matches = r.json()
+    assert [m["provider_id"] for m in matches] == ["provM2", "provM3"]
+    assert matches[0]["estimate"] == {"usd_per_month": 7.0, "usd_per_hour": 0.009589, "glm_per_month": 14.0}
+    assert matches[0]["pricing"]["usd_per_core_month"] == 1.0
+
+    r = app_client.get("/api/v1/advertisements/match?cpu=0&memory=4&storage=10")
+    assert r.json()["detail"]["code"] == "ADV_002"
+    r = app_client.get("/api/v1/advertisements/match?cpu=1&memory=4&storage=10&limit=0")
+    assert r.json()["detail"]["code"] == "ADV_006"
+    assert app_client.get("/api/v1/advertisements/match?cpu=1").status_code == 422
+
+    for pid in ("provM1", "provM2", "provM3"):
+        app_client.delete(f"/api/v1/advertisements/{pid}", headers=_headers(pid))
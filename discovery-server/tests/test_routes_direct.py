@@ -1,3 +1,5 @@
+import json
+
 import pytest
 
 
@@ -5,13 +7,18 @@ import pytest
 async def test_routes_direct_return_paths():
     from discovery.api import routes
     from discovery.api.models import AdvertisementCreate
+    from discovery.db.index import IndexedAdvertisement
+    from starlette.requests import Request
 
     class DummyRepo:
         async def upsert_advertisement(self, **kwargs):
             return {"ok": True}
 
+        def version(self, heartbeats=False):
+            return "dummy:0"
+
         async def find_by_requirements(self, **kwargs):
-            return [{"provider_id": "x"}]
+            return [IndexedAdvertisement("x", "1.2.3.4", "US", {"cpu": 1, "memory": 1, "storage": 1})]
 
         async def get_by_id(self, provider_id: str):
             return {"provider_id": provider_id} if provider_id == "exists" else None
@@ -31,8 +38,12 @@ async def test_routes_direct_return_paths():
     assert res == {"ok": True}
 
     # list_advertisements return path
-    res2 = await routes.list_advertisements(repo=repo)
-    assert res2 == [{"provider_id": "x"}]
+    request = Request({"type": "http", "method": "GET", "path": "/api/v1/advertisements",
+                       "query_string": b"", "headers": [], "server": ("test", 80), "scheme": "http"})
+    res2 = await routes.list_advertisements(
+        request=request, sort="provider_id", limit=None, cursor=None, fields=None, if_none_match=None, repo=repo
+    )
+    assert json.loads(res2.body)[0]["provider_id"] == "x"
 
     # get_advertisement 404 path
     with pytest.raises(Exception):
@@ -0,0 +1,59 @@
+import json
+import os
+from datetime import timedelta
+
+os.environ["GOLEM_DISCOVERY_DATABASE_URL"] = "sqlite+aiosqlite:///:memory:"
+
+from fastapi.encoders import jsonable_encoder
+
+from discovery.api import serialization
+from discovery.api.models import AdvertisementResponse
+from discovery.api.serialization import encode_advertisements, encoded_advertisement
+from discovery.db.index import IndexedAdvertisement
+from discovery.db.models import Advertisement
+
+
+def _ad(pid="0xabc", **kwargs):
+    return IndexedAdvertisement(
+        pid,
+        "1.2.3.4",
+        "SE",
+        {"cpu": 4, "memory": 8, "storage": 100},
+        pricing={"usd_per_core_month": 1.5, "usd_per_gb_ram_month": 0.5, "usd_per_gb_storage_month": 0.01},
+        platform="x86_64",
+        **kwargs,
+    )
+
+
+def test_fast_encoding_matches_validated_responses():
+    ads = [_ad("0x1"), _ad("0x2")]
+    orm = Advertisement(**ads[0].as_row())
+    ads.append(orm)
+    expected = json.dumps(
+        jsonable_encoder([AdvertisementResponse.from_orm(ad) for ad in ads]), separators=(",", ":")
+    )
+    assert encode_advertisements(ads).decode() == expected
+    assert json.loads(encode_advertisements(ads, {"provider_id", "pricing"})) == [
+        {"provider_id": ad.provider_id, "pricing": ad.pricing} for ad in ads
+    ]
+    assert encode_advertisements([]) == b"[]"
+
+
+def test_index_entries_cache_their_encoding_until_a_heartbeat():
+    ad = _ad()
+    first = encoded_advertisement(ad)
+    assert encoded_advertisement(ad) is first
+    ad.updated_at += timedelta(seconds=30)
+    refreshed = encoded_advertisement(ad)
+    assert refreshed is not first
+    assert json.loads(refreshed)["updated_at"] == ad.updated_at.isoformat()
+
+
+def test_orjson_is_used_when_installed(monkeypatch):
+    class FakeOrjson:
+        @staticmethod
+        def dumps(content):
+            return b"orjson"
+
+    monkeypatch.setattr(serialization, "orjson", FakeOrjson)
+    assert serialization.dumps({"a": 1}) == b"orjson"
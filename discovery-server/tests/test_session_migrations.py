@@ -88,3 +88,63 @@ async def test_init_db_swallows_migration_probe_errors(monkeypatch):
 
     # Should complete without raising despite the internal error
     await sess.init_db()
+
+
+@pytest.mark.asyncio
+async def test_init_db_backfills_resource_columns_and_indexes(tmp_path, monkeypatch):
+    db_path = tmp_path / "discovery.sqlite"
+
+    # Database from before the resource columns and indexes existed
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        """
+        CREATE TABLE advertisements (
+            provider_id TEXT PRIMARY KEY,
+            ip_address TEXT NOT NULL,
+            country TEXT NOT NULL,
+            platform TEXT,
+            resources TEXT NOT NULL,
+            pricing TEXT,
+            usd_per_core_month REAL,
+            created_at TEXT,
+            updated_at TEXT
+        )
+        """
+    )
+    # Left behind by a build that ranked providers in SQL
+    conn.execute("CREATE INDEX ix_advertisements_prices ON advertisements (usd_per_core_month)")
+    conn.execute(
+        "INSERT INTO advertisements (provider_id, ip_address, country, resources, pricing, created_at, updated_at) "
+        "VALUES ('P1', '10.0.0.1', 'US', '{\"cpu\": 4, \"memory\": 8, \"storage\": 50}', "
+        "'{\"usd_per_core_month\": 5, \"usd_per_gb_ram_month\": 1.5, \"usd_per_gb_storage_month\": \"n/a\"}', "
+        "'2024-01-01', '2024-01-01')"
+    )
+    conn.commit()
+    conn.close()
+
+    import discovery.db.session as sess
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{db_path}", connect_args={"check_same_thread": False}
+    )
+    monkeypatch.setattr(sess, "engine", engine, raising=False)
+
+    await sess.init_db()
+    # Running again on an up-to-date schema is a no-op
+    await sess.init_db()
+    await engine.dispose()
+
+    conn = sqlite3.connect(db_path)
+    row = conn.execute("SELECT cpu, memory, storage FROM advertisements WHERE provider_id = 'P1'").fetchone()
+    indexes = {r[1] for r in conn.execute("PRAGMA index_list(advertisements)").fetchall()}
+    conn.close()
+    assert row == (4, 8, 50)
+    assert {
+        "ix_advertisements_cpu",
+        "ix_advertisements_memory",
+        "ix_advertisements_storage",
+        "ix_advertisements_updated_at",
+        "ix_advertisements_country_platform_updated_at",
+    } <= indexes
+    assert "ix_advertisements_prices" not in indexes
@@ -0,0 +1,236 @@
+import asyncio
+import json
+import os
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+
+RES = {"cpu": 2, "memory": 4, "storage": 10}
+
+
+@pytest_asyncio.fixture
+async def session_factory(tmp_path):
+    os.environ["GOLEM_DISCOVERY_DATABASE_URL"] = "sqlite+aiosqlite:///:memory:"
+    from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+    from sqlalchemy.orm import sessionmaker
+    from discovery.db.models import Base
+
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'discovery.sqlite'}", connect_args={"check_same_thread": False}
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    await engine.dispose()
+
+
+def _parse(frame: str):
+    fields = dict(line.split(": ", 1) for line in frame.strip().splitlines())
+    return fields["event"], fields["id"], json.loads(fields["data"])
+
+
+async def _next_event(stream):
+    while True:
+        frame = await asyncio.wait_for(stream.__anext__(), 1)
+        if not frame.startswith(":"):
+            return _parse(frame)
+
+
+@pytest.mark.asyncio
+async def test_change_log_sequences_and_gaps(session_factory):
+    from discovery.db.index import AdvertisementChange, AdvertisementIndex
+
+    index = AdvertisementIndex(session_factory, change_log_size=3)
+    assert index.changes_since(0) == []
+    await index.upsert_advertisement("PA", "10.0.0.1", "US", RES)
+    await index.upsert_advertisement("PA", "10.0.0.1", "US", RES)  # unchanged: not logged
+    await index.touch("PA")
+    await index.upsert_advertisement("PA", "10.0.0.2", "US", RES)
+    await index.delete("PA")
+    assert [(c.sequence, c.kind) for c in index.changes_since(0)] == [
+        (1, AdvertisementChange.UPSERT),
+        (2, AdvertisementChange.UPSERT),
+        (3, AdvertisementChange.DELETE),
+    ]
+    assert index.changes_since(1)[0].previous.ip_address == "10.0.0.1"
+
+    await index.upsert_advertisement("PB", "10.0.0.3", "US", RES)
+    assert index.changes_since(0) is None  # change 1 fell out of the log
+    assert index.changes_since(99) is None  # token from a different history
+    assert [c.sequence for c in index.changes_since(2)] == [3, 4]
+
+    assert await index.wait_for_changes(0, 0.01) is True
+    assert await index.wait_for_changes(index.sequence, 0.01) is False
+    assert index._waiters == []
+    waiting = asyncio.create_task(index.wait_for_changes(index.sequence, 1))
+    await asyncio.sleep(0)
+    await index.delete("PB")
+    assert await waiting is True
+
+
+@pytest.mark.asyncio
+async def test_expiry_sync_and_reload_are_logged(session_factory):
+    from discovery.db.index import AdvertisementIndex
+    from discovery.db.repository import AdvertisementRepository
+
+    index = AdvertisementIndex(session_factory)
+    await index.upsert_advertisement("PA", "10.0.0.1", "US", RES)
+    await index.upsert_advertisement("PB", "10.0.0.2", "US", RES)
+    await index.flush()
+    stale = datetime.utcnow() - timedelta(minutes=10)
+    index._ads["PA"].updated_at = stale
+    async with session_factory() as session:
+        await AdvertisementRepository(session).touch_many({"PA": stale})
+    seen = index.sequence
+    index.expire()
+    assert [(c.kind, c.advertisement.provider_id) for c in index.changes_since(seen)] == [("expire", "PA")]
+
+    # Another worker changes PB and adds PC
+    other = AdvertisementIndex(session_factory)
+    await other.load()
+    await other.upsert_advertisement("PB", "10.0.0.9", "US", RES)
+    await other.upsert_advertisement("PC", "10.0.0.3", "US", RES)
+    await other.flush()
+    seen = index.sequence
+    assert await index.sync() == 2
+    assert sorted(c.advertisement.provider_id for c in index.changes_since(seen)) == ["PB", "PC"]
+
+    # ...and deletes PC, which this worker picks up from its tombstone
+    await other.delete("PC")
+    await other.flush()
+    seen = index.sequence
+    assert await index.sync() == 1
+    assert [(c.kind, c.advertisement.provider_id) for c in index.changes_since(seen)] == [("delete", "PC")]
+
+    # Rows gone because they expired are reported as expiries
+    index._ads["PB"].updated_at = stale
+    async with session_factory() as session:
+        await AdvertisementRepository(session).touch_many({"PB": stale})
+    seen = index.sequence
+    await index.load()
+    assert [(c.kind, c.advertisement.provider_id) for c in index.changes_since(seen)] == [("expire", "PB")]
+
+
+@pytest.mark.asyncio
+async def test_watch_stream_snapshot_deltas_and_resume(session_factory):
+    from discovery.api.watch import advertisement_events
+    from discovery.db.index import AdvertisementIndex
+
+    index = AdvertisementIndex(session_factory)
+    await index.upsert_advertisement("PA", "10.0.0.1", "US", RES)
+    await index.upsert_advertisement("PX", "10.0.0.2", "DE", RES)
+    stream = advertisement_events(index, {"country": "US"}, keepalive=0.01)
+
+    kind, _, data = await _next_event(stream)
+    assert (kind, data["provider_id"]) == ("upsert", "PA")
+    assert (await _next_event(stream))[0] == "synced"
+
+    await index.upsert_advertisement("PB", "10.0.0.3", "US", RES)
+    await index.upsert_advertisement("PX", "10.0.0.4", "DE", RES)  # filtered out
+    kind, token, data = await _next_event(stream)
+    assert (kind, data["provider_id"], data["ip_address"]) == ("upsert", "PB", "10.0.0.3")
+
+    # Moving out of the filtered set looks like a delete to this watcher
+    await index.upsert_advertisement("PB", "10.0.0.3", "SE", RES)
+    assert await _next_event(stream) == ("delete", f"{index.stream_id}-{index.sequence}", {"provider_id": "PB"})
+    await stream.aclose()
+
+    # Resuming from a token replays only what happened since
+    await index.delete("PX")  # filtered out
+    await index.delete("PA")
+    resumed = advertisement_events(index, {"country": "US"}, resume=token, keepalive=0.01)
+    assert (await _next_event(resumed))[0::2] == ("delete", {"provider_id": "PB"})
+    assert (await _next_event(resumed))[0::2] == ("delete", {"provider_id": "PA"})
+    await resumed.aclose()
+
+    # Unknown tokens get a reset followed by a fresh snapshot
+    await index.upsert_advertisement("PC", "10.0.0.5", "US", RES)
+    reset = advertisement_events(index, {"country": "US"}, resume="other-worker-3", keepalive=0.01)
+    assert (await _next_event(reset))[0] == "reset"
+    kind, _, data = await _next_event(reset)
+    assert (kind, data["provider_id"]) == ("upsert", "PC")
+    assert (await _next_event(reset))[0] == "synced"
+    await reset.aclose()
+
+
+@pytest.mark.asyncio
+async def test_watch_stream_resyncs_consumers_that_fell_behind(session_factory):
+    from discovery.api.watch import advertisement_events
+    from discovery.db.index import AdvertisementIndex
+
+    index = AdvertisementIndex(session_factory, change_log_size=2)
+    stream = advertisement_events(index, {}, keepalive=0.01)
+    assert (await _next_event(stream))[0] == "synced"
+    assert await asyncio.wait_for(stream.__anext__(), 1) == ": keepalive\n\n"
+    for i in range(3):
+        await index.upsert_advertisement(f"P{i}", "10.0.0.1", "US", RES)
+    assert (await _next_event(stream))[0] == "reset"
+    kinds = [(await _next_event(stream))[0] for _ in range(4)]
+    assert kinds == ["upsert", "upsert", "upsert", "synced"]
+    await stream.aclose()
+
+
+async def _watch_over_asgi(app, query: str, frames: int):
+    """Read ``frames`` SSE frames from the watch endpoint, then disconnect."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/api/v1/advertisements/watch",
+        "raw_path": b"/api/v1/advertisements/watch",
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [(b"host", b"discovery")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("discovery", 80),
+    }
+    disconnect = asyncio.Event()
+    start = {}
+    body = []
+
+    async def receive():
+        await disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            start.update(message)
+        elif message.get("body"):
+            body.append(message["body"].decode())
+            if len(body) >= frames:
+                disconnect.set()
+
+    await asyncio.wait_for(app(scope, receive, send), 2)
+    return start, body
+
+
+@pytest.mark.asyncio
+async def test_watch_endpoint_streams_server_sent_events(session_factory):
+    from discovery.api import routes
+    from discovery.db.index import AdvertisementIndex
+    from discovery.main import app
+
+    index = AdvertisementIndex(session_factory)
+    await index.upsert_advertisement("PW", "10.0.0.1", "US", RES)
+
+    async def get_repository():
+        return index
+
+    app.dependency_overrides[routes.get_repository] = get_repository
+    try:
+        start, body = await _watch_over_asgi(app, "country=US&cpu=2", 2)
+        assert start["status"] == 200
+        headers = dict(start["headers"])
+        assert headers[b"content-type"].startswith(b"text/event-stream")
+        assert headers[b"cache-control"] == b"no-cache"
+        assert _parse(body[0])[2]["provider_id"] == "PW"
+        assert _parse(body[1])[0] == "synced"
+
+        start, body = await _watch_over_asgi(app, "cpu=0", 1)
+        assert start["status"] == 400
+        assert json.loads(body[0])["detail"]["code"] == "ADV_002"
+    finally:
+        app.dependency_overrides.clear()
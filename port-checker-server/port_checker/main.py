@@ -1,14 +1,23 @@
 import asyncio
+import contextlib
+import json
 import logging
 import os
-from typing import Dict, List, Optional, Tuple
+import time
+from collections import OrderedDict
+from typing import AsyncContextManager, AsyncIterator, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
 from ipaddress import ip_address, IPv4Address, IPv6Address
 
-from fastapi import FastAPI, HTTPException, Request, Response, Header, Query
+from fastapi import FastAPI, HTTPException, Request, Response, Header, Query, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from starlette.requests import HTTPConnection
 from pydantic import BaseModel, Field, field_validator
 import aiohttp
 
+from port_checker.store import MemoryStore, create_store
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -28,18 +37,58 @@ app.add_middleware(
     allow_headers=["*"]
 )
 
+# Worker processes (see start()). Instance-wide limits below are split between
+# them; caches and rate limits are shared through Redis when configured.
+WORKERS = max(1, int(os.getenv("PORT_CHECKER_WORKERS", "1")))
+REDIS_URL = os.getenv("PORT_CHECKER_REDIS_URL", "")
+# Connections per worker for ordinary requests, on top of its share of the tunnels
+REQUEST_CONCURRENCY = int(os.getenv("PORT_CHECKER_REQUEST_CONCURRENCY", "100"))
+
+
+def _per_worker(limit: int) -> int:
+    return max(1, limit // WORKERS)
+
+
 # Proxy configuration
 PROXY_ENABLED = os.getenv("PORT_CHECKER_PROXY_ENABLED", "true").lower() == "true"
 PROXY_ALLOW_DIRECT_IP = os.getenv("PORT_CHECKER_PROXY_ALLOW_DIRECT_IP", "false").lower() == "true"
 MAX_BODY_BYTES = int(os.getenv("PORT_CHECKER_PROXY_MAX_BODY_BYTES", str(2 * 1024 * 1024)))  # 2 MiB
+# Responses with a declared length up to this size are sent in one piece; larger ones are streamed
+BUFFER_BYTES = int(os.getenv("PORT_CHECKER_PROXY_BUFFER_BYTES", str(64 * 1024)))
 DEFAULT_ALLOWED_PORTS = "80,443,1024-65535"
 ALLOWED_PORTS_SPEC = os.getenv("PORT_CHECKER_PROXY_ALLOWED_PORTS", DEFAULT_ALLOWED_PORTS)
 CONNECT_TIMEOUT = float(os.getenv("PORT_CHECKER_PROXY_CONNECT_TIMEOUT", "5.0"))
 READ_TIMEOUT = float(os.getenv("PORT_CHECKER_PROXY_READ_TIMEOUT", "10.0"))
+# Long-lived connections: WebSocket tunnels and event streams
+MAX_TUNNELS = int(os.getenv("PORT_CHECKER_PROXY_MAX_TUNNELS", "256"))
+TUNNEL_IDLE_TIMEOUT = float(os.getenv("PORT_CHECKER_PROXY_TUNNEL_IDLE_TIMEOUT", "300.0"))
+# Upstream connection pool shared by all proxied requests and discovery lookups
+POOL_LIMIT = int(os.getenv("PORT_CHECKER_PROXY_POOL_LIMIT", "256"))
+POOL_LIMIT_PER_HOST = int(os.getenv("PORT_CHECKER_PROXY_POOL_LIMIT_PER_HOST", "16"))
+KEEPALIVE_TIMEOUT = float(os.getenv("PORT_CHECKER_PROXY_KEEPALIVE_TIMEOUT", "30.0"))
+DNS_CACHE_TTL = int(os.getenv("PORT_CHECKER_PROXY_DNS_CACHE_TTL", "300"))
 DISCOVERY_API_URL = os.getenv("DISCOVERY_API_URL", "http://localhost:9001/api/v1")
 PROXY_SHARED_TOKEN = os.getenv("PORT_CHECKER_PROXY_TOKEN", "")
 GOLEM_BASE_RPC_URL = os.getenv("GOLEM_BASE_RPC_URL", "")
 GOLEM_BASE_WS_URL = os.getenv("GOLEM_BASE_WS_URL", "")
+# provider_id -> IP cache for Golem Base lookups
+RESOLVE_CACHE_TTL = float(os.getenv("PORT_CHECKER_RESOLVE_CACHE_TTL", "300"))
+RESOLVE_NEGATIVE_TTL = float(os.getenv("PORT_CHECKER_RESOLVE_NEGATIVE_TTL", "30"))
+RESOLVE_CACHE_SIZE = int(os.getenv("PORT_CHECKER_RESOLVE_CACHE_SIZE", "10000"))
+GOLEM_BASE_BLOCK_TIME = float(os.getenv("GOLEM_BASE_BLOCK_TIME_SECONDS", "2.0"))
+# Connected Golem Base clients kept at once; request headers can name other endpoints
+GOLEM_BASE_MAX_CLIENTS = max(1, int(os.getenv("PORT_CHECKER_GOLEM_BASE_MAX_CLIENTS", "4")))
+# /check-ports
+CHECK_RETRIES = int(os.getenv("PORT_CHECK_RETRIES", "3"))
+CHECK_RETRY_DELAY = float(os.getenv("PORT_CHECK_RETRY_DELAY", "1.0"))
+CHECK_TIMEOUT = float(os.getenv("PORT_CHECK_TIMEOUT", "5.0"))
+CHECK_MAX_PORTS = int(os.getenv("PORT_CHECK_MAX_PORTS", "4096"))
+CHECK_MAX_CONCURRENT = int(os.getenv("PORT_CHECK_MAX_CONCURRENT", "256"))
+CHECK_MAX_PER_TARGET = int(os.getenv("PORT_CHECK_MAX_PER_TARGET", "32"))
+CHECK_CACHE_TTL = float(os.getenv("PORT_CHECK_CACHE_TTL", "30"))
+CHECK_NEGATIVE_CACHE_TTL = float(os.getenv("PORT_CHECK_NEGATIVE_CACHE_TTL", "5"))
+CHECK_CACHE_SIZE = int(os.getenv("PORT_CHECK_CACHE_SIZE", "100000"))
+CHECK_RATE_LIMIT = int(os.getenv("PORT_CHECK_RATE_LIMIT", "0"))  # requests per client per minute; 0 = off
 # Dev mode flag: prefer development network when GOLEM_ENVIRONMENT=development
 # Unified environment variable only; allow explicit override via PORT_CHECKER_EXPECTED_NETWORK
 PROVIDER_ENV = (os.getenv("GOLEM_ENVIRONMENT") or "").lower()
@@ -84,6 +133,198 @@ except Exception:  # pragma: no cover - optional
 # at runtime, the proxy will respond with 501 for Golem Base lookups.
 
 
+async def _create_golem_base_client(rpc_url: str, ws_url: str):
+    """Build a read-only Golem Base client, preferring the RO client if available."""
+    kwargs = {"rpc_url": rpc_url, "ws_url": ws_url}
+    if '_GolemBaseROClient' in globals() and _GolemBaseROClient is not None:
+        return await _GolemBaseROClient.create_ro_client(**kwargs)  # type: ignore
+    if hasattr(GolemBaseClient, 'create_ro_client'):
+        return await GolemBaseClient.create_ro_client(**kwargs)  # type: ignore[attr-defined]
+    if hasattr(GolemBaseClient, 'create'):
+        # Legacy path – some SDKs supported create(rpc_url, ws_url) without key
+        return await GolemBaseClient.create(**kwargs)  # type: ignore
+    raise RuntimeError("No suitable Golem Base client constructor found")
+
+
+async def _query_provider_ip(client, provider_id: str) -> Tuple[bool, Optional[str], Optional[int]]:
+    """Look up a provider's advertisement on Golem Base.
+
+    Returns whether it was found, its IP annotation and its expiry block.
+    """
+    # Prefer dev_golem_provider_id in dev; always constrain by expected network
+    net_clause = f' && golem_network="{EXPECTED_NETWORK}"'
+    queries: List[str] = [f'golem_provider_id="{provider_id}"{net_clause}']
+    if IS_PROVIDER_DEV:
+        queries = [f'dev_golem_provider_id="{provider_id}"{net_clause}'] + queries
+    results = []
+    for q in queries:
+        results = await client.query_entities(q)
+        if results:
+            break
+    if not results:
+        return False, None, None
+    ek = EntityKey(GenericBytes.from_hex_string(results[0].entity_key))  # type: ignore
+    md = await client.get_entity_metadata(ek)
+    anns = {a.key: a.value for a in md.string_annotations}
+    # Prefer dev_ prefixed keys in development; fall back to standard keys
+    def pick(key: str) -> Optional[str]:
+        if IS_PROVIDER_DEV and ("dev_" + key) in anns and str(anns["dev_" + key]).strip():
+            return str(anns["dev_" + key]).strip()
+        v = anns.get(key)
+        return str(v).strip() if v is not None else None
+    return True, pick("golem_ip_address"), getattr(md, "expires_at_block", None)
+
+
+def _is_connection_error(err: BaseException) -> bool:
+    """Whether ``err`` means the Golem Base connection itself is broken."""
+    if isinstance(err, (OSError, asyncio.TimeoutError, aiohttp.ClientConnectionError)):
+        return True
+    # websockets' ConnectionClosed and web3's ProviderConnectionError, without importing either
+    return any(cls.__name__ in ("ConnectionClosed", "ProviderConnectionError") for cls in type(err).__mro__)
+
+
+class _ClientEntry:
+    """A connected Golem Base client and the lookups currently using it."""
+
+    def __init__(self, client):
+        self.client = client
+        self.users = 0
+        self.retired = False
+
+
+class ProviderResolver:
+    """Resolve provider IDs to IPs on Golem Base with shared clients and a TTL cache.
+
+    One client per RPC/WS endpoint pair stays connected between requests, for
+    at most ``max_clients`` pairs; the least recently used one is disconnected
+    when another is needed. A resolved IP is kept for ``ttl`` seconds but never
+    past the block at which its advertisement expires; providers that are not
+    found are remembered for ``negative_ttl`` seconds. Concurrent lookups of the
+    same provider share a single query. Failed lookups are not cached; a
+    connection error also retires the client, which is disconnected once no
+    other lookup is using it, so the next lookup reconnects. Lookups are cached
+    in ``cache`` (a store shared by all workers, see ``store.py``) or, by
+    default, in this process.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 300.0,
+        negative_ttl: float = 30.0,
+        max_entries: int = 10_000,
+        block_time: float = 2.0,
+        clock: Callable[[], float] = time.monotonic,
+        cache=None,
+        max_clients: int = 4,
+    ):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.block_time = block_time
+        self.max_clients = max(1, max_clients)
+        # "rpc_url ws_url provider_id" -> [found, ip]
+        self._cache = cache if cache is not None else MemoryStore(max_entries, clock=clock)
+        self._inflight: Dict[Tuple[str, str, str], "asyncio.Future"] = {}
+        # (rpc_url, ws_url) -> entry, least recently used first
+        self._clients: "OrderedDict[Tuple[str, str], _ClientEntry]" = OrderedDict()
+        # One lock per endpoint, so a slow connect only holds up lookups on that endpoint
+        self._connect_locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+
+    async def resolve(self, provider_id: str, rpc_url: str, ws_url: str) -> Tuple[bool, Optional[str]]:
+        """Return whether ``provider_id`` is advertised and its IP, from cache when fresh."""
+        key = (rpc_url, ws_url, provider_id)
+        entry = await self._cache.get(" ".join(key))
+        if entry is not None:
+            return entry[0], entry[1]
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._lookup(key))
+            self._inflight[key] = future
+            future.add_done_callback(lambda done: self._finish(key, done))
+        # A cancelled caller must not cancel the lookup other callers are waiting on
+        return await asyncio.shield(future)
+
+    def _finish(self, key: Tuple[str, str, str], future: "asyncio.Future") -> None:
+        self._inflight.pop(key, None)
+        if not future.cancelled():
+            # Mark the error retrieved even if every waiter went away
+            future.exception()
+
+    async def _acquire(self, endpoint: Tuple[str, str]) -> _ClientEntry:
+        """Return the endpoint's client entry, connecting first if needed, counted as in use."""
+        entry = self._clients.get(endpoint)
+        if entry is None:
+            lock = self._connect_locks.setdefault(endpoint, asyncio.Lock())
+            try:
+                async with lock:
+                    entry = self._clients.get(endpoint)
+                    if entry is None:
+                        entry = _ClientEntry(await _create_golem_base_client(*endpoint))
+                        self._clients[endpoint] = entry
+            finally:
+                if not lock.locked():
+                    self._connect_locks.pop(endpoint, None)
+        entry.users += 1
+        self._clients.move_to_end(endpoint)
+        while len(self._clients) > self.max_clients:
+            oldest, evicted = next(iter(self._clients.items()))
+            await self._retire(oldest, evicted)
+        return entry
+
+    async def _release(self, entry: _ClientEntry) -> None:
+        entry.users -= 1
+        if entry.retired and entry.users == 0:
+            await self._disconnect(entry)
+
+    async def _retire(self, endpoint: Tuple[str, str], entry: _ClientEntry) -> None:
+        """Stop handing out ``entry``; disconnect it now or when its last lookup finishes."""
+        if self._clients.get(endpoint) is entry:
+            del self._clients[endpoint]
+        entry.retired = True
+        if entry.users == 0:
+            await self._disconnect(entry)
+
+    @staticmethod
+    async def _disconnect(entry: _ClientEntry) -> None:
+        try:
+            await entry.client.disconnect()
+        except Exception as e:
+            logger.warning(f"Error disconnecting Golem Base client: {e}")
+
+    async def _lookup(self, key: Tuple[str, str, str]) -> Tuple[bool, Optional[str]]:
+        rpc_url, ws_url, provider_id = key
+        entry = await self._acquire((rpc_url, ws_url))
+        try:
+            client = entry.client
+            found, ip, expires_at_block = await _query_provider_ip(client, provider_id)
+            ttl = self.ttl if found else self.negative_ttl
+            if found and expires_at_block is not None:
+                current_block = await client.http_client().eth.get_block_number()
+                ttl = min(ttl, max(0.0, (expires_at_block - current_block) * self.block_time))
+        except Exception as e:
+            if _is_connection_error(e):
+                await self._retire((rpc_url, ws_url), entry)
+            raise
+        finally:
+            await self._release(entry)
+        await self._cache.set(" ".join(key), [found, ip], ttl)
+        return found, ip
+
+    async def close(self) -> None:
+        """Disconnect all clients and close the cache."""
+        for endpoint, entry in list(self._clients.items()):
+            await self._retire(endpoint, entry)
+        await self._cache.close()
+
+
+provider_resolver = ProviderResolver(
+    ttl=RESOLVE_CACHE_TTL,
+    negative_ttl=RESOLVE_NEGATIVE_TTL,
+    block_time=GOLEM_BASE_BLOCK_TIME,
+    cache=create_store(REDIS_URL, prefix="resolve:", max_entries=RESOLVE_CACHE_SIZE),
+    max_clients=GOLEM_BASE_MAX_CLIENTS,
+)
+
+
 def _parse_allowed_ports(spec: str) -> List[Tuple[int, int]]:
     ranges: List[Tuple[int, int]] = []
     s = (spec or "").strip()
@@ -118,6 +359,273 @@ def _is_allowed_port(port: int) -> bool:
     return False
 
 
+_http_session: Optional["aiohttp.ClientSession"] = None
+
+
+def _get_http_session() -> "aiohttp.ClientSession":
+    """Return the app-wide upstream session, creating it on first use.
+
+    Reusing one connection pool keeps TCP connections to providers and to the
+    discovery service alive between proxied requests instead of paying a new
+    handshake each time. Cookies are never stored: the session is shared by
+    all clients. Responses are not decompressed, so proxied bodies keep their
+    original encoding and length.
+    """
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=POOL_LIMIT,
+            limit_per_host=POOL_LIMIT_PER_HOST,
+            keepalive_timeout=KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=DNS_CACHE_TTL,
+        )
+        _http_session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=None, connect=CONNECT_TIMEOUT, sock_read=READ_TIMEOUT),
+            connector=connector,
+            cookie_jar=aiohttp.DummyCookieJar(),
+            # Bodies are relayed as sent, together with their Content-Encoding
+            auto_decompress=False,
+        )
+    return _http_session
+
+
+@app.on_event("shutdown")
+async def close_http_session() -> None:
+    """Close the upstream connection pool."""
+    global _http_session
+    if _http_session is not None:
+        await _http_session.close()
+        _http_session = None
+
+
+@app.on_event("shutdown")
+async def close_golem_base_clients() -> None:
+    """Disconnect the shared Golem Base clients."""
+    await provider_resolver.close()
+
+
+class _TunnelLimiter:
+    """Counts open long-lived connections against a global cap."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+
+    def try_acquire(self) -> bool:
+        if self.active >= self.limit:
+            return False
+        self.active += 1
+        return True
+
+    def release(self) -> None:
+        self.active -= 1
+
+
+tunnels = _TunnelLimiter(_per_worker(MAX_TUNNELS))
+
+
+def _wants_stream(request: Request) -> bool:
+    """Whether the client asked for a long-lived response (SSE or long polling)."""
+    if "text/event-stream" in request.headers.get("accept", "").lower():
+        return True
+    return request.headers.get("x-proxy-stream", "").lower() in {"1", "true"}
+
+
+def _forward_headers(conn: HTTPConnection, hop_by_hop: set) -> Dict[str, str]:
+    """Client headers to send upstream, plus X-Forwarded-For / X-Real-IP."""
+    fwd_headers = {k: v for k, v in conn.headers.items() if k.lower() not in hop_by_hop}
+    # Attach client IPs for tracing
+    client_ip = conn.client.host if conn.client else ""
+    prior_xff = conn.headers.get("x-forwarded-for")
+    chain = f"{prior_xff}, {client_ip}" if prior_xff and client_ip else (client_ip or prior_xff)
+    if chain:
+        fwd_headers["X-Forwarded-For"] = chain
+    if client_ip:
+        fwd_headers["X-Real-IP"] = client_ip
+    return fwd_headers
+
+
+class _BodyTooLarge(Exception):
+    pass
+
+
+class _LimitedBody:
+    """Incoming request body relayed chunk by chunk, aborted past ``limit`` bytes."""
+
+    def __init__(self, request: Request, limit: int):
+        self.request = request
+        self.limit = limit
+        self.size = 0
+        self.exceeded = False
+
+    async def chunks(self):
+        async for chunk in self.request.stream():
+            self.size += len(chunk)
+            if self.size > self.limit:
+                self.exceeded = True
+                raise _BodyTooLarge()
+            if chunk:
+                yield chunk
+
+
+def _upload_body(request: Request) -> Optional[_LimitedBody]:
+    """Streamed body of ``request``, or None when it has none.
+
+    A declared Content-Length over ``MAX_BODY_BYTES`` is rejected up front;
+    chunked uploads are cut off as soon as they cross the limit.
+    """
+    length = request.headers.get("content-length")
+    if length is not None:
+        try:
+            declared = int(length)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid Content-Length")
+        if declared > MAX_BODY_BYTES:
+            raise HTTPException(status_code=413, detail="Request body too large")
+        if declared == 0:
+            return None
+    elif "chunked" not in request.headers.get("transfer-encoding", "").lower():
+        return None
+    return _LimitedBody(request, MAX_BODY_BYTES)
+
+
+async def _relay(resp: "aiohttp.ClientResponse", on_close: Optional[Callable[[], None]] = None):
+    """Yield the upstream body as it arrives, then hand the connection back."""
+    try:
+        async for chunk in resp.content.iter_any():
+            yield chunk
+    finally:
+        resp.release()
+        if on_close is not None:
+            on_close()
+
+
+async def _forward(
+    request: Request,
+    url: str,
+    fwd_headers: Dict[str, str],
+    hop_by_hop: set,
+    extra_headers: Dict[str, str],
+) -> StreamingResponse:
+    """Send ``request`` to ``url`` and stream the upstream response back.
+
+    The upload is relayed as the client sends it and the response is passed on
+    chunk by chunk, so memory stays flat and the first bytes reach the client
+    as soon as the upstream sends them. Only responses declaring a length of
+    at most ``BUFFER_BYTES`` are read in full before replying.
+    """
+    upload = _upload_body(request)
+    long_lived = _wants_stream(request)
+    kwargs = {}
+    if long_lived:
+        if not tunnels.try_acquire():
+            raise HTTPException(status_code=503, detail="Too many open tunnels")
+        # Event streams may stay quiet between events; only a long silence ends them
+        kwargs["timeout"] = aiohttp.ClientTimeout(total=None, connect=CONNECT_TIMEOUT, sock_read=TUNNEL_IDLE_TIMEOUT)
+    session = _get_http_session()
+    try:
+        try:
+            resp = await session.request(
+                method=request.method,
+                url=url,
+                headers=fwd_headers,
+                data=upload.chunks() if upload is not None else None,
+                allow_redirects=False,
+                **kwargs,
+            )
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail="Upstream timeout")
+        except aiohttp.ClientError as e:
+            if upload is not None and upload.exceeded:
+                raise HTTPException(status_code=413, detail="Request body too large")
+            raise HTTPException(status_code=502, detail=f"Upstream error: {e}")
+        if upload is not None and upload.exceeded:
+            # The upstream answered before the rest of the upload was cut off
+            resp.close()
+            raise HTTPException(status_code=413, detail="Request body too large")
+    except HTTPException:
+        if long_lived:
+            tunnels.release()
+        raise
+    resp_headers = {}
+    for k, v in resp.headers.items():
+        if k.lower() in hop_by_hop:
+            continue
+        resp_headers[k] = v
+    resp_headers.update(extra_headers)
+    if long_lived:
+        # Ask fronting proxies (e.g. nginx) not to buffer the stream either
+        resp_headers["X-Accel-Buffering"] = "no"
+        return StreamingResponse(_relay(resp, tunnels.release), status_code=resp.status, headers=resp_headers)
+    length = resp.headers.get("Content-Length", "")
+    if length.isdigit() and int(length) <= BUFFER_BYTES:
+        # Small bodies gain nothing from streaming and skip its per-response overhead
+        try:
+            content = await resp.read()
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail="Upstream timeout")
+        except aiohttp.ClientError as e:
+            raise HTTPException(status_code=502, detail=f"Upstream error: {e}")
+        finally:
+            resp.release()
+        return Response(content=content, status_code=resp.status, headers=resp_headers)
+    return StreamingResponse(_relay(resp), status_code=resp.status, headers=resp_headers)
+
+
+async def _tunnel_websocket(websocket: WebSocket, upstream: "aiohttp.ClientWebSocketResponse") -> None:
+    """Pump messages both ways until either side closes or the tunnel idles out."""
+    loop = asyncio.get_running_loop()
+    last_activity = loop.time()
+    close_code = 1000
+
+    async def client_to_upstream() -> None:
+        nonlocal last_activity, close_code
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                close_code = message.get("code", 1000)
+                return
+            last_activity = loop.time()
+            if message.get("text") is not None:
+                await upstream.send_str(message["text"])
+            else:
+                await upstream.send_bytes(message.get("bytes") or b"")
+
+    async def upstream_to_client() -> None:
+        nonlocal last_activity, close_code
+        async for msg in upstream:
+            last_activity = loop.time()
+            if msg.type == aiohttp.WSMsgType.TEXT:
+                await websocket.send_text(msg.data)
+            elif msg.type == aiohttp.WSMsgType.BINARY:
+                await websocket.send_bytes(msg.data)
+            elif msg.type == aiohttp.WSMsgType.ERROR:
+                close_code = 1011
+                return
+        close_code = upstream.close_code or 1000
+
+    pumps = {asyncio.ensure_future(client_to_upstream()), asyncio.ensure_future(upstream_to_client())}
+    try:
+        while True:
+            remaining = TUNNEL_IDLE_TIMEOUT - (loop.time() - last_activity)
+            if remaining <= 0:
+                close_code = 1001
+                break
+            done, _ = await asyncio.wait(pumps, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            if done:
+                break
+    finally:
+        for pump in pumps:
+            pump.cancel()
+        await asyncio.gather(*pumps, return_exceptions=True)
+        await upstream.close(code=close_code)
+        try:
+            await websocket.close(code=close_code)
+        except RuntimeError:
+            # The client already went away
+            pass
+
+
 def _is_public_ip(ip_str: str) -> bool:
     try:
         ip = ip_address(ip_str)
@@ -133,10 +641,13 @@ class PortCheckRequest(BaseModel):
     """Request model for port checking."""
     provider_ip: str = Field(..., description="Provider's public IP address")
     ports: List[int] = Field(..., description="List of ports to check")
+    compact: bool = Field(False, description="Group ports by outcome instead of returning per-port results")
 
     @field_validator('ports')
     def validate_ports(cls, ports):
         """Validate port numbers."""
+        if len(ports) > CHECK_MAX_PORTS:
+            raise ValueError(f"Too many ports: {len(ports)} (at most {CHECK_MAX_PORTS})")
         for port in ports:
             if not 1 <= port <= 65535:
                 raise ValueError(f"Invalid port number: {port}")
@@ -150,17 +661,34 @@ class PortStatus(BaseModel):
 class PortCheckResponse(BaseModel):
     """Response model for port checking."""
     success: bool = Field(..., description="Overall success status")
-    results: Dict[int, PortStatus] = Field(..., description="Results for each port")
+    results: Optional[Dict[int, PortStatus]] = Field(None, description="Results for each port")
+    accessible: Optional[List[int]] = Field(None, description="Accessible ports (compact responses)")
+    failed: Optional[Dict[str, List[int]]] = Field(
+        None, description="Inaccessible ports grouped by error message (compact responses)"
+    )
     message: str = Field(..., description="Summary message")
 
-async def check_port(ip: str, port: int, retries: int = 3, retry_delay: float = 1.0) -> PortStatus:
+async def check_port(
+    ip: str,
+    port: int,
+    retries: int = 3,
+    retry_delay: float = 1.0,
+    timeout: float = 5.0,
+    limiter: Optional[Callable[[], AsyncContextManager]] = None,
+) -> PortStatus:
     """Check if a port is accessible with retries.
     
+    A refused connection ends the check at once: the host answered, so the
+    port is closed and retrying would only repeat that answer.
+
     Args:
         ip: IP address to check
         port: Port number to check
         retries: Number of retry attempts
         retry_delay: Delay between retries in seconds
+        timeout: Timeout of each connection attempt in seconds
+        limiter: Returns an async context manager held around each connection
+            attempt, but not across the delay between attempts
         
     Returns:
         PortStatus object with accessibility result
@@ -169,13 +697,14 @@ async def check_port(ip: str, port: int, retries: int = 3, retry_delay: float =
     
     for attempt in range(retries):
         try:
-            # Try to establish a TCP connection
-            _, writer = await asyncio.wait_for(
-                asyncio.open_connection(ip, port),
-                timeout=5.0
-            )
-            writer.close()
-            await writer.wait_closed()
+            async with (limiter() if limiter is not None else contextlib.nullcontext()):
+                # Try to establish a TCP connection
+                _, writer = await asyncio.wait_for(
+                    asyncio.open_connection(ip, port),
+                    timeout=timeout
+                )
+                writer.close()
+                await writer.wait_closed()
             
             logger.info(f"Port {port} is accessible (attempt {attempt + 1}/{retries})")
             return PortStatus(
@@ -188,6 +717,7 @@ async def check_port(ip: str, port: int, retries: int = 3, retry_delay: float =
         except ConnectionRefusedError:
             last_error = "Connection refused"
             logger.warning(f"Port {port} connection refused (attempt {attempt + 1}/{retries})")
+            break
         except Exception as e:
             last_error = str(e)
             logger.error(f"Error checking port {port} (attempt {attempt + 1}/{retries}): {last_error}")
@@ -200,47 +730,231 @@ async def check_port(ip: str, port: int, retries: int = 3, retry_delay: float =
         error=last_error
     )
 
-@app.post("/check-ports", response_model=PortCheckResponse)
-async def check_ports(request: PortCheckRequest) -> PortCheckResponse:
+
+class PortChecker:
+    """Run port checks with bounded concurrency and a short-lived result cache.
+
+    At most ``max_concurrent`` connection attempts are in flight at once, and
+    a single target IP holds at most ``max_per_target`` of them, so a provider
+    checking a large range cannot starve everyone else. Results are kept for
+    ``ttl`` seconds (``negative_ttl`` for inaccessible ports) in ``cache``, by
+    default in this process, and concurrent checks of the same (ip, port) in
+    this process share a single check.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 256,
+        max_per_target: int = 32,
+        ttl: float = 30.0,
+        negative_ttl: float = 5.0,
+        max_entries: int = 100_000,
+        retries: int = 3,
+        retry_delay: float = 1.0,
+        timeout: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+        cache=None,
+    ):
+        self.max_per_target = max_per_target
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.timeout = timeout
+        self._slots = asyncio.Semaphore(max_concurrent)
+        # ip -> [semaphore, checks holding or waiting for it]
+        self._targets: Dict[str, list] = {}
+        # "ip port" -> PortStatus fields
+        self._cache = cache if cache is not None else MemoryStore(max_entries, clock=clock)
+        self._inflight: Dict[Tuple[str, int], "asyncio.Future"] = {}
+
+    async def check(self, ip: str, ports: List[int]) -> Dict[int, PortStatus]:
+        """Return the status of each of ``ports`` on ``ip``; repeated ports are checked once."""
+        unique = list(dict.fromkeys(ports))
+        statuses = await asyncio.gather(*(self.check_one(ip, port) for port in unique))
+        return dict(zip(unique, statuses))
+
+    async def as_completed(self, ip: str, ports: List[int]) -> AsyncIterator[Tuple[int, PortStatus]]:
+        """Yield ``(port, status)`` for each of ``ports`` on ``ip`` as its check finishes."""
+        pending = {
+            asyncio.ensure_future(self._check_numbered(ip, port))
+            for port in dict.fromkeys(ports)
+        }
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            # The shared checks keep running and still fill the cache
+            for task in pending:
+                task.cancel()
+
+    async def _check_numbered(self, ip: str, port: int) -> Tuple[int, PortStatus]:
+        return port, await self.check_one(ip, port)
+
+    async def check_one(self, ip: str, port: int) -> PortStatus:
+        """Return the status of ``port`` on ``ip``, from cache when fresh."""
+        key = (ip, port)
+        entry = await self._cache.get(f"{ip} {port}")
+        if entry is not None:
+            return PortStatus(**entry)
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._check(key))
+            self._inflight[key] = future
+            future.add_done_callback(lambda done: self._finish(key, done))
+        # A cancelled caller must not cancel the check other callers are waiting on
+        return await asyncio.shield(future)
+
+    def _finish(self, key: Tuple[str, int], future: "asyncio.Future") -> None:
+        self._inflight.pop(key, None)
+        if not future.cancelled():
+            future.exception()
+
+    @contextlib.asynccontextmanager
+    async def _slot(self, ip: str):
+        target = self._targets.get(ip)
+        if target is None:
+            target = self._targets[ip] = [asyncio.Semaphore(self.max_per_target), 0]
+        target[1] += 1
+        try:
+            # The per-target limit is taken first so one IP never queues more
+            # than its share on the global limit
+            async with target[0]:
+                async with self._slots:
+                    yield
+        finally:
+            target[1] -= 1
+            if target[1] == 0:
+                del self._targets[ip]
+
+    async def _check(self, key: Tuple[str, int]) -> PortStatus:
+        ip, port = key
+        status = await check_port(
+            ip,
+            port,
+            retries=self.retries,
+            retry_delay=self.retry_delay,
+            timeout=self.timeout,
+            limiter=lambda: self._slot(ip),
+        )
+        ttl = self.ttl if status.accessible else self.negative_ttl
+        await self._cache.set(f"{ip} {port}", status.model_dump(), ttl)
+        return status
+
+    async def close(self) -> None:
+        """Close the result cache."""
+        await self._cache.close()
+
+
+port_checks = PortChecker(
+    max_concurrent=_per_worker(CHECK_MAX_CONCURRENT),
+    max_per_target=_per_worker(CHECK_MAX_PER_TARGET),
+    ttl=CHECK_CACHE_TTL,
+    negative_ttl=CHECK_NEGATIVE_CACHE_TTL,
+    retries=CHECK_RETRIES,
+    retry_delay=CHECK_RETRY_DELAY,
+    timeout=CHECK_TIMEOUT,
+    cache=create_store(REDIS_URL, prefix="ports:", max_entries=CHECK_CACHE_SIZE),
+)
+# Per-client request counters for PORT_CHECK_RATE_LIMIT
+rate_limits = create_store(REDIS_URL, prefix="ratelimit:")
+
+
+@app.on_event("shutdown")
+async def close_port_check_state() -> None:
+    await port_checks.close()
+    await rate_limits.close()
+
+
+async def _allow_check(client: str) -> bool:
+    """Whether ``client`` is within PORT_CHECK_RATE_LIMIT requests this minute."""
+    if CHECK_RATE_LIMIT <= 0:
+        return True
+    window = int(time.time() // 60)
+    return await rate_limits.incr(f"{client} {window}", 60) <= CHECK_RATE_LIMIT
+
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def _json_line(data: dict) -> bytes:
+    return json.dumps(data, separators=(",", ":")).encode() + b"\n"
+
+
+async def _port_check_lines(request: PortCheckRequest):
+    """NDJSON body of a streamed port check: one line per port, then a summary."""
+    checked = accessible = 0
+    async for port, status in port_checks.as_completed(request.provider_ip, request.ports):
+        checked += 1
+        accessible += status.accessible
+        yield _json_line({"port": port, "accessible": status.accessible, "error": status.error})
+    message = f"Successfully verified {accessible} out of {checked} ports"
+    logger.info(f"Summary: {message}")
+    yield _json_line({"success": accessible > 0, "message": message})
+
+
+@app.post("/check-ports", response_model=PortCheckResponse, response_model_exclude_unset=True)
+async def check_ports(
+    request: PortCheckRequest,
+    http_request: Request,
+    accept: Optional[str] = Header(None),
+) -> PortCheckResponse:
     """Check accessibility of specified ports.
     
     Args:
         request: Port check request containing IP and ports to check
+        accept: With ``application/x-ndjson``, results are streamed as each
+            port finishes
         
     Returns:
-        Results of port checking
+        Results of port checking, per port or, with ``compact``, as the list
+        of accessible ports and the inaccessible ones grouped by error
     """
-    logger.info(f"Checking ports {request.ports} for IP {request.provider_ip}")
+    client = http_request.client.host if http_request.client else "unknown"
+    if not await _allow_check(client):
+        raise HTTPException(status_code=429, detail="Rate limit exceeded")
+    logger.info(f"Checking {len(request.ports)} ports for IP {request.provider_ip}")
     
-    # Check all ports concurrently
-    tasks = [
-        check_port(request.provider_ip, port)
-        for port in request.ports
-    ]
-    results = await asyncio.gather(*tasks)
+    if NDJSON_MEDIA_TYPE in (accept or "").lower():
+        return StreamingResponse(
+            _port_check_lines(request),
+            media_type=NDJSON_MEDIA_TYPE,
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
     
-    # Compile results
-    port_results = {
-        port: status
-        for port, status in zip(request.ports, results)
-    }
+    port_results = await port_checks.check(request.provider_ip, request.ports)
     
     # Count accessible ports
-    accessible_ports = sum(1 for status in results if status.accessible)
+    accessible_ports = sorted(port for port, status in port_results.items() if status.accessible)
     
     # Print detailed results
-    logger.info("Port check results:")
+    logger.debug("Port check results:")
     for port, status in port_results.items():
         if status.accessible:
-            logger.info(f"Port {port}: ✅ Accessible")
+            logger.debug(f"Port {port}: ✅ Accessible")
         else:
-            logger.info(f"Port {port}: ❌ Not accessible - {status.error}")
+            logger.debug(f"Port {port}: ❌ Not accessible - {status.error}")
     
-    response = PortCheckResponse(
-        success=accessible_ports > 0,
-        results=port_results,
-        message=f"Successfully verified {accessible_ports} out of {len(request.ports)} ports"
-    )
+    message = f"Successfully verified {len(accessible_ports)} out of {len(port_results)} ports"
+    if request.compact:
+        failed: Dict[str, List[int]] = {}
+        for port, status in sorted(port_results.items()):
+            if not status.accessible:
+                failed.setdefault(status.error or "Unknown error", []).append(port)
+        response = PortCheckResponse(
+            success=bool(accessible_ports),
+            accessible=accessible_ports,
+            failed=failed,
+            message=message,
+        )
+    else:
+        response = PortCheckResponse(
+            success=bool(accessible_ports),
+            results=port_results,
+            message=message,
+        )
     
     logger.info(f"Summary: {response.message}")
     return response
@@ -251,6 +965,55 @@ async def health_check():
     return {"status": "ok"}
 
 
+async def _resolve_provider_ip(
+    provider_id: str,
+    source: Optional[str],
+    golem_base_rpc: Optional[str] = None,
+    golem_base_ws: Optional[str] = None,
+) -> str:
+    """Resolve a provider's IP from discovery or Golem Base (the default).
+
+    Raises HTTPException when it cannot be resolved or may not be proxied to.
+    """
+    src = (source or "golem-base").lower()
+    if src not in {"discovery", "golem-base"}:
+        raise HTTPException(status_code=400, detail="Invalid source; use 'discovery' or 'golem-base'")
+
+    ip: Optional[str] = None
+    if src == "discovery":
+        adv_url = f"{DISCOVERY_API_URL.rstrip('/')}/advertisements/{provider_id}"
+        session = _get_http_session()
+        try:
+            async with session.get(adv_url, headers={"Accept-Encoding": "identity"}) as adv_resp:
+                if adv_resp.status != 200:
+                    raise HTTPException(status_code=404, detail="Provider not found")
+                data = await adv_resp.json()
+                ip = data.get("ip_address") if isinstance(data, dict) else None
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail="Discovery timeout")
+        except aiohttp.ClientError as e:
+            raise HTTPException(status_code=502, detail=f"Discovery error: {e}")
+    else:
+        if not _HAS_GOLEM_BASE:
+            raise HTTPException(status_code=501, detail="Golem Base support not installed on server")
+        rpc_url = (golem_base_rpc or GOLEM_BASE_RPC_URL).strip()
+        ws_url = (golem_base_ws or GOLEM_BASE_WS_URL).strip()
+        if not rpc_url or not ws_url:
+            raise HTTPException(status_code=500, detail="Golem Base RPC/WS URLs not configured")
+        try:
+            found, ip = await provider_resolver.resolve(provider_id, rpc_url, ws_url)
+        except Exception as e:
+            raise HTTPException(status_code=502, detail=f"Golem Base error: {e}")
+        if not found:
+            raise HTTPException(status_code=404, detail="Provider not found on Golem Base")
+    if not ip:
+        raise HTTPException(status_code=400, detail="Resolved IP invalid or not public")
+    # In development, allow forwarding to local/private IPs to support local setups
+    if not _is_public_ip(ip) and not ALLOW_LOCAL_IPS:
+        raise HTTPException(status_code=400, detail="Resolved IP invalid or not public")
+    return ip
+
+
 @app.api_route("/proxy/provider/{provider_id}/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"])
 async def http_proxy_provider(
     request: Request,
@@ -277,79 +1040,7 @@ async def http_proxy_provider(
     if port is None or not _is_allowed_port(int(port)):
         raise HTTPException(status_code=403, detail="Target port not allowed")
 
-    # Resolve IP from source; default to Golem Base
-    src = (x_proxy_source or "golem-base").lower()
-    if src not in {"discovery", "golem-base"}:
-        raise HTTPException(status_code=400, detail="Invalid source; use 'discovery' or 'golem-base'")
-
-    ip: Optional[str] = None
-    if src == "discovery":
-        adv_url = f"{DISCOVERY_API_URL.rstrip('/')}/advertisements/{provider_id}"
-        timeout = aiohttp.ClientTimeout(total=None, connect=CONNECT_TIMEOUT, sock_read=READ_TIMEOUT)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            try:
-                async with session.get(adv_url) as adv_resp:
-                    if adv_resp.status != 200:
-                        raise HTTPException(status_code=404, detail="Provider not found")
-                    data = await adv_resp.json()
-                    ip = data.get("ip_address") if isinstance(data, dict) else None
-            except asyncio.TimeoutError:
-                raise HTTPException(status_code=504, detail="Discovery timeout")
-            except aiohttp.ClientError as e:
-                raise HTTPException(status_code=502, detail=f"Discovery error: {e}")
-    else:
-        if not _HAS_GOLEM_BASE:
-            raise HTTPException(status_code=501, detail="Golem Base support not installed on server")
-        rpc_url = (x_proxy_golem_base_rpc or GOLEM_BASE_RPC_URL).strip()
-        ws_url = (x_proxy_golem_base_ws or GOLEM_BASE_WS_URL).strip()
-        if not rpc_url or not ws_url:
-            raise HTTPException(status_code=500, detail="Golem Base RPC/WS URLs not configured")
-        try:
-            # Build client (read-only). Prefer RO client if available.
-            kwargs = {"rpc_url": rpc_url, "ws_url": ws_url}
-            client = None
-            if '_GolemBaseROClient' in globals() and _GolemBaseROClient is not None:
-                client = await _GolemBaseROClient.create_ro_client(**kwargs)  # type: ignore
-            elif hasattr(GolemBaseClient, 'create_ro_client'):
-                client = await GolemBaseClient.create_ro_client(**kwargs)  # type: ignore[attr-defined]
-            elif hasattr(GolemBaseClient, 'create'):
-                # Legacy path – some SDKs supported create(rpc_url, ws_url) without key
-                client = await GolemBaseClient.create(**kwargs)  # type: ignore
-            else:
-                raise RuntimeError("No suitable Golem Base client constructor found")
-            # Prefer dev_golem_provider_id in dev; always constrain by expected network
-            net_clause = f' && golem_network="{EXPECTED_NETWORK}"'
-            queries: List[str] = [f'golem_provider_id="{provider_id}"{net_clause}']
-            if IS_PROVIDER_DEV:
-                queries = [f'dev_golem_provider_id="{provider_id}"{net_clause}'] + queries
-            results = []
-            for q in queries:
-                results = await client.query_entities(q)
-                if results:
-                    break
-            if not results:
-                await client.disconnect()
-                raise HTTPException(status_code=404, detail="Provider not found on Golem Base")
-            ek = EntityKey(GenericBytes.from_hex_string(results[0].entity_key))  # type: ignore
-            md = await client.get_entity_metadata(ek)
-            await client.disconnect()
-            anns = {a.key: a.value for a in md.string_annotations}
-            # Prefer dev_ prefixed keys in development; fall back to standard keys
-            def pick(key: str) -> Optional[str]:
-                if IS_PROVIDER_DEV and ("dev_" + key) in anns and str(anns["dev_" + key]).strip():
-                    return str(anns["dev_" + key]).strip()
-                v = anns.get(key)
-                return str(v).strip() if v is not None else None
-            ip = pick("golem_ip_address")
-        except HTTPException:
-            raise
-        except Exception as e:
-            raise HTTPException(status_code=502, detail=f"Golem Base error: {e}")
-    if not ip:
-        raise HTTPException(status_code=400, detail="Resolved IP invalid or not public")
-    # In development, allow forwarding to local/private IPs to support local setups
-    if not _is_public_ip(ip) and not ALLOW_LOCAL_IPS:
-        raise HTTPException(status_code=400, detail="Resolved IP invalid or not public")
+    ip = await _resolve_provider_ip(provider_id, x_proxy_source, x_proxy_golem_base_rpc, x_proxy_golem_base_ws)
 
     # Build provider URL
     qs = request.url.query
@@ -362,11 +1053,6 @@ async def http_proxy_provider(
     if qs_forward:
         url = f"{url}?{qs_forward}"
 
-    # Read body with size limit
-    body = await request.body()
-    if len(body) > MAX_BODY_BYTES:
-        raise HTTPException(status_code=413, detail="Request body too large")
-
     hop_by_hop = {
         "connection",
         "keep-alive",
@@ -377,42 +1063,96 @@ async def http_proxy_provider(
         "transfer-encoding",
         "upgrade",
         "host",
-        "content-length",
         "accept-encoding",
     }
-    fwd_headers = {k: v for k, v in request.headers.items() if k.lower() not in hop_by_hop}
-    # Attach client IPs for tracing
-    client_ip = request.client.host if request.client else ""
-    prior_xff = request.headers.get("x-forwarded-for")
-    chain = f"{prior_xff}, {client_ip}" if prior_xff and client_ip else (client_ip or prior_xff)
-    if chain:
-        fwd_headers["X-Forwarded-For"] = chain
-    if client_ip:
-        fwd_headers["X-Real-IP"] = client_ip
+    fwd_headers = _forward_headers(request, hop_by_hop)
+
+    return await _forward(
+        request,
+        url,
+        fwd_headers,
+        hop_by_hop,
+        {"X-Proxy": "golem-port-checker", "X-Proxy-Provider-Id": provider_id},
+    )
+
 
-    timeout = aiohttp.ClientTimeout(total=None, connect=CONNECT_TIMEOUT, sock_read=READ_TIMEOUT)
-    async with aiohttp.ClientSession(timeout=timeout) as session:
+# Handshake headers aiohttp sets itself for the upstream WebSocket
+WEBSOCKET_HOP_BY_HOP = {
+    "connection",
+    "keep-alive",
+    "upgrade",
+    "host",
+    "content-length",
+    "accept-encoding",
+    "sec-websocket-key",
+    "sec-websocket-version",
+    "sec-websocket-extensions",
+    "sec-websocket-protocol",
+    "x-proxy-token",
+}
+# Query parameters meant for the proxy rather than the provider
+WEBSOCKET_PROXY_PARAMS = {"port", "token", "source"}
+
+
+@app.websocket("/proxy/provider/{provider_id}/{path:path}")
+async def websocket_proxy_provider(websocket: WebSocket, provider_id: str, path: str) -> None:
+    """Tunnel a WebSocket to a provider resolved like ``http_proxy_provider``.
+
+    Browsers cannot set headers on a WebSocket handshake, so the token, source
+    and port may also be given as ``token``, ``source`` and ``port`` query
+    parameters; these are not forwarded. Tunnels count against
+    ``MAX_TUNNELS`` and close after ``TUNNEL_IDLE_TIMEOUT`` seconds without a
+    message in either direction.
+    """
+    params = websocket.query_params
+    headers = websocket.headers
+    try:
+        if not PROXY_ENABLED:
+            raise HTTPException(status_code=404, detail="Proxy is disabled")
+        token = headers.get("x-proxy-token") or params.get("token")
+        if not PROXY_SHARED_TOKEN or token != PROXY_SHARED_TOKEN:
+            raise HTTPException(status_code=403, detail="Forbidden")
         try:
-            async with session.request(
-                method=request.method,
-                url=url,
-                headers=fwd_headers,
-                data=body if body else None,
-                allow_redirects=False,
-            ) as resp:
-                content = await resp.read()
-                resp_headers = {}
-                for k, v in resp.headers.items():
-                    if k.lower() in hop_by_hop:
-                        continue
-                    resp_headers[k] = v
-                resp_headers["X-Proxy"] = "golem-port-checker"
-                resp_headers["X-Proxy-Provider-Id"] = provider_id
-                return Response(content=content, status_code=resp.status, headers=resp_headers)
-        except asyncio.TimeoutError:
-            raise HTTPException(status_code=504, detail="Upstream timeout")
-        except aiohttp.ClientError as e:
-            raise HTTPException(status_code=502, detail=f"Upstream error: {e}")
+            port = int(params.get("port", "80"))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid port")
+        if not _is_allowed_port(port):
+            raise HTTPException(status_code=403, detail="Target port not allowed")
+        ip = await _resolve_provider_ip(
+            provider_id,
+            headers.get("x-proxy-source") or params.get("source"),
+            headers.get("x-proxy-golem-base-rpc"),
+            headers.get("x-proxy-golem-base-ws"),
+        )
+    except HTTPException as e:
+        # Closing before accepting rejects the handshake with 403
+        logger.info(f"WebSocket proxy to {provider_id} rejected: {e.detail}")
+        await websocket.close(code=1008)
+        return
+
+    if not tunnels.try_acquire():
+        await websocket.accept()
+        await websocket.close(code=1013)  # Try again later
+        return
+    try:
+        query = urlencode([(k, v) for k, v in params.multi_items() if k not in WEBSOCKET_PROXY_PARAMS])
+        url = f"ws://{ip}:{port}/{path}" + (f"?{query}" if query else "")
+        protocols = [p.strip() for p in headers.get("sec-websocket-protocol", "").split(",") if p.strip()]
+        try:
+            upstream = await _get_http_session().ws_connect(
+                url,
+                headers=_forward_headers(websocket, WEBSOCKET_HOP_BY_HOP),
+                protocols=protocols,
+                max_msg_size=MAX_BODY_BYTES,
+            )
+        except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+            logger.info(f"WebSocket proxy to {provider_id} failed: {e}")
+            await websocket.close(code=1011)
+            return
+        await websocket.accept(subprotocol=upstream.protocol)
+        await _tunnel_websocket(websocket, upstream)
+    finally:
+        tunnels.release()
 
 
 @app.api_route("/proxy/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"])
@@ -476,11 +1216,6 @@ async def http_proxy(
     if qs_forward:
         url = f"{url}?{qs_forward}"
 
-    # Read body with size limit
-    body = await request.body()
-    if len(body) > MAX_BODY_BYTES:
-        raise HTTPException(status_code=413, detail="Request body too large")
-
     # Prepare headers to forward (strip hop-by-hop and proxy-specific)
     hop_by_hop = {
         "connection",
@@ -492,44 +1227,24 @@ async def http_proxy(
         "transfer-encoding",
         "upgrade",
         "host",
-        "content-length",
         "accept-encoding",
         "x-forward-to",
         "x-forward-protocol",
     }
-    fwd_headers = {k: v for k, v in request.headers.items() if k.lower() not in hop_by_hop}
-    # Attach client IPs for tracing
-    client_ip = request.client.host if request.client else ""
-    prior_xff = request.headers.get("x-forwarded-for")
-    chain = f"{prior_xff}, {client_ip}" if prior_xff and client_ip else (client_ip or prior_xff)
-    if chain:
-        fwd_headers["X-Forwarded-For"] = chain
-    if client_ip:
-        fwd_headers["X-Real-IP"] = client_ip
+    fwd_headers = _forward_headers(request, hop_by_hop)
+
+    return await _forward(request, url, fwd_headers, hop_by_hop, {"X-Proxy": "golem-port-checker"})
+
+def _limit_concurrency() -> int:
+    """uvicorn's connection limit per worker.
+
+    Every open tunnel holds one connection for as long as it lasts, so the
+    worker's share of ``MAX_TUNNELS`` is added on top of the connections kept
+    for ordinary requests; a full set of tunnels then cannot starve
+    ``/check-ports`` or ``/health``.
+    """
+    return _per_worker(MAX_TUNNELS) + REQUEST_CONCURRENCY
 
-    timeout = aiohttp.ClientTimeout(total=None, connect=CONNECT_TIMEOUT, sock_read=READ_TIMEOUT)
-    async with aiohttp.ClientSession(timeout=timeout) as session:
-        try:
-            async with session.request(
-                method=request.method,
-                url=url,
-                headers=fwd_headers,
-                data=body if body else None,
-                allow_redirects=False,
-            ) as resp:
-                content = await resp.read()
-                # Sanitize response headers
-                resp_headers = {}
-                for k, v in resp.headers.items():
-                    if k.lower() in hop_by_hop:
-                        continue
-                    resp_headers[k] = v
-                resp_headers["X-Proxy"] = "golem-port-checker"
-                return Response(content=content, status_code=resp.status, headers=resp_headers)
-        except asyncio.TimeoutError:
-            raise HTTPException(status_code=504, detail="Upstream timeout")
-        except aiohttp.ClientError as e:
-            raise HTTPException(status_code=502, detail=f"Upstream error: {e}")
 
 def start():
     """Entry point for the port checker service."""
@@ -557,10 +1272,11 @@ def start():
         host=host,
         port=port,
         reload=debug,
+        workers=WORKERS,
         log_level="debug" if debug else "info",
         log_config=log_config,
         timeout_keep_alive=60,
-        limit_concurrency=100,
+        limit_concurrency=_limit_concurrency(),
     )
 
 if __name__ == "__main__":
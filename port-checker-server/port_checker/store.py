@@ -0,0 +1,127 @@
+"""Expiring key/value state for caches and rate limits.
+
+- ``MemoryStore`` keeps entries in this process, bounded by LRU eviction.
+- ``RedisStore`` keeps them in Redis so every worker (and every instance)
+  using the same server shares cached results and rate limit counters.
+  Requires the optional ``redis`` package.
+
+Values must be JSON serializable. Redis errors are logged and treated as a
+miss (or a fresh counter): a cache or a limit that is briefly unavailable
+must not fail port checks.
+"""
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryStore:
+    """Expiring entries in one process; the least recently used entry goes first when full."""
+
+    def __init__(self, max_entries: int = 100_000, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self._clock = clock
+        # key -> [expires_at, value], least recently used first
+        self._entries: "OrderedDict[str, List[Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _live(self, key: str) -> Optional[List[Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= self._clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _put(self, key: str, entry: List[Any]) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get(self, key: str) -> Any:
+        """Return the value stored under ``key``, or None when missing or expired."""
+        entry = self._live(key)
+        return entry[1] if entry is not None else None
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        """Store ``value`` under ``key`` for ``ttl`` seconds."""
+        if ttl > 0:
+            self._put(key, [self._clock() + ttl, value])
+
+    async def incr(self, key: str, ttl: float) -> int:
+        """Increment the counter under ``key``; a new counter lives ``ttl`` seconds."""
+        entry = self._live(key)
+        if entry is None:
+            self._put(key, [self._clock() + ttl, 1])
+            return 1
+        entry[1] += 1
+        return entry[1]
+
+    async def close(self) -> None:
+        """Forget all entries."""
+        self._entries.clear()
+
+
+class RedisStore:
+    """Expiring entries in Redis, shared by every worker using the same server."""
+
+    def __init__(self, client, prefix: str = "golem-port-checker:"):
+        self.client = client
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Any:
+        try:
+            raw = await self.client.get(self.prefix + key)
+        except Exception as e:
+            logger.warning(f"Shared store unavailable, treating {key} as missing: {e}")
+            return None
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        if ttl <= 0:
+            return
+        try:
+            await self.client.set(self.prefix + key, json.dumps(value), px=max(1, int(ttl * 1000)))
+        except Exception as e:
+            logger.warning(f"Shared store unavailable, not caching {key}: {e}")
+
+    async def incr(self, key: str, ttl: float) -> int:
+        name = self.prefix + key
+        try:
+            async with self.client.pipeline(transaction=True) as pipe:
+                pipe.incr(name)
+                pipe.pttl(name)
+                count, remaining = await pipe.execute()
+            if remaining < 0:
+                # First increment (or a counter that lost its expiry): start the window
+                await self.client.pexpire(name, max(1, int(ttl * 1000)))
+        except Exception as e:
+            logger.warning(f"Shared store unavailable, not counting {key}: {e}")
+            return 0
+        return int(count)
+
+    async def close(self) -> None:
+        """Close the connection to Redis; shared entries are left for other workers."""
+        try:
+            await self.client.aclose()
+        except Exception as e:
+            logger.warning(f"Error closing shared store: {e}")
+
+
+def create_store(redis_url: Optional[str] = None, prefix: str = "", max_entries: int = 100_000):
+    """Build a Redis store when a URL is configured, else an in-process one."""
+    if not redis_url:
+        return MemoryStore(max_entries=max_entries)
+    try:
+        import redis.asyncio as aioredis
+    except ImportError as e:
+        raise RuntimeError("PORT_CHECKER_REDIS_URL is set but the 'redis' package is not installed") from e
+    return RedisStore(aioredis.from_url(redis_url), prefix=f"golem-port-checker:{prefix}")
@@ -24,6 +24,7 @@ def main():
         host = os.getenv('PORT_CHECKER_HOST', '0.0.0.0')
         port = int(os.getenv('PORT_CHECKER_PORT', '7466'))
         debug = os.getenv('PORT_CHECKER_DEBUG', 'false').lower() == 'true'
+        workers = max(1, int(os.getenv('PORT_CHECKER_WORKERS', '1')))
 
         # Configure uvicorn logging
         log_config = uvicorn.config.LOGGING_CONFIG
@@ -36,6 +37,7 @@ def main():
             host=host,
             port=port,
             reload=debug,
+            workers=workers,
             log_level="debug" if debug else "info",
             log_config=log_config,
             timeout_keep_alive=60,
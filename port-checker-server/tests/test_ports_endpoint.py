@@ -33,3 +33,188 @@ def test_check_ports_success_and_fail(monkeypatch):
     assert data["results"]["80"]["accessible"] is True
     assert data["results"]["1234"]["accessible"] is False
 
+
+
+def _run(coro):
+    # A private loop leaves the default event loop alone for other tests
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_check_ports_compact_groups_by_outcome(monkeypatch):
+    m = importlib.import_module("port_checker.main")
+    monkeypatch.setattr(m, "port_checks", m.PortChecker(retries=1))
+    client = TestClient(m.app)
+
+    async def fake_open_connection(host, port):
+        if port in (80, 443):
+            return object(), _DummyWriter()
+        if port == 22:
+            raise asyncio.TimeoutError()
+        raise ConnectionRefusedError()
+
+    monkeypatch.setattr(asyncio, "open_connection", fake_open_connection)
+
+    r = client.post(
+        "/check-ports",
+        json={"provider_ip": "8.8.8.8", "ports": [443, 81, 80, 22, 82, 80], "compact": True},
+    )
+    assert r.status_code == 200
+    data = r.json()
+    assert "results" not in data
+    assert data["success"] is True
+    assert data["accessible"] == [80, 443]
+    assert data["failed"] == {"Connection refused": [81, 82], "Connection timed out": [22]}
+    assert data["message"] == "Successfully verified 2 out of 5 ports"
+
+
+def test_check_ports_rejects_too_many_ports(monkeypatch):
+    m = importlib.import_module("port_checker.main")
+    monkeypatch.setattr(m, "CHECK_MAX_PORTS", 2)
+    client = TestClient(m.app)
+    r = client.post("/check-ports", json={"provider_ip": "8.8.8.8", "ports": [1, 2, 3]})
+    assert r.status_code == 422
+
+
+def test_check_port_refused_is_not_retried(monkeypatch):
+    m = importlib.import_module("port_checker.main")
+    attempts = []
+
+    async def fake_open_connection(host, port):
+        attempts.append(port)
+        raise ConnectionRefusedError()
+
+    monkeypatch.setattr(asyncio, "open_connection", fake_open_connection)
+    status = _run(m.check_port("1.2.3.4", 80, retries=3, retry_delay=0))
+    assert status.accessible is False and status.error == "Connection refused"
+    assert attempts == [80]
+
+
+def test_port_checker_caches_results(monkeypatch):
+    m = importlib.import_module("port_checker.main")
+    attempts = []
+
+    async def fake_open_connection(host, port):
+        attempts.append((host, port))
+        if port == 80:
+            return object(), _DummyWriter()
+        raise ConnectionRefusedError()
+
+    monkeypatch.setattr(asyncio, "open_connection", fake_open_connection)
+    clock = _Clock()
+    checker = m.PortChecker(ttl=30, negative_ttl=5, retries=1, clock=clock)
+
+    first = _run(checker.check("1.2.3.4", [80, 81, 80]))
+    assert list(first) == [80, 81]
+    assert first[80].accessible is True and first[81].accessible is False
+    assert attempts == [("1.2.3.4", 80), ("1.2.3.4", 81)]
+
+    # Inaccessible ports are remembered for a shorter time than accessible ones
+    clock.now += 10
+    _run(checker.check("1.2.3.4", [80, 81]))
+    assert attempts[2:] == [("1.2.3.4", 81)]
+
+    clock.now += 30
+    _run(checker.check("1.2.3.4", [80]))
+    assert attempts[3:] == [("1.2.3.4", 80)]
+
+    # Results are kept per IP
+    _run(checker.check("5.6.7.8", [80]))
+    assert attempts[4:] == [("5.6.7.8", 80)]
+
+
+def test_port_checker_single_flight(monkeypatch):
+    m = importlib.import_module("port_checker.main")
+    attempts = []
+
+    async def fake_open_connection(host, port):
+        attempts.append(port)
+        await asyncio.sleep(0.01)
+        return object(), _DummyWriter()
+
+    monkeypatch.setattr(asyncio, "open_connection", fake_open_connection)
+    checker = m.PortChecker(retries=1)
+
+    async def scenario():
+        return await asyncio.gather(*(checker.check("1.2.3.4", [80]) for _ in range(5)))
+
+    results = _run(scenario())
+    assert attempts == [80]
+    assert all(r[80].accessible for r in results)
+
+
+def test_port_checker_limits_concurrency_per_target(monkeypatch):
+    m = importlib.import_module("port_checker.main")
+    active = {}
+    peak = {"total": 0}
+    peaks = {}
+
+    async def fake_open_connection(host, port):
+        active[host] = active.get(host, 0) + 1
+        peaks[host] = max(peaks.get(host, 0), active[host])
+        peak["total"] = max(peak["total"], sum(active.values()))
+        await asyncio.sleep(0.001)
+        active[host] -= 1
+        return object(), _DummyWriter()
+
+    monkeypatch.setattr(asyncio, "open_connection", fake_open_connection)
+    checker = m.PortChecker(max_concurrent=6, max_per_target=4, retries=1)
+
+    async def scenario():
+        return await asyncio.gather(
+            checker.check("1.1.1.1", list(range(1000, 1100))),
+            checker.check("2.2.2.2", list(range(1000, 1010))),
+        )
+
+    big, small = _run(scenario())
+    assert len(big) == 100 and len(small) == 10
+    assert all(s.accessible for s in list(big.values()) + list(small.values()))
+    assert peak["total"] == 6
+    assert peaks["1.1.1.1"] == 4
+    # The small batch got slots while the large one was still running
+    assert peaks["2.2.2.2"] >= 2
+    assert checker._targets == {}
+
+
+def test_check_ports_streams_ndjson_as_ports_finish(monkeypatch):
+    import json
+
+    m = importlib.import_module("port_checker.main")
+    monkeypatch.setattr(m, "port_checks", m.PortChecker(retries=1))
+    client = TestClient(m.app)
+
+    async def fake_open_connection(host, port):
+        if port == 80:
+            # The slow port finishes last even though it was asked for first
+            await asyncio.sleep(0.05)
+            return object(), _DummyWriter()
+        raise ConnectionRefusedError()
+
+    monkeypatch.setattr(asyncio, "open_connection", fake_open_connection)
+
+    with client.stream(
+        "POST",
+        "/check-ports",
+        json={"provider_ip": "8.8.8.8", "ports": [80, 1234, 1234]},
+        headers={"Accept": "application/x-ndjson"},
+    ) as r:
+        assert r.status_code == 200
+        assert r.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in r.iter_lines() if line]
+
+    assert lines == [
+        {"port": 1234, "accessible": False, "error": "Connection refused"},
+        {"port": 80, "accessible": True, "error": None},
+        {"success": True, "message": "Successfully verified 1 out of 2 ports"},
+    ]
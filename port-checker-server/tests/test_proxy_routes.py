@@ -5,7 +5,10 @@ import asyncio
 from typing import Any, Dict
 
 import importlib
+import aiohttp
+import pytest
 from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
 
 
 def setup_app(monkeypatch, env: Dict[str, str]):
@@ -39,9 +42,34 @@ class _StubResp:
     async def __aexit__(self, exc_type, exc, tb):
         return False
 
+    def __await__(self):
+        async def _self():
+            return self
+        return _self().__await__()
+
+    @property
+    def content(self):
+        return _StubContent(self._body)
+
+    def release(self):
+        self.released = True
+
+    def close(self):
+        self.closed = True
+
+
+class _StubContent:
+    def __init__(self, body: bytes, chunk_size: int = 4):
+        self._chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)]
+
+    async def iter_any(self):
+        for chunk in self._chunks:
+            yield chunk
+
 
 class _StubSession:
     client_error_cls = Exception
+    closed = False
     def __init__(self, routes):
         self.routes = routes  # maps (METHOD, URL) => _StubResp or {"raise": "timeout"|"client"}
         self.last = {}  # maps (METHOD, URL) => kwargs
@@ -111,7 +139,7 @@ def test_provider_proxy_discovery_success(monkeypatch):
     class _ClientError(Exception):
         pass
     _StubSession.client_error_cls = _ClientError
-    monkeypatch.setattr(m, "aiohttp", types.SimpleNamespace(ClientSession=lambda timeout=None: session, ClientTimeout=lambda **kw: object(), ClientError=_ClientError))
+    monkeypatch.setattr(m, "aiohttp", types.SimpleNamespace(ClientSession=lambda **kw: session, ClientTimeout=lambda **kw: object(), TCPConnector=lambda **kw: None, DummyCookieJar=lambda: None, ClientError=_ClientError))
 
     r = client.get(
         "/proxy/provider/prov123/status?port=8080&foo=bar",
@@ -170,7 +198,7 @@ def test_provider_proxy_body_too_large(monkeypatch):
     class _ClientError(Exception):
         pass
     _StubSession.client_error_cls = _ClientError
-    monkeypatch.setattr(m, "aiohttp", types.SimpleNamespace(ClientSession=lambda timeout=None: session, ClientTimeout=lambda **kw: object(), ClientError=_ClientError))
+    monkeypatch.setattr(m, "aiohttp", types.SimpleNamespace(ClientSession=lambda **kw: session, ClientTimeout=lambda **kw: object(), TCPConnector=lambda **kw: None, DummyCookieJar=lambda: None, ClientError=_ClientError))
     r = client.post(
         "/proxy/provider/pid/upload?port=80",
         headers={"X-Proxy-Token": "secret", "X-Proxy-Source": "discovery"},
@@ -193,7 +221,7 @@ def test_provider_proxy_discovery_timeout(monkeypatch):
     class _ClientError(Exception):
         pass
     _StubSession.client_error_cls = _ClientError
-    monkeypatch.setattr(m, "aiohttp", types.SimpleNamespace(ClientSession=lambda timeout=None: session, ClientTimeout=lambda **kw: object(), ClientError=_ClientError))
+    monkeypatch.setattr(m, "aiohttp", types.SimpleNamespace(ClientSession=lambda **kw: session, ClientTimeout=lambda **kw: object(), TCPConnector=lambda **kw: None, DummyCookieJar=lambda: None, ClientError=_ClientError))
     r = client.get(
         "/proxy/provider/slow/status?port=80",
         headers={"X-Proxy-Token": "secret", "X-Proxy-Source": "discovery"},
@@ -217,7 +245,7 @@ def test_provider_proxy_upstream_client_error(monkeypatch):
     class _ClientError(Exception):
         pass
     _StubSession.client_error_cls = _ClientError
-    monkeypatch.setattr(m, "aiohttp", types.SimpleNamespace(ClientSession=lambda timeout=None: session, ClientTimeout=lambda **kw: object(), ClientError=_ClientError))
+    monkeypatch.setattr(m, "aiohttp", types.SimpleNamespace(ClientSession=lambda **kw: session, ClientTimeout=lambda **kw: object(), TCPConnector=lambda **kw: None, DummyCookieJar=lambda: None, ClientError=_ClientError))
     r = client.get(
         "/proxy/provider/prov/fail?port=80",
         headers={"X-Proxy-Token": "secret", "X-Proxy-Source": "discovery"},
@@ -237,7 +265,7 @@ def test_provider_proxy_discovery_not_found(monkeypatch):
     })
     class _ClientError(Exception):
         pass
-    monkeypatch.setattr(m, "aiohttp", types.SimpleNamespace(ClientSession=lambda timeout=None: _StubSession(routes), ClientTimeout=lambda **kw: object(), ClientError=_ClientError))
+    monkeypatch.setattr(m, "aiohttp", types.SimpleNamespace(ClientSession=lambda **kw: _StubSession(routes), ClientTimeout=lambda **kw: object(), TCPConnector=lambda **kw: None, DummyCookieJar=lambda: None, ClientError=_ClientError))
     r = client.get(
         "/proxy/provider/missing/status?port=80",
         headers={"X-Proxy-Token": "secret", "X-Proxy-Source": "discovery"},
@@ -286,8 +314,10 @@ def test_provider_proxy_golem_base_success(monkeypatch):
         m,
         "aiohttp",
         types.SimpleNamespace(
-            ClientSession=lambda timeout=None: session,
+            ClientSession=lambda **kw: session,
             ClientTimeout=lambda **kw: object(),
+            TCPConnector=lambda **kw: None,
+            DummyCookieJar=lambda: None,
             ClientError=Exception,
         ),
     )
@@ -319,6 +349,8 @@ def test_provider_proxy_golem_base_success(monkeypatch):
 
     monkeypatch.setattr(m, "GolemBaseClient", types.SimpleNamespace(create=_create))
     monkeypatch.setattr(m, "_HAS_GOLEM_BASE", True)
+    # Use the stubbed constructor even when the real SDK is installed
+    monkeypatch.setattr(m, "_GolemBaseROClient", None)
 
     # Call with header overrides for RPC/WS to exercise that branch
     r = client.get(
@@ -369,6 +401,8 @@ def test_provider_proxy_golem_base_not_found(monkeypatch):
 
     monkeypatch.setattr(m, "GolemBaseClient", types.SimpleNamespace(create=_create))
     monkeypatch.setattr(m, "_HAS_GOLEM_BASE", True)
+    # Use the stubbed constructor even when the real SDK is installed
+    monkeypatch.setattr(m, "_GolemBaseROClient", None)
 
     r = client.get(
         "/proxy/provider/prov/status?port=80",
@@ -406,7 +440,7 @@ def test_direct_ip_enabled_with_token(monkeypatch):
         "PORT_CHECKER_PROXY_ALLOW_DIRECT_IP": "true",
         "PORT_CHECKER_PROXY_TOKEN": "secret",
     })
-    monkeypatch.setattr(m, "aiohttp", types.SimpleNamespace(ClientSession=lambda timeout=None: _StubSession(routes), ClientTimeout=lambda **kw: object()))
+    monkeypatch.setattr(m, "aiohttp", types.SimpleNamespace(ClientSession=lambda **kw: _StubSession(routes), ClientTimeout=lambda **kw: object(), TCPConnector=lambda **kw: None, DummyCookieJar=lambda: None))
     r = client.get(
         "/proxy/info?foo=bar&target=shouldremove",
         headers={
@@ -437,6 +471,8 @@ def test_provider_proxy_golem_base_error_and_invalid_ip(monkeypatch):
 
     monkeypatch.setattr(m, "GolemBaseClient", types.SimpleNamespace(create=_create_raises))
     monkeypatch.setattr(m, "_HAS_GOLEM_BASE", True)
+    # Use the stubbed constructor even when the real SDK is installed
+    monkeypatch.setattr(m, "_GolemBaseROClient", None)
     r = client.get(
         "/proxy/provider/prov/status",
         headers={"X-Proxy-Token": "secret", "X-Proxy-Source": "golem-base"},
@@ -481,7 +517,7 @@ def test_provider_default_port_no_query(monkeypatch):
         "DISCOVERY_API_URL": "http://localhost:9001/api/v1",
     })
     session = _StubSession(routes)
-    monkeypatch.setattr(m, "aiohttp", types.SimpleNamespace(ClientSession=lambda timeout=None: session, ClientTimeout=lambda **kw: object(), ClientError=Exception))
+    monkeypatch.setattr(m, "aiohttp", types.SimpleNamespace(ClientSession=lambda **kw: session, ClientTimeout=lambda **kw: object(), TCPConnector=lambda **kw: None, DummyCookieJar=lambda: None, ClientError=Exception))
     r = client.get(
         "/proxy/provider/pdef/status",
         headers={"X-Proxy-Token": "secret"},
@@ -523,7 +559,7 @@ def test_discovery_client_error(monkeypatch):
     class _ClientError(Exception):
         pass
     _StubSession.client_error_cls = _ClientError
-    monkeypatch.setattr(m, "aiohttp", types.SimpleNamespace(ClientSession=lambda timeout=None: session, ClientTimeout=lambda **kw: object(), ClientError=_ClientError))
+    monkeypatch.setattr(m, "aiohttp", types.SimpleNamespace(ClientSession=lambda **kw: session, ClientTimeout=lambda **kw: object(), TCPConnector=lambda **kw: None, DummyCookieJar=lambda: None, ClientError=_ClientError))
     r = client.get(
         "/proxy/provider/provCE/status?port=80",
         headers={"X-Proxy-Token": "secret", "X-Proxy-Source": "discovery"},
@@ -547,7 +583,7 @@ def test_provider_upstream_timeout(monkeypatch):
     class _ClientError(Exception):
         pass
     _StubSession.client_error_cls = _ClientError
-    monkeypatch.setattr(m, "aiohttp", types.SimpleNamespace(ClientSession=lambda timeout=None: session, ClientTimeout=lambda **kw: object(), ClientError=_ClientError))
+    monkeypatch.setattr(m, "aiohttp", types.SimpleNamespace(ClientSession=lambda **kw: session, ClientTimeout=lambda **kw: object(), TCPConnector=lambda **kw: None, DummyCookieJar=lambda: None, ClientError=_ClientError))
     r = client.get(
         "/proxy/provider/provTO/slow?port=80",
         headers={"X-Proxy-Token": "secret", "X-Proxy-Source": "discovery"},
@@ -578,7 +614,7 @@ def test_direct_ip_no_query_and_body_too_large(monkeypatch):
         "PORT_CHECKER_PROXY_TOKEN": "secret",
         "PORT_CHECKER_PROXY_MAX_BODY_BYTES": "3",
     })
-    monkeypatch.setattr(m, "aiohttp", types.SimpleNamespace(ClientSession=lambda timeout=None: _StubSession(routes), ClientTimeout=lambda **kw: object(), ClientError=Exception))
+    monkeypatch.setattr(m, "aiohttp", types.SimpleNamespace(ClientSession=lambda **kw: _StubSession(routes), ClientTimeout=lambda **kw: object(), TCPConnector=lambda **kw: None, DummyCookieJar=lambda: None, ClientError=Exception))
     # No query string -> exercises qs_forward else branch
     r = client.get(
         "/proxy/info",
@@ -609,7 +645,7 @@ def test_direct_ip_timeout_and_client_error(monkeypatch):
     class _ClientError(Exception):
         pass
     _StubSession.client_error_cls = _ClientError
-    monkeypatch.setattr(m, "aiohttp", types.SimpleNamespace(ClientSession=lambda timeout=None: session, ClientTimeout=lambda **kw: object(), ClientError=_ClientError))
+    monkeypatch.setattr(m, "aiohttp", types.SimpleNamespace(ClientSession=lambda **kw: session, ClientTimeout=lambda **kw: object(), TCPConnector=lambda **kw: None, DummyCookieJar=lambda: None, ClientError=_ClientError))
 
     r = client.get(
         "/proxy/slow",
@@ -634,8 +670,9 @@ def test_start_invokes_uvicorn_with_env(monkeypatch):
         class config:
             LOGGING_CONFIG = {"formatters": {"access": {"fmt": ""}}}
 
-        def run(self, app, host, port, reload, log_level, log_config, timeout_keep_alive, limit_concurrency):  # noqa: ARG002
-            called.update(dict(app=app, host=host, port=port, reload=reload, log_level=log_level))
+        def run(self, app, host, port, reload, workers, log_level, log_config, timeout_keep_alive, limit_concurrency):  # noqa: ARG002
+            called.update(dict(app=app, host=host, port=port, reload=reload, workers=workers, log_level=log_level,
+                               limit_concurrency=limit_concurrency))
 
     # Patch modules so that `import uvicorn` and `from dotenv import load_dotenv` succeed
     monkeypatch.setitem(sys.modules, "uvicorn", _UV())
@@ -648,6 +685,9 @@ def test_start_invokes_uvicorn_with_env(monkeypatch):
     assert called.get("port") == 9100
     assert called.get("reload") is True
     assert called.get("log_level") == "debug"
+    assert called.get("workers") == 1
+    # A worker full of tunnels still has room for ordinary requests
+    assert called.get("limit_concurrency") == m._per_worker(m.MAX_TUNNELS) + m.REQUEST_CONCURRENCY
 
 
 def test_main_guard_executes_start(monkeypatch):
@@ -659,7 +699,7 @@ def test_main_guard_executes_start(monkeypatch):
         class config:
             LOGGING_CONFIG = {"formatters": {"access": {"fmt": ""}}}
 
-        def run(self, app, host, port, reload, log_level, log_config, timeout_keep_alive, limit_concurrency):  # noqa: ARG002
+        def run(self, app, host, port, reload, workers, log_level, log_config, timeout_keep_alive, limit_concurrency):  # noqa: ARG002
             called.update(dict(app=app, host=host, port=port))
 
     mod_path = os.path.join(os.path.dirname(__file__), "..", "port_checker", "main.py")
@@ -718,7 +758,7 @@ def test_direct_ip_non_public_and_disallowed_port(monkeypatch):
         "PORT_CHECKER_PROXY_TOKEN": "secret",
         "PORT_CHECKER_PROXY_ALLOWED_PORTS": "80",
     })
-    monkeypatch.setattr(m, "aiohttp", types.SimpleNamespace(ClientSession=lambda timeout=None: _StubSession(routes), ClientTimeout=lambda **kw: object(), ClientError=Exception))
+    monkeypatch.setattr(m, "aiohttp", types.SimpleNamespace(ClientSession=lambda **kw: _StubSession(routes), ClientTimeout=lambda **kw: object(), TCPConnector=lambda **kw: None, DummyCookieJar=lambda: None, ClientError=Exception))
     # Non-public
     r = client.get(
         "/proxy/info",
@@ -750,3 +790,283 @@ def test_provider_invalid_source_and_token_mismatch(monkeypatch):
         headers={"X-Proxy-Token": "wrong", "X-Proxy-Source": "discovery"},
     )
     assert r.status_code == 403
+
+
+def _run(coro):
+    # A private loop leaves the default event loop alone for other tests
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def test_provider_proxy_reuses_pooled_session(monkeypatch):
+    adv_url = "http://localhost:9001/api/v1/advertisements/pool"
+    upstream_url = "http://1.1.1.1:8080/status"
+    routes = {
+        ("GET", adv_url): _StubResp(200, json_obj={"ip_address": "1.1.1.1"}),
+        ("GET", upstream_url): _StubResp(200, body=b"OK"),
+    }
+    m, client = setup_app(monkeypatch, {
+        "PORT_CHECKER_PROXY_ENABLED": "true",
+        "PORT_CHECKER_PROXY_TOKEN": "secret",
+        "DISCOVERY_API_URL": "http://localhost:9001/api/v1",
+        "PORT_CHECKER_PROXY_POOL_LIMIT_PER_HOST": "4",
+    })
+    session = _StubSession(routes)
+    sessions, connectors = [], []
+
+    def _client_session(**kw):
+        sessions.append(kw)
+        return session
+
+    def _connector(**kw):
+        connectors.append(kw)
+        return kw
+
+    monkeypatch.setattr(m, "aiohttp", types.SimpleNamespace(ClientSession=_client_session, ClientTimeout=lambda **kw: object(), TCPConnector=_connector, DummyCookieJar=lambda: "no-cookies", ClientError=Exception))
+    for _ in range(3):
+        r = client.get(
+            "/proxy/provider/pool/status?port=8080",
+            headers={"X-Proxy-Token": "secret", "X-Proxy-Source": "discovery"},
+        )
+        assert r.status_code == 200
+    # Discovery lookups and upstream calls share one session and connection pool
+    assert len(sessions) == 1
+    assert connectors[0]["limit_per_host"] == 4
+    assert connectors[0]["ttl_dns_cache"] == m.DNS_CACHE_TTL
+    # Cookies from one provider response must never reach another client
+    assert sessions[0]["cookie_jar"] == "no-cookies"
+
+
+def test_shutdown_closes_pooled_session(monkeypatch):
+    m, _ = setup_app(monkeypatch, {"PORT_CHECKER_PROXY_ENABLED": "true"})
+
+    async def scenario():
+        session = m._get_http_session()
+        assert m._get_http_session() is session
+        await m.close_http_session()
+        assert session.closed
+        assert m._http_session is None
+        # Closing again is a no-op
+        await m.close_http_session()
+
+    _run(scenario())
+
+
+class _UploadSession(_StubSession):
+    """Stub session that consumes streamed uploads like aiohttp does."""
+
+    def __init__(self, routes):
+        super().__init__(routes)
+        self.uploaded = {}
+
+    def request(self, method: str, url: str, **kwargs):
+        async def send():
+            resp = self._handle(method, url, **kwargs)
+            data = kwargs.get("data")
+            chunks = []
+            if data is not None:
+                try:
+                    async for chunk in data:
+                        chunks.append(chunk)
+                except Exception as e:
+                    raise self.client_error_cls("upload aborted") from e
+            self.uploaded[(method.upper(), url)] = b"".join(chunks)
+            return resp
+        return send()
+
+
+def _streaming_app(monkeypatch, routes, max_body: str = "1024"):
+    m, client = setup_app(monkeypatch, {
+        "PORT_CHECKER_PROXY_ENABLED": "true",
+        "PORT_CHECKER_PROXY_ALLOW_DIRECT_IP": "true",
+        "PORT_CHECKER_PROXY_TOKEN": "secret",
+        "PORT_CHECKER_PROXY_MAX_BODY_BYTES": max_body,
+        "PORT_CHECKER_PROXY_BUFFER_BYTES": "16",
+    })
+
+    class _ClientError(Exception):
+        pass
+
+    session = _UploadSession(routes)
+    session.client_error_cls = _ClientError
+    monkeypatch.setattr(m, "aiohttp", types.SimpleNamespace(ClientSession=lambda **kw: session, ClientTimeout=lambda **kw: object(), TCPConnector=lambda **kw: None, DummyCookieJar=lambda: None, ClientError=_ClientError))
+    return m, client, session
+
+
+def test_proxy_streams_response_body(monkeypatch):
+    upstream = _StubResp(200, headers={"Content-Length": "26", "Content-Encoding": "identity"}, body=b"abcdefghijklmnopqrstuvwxyz")
+    m, client, session = _streaming_app(monkeypatch, {("GET", "http://2.2.2.2:8000/file"): upstream})
+    r = client.get("/proxy/file", headers={"X-Forward-To": "2.2.2.2:8000", "X-Proxy-Token": "secret"})
+    assert r.status_code == 200
+    assert r.content == b"abcdefghijklmnopqrstuvwxyz"
+    # The upstream length is passed on since the body is relayed unchanged
+    assert r.headers.get("Content-Length") == "26"
+    assert upstream.released
+    # No body was sent upstream for a GET
+    assert session.last[("GET", "http://2.2.2.2:8000/file")]["data"] is None
+
+
+def test_proxy_buffers_small_declared_response(monkeypatch):
+    upstream = _StubResp(200, headers={"Content-Length": "5"}, body=b"small")
+    m, client, session = _streaming_app(monkeypatch, {("GET", "http://2.2.2.2:8000/tiny"): upstream})
+    r = client.get("/proxy/tiny", headers={"X-Forward-To": "2.2.2.2:8000", "X-Proxy-Token": "secret"})
+    assert r.status_code == 200
+    assert r.content == b"small"
+    assert r.headers.get("Content-Length") == "5"
+    assert upstream.released
+
+
+def test_proxy_streams_upload(monkeypatch):
+    url = "http://2.2.2.2:8000/upload"
+    m, client, session = _streaming_app(monkeypatch, {("POST", url): _StubResp(201, body=b"stored")})
+    r = client.post(
+        "/proxy/upload",
+        content=iter([b"x" * 300, b"y" * 300]),
+        headers={"X-Forward-To": "2.2.2.2:8000", "X-Proxy-Token": "secret"},
+    )
+    assert r.status_code == 201
+    assert session.uploaded[("POST", url)] == b"x" * 300 + b"y" * 300
+
+
+def test_proxy_rejects_declared_oversized_upload(monkeypatch):
+    # No stub route: the upstream must never be contacted
+    m, client, session = _streaming_app(monkeypatch, {})
+    r = client.post(
+        "/proxy/upload",
+        content=b"z" * 2048,
+        headers={"X-Forward-To": "2.2.2.2:8000", "X-Proxy-Token": "secret"},
+    )
+    assert r.status_code == 413
+    assert session.last == {}
+
+
+def test_proxy_cuts_off_chunked_upload_over_limit(monkeypatch):
+    url = "http://2.2.2.2:8000/upload"
+    m, client, session = _streaming_app(monkeypatch, {("POST", url): _StubResp(201)})
+    r = client.post(
+        "/proxy/upload",
+        content=iter([b"x" * 1000, b"y" * 1000]),
+        headers={"X-Forward-To": "2.2.2.2:8000", "X-Proxy-Token": "secret"},
+    )
+    assert r.status_code == 413
+
+
+def test_proxy_event_stream_is_unbuffered_and_counted(monkeypatch):
+    url = "http://2.2.2.2:8000/events"
+    upstream = _StubResp(200, headers={"Content-Type": "text/event-stream", "Content-Length": "12"}, body=b"data: 1\n\n")
+    m, client, session = _streaming_app(monkeypatch, {("GET", url): upstream})
+    headers = {"X-Forward-To": "2.2.2.2:8000", "X-Proxy-Token": "secret", "Accept": "text/event-stream"}
+    r = client.get("/proxy/events", headers=headers)
+    assert r.status_code == 200
+    assert r.content == b"data: 1\n\n"
+    assert r.headers.get("X-Accel-Buffering") == "no"
+    # Streams get the idle timeout instead of the short read timeout
+    assert "timeout" in session.last[("GET", url)]
+    assert m.tunnels.active == 0
+
+    monkeypatch.setattr(m.tunnels, "limit", 0)
+    r = client.get("/proxy/events", headers=headers)
+    assert r.status_code == 503
+
+
+class _StubUpstreamWS:
+    protocol = "chat"
+    close_code = 1000
+
+    def __init__(self):
+        self.sent = []
+        self.closed_with = None
+        self._queue = None
+
+    def _messages(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        return self._queue
+
+    async def send_str(self, data):
+        self.sent.append(data)
+        await self._messages().put(types.SimpleNamespace(type=aiohttp.WSMsgType.TEXT, data=f"echo:{data}"))
+
+    async def send_bytes(self, data):
+        self.sent.append(data)
+        await self._messages().put(types.SimpleNamespace(type=aiohttp.WSMsgType.BINARY, data=data[::-1]))
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self._messages().get()
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+def _websocket_app(monkeypatch):
+    m, client = setup_app(monkeypatch, {
+        "PORT_CHECKER_PROXY_ENABLED": "true",
+        "PORT_CHECKER_PROXY_TOKEN": "secret",
+    })
+    upstream = _StubUpstreamWS()
+    connects = []
+
+    async def _resolve(provider_id, source, rpc=None, ws=None):  # noqa: ARG001
+        return "1.1.1.1"
+
+    async def _ws_connect(url, **kwargs):
+        connects.append((url, kwargs))
+        return upstream
+
+    monkeypatch.setattr(m, "_resolve_provider_ip", _resolve)
+    monkeypatch.setattr(m, "_get_http_session", lambda: types.SimpleNamespace(ws_connect=_ws_connect))
+    return m, client, upstream, connects
+
+
+def test_websocket_tunnel_relays_both_ways(monkeypatch):
+    m, client, upstream, connects = _websocket_app(monkeypatch)
+    with client.websocket_connect(
+        "/proxy/provider/prov/socket?port=8080&token=secret&room=1",
+        subprotocols=["chat"],
+    ) as ws:
+        assert ws.accepted_subprotocol == "chat"
+        ws.send_text("hi")
+        assert ws.receive_text() == "echo:hi"
+        ws.send_bytes(b"abc")
+        assert ws.receive_bytes() == b"cba"
+        assert m.tunnels.active == 1
+    url, kwargs = connects[0]
+    # Proxy parameters and credentials stay with the proxy
+    assert url == "ws://1.1.1.1:8080/socket?room=1"
+    assert kwargs["protocols"] == ["chat"]
+    assert "X-Real-IP" in kwargs["headers"]
+    assert upstream.closed_with == 1000
+    assert m.tunnels.active == 0
+
+
+def test_websocket_tunnel_rejects_bad_token(monkeypatch):
+    m, client, _, connects = _websocket_app(monkeypatch)
+    with pytest.raises(WebSocketDisconnect) as exc:
+        with client.websocket_connect("/proxy/provider/prov/socket?token=wrong"):
+            pass
+    assert exc.value.code == 1008
+    assert connects == []
+
+
+def test_websocket_tunnel_cap_and_idle_timeout(monkeypatch):
+    m, client, upstream, _ = _websocket_app(monkeypatch)
+    monkeypatch.setattr(m.tunnels, "limit", 0)
+    with client.websocket_connect("/proxy/provider/prov/socket", headers={"X-Proxy-Token": "secret"}) as ws:
+        with pytest.raises(WebSocketDisconnect) as exc:
+            ws.receive_text()
+    assert exc.value.code == 1013
+
+    monkeypatch.setattr(m.tunnels, "limit", 10)
+    monkeypatch.setattr(m, "TUNNEL_IDLE_TIMEOUT", 0.2)
+    with client.websocket_connect("/proxy/provider/prov/socket", headers={"X-Proxy-Token": "secret"}) as ws:
+        with pytest.raises(WebSocketDisconnect) as exc:
+            ws.receive_text()
+    assert exc.value.code == 1001
+    assert upstream.closed_with == 1001
+    assert m.tunnels.active == 0
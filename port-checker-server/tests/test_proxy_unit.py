@@ -2,6 +2,7 @@ import importlib
 import os
 import sys
 import asyncio
+import types
 
 # Ensure local package is importable (prefer local over any installed version)
 TEST_DIR = os.path.dirname(__file__)
@@ -101,3 +102,245 @@ def test_check_port_handles_timeout_and_generic(monkeypatch):
     monkeypatch.setattr(m.asyncio, "open_connection", _fake_open_connection_generic)
     res = m.asyncio.get_event_loop().run_until_complete(m.check_port("1.2.3.4", 80, retries=1))
     assert res.accessible is False and "boom" in (res.error or "")
+
+
+def _run(coro):
+    # A private loop leaves the default event loop alone for other tests
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class _GBClient:
+    """Golem Base client stub answering from ``providers`` (provider_id -> IP)."""
+
+    def __init__(self, providers, expires_at_block=None, current_block=100):
+        self.providers = providers
+        self.expires_at_block = expires_at_block
+        self.current_block = current_block
+        self.queries = 0
+        self.disconnected = False
+        self.release = None
+
+    async def query_entities(self, query):
+        self.queries += 1
+        if self.release is not None:
+            await self.release.wait()
+        provider_id = query.split('"')[1]
+        if provider_id not in self.providers:
+            return []
+        self.last = provider_id
+        return [types.SimpleNamespace(entity_key="0x" + ("00" * 32))]
+
+    async def get_entity_metadata(self, _ek):
+        return types.SimpleNamespace(
+            string_annotations=[types.SimpleNamespace(key="golem_ip_address", value=self.providers[self.last])],
+            expires_at_block=self.expires_at_block,
+        )
+
+    def http_client(self):
+        async def get_block_number():
+            return self.current_block
+
+        return types.SimpleNamespace(eth=types.SimpleNamespace(get_block_number=get_block_number))
+
+    async def disconnect(self):
+        self.disconnected = True
+
+
+def _resolver(monkeypatch, gb_client, **kwargs):
+    m = importlib.import_module("port_checker.main")
+    created = []
+
+    async def _create(**kw):
+        created.append(kw)
+        return gb_client
+
+    monkeypatch.setattr(m, "_GolemBaseROClient", types.SimpleNamespace(create_ro_client=_create))
+    clock = _Clock()
+    return m.ProviderResolver(clock=clock, **kwargs), clock, created
+
+
+def test_provider_resolver_caches_hits_and_misses(monkeypatch):
+    gb = _GBClient({"prov": "1.2.3.4"})
+    resolver, clock, created = _resolver(monkeypatch, gb, ttl=60, negative_ttl=10)
+
+    async def scenario():
+        assert await resolver.resolve("prov", "http://rpc", "ws://ws") == (True, "1.2.3.4")
+        assert await resolver.resolve("prov", "http://rpc", "ws://ws") == (True, "1.2.3.4")
+        assert await resolver.resolve("ghost", "http://rpc", "ws://ws") == (False, None)
+        assert await resolver.resolve("ghost", "http://rpc", "ws://ws") == (False, None)
+        assert gb.queries == 2
+        # Misses expire sooner than hits
+        clock.now += 11
+        await resolver.resolve("prov", "http://rpc", "ws://ws")
+        await resolver.resolve("ghost", "http://rpc", "ws://ws")
+        assert gb.queries == 3
+        clock.now += 50
+        await resolver.resolve("prov", "http://rpc", "ws://ws")
+        assert gb.queries == 4
+        # One long-lived client served every lookup
+        assert len(created) == 1
+        await resolver.close()
+        assert gb.disconnected
+
+    _run(scenario())
+
+
+def test_provider_resolver_bounded_by_expiry_block(monkeypatch):
+    # Advertisement expires 5 blocks (10 s) from now, well inside the 300 s TTL
+    gb = _GBClient({"prov": "1.2.3.4"}, expires_at_block=105, current_block=100)
+    resolver, clock, _ = _resolver(monkeypatch, gb, ttl=300, block_time=2.0)
+
+    async def scenario():
+        await resolver.resolve("prov", "http://rpc", "ws://ws")
+        clock.now += 9
+        await resolver.resolve("prov", "http://rpc", "ws://ws")
+        assert gb.queries == 1
+        clock.now += 2
+        await resolver.resolve("prov", "http://rpc", "ws://ws")
+        assert gb.queries == 2
+
+    _run(scenario())
+
+
+def test_provider_resolver_single_flight(monkeypatch):
+    gb = _GBClient({"prov": "1.2.3.4"})
+    resolver, _, _ = _resolver(monkeypatch, gb)
+
+    async def scenario():
+        gb.release = asyncio.Event()
+        lookups = [asyncio.ensure_future(resolver.resolve("prov", "http://rpc", "ws://ws")) for _ in range(5)]
+        await asyncio.sleep(0.01)
+        gb.release.set()
+        assert await asyncio.gather(*lookups) == [(True, "1.2.3.4")] * 5
+        assert gb.queries == 1
+
+    _run(scenario())
+
+
+def test_provider_resolver_errors_are_not_cached(monkeypatch):
+    gb = _GBClient({"prov": "1.2.3.4"})
+    resolver, _, created = _resolver(monkeypatch, gb)
+
+    async def failing_query(query):  # noqa: ARG001
+        raise ConnectionError("ws closed")
+
+    async def scenario():
+        gb.query_entities, working = failing_query, gb.query_entities
+        try:
+            await resolver.resolve("prov", "http://rpc", "ws://ws")
+        except ConnectionError:
+            pass
+        else:
+            raise AssertionError("expected the lookup error")
+        # The broken client was dropped and is replaced on the next lookup
+        assert gb.disconnected
+        gb.query_entities = working
+        assert await resolver.resolve("prov", "http://rpc", "ws://ws") == (True, "1.2.3.4")
+        assert len(created) == 2
+
+    _run(scenario())
+
+
+def test_provider_resolver_keeps_client_on_lookup_errors(monkeypatch):
+    gb = _GBClient({"prov": "1.2.3.4"})
+    resolver, _, created = _resolver(monkeypatch, gb)
+
+    async def scenario():
+        working = gb.query_entities
+
+        async def bad_query(query):
+            if "broken" in query:
+                raise ValueError("unparseable annotation")
+            return await working(query)
+
+        gb.query_entities = bad_query
+        try:
+            await resolver.resolve("broken", "http://rpc", "ws://ws")
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("expected the lookup error")
+        # Not a connection problem: the shared client stays connected
+        assert not gb.disconnected
+        assert await resolver.resolve("prov", "http://rpc", "ws://ws") == (True, "1.2.3.4")
+        assert len(created) == 1
+
+    _run(scenario())
+
+
+def test_provider_resolver_disconnects_only_after_other_lookups_finish(monkeypatch):
+    gb = _GBClient({"prov": "1.2.3.4"})
+    resolver, _, created = _resolver(monkeypatch, gb)
+
+    async def scenario():
+        gb.release = asyncio.Event()
+        working = gb.query_entities
+
+        async def query(q):
+            if "down" in q:
+                raise ConnectionError("ws closed")
+            return await working(q)
+
+        gb.query_entities = query
+        slow = asyncio.ensure_future(resolver.resolve("prov", "http://rpc", "ws://ws"))
+        await asyncio.sleep(0.01)
+        try:
+            await resolver.resolve("down", "http://rpc", "ws://ws")
+        except ConnectionError:
+            pass
+        # The lookup still using the client keeps it connected until it finishes
+        assert not gb.disconnected
+        gb.release.set()
+        assert await slow == (True, "1.2.3.4")
+        assert gb.disconnected
+        # A fresh client serves the next lookup
+        gb.disconnected = False
+        await resolver.resolve("prov2", "http://rpc", "ws://ws")
+        assert len(created) == 2
+
+    _run(scenario())
+
+
+def test_provider_resolver_bounds_clients_and_connects_per_endpoint(monkeypatch):
+    m = importlib.import_module("port_checker.main")
+    clients = {}
+    hang = asyncio.Event()
+
+    async def _create(rpc_url, ws_url):
+        if rpc_url == "http://unreachable":
+            await hang.wait()
+        clients[rpc_url] = _GBClient({"prov": "1.2.3.4"})
+        return clients[rpc_url]
+
+    monkeypatch.setattr(m, "_GolemBaseROClient", types.SimpleNamespace(create_ro_client=_create))
+    resolver = m.ProviderResolver(clock=_Clock(), max_clients=2)
+
+    async def scenario():
+        stuck = asyncio.ensure_future(resolver.resolve("prov", "http://unreachable", "ws://u"))
+        await asyncio.sleep(0.01)
+        # A connect that hangs on one endpoint does not hold up the others
+        for i in range(3):
+            assert await asyncio.wait_for(resolver.resolve("prov", f"http://rpc{i}", "ws://ws"), 1) == (True, "1.2.3.4")
+        # Only the two most recently used endpoints stay connected
+        assert clients["http://rpc0"].disconnected
+        assert not clients["http://rpc1"].disconnected
+        assert not clients["http://rpc2"].disconnected
+        hang.set()
+        await stuck
+        assert clients["http://rpc1"].disconnected
+        await resolver.close()
+        assert all(c.disconnected for c in clients.values())
+
+    _run(scenario())
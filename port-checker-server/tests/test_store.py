@@ -0,0 +1,213 @@
+import asyncio
+import importlib
+import sys
+import types
+
+import pytest
+from fastapi.testclient import TestClient
+
+from port_checker.store import MemoryStore, RedisStore, create_store
+
+
+def _run(coro):
+    # A private loop leaves the default event loop alone for other tests
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class _FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.ops = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def incr(self, key):
+        self.ops.append(("incr", key))
+
+    def pttl(self, key):
+        self.ops.append(("pttl", key))
+
+    async def execute(self):
+        if self.redis.fail:
+            raise ConnectionError("redis down")
+        results = []
+        for op, key in self.ops:
+            if op == "incr":
+                self.redis.values[key] = int(self.redis.values.get(key, 0)) + 1
+                results.append(self.redis.values[key])
+            else:
+                results.append(self.redis.ttls.get(key, -1))
+        return results
+
+
+class _FakeRedis:
+    def __init__(self, fail=False):
+        self.values = {}
+        self.ttls = {}
+        self.fail = fail
+        self.closed = False
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+    async def get(self, key):
+        if self.fail:
+            raise ConnectionError("redis down")
+        value = self.values.get(key)
+        return value.encode() if isinstance(value, str) else value
+
+    async def set(self, key, value, px=None):
+        if self.fail:
+            raise ConnectionError("redis down")
+        self.values[key] = value
+        self.ttls[key] = px
+
+    async def pexpire(self, key, ms):
+        self.ttls[key] = ms
+
+    async def aclose(self):
+        self.closed = True
+
+
+def test_memory_store_expires_and_evicts():
+    clock = _Clock()
+    store = MemoryStore(max_entries=2, clock=clock)
+
+    async def scenario():
+        await store.set("a", {"accessible": True}, 10)
+        await store.set("b", [True, "1.2.3.4"], 20)
+        await store.set("zero", 1, 0)
+        assert await store.get("a") == {"accessible": True}
+        assert await store.get("zero") is None
+        # "b" is the least recently used entry and makes room for "c"
+        await store.set("c", 3, 30)
+        assert await store.get("b") is None and len(store) == 2
+        clock.now += 10
+        assert await store.get("a") is None
+        assert await store.get("c") == 3
+
+        assert [await store.incr("n", 60) for _ in range(3)] == [1, 2, 3]
+        clock.now += 60
+        assert await store.incr("n", 60) == 1
+        await store.close()
+        assert len(store) == 0
+
+    _run(scenario())
+
+
+def test_redis_store_is_shared_between_workers():
+    redis = _FakeRedis()
+    worker_a = RedisStore(redis, prefix="pc:")
+    worker_b = RedisStore(redis, prefix="pc:")
+
+    async def scenario():
+        await worker_a.set("1.2.3.4 80", {"accessible": True, "error": None}, 1.5)
+        assert redis.ttls["pc:1.2.3.4 80"] == 1500
+        assert await worker_b.get("1.2.3.4 80") == {"accessible": True, "error": None}
+        assert await worker_b.get("missing") is None
+
+        assert await worker_a.incr("client 1", 60) == 1
+        assert redis.ttls["pc:client 1"] == 60000
+        redis.ttls["pc:client 1"] = 59000
+        assert await worker_b.incr("client 1", 60) == 2
+        # The window is not extended by later increments
+        assert redis.ttls["pc:client 1"] == 59000
+
+        await worker_a.close()
+        assert redis.closed
+
+    _run(scenario())
+
+
+def test_redis_store_failures_act_as_misses():
+    store = RedisStore(_FakeRedis(fail=True))
+
+    async def scenario():
+        await store.set("k", 1, 10)
+        assert await store.get("k") is None
+        assert await store.incr("k", 60) == 0
+
+    _run(scenario())
+
+
+def test_create_store_selects_backend(monkeypatch):
+    store = create_store(max_entries=5)
+    assert isinstance(store, MemoryStore) and store.max_entries == 5
+
+    monkeypatch.setitem(sys.modules, "redis", None)
+    with pytest.raises(RuntimeError):
+        create_store("redis://localhost")
+
+    fake_asyncio = types.SimpleNamespace(from_url=lambda url: ("client", url))
+    monkeypatch.setitem(sys.modules, "redis", types.SimpleNamespace(asyncio=fake_asyncio))
+    monkeypatch.setitem(sys.modules, "redis.asyncio", fake_asyncio)
+    store = create_store("redis://localhost", prefix="ports:")
+    assert isinstance(store, RedisStore)
+    assert store.client == ("client", "redis://localhost")
+    assert store.prefix == "golem-port-checker:ports:"
+
+
+def test_port_checks_share_cached_results_through_store(monkeypatch):
+    m = importlib.import_module("port_checker.main")
+    redis = _FakeRedis()
+    attempts = []
+
+    async def fake_open_connection(host, port):
+        attempts.append(port)
+        raise ConnectionRefusedError()
+
+    monkeypatch.setattr(asyncio, "open_connection", fake_open_connection)
+    worker_a = m.PortChecker(retries=1, cache=RedisStore(redis))
+    worker_b = m.PortChecker(retries=1, cache=RedisStore(redis))
+
+    first = _run(worker_a.check("1.2.3.4", [80]))
+    second = _run(worker_b.check("1.2.3.4", [80]))
+    assert attempts == [80]
+    assert first == second == {80: m.PortStatus(accessible=False, error="Connection refused")}
+
+
+def test_check_ports_rate_limit(monkeypatch):
+    m = importlib.import_module("port_checker.main")
+    monkeypatch.setattr(m, "port_checks", m.PortChecker(retries=1))
+    monkeypatch.setattr(m, "rate_limits", MemoryStore())
+    monkeypatch.setattr(m, "CHECK_RATE_LIMIT", 2)
+    client = TestClient(m.app)
+
+    async def fake_open_connection(host, port):
+        raise ConnectionRefusedError()
+
+    monkeypatch.setattr(asyncio, "open_connection", fake_open_connection)
+    body = {"provider_ip": "8.8.8.8", "ports": [80]}
+    assert [client.post("/check-ports", json=body).status_code for _ in range(3)] == [200, 200, 429]
+
+
+def test_limits_are_split_between_workers(monkeypatch):
+    m = importlib.import_module("port_checker.main")
+    monkeypatch.setattr(m, "WORKERS", 4)
+    assert m._per_worker(256) == 64
+    assert m._per_worker(2) == 1
+
+
+def test_connection_limit_leaves_room_beside_tunnels(monkeypatch):
+    m = importlib.import_module("port_checker.main")
+    monkeypatch.setattr(m, "WORKERS", 4)
+    monkeypatch.setattr(m, "MAX_TUNNELS", 256)
+    monkeypatch.setattr(m, "REQUEST_CONCURRENCY", 100)
+    # Each worker may hold 64 tunnels and still serve 100 other connections
+    assert m._limit_concurrency() == 164
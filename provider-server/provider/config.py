@@ -257,7 +257,7 @@ class Settings(BaseSettings):
     )
     STREAM_MONITOR_INTERVAL_SECONDS: int = Field(
         default=30,
-        description="How frequently to check stream runway"
+        description="Longest time between on-chain reads of a stream (bounds how late a halt is noticed); stopTime and withdrawals are checked at their own deadlines"
     )
     STREAM_WITHDRAW_INTERVAL_SECONDS: int = Field(
         default=1800,
@@ -95,7 +95,8 @@ class Container(containers.DeclarativeContainer):
         rpc_url=config.POLYGON_RPC_URL,
         contract_address=config.STREAM_PAYMENT_ADDRESS,
     )
-    stream_client = providers.Factory(
+    # Singleton so every sender in the process shares one nonce manager
+    stream_client = providers.Singleton(
         StreamPaymentClient,
         cfg=providers.Callable(
             lambda rpc, addr, pk: _SPC(rpc_url=rpc, contract_address=addr, private_key=pk),
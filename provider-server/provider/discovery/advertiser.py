@@ -1,5 +1,6 @@
 import aiohttp
 import asyncio
+import copy
 import logging
 from abc import ABC, abstractmethod
 from typing import Optional
@@ -47,6 +48,10 @@ class DiscoveryServerAdvertiser(Advertiser):
         self.provider_id = provider_id or settings.PROVIDER_ID
         self.session: Optional[aiohttp.ClientSession] = None
         self._stop_event = asyncio.Event()
+        # Last payload accepted by the discovery server and its content hash;
+        # while the payload is unchanged a small heartbeat replaces the full POST
+        self._last_payload: Optional[dict] = None
+        self._content_hash: Optional[str] = None
 
     async def initialize(self):
         """Initialize the advertiser."""
@@ -125,27 +130,32 @@ class DiscoveryServerAdvertiser(Advertiser):
                     platform_str = 'x86_64'
                 else:
                     platform_str = raw
+            payload = {
+                "ip_address": ip_address,
+                "country": settings.PROVIDER_COUNTRY,
+                "platform": platform_str,
+                "resources": resources,
+                "pricing": {
+                    "usd_per_core_month": settings.PRICE_USD_PER_CORE_MONTH,
+                    "usd_per_gb_ram_month": settings.PRICE_USD_PER_GB_RAM_MONTH,
+                    "usd_per_gb_storage_month": settings.PRICE_USD_PER_GB_STORAGE_MONTH,
+                    "glm_per_core_month": settings.PRICE_GLM_PER_CORE_MONTH,
+                    "glm_per_gb_ram_month": settings.PRICE_GLM_PER_GB_RAM_MONTH,
+                    "glm_per_gb_storage_month": settings.PRICE_GLM_PER_GB_STORAGE_MONTH,
+                }
+            }
+            headers = {
+                "X-Provider-ID": self.provider_id,
+                "X-Provider-Signature": "signature",
+                "Content-Type": "application/json"
+            }
+            if payload == self._last_payload and self._content_hash:
+                if await self._send_heartbeat(headers):
+                    return
             async with self.session.post(
                 f"{self.discovery_url}/api/v1/advertisements",
-                headers={
-                    "X-Provider-ID": self.provider_id,
-                    "X-Provider-Signature": "signature",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "ip_address": ip_address,
-                    "country": settings.PROVIDER_COUNTRY,
-                    "platform": platform_str,
-                    "resources": resources,
-                    "pricing": {
-                        "usd_per_core_month": settings.PRICE_USD_PER_CORE_MONTH,
-                        "usd_per_gb_ram_month": settings.PRICE_USD_PER_GB_RAM_MONTH,
-                        "usd_per_gb_storage_month": settings.PRICE_USD_PER_GB_STORAGE_MONTH,
-                        "glm_per_core_month": settings.PRICE_GLM_PER_CORE_MONTH,
-                        "glm_per_gb_ram_month": settings.PRICE_GLM_PER_GB_RAM_MONTH,
-                        "glm_per_gb_storage_month": settings.PRICE_GLM_PER_GB_STORAGE_MONTH,
-                    }
-                },
+                headers=headers,
+                json=payload,
                 timeout=aiohttp.ClientTimeout(total=5)
             ) as response:
                 if not response.ok:
@@ -153,6 +163,12 @@ class DiscoveryServerAdvertiser(Advertiser):
                     raise Exception(
                         f"Failed to post advertisement: {response.status} - {error_text}"
                     )
+                try:
+                    content_hash = (await response.json()).get("content_hash")
+                except (aiohttp.ContentTypeError, ValueError):
+                    content_hash = None
+                self._last_payload = copy.deepcopy(payload)
+                self._content_hash = content_hash
                 logger.info(
                     f"Posted advertisement with resources: CPU={resources['cpu']}, "
                     f"Memory={resources['memory']}GB, Storage={resources['storage']}GB"
@@ -161,6 +177,24 @@ class DiscoveryServerAdvertiser(Advertiser):
             logger.error("Advertisement request timed out")
             raise
 
+    async def _send_heartbeat(self, headers: dict) -> bool:
+        """Refresh the unchanged advertisement by content hash.
+
+        Returns False when the server no longer holds matching content (or does
+        not support heartbeats), in which case the full advertisement is posted.
+        """
+        async with self.session.patch(
+            f"{self.discovery_url}/api/v1/advertisements/{self.provider_id}",
+            headers={**headers, "If-Match": f'"{self._content_hash}"'},
+            timeout=aiohttp.ClientTimeout(total=5)
+        ) as response:
+            if response.status == 204:
+                logger.debug("Refreshed unchanged advertisement")
+                return True
+            logger.info(f"Advertisement heartbeat rejected ({response.status}), posting full advertisement")
+            self._content_hash = None
+            return False
+
     @async_retry(
         retries=settings.RETRY_ATTEMPTS,
         delay=settings.RETRY_DELAY_SECONDS,
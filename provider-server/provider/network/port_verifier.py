@@ -1,13 +1,17 @@
+import json
 import socket
 import asyncio
+import inspect
 import aiohttp
 import logging
-from typing import Set, List, Dict, Optional, Tuple
+from typing import Awaitable, Callable, Set, List, Dict, Optional, Tuple, Union
 from dataclasses import dataclass
 import requests
 
 logger = logging.getLogger(__name__)
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
 
 @dataclass
 class ServerAttempt:
@@ -25,6 +29,14 @@ class PortVerificationResult:
     verified_by: str = None  # Server that successfully verified the port
     attempts: List[ServerAttempt] = None  # Track all server attempts
 
+# Result callbacks may be plain functions or coroutine functions
+ResultCallback = Callable[[PortVerificationResult], Union[None, Awaitable[None]]]
+
+async def _notify(callback: ResultCallback, result: PortVerificationResult) -> None:
+    outcome = callback(result)
+    if inspect.isawaitable(outcome):
+        await outcome
+
 class PortVerifier:
     """Verifies port accessibility both locally and externally."""
     
@@ -38,17 +50,23 @@ class PortVerifier:
         self.port_check_servers = port_check_servers
         self.discovery_port = discovery_port
     
-    async def verify_local_binding(self, ports: List[int]) -> Set[int]:
+    async def verify_local_binding(
+        self,
+        ports: List[int],
+        listeners: Optional[Dict[int, asyncio.AbstractServer]] = None,
+    ) -> Set[int]:
         """Try to bind to ports locally to verify availability.
         
         Args:
             ports: List of ports to verify
+            listeners: Filled with the temporary listener of each bound port;
+                a listener removed from it is no longer closed here
             
         Returns:
             Set of ports that were successfully bound
         """
         available_ports = set()
-        temp_listeners = []
+        temp_listeners = listeners if listeners is not None else {}
         
         for port in ports:
             try:
@@ -60,7 +78,7 @@ class PortVerifier:
                             '0.0.0.0', 
                             port
                         )
-                        temp_listeners.append(server)
+                        temp_listeners[port] = server
                         available_ports.add(port)
                         logger.debug(f"Created temporary listener for discovery port {port}")
                         continue
@@ -80,7 +98,7 @@ class PortVerifier:
                         '0.0.0.0', 
                         port
                     )
-                    temp_listeners.append(server)
+                    temp_listeners[port] = server
                     available_ports.add(port)
                     logger.debug(f"Created temporary listener on port {port}")
                 except Exception as e:
@@ -98,7 +116,7 @@ class PortVerifier:
             yield available_ports
         finally:
             # Cleanup temporary listeners
-            for server in temp_listeners:
+            for server in temp_listeners.values():
                 server.close()
                 await server.wait_closed()
             if temp_listeners:
@@ -116,57 +134,83 @@ class PortVerifier:
     
     async def verify_external_access(
         self, 
-        ports: Set[int]
+        ports: Set[int],
+        on_result: Optional[ResultCallback] = None,
     ) -> Dict[int, PortVerificationResult]:
         """Verify external accessibility using port check servers.
         
+        Results are streamed from servers that support it, so ``on_result``
+        sees each port as soon as a server has checked it. Servers are tried
+        in turn until every port is accessible.
+
         Args:
             ports: Set of ports to verify
+            on_result: Called with each new or improved port result; awaited
+                if it returns an awaitable
             
         Returns:
             Dictionary mapping ports to their verification results
         """
         results: Dict[int, PortVerificationResult] = {}
         attempts: List[ServerAttempt] = []
+
+        async def record(server: str, port: int, accessible: bool, err: Optional[str]) -> None:
+            if port not in results or (accessible and not results[port].accessible):
+                results[port] = PortVerificationResult(
+                    port=port,
+                    accessible=accessible,
+                    error=err,
+                    verified_by=server if accessible else None,
+                    attempts=[],
+                )
+                if on_result is not None:
+                    await _notify(on_result, results[port])
         
         # Try each server
         for server in self.port_check_servers:
+            pending = sorted(port for port in ports if not (port in results and results[port].accessible))
+            if not pending:
+                break
             try:
                 public_ip = await self._get_public_ip()
                 
                 async with aiohttp.ClientSession() as session:
+                    # Streamed results arrive as each port finishes, so the
+                    # timeout bounds the wait between results, not the whole check
                     response = await session.post(
                         f"{server}/check-ports",
                         json={
                             "provider_ip": public_ip,
-                            "ports": list(ports)
+                            "ports": pending
                         },
-                        timeout=30  # 30 second timeout for port checking
+                        headers={"Accept": NDJSON_MEDIA_TYPE},
+                        timeout=aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=30)
                     )
                     
                     if response.status == 200:
-                        data = await response.json()
                         # Treat a 200 response as a successful attempt regardless of overall success flag.
                         # The 'success' field in the checker indicates if any port was reachable, not server health.
-                        raw_results = data.get("results", {}) or {}
-                        for port_key, result in raw_results.items():
-                            try:
-                                port = int(port_key)
-                            except Exception:
-                                # Some implementations might already use ints
-                                port = int(result.get("port", 0)) if isinstance(result, dict) else 0
-                            if not port:
-                                continue
-                            accessible = bool(result.get("accessible"))
-                            err = result.get("error")
-                            if port not in results or (accessible and not results[port].accessible):
-                                results[port] = PortVerificationResult(
-                                    port=port,
-                                    accessible=accessible,
-                                    error=err,
-                                    verified_by=server if accessible else None,
-                                    attempts=[],
-                                )
+                        if response.content_type == NDJSON_MEDIA_TYPE:
+                            async for line in response.content:
+                                if not line.strip():
+                                    continue
+                                item = json.loads(line)
+                                # The closing summary line carries no port
+                                if "port" in item:
+                                    await record(server, int(item["port"]), bool(item.get("accessible")), item.get("error"))
+                        else:
+                            # Checkers without streaming answer with a single JSON document
+                            data = await response.json()
+                            raw_results = data.get("results", {}) or {}
+                            for port_key, result in raw_results.items():
+                                try:
+                                    port = int(port_key)
+                                except Exception:
+                                    # Some implementations might already use ints
+                                    port = int(result.get("port", 0)) if isinstance(result, dict) else 0
+                                if not port:
+                                    continue
+                                await record(server, port, bool(result.get("accessible")), result.get("error"))
                         attempts.append(ServerAttempt(server=server, success=True))
                         logger.info(f"Port verification completed using {server}")
                     else:
@@ -200,8 +244,9 @@ class PortVerifier:
                 ))
                 logger.warning(error_msg)
         
-        # If no servers responded successfully, fail verification
-        if not any(attempt.success for attempt in attempts):
+        # If no servers responded successfully, fail verification; a stream
+        # that broke off still counts for the ports it already reported
+        if not results and not any(attempt.success for attempt in attempts):
             error_msg = (
                 "Failed to connect to any port check servers. Please ensure:\n"
                 "1. At least one port check server is running and accessible\n"
@@ -265,11 +310,22 @@ class PortVerifier:
             logger.error(f"Failed to check port {port} status: {e}")
             return None
 
-    async def verify_ports(self, ports: List[int]) -> Dict[int, PortVerificationResult]:
+    async def verify_ports(
+        self,
+        ports: List[int],
+        on_result: Optional[ResultCallback] = None,
+    ) -> Dict[int, PortVerificationResult]:
         """Verify ports both locally and externally.
         
+        The temporary listener on a port is closed as soon as the port is
+        verified, and ``on_result`` is only called once it has finished
+        closing, so the port can be put to use while the rest of the range is
+        still being checked.
+
         Args:
             ports: List of ports to verify
+            on_result: Called with each new or improved port result; awaited
+                if it returns an awaitable
             
         Returns:
             Dictionary mapping ports to their verification results
@@ -282,7 +338,18 @@ class PortVerifier:
         
         # First verify ports with local binding
         logger.info("Checking local port availability...")
-        async for local_available in self.verify_local_binding(ports):
+        listeners: Dict[int, asyncio.AbstractServer] = {}
+
+        async def release(result: PortVerificationResult) -> None:
+            if result.accessible:
+                listener = listeners.pop(result.port, None)
+                if listener is not None:
+                    listener.close()
+                    await listener.wait_closed()
+            if on_result is not None:
+                await _notify(on_result, result)
+
+        async for local_available in self.verify_local_binding(ports, listeners):
             if not local_available:
                 logger.error("No ports available for local binding")
                 return {
@@ -296,7 +363,7 @@ class PortVerifier:
             
             # Verify external access while listeners are active
             logger.info("Starting external port verification...")
-            results = await self.verify_external_access(local_available)
+            results = await self.verify_external_access(local_available, on_result=release)
             
             # Log verification results
             accessible_ports = [port for port, result in results.items() if result.accessible]
@@ -1,12 +1,14 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 from web3 import Web3
 from eth_account import Account
 from golem_streaming_abi import STREAM_PAYMENT_ABI
 
+from .tx_manager import TransactionManager
+
 
  # ABI imported from shared package
 
@@ -26,29 +28,17 @@ class StreamPaymentClient:
         self.contract = self.web3.eth.contract(
             address=Web3.to_checksum_address(cfg.contract_address), abi=STREAM_PAYMENT_ABI
         )
+        self.transactions = TransactionManager(self.web3, self.account)
 
     def _send(self, fn) -> Dict[str, Any]:
-        tx = fn.build_transaction(
-            {
-                "from": self.account.address,
-                "nonce": self.web3.eth.get_transaction_count(self.account.address),
-            }
-        )
-        if hasattr(self.account, "sign_transaction"):
-            signed = self.account.sign_transaction(tx)
-            raw = getattr(signed, "rawTransaction", None) or getattr(signed, "raw_transaction", None)
-            if raw is None:
-                raise RuntimeError("sign_transaction did not return raw transaction bytes")
-            tx_hash = self.web3.eth.send_raw_transaction(raw)
-        else:
-            tx_hash = self.web3.eth.send_transaction(tx)
-        receipt = self.web3.eth.wait_for_transaction_receipt(tx_hash)
-        return {"transactionHash": tx_hash.hex(), "status": receipt.status}
+        pending, receipt = self.transactions.send(fn)
+        return {"transactionHash": pending.tx_hash.hex(), "status": receipt.status}
 
     def withdraw(self, stream_id: int) -> str:
         fn = self.contract.functions.withdraw(int(stream_id))
         receipt = self._send(fn)
         return receipt["transactionHash"]
+
     def terminate(self, stream_id: int) -> str:
         fn = self.contract.functions.terminate(int(stream_id))
         receipt = self._send(fn)
@@ -77,7 +67,9 @@ class StreamPaymentReader:
             "halted": bool(halted),
         }
 
-    def verify_stream(self, stream_id: int, expected_recipient: str) -> tuple[bool, str]:
+    def verify_stream(
+        self, stream_id: int, expected_recipient: str, now: Optional[int] = None
+    ) -> tuple[bool, str]:
         try:
             s = self.get_stream(stream_id)
         except Exception as e:
@@ -86,7 +78,9 @@ class StreamPaymentReader:
             return False, "recipient mismatch"
         if s["deposit"] <= 0:
             return False, "no deposit"
-        now = int(self.web3.eth.get_block("latest")["timestamp"])
+        # Callers verifying many streams pass one shared chain timestamp
+        if now is None:
+            now = int(self.web3.eth.get_block("latest")["timestamp"])
         if s["startTime"] > now:
             return False, "stream not started"
         if s["halted"]:
@@ -1,13 +1,27 @@
 import asyncio
-from typing import Optional
+import heapq
+import time
+from typing import Dict, List, Optional, Tuple
 
 from ..utils.logging import setup_logger
 from ..vm.models import VMNotFoundError
 
 logger = setup_logger(__name__)
 
+# Upper bound on concurrent on-chain stream reads when many deadlines fall due together
+_MAX_CONCURRENT_READS = 8
+
 
 class StreamMonitor:
+    """Enforces stream runway and withdraws vested funds.
+
+    Each mapped stream has a deadline (in chain time) at which action may be
+    needed: its ``stopTime``, the moment it becomes eligible for withdrawal,
+    or the next monitor interval. Deadlines live in a priority queue, so an
+    exhausted stream is deleted as soon as its ``stopTime`` passes. A halt can
+    happen at any time, so no stream goes longer than one interval unread.
+    """
+
     def __init__(self, *, stream_map, vm_service, reader, client, settings):
         self.stream_map = stream_map
         self.vm_service = vm_service
@@ -15,6 +29,13 @@ class StreamMonitor:
         self.client = client
         self.settings = settings
         self._task: Optional[asyncio.Task] = None
+        # (deadline, vm_id, stream_id); stale entries are skipped on pop
+        self._queue: List[Tuple[int, str, int]] = []
+        self._deadlines: Dict[str, Tuple[int, int]] = {}
+        self._last_withdraw: Dict[int, int] = {}
+        self._withdrawals: Dict[int, asyncio.Task] = {}
+        # chain time minus local time, refreshed on every block read
+        self._clock_offset: Optional[float] = None
 
     def _get(self, key: str, default=None):
         """Safely read setting from either an object with attributes or a dict-like mapping."""
@@ -42,131 +63,234 @@ class StreamMonitor:
             except asyncio.CancelledError:
                 pass
 
+    def _schedule(self, vm_id: str, stream_id: int, deadline: int) -> None:
+        self._deadlines[vm_id] = (int(deadline), int(stream_id))
+        heapq.heappush(self._queue, (int(deadline), vm_id, int(stream_id)))
+
+    def _unschedule(self, vm_id: str) -> None:
+        self._deadlines.pop(vm_id, None)
+
+    def _next_deadline(self) -> Optional[int]:
+        while self._queue:
+            deadline, vm_id, stream_id = self._queue[0]
+            if self._deadlines.get(vm_id) == (deadline, stream_id):
+                return deadline
+            heapq.heappop(self._queue)
+        return None
+
+    def _pop_due(self, now: int) -> List[Tuple[str, int]]:
+        due: List[Tuple[str, int]] = []
+        while True:
+            deadline = self._next_deadline()
+            if deadline is None or deadline > now:
+                return due
+            _, vm_id, stream_id = heapq.heappop(self._queue)
+            del self._deadlines[vm_id]
+            due.append((vm_id, stream_id))
+
+    async def _sync_stream_map(self) -> None:
+        """Schedule newly mapped streams for an immediate check and forget removed ones."""
+        items = await self.stream_map.all_items()
+        for vm_id in list(self._deadlines):
+            if items.get(vm_id) != self._deadlines[vm_id][1]:
+                self._unschedule(vm_id)
+        for vm_id, stream_id in items.items():
+            if vm_id not in self._deadlines:
+                self._schedule(vm_id, int(stream_id), 0)
+
+    async def _chain_time(self) -> int:
+        block = await asyncio.to_thread(self.reader.web3.eth.get_block, "latest")
+        now = int(block["timestamp"])
+        self._clock_offset = now - time.time()
+        return now
+
+    def _estimated_chain_time(self) -> Optional[float]:
+        if self._clock_offset is None:
+            return None
+        return time.time() + self._clock_offset
+
+    def _next_delay(self) -> float:
+        """Seconds to sleep: until the earliest deadline, bounded by the map sync interval."""
+        interval = max(int(self._get("STREAM_MONITOR_INTERVAL_SECONDS", 60)), 0)
+        deadline = self._next_deadline()
+        estimate = self._estimated_chain_time()
+        if deadline is None or estimate is None:
+            return interval
+        return max(min(deadline - estimate, interval), 0)
+
+    def _withdraw_eligible_at(self, stream_id: int, s: dict, now: int) -> Optional[int]:
+        """Chain time at which ``stream_id`` may next be withdrawn, or None if never."""
+        rate = int(s["ratePerSecond"])
+        if rate <= 0:
+            return None
+        min_wei = int(self._get("STREAM_MIN_WITHDRAW_WEI", 0))
+        # Time at which vested - withdrawn reaches the configured minimum (ceil division)
+        by_amount = int(s["startTime"]) + -(-(int(s["withdrawn"]) + min_wei) // rate)
+        if by_amount > int(s["stopTime"]):
+            # Vesting ends before the configured minimum is ever reached
+            return None
+        interval = int(self._get("STREAM_WITHDRAW_INTERVAL_SECONDS", 1800))
+        by_interval = self._last_withdraw.get(stream_id, now - interval) + interval
+        return max(by_amount, by_interval)
+
+    def _next_check(self, stream_id: int, s: dict, now: int) -> int:
+        """Earliest chain time at which the stream needs another look."""
+        # Halts and terminations are not predictable from the stream, so re-read every interval
+        interval = max(int(self._get("STREAM_MONITOR_INTERVAL_SECONDS", 60)), 1)
+        candidates = [int(s["stopTime"]), now + interval]
+        if self._get("STREAM_WITHDRAW_ENABLED", False) and self.client and stream_id not in self._withdrawals:
+            eligible = self._withdraw_eligible_at(stream_id, s, now)
+            if eligible is not None:
+                candidates.append(eligible)
+        return max(min(candidates), now + 1)
+
     async def _run(self):
-        last_withdraw = 0
+        delay: float = int(self._get("STREAM_MONITOR_INTERVAL_SECONDS", 60))
+        reads = asyncio.Semaphore(_MAX_CONCURRENT_READS)
         while True:
             try:
-                await asyncio.sleep(int(self._get("STREAM_MONITOR_INTERVAL_SECONDS", 60)))
-                items = await self.stream_map.all_items()
-                now = int(self.reader.web3.eth.get_block("latest")["timestamp"]) if items else 0
-                logger.debug(f"stream monitor tick: {len(items)} streams, now={now}")
-                for vm_id, stream_id in items.items():
-                    try:
-                        s = self.reader.get_stream(stream_id)
-                    except Exception as e:
-                        # No payment info available; delete the VM and remove mapping per unified policy
-                        logger.info(
-                            f"Deleting VM {vm_id} due to missing/unavailable payment stream (id={stream_id}): {e}"
-                        )
-                        try:
-                            await self.vm_service.delete_vm(vm_id)
-                        except Exception as del_err:
-                            logger.warning(f"delete_vm failed for {vm_id} after stream lookup failure: {del_err}")
-                        try:
-                            await self.stream_map.remove(vm_id)
-                        except Exception as rem_err:
-                            logger.debug(f"failed to remove vm {vm_id} from stream map: {rem_err}")
-                        continue
-                    # Stop VM if remaining runway < threshold
-                    remaining = max(int(s["stopTime"]) - int(now), 0)
-                    logger.debug(
-                        f"stream {stream_id} for VM {vm_id}: start={s['startTime']} stop={s['stopTime']} "
-                        f"rate={s['ratePerSecond']} withdrawn={s['withdrawn']} halted={s['halted']} remaining={remaining}s"
-                    )
-                    # If stream is force-halted, delete immediately to free all resources
-                    if bool(s.get("halted")):
-                        logger.info(
-                            f"Deleting VM {vm_id} due to halted stream (id={stream_id}, now={now})"
-                        )
-                        try:
-                            await self.vm_service.delete_vm(vm_id)
-                            # Best-effort verification of deletion for investigation
-                            try:
-                                _ = await self.vm_service.get_vm_status(vm_id)
-                                logger.info(
-                                    f"Post-delete status check: VM {vm_id} still present after delete request"
-                                )
-                            except VMNotFoundError:
-                                logger.info(
-                                    f"Post-delete status check: VM {vm_id} not found (expected)"
-                                )
-                            except Exception as chk_err:
-                                logger.debug(
-                                    f"Post-delete status check failed for {vm_id}: {chk_err}"
-                                )
-                        except Exception as e:
-                            logger.warning(f"delete_vm failed for {vm_id}: {e}")
-                        try:
-                            await self.stream_map.remove(vm_id)
-                            logger.debug(f"Removed {vm_id} from stream map after delete")
-                        except Exception as e:
-                            logger.debug(f"failed to remove vm {vm_id} from stream map: {e}")
-                        continue
-
-                    # If runway is exhausted, delete the VM and remove mapping
-                    if remaining == 0:
-                        logger.info(
-                            f"Deleting VM {vm_id} as stream runway is exhausted (id={stream_id}, now={now}, stop={s.get('stopTime')})"
-                        )
-                        # Capture pre-delete status for context
-                        try:
-                            pre = await self.vm_service.get_vm_status(vm_id)
-                            logger.info(
-                                f"Pre-delete status for {vm_id}: status={getattr(pre, 'status', '?')} ip={getattr(pre, 'ip_address', '?')}"
-                            )
-                        except VMNotFoundError:
-                            logger.info(
-                                f"Pre-delete status for {vm_id}: not found (will remove mapping)"
-                            )
-                        except Exception as pre_err:
-                            logger.debug(f"Pre-delete status check failed for {vm_id}: {pre_err}")
-
-                        try:
-                            await self.vm_service.delete_vm(vm_id)
-                            # Verify deletion
-                            try:
-                                _ = await self.vm_service.get_vm_status(vm_id)
-                                logger.info(
-                                    f"Post-delete status check: VM {vm_id} still present after delete request"
-                                )
-                            except VMNotFoundError:
-                                logger.info(
-                                    f"Post-delete status check: VM {vm_id} not found (expected)"
-                                )
-                            except Exception as chk_err:
-                                logger.debug(
-                                    f"Post-delete status check failed for {vm_id}: {chk_err}"
-                                )
-                        except Exception as e:
-                            logger.warning(f"delete_vm failed for {vm_id}: {e}")
-                        try:
-                            await self.stream_map.remove(vm_id)
-                            logger.info(f"Removed mapping for {vm_id} after delete on exhausted runway")
-                        except Exception as rem_err:
-                            logger.debug(
-                                f"failed to remove vm {vm_id} from stream map after delete: {rem_err}"
-                            )
-                        continue
-
-                    # Otherwise, do not stop; just log health and consider withdrawals
-                    logger.debug(
-                        f"VM {vm_id} stream {stream_id} healthy (remaining={remaining}s)"
-                    )
-                    # Withdraw if enough vested and configured
-                    if self._get("STREAM_WITHDRAW_ENABLED", False) and self.client:
-                        vested = max(min(now, s["stopTime"]) - s["startTime"], 0) * s["ratePerSecond"]
-                        withdrawable = max(vested - s["withdrawn"], 0)
-                        logger.debug(f"withdraw check stream {stream_id}: vested={vested} withdrawable={withdrawable}")
-                        # Enforce a minimum interval between withdrawals
-                        if withdrawable >= int(self._get("STREAM_MIN_WITHDRAW_WEI", 0)) and (
-                            now - last_withdraw >= int(self._get("STREAM_WITHDRAW_INTERVAL_SECONDS", 1800))
-                        ):
-                            try:
-                                self.client.withdraw(stream_id)
-                                last_withdraw = now
-                            except Exception as e:
-                                logger.warning(f"withdraw failed for {stream_id}: {e}")
+                await asyncio.sleep(delay)
+                checked = await self._check_due(reads)
+                # Block timestamps trail wall time; avoid spinning until the chain catches up
+                delay = max(self._next_delay(), 1) if checked == 0 else self._next_delay()
             except asyncio.CancelledError:
                 break
             except Exception as e:
                 logger.error(f"stream monitor error: {e}")
+                delay = int(self._get("STREAM_MONITOR_INTERVAL_SECONDS", 60))
+        if self._withdrawals:
+            # Let withdrawals that already started finish recording their outcome
+            await asyncio.wait(list(self._withdrawals.values()), timeout=5)
+
+    async def _check_due(self, reads: asyncio.Semaphore) -> Optional[int]:
+        """Check every stream whose deadline has passed.
+
+        Returns the number of streams checked, or None when nothing was due and
+        the block read was skipped.
+        """
+        await self._sync_stream_map()
+        deadline = self._next_deadline()
+        estimate = self._estimated_chain_time()
+        if deadline is None or (estimate is not None and deadline > estimate + 1):
+            # Nothing is due yet; skip the block read entirely
+            return None
+        now = await self._chain_time()
+        due = self._pop_due(now)
+        logger.debug(f"stream monitor wakeup: {len(due)} due of {len(self._deadlines) + len(due)} streams, now={now}")
+
+        async def _bounded(vm_id: str, stream_id: int):
+            async with reads:
+                await self._check_stream(vm_id, stream_id, now)
+
+        await asyncio.gather(*(_bounded(vm_id, sid) for vm_id, sid in due))
+        return len(due)
+
+    async def _check_stream(self, vm_id: str, stream_id: int, now: int) -> None:
+        try:
+            s = await asyncio.to_thread(self.reader.get_stream, stream_id)
+        except Exception as e:
+            # No payment info available; delete the VM and remove mapping per unified policy
+            logger.info(
+                f"Deleting VM {vm_id} due to missing/unavailable payment stream (id={stream_id}): {e}"
+            )
+            try:
+                await self.vm_service.delete_vm(vm_id)
+            except Exception as del_err:
+                logger.warning(f"delete_vm failed for {vm_id} after stream lookup failure: {del_err}")
+            try:
+                await self.stream_map.remove(vm_id)
+            except Exception as rem_err:
+                logger.debug(f"failed to remove vm {vm_id} from stream map: {rem_err}")
+            return
+        # Stop VM if remaining runway < threshold
+        remaining = max(int(s["stopTime"]) - int(now), 0)
+        logger.debug(
+            f"stream {stream_id} for VM {vm_id}: start={s['startTime']} stop={s['stopTime']} "
+            f"rate={s['ratePerSecond']} withdrawn={s['withdrawn']} halted={s['halted']} remaining={remaining}s"
+        )
+        # If stream is force-halted, delete immediately to free all resources
+        if bool(s.get("halted")):
+            logger.info(
+                f"Deleting VM {vm_id} due to halted stream (id={stream_id}, now={now})"
+            )
+            await self._delete_vm(vm_id)
+            try:
+                await self.stream_map.remove(vm_id)
+                logger.debug(f"Removed {vm_id} from stream map after delete")
+            except Exception as e:
+                logger.debug(f"failed to remove vm {vm_id} from stream map: {e}")
+            return
+
+        # If runway is exhausted, delete the VM and remove mapping
+        if remaining == 0:
+            logger.info(
+                f"Deleting VM {vm_id} as stream runway is exhausted (id={stream_id}, now={now}, stop={s.get('stopTime')})"
+            )
+            # Capture pre-delete status for context
+            try:
+                pre = await self.vm_service.get_vm_status(vm_id)
+                logger.info(
+                    f"Pre-delete status for {vm_id}: status={getattr(pre, 'status', '?')} ip={getattr(pre, 'ip_address', '?')}"
+                )
+            except VMNotFoundError:
+                logger.info(
+                    f"Pre-delete status for {vm_id}: not found (will remove mapping)"
+                )
+            except Exception as pre_err:
+                logger.debug(f"Pre-delete status check failed for {vm_id}: {pre_err}")
+
+            await self._delete_vm(vm_id)
+            try:
+                await self.stream_map.remove(vm_id)
+                logger.info(f"Removed mapping for {vm_id} after delete on exhausted runway")
+            except Exception as rem_err:
+                logger.debug(
+                    f"failed to remove vm {vm_id} from stream map after delete: {rem_err}"
+                )
+            return
+
+        # Otherwise, do not stop; just log health and consider withdrawals
+        logger.debug(
+            f"VM {vm_id} stream {stream_id} healthy (remaining={remaining}s)"
+        )
+        # Withdraw if enough vested and configured
+        if self._get("STREAM_WITHDRAW_ENABLED", False) and self.client and stream_id not in self._withdrawals:
+            vested = max(min(now, s["stopTime"]) - s["startTime"], 0) * s["ratePerSecond"]
+            withdrawable = max(vested - s["withdrawn"], 0)
+            logger.debug(f"withdraw check stream {stream_id}: vested={vested} withdrawable={withdrawable}")
+            eligible_at = self._withdraw_eligible_at(stream_id, s, now)
+            if withdrawable > 0 and eligible_at is not None and eligible_at <= now:
+                self._last_withdraw[stream_id] = now
+                self._withdrawals[stream_id] = asyncio.create_task(
+                    self._withdraw(stream_id), name=f"stream-withdraw-{stream_id}"
+                )
+        self._schedule(vm_id, stream_id, self._next_check(stream_id, s, now))
+
+    async def _withdraw(self, stream_id: int) -> None:
+        """Withdraw in the background so confirmation does not delay other deadlines."""
+        try:
+            await asyncio.to_thread(self.client.withdraw, stream_id)
+        except Exception as e:
+            logger.warning(f"withdraw failed for {stream_id}: {e}")
+        finally:
+            self._withdrawals.pop(stream_id, None)
+
+    async def _delete_vm(self, vm_id: str) -> None:
+        try:
+            await self.vm_service.delete_vm(vm_id)
+            # Best-effort verification of deletion for investigation
+            try:
+                _ = await self.vm_service.get_vm_status(vm_id)
+                logger.info(
+                    f"Post-delete status check: VM {vm_id} still present after delete request"
+                )
+            except VMNotFoundError:
+                logger.info(
+                    f"Post-delete status check: VM {vm_id} not found (expected)"
+                )
+            except Exception as chk_err:
+                logger.debug(
+                    f"Post-delete status check failed for {vm_id}: {chk_err}"
+                )
+        except Exception as e:
+            logger.warning(f"delete_vm failed for {vm_id}: {e}")
@@ -2,12 +2,17 @@ import asyncio
 from fastapi import FastAPI
 
 from .utils.logging import setup_logger
+from .vm.models import VMNotFoundError
 from .vm.service import VMService
 from .discovery.service import AdvertisementService
 from .utils.pricing import PricingAutoUpdater
 
 logger = setup_logger(__name__)
 
+# Startup reconciliation limits: concurrent RPC stream reads and concurrent VM deletions
+_RECONCILE_VERIFY_CONCURRENCY = 16
+_RECONCILE_DELETE_CONCURRENCY = 4
+
 
 class ProviderService:
     """Service for managing the provider's lifecycle."""
@@ -19,6 +24,7 @@ class ProviderService:
         self._pricing_updater: PricingAutoUpdater | None = None
         self._pricing_task: asyncio.Task | None = None
         self._stream_monitor = None
+        self._reconcile_task: asyncio.Task | None = None
 
     async def setup(self, app: FastAPI):
         """Setup and initialize the provider components."""
@@ -40,65 +46,24 @@ class ProviderService:
             await self.vm_service.provider.initialize()
 
             # Before starting advertisement, sync allocated resources with existing VMs
+            vm_resources = {}
             try:
                 vm_resources = await self.vm_service.get_all_vms_resources()
                 await self.vm_service.resource_tracker.sync_with_multipass(vm_resources)
             except Exception as e:
                 logger.warning(f"Failed to sync resources with existing VMs: {e}")
 
-            # Cross-check running VMs against payment streams. If a VM has no
-            # active stream, it is no longer rented: terminate it and free resources.
-            try:
-                # Only perform checks if payments are configured
-                if settings.STREAM_PAYMENT_ADDRESS and not settings.STREAM_PAYMENT_ADDRESS.lower().endswith("0000000000000000000000000000000000000000") and settings.POLYGON_RPC_URL:
-                    stream_map = app.container.stream_map()
-                    reader = app.container.stream_reader()
-
-                    # Use the most recent view of VMs from the previous sync
-                    vm_ids = list(vm_resources.keys()) if 'vm_resources' in locals() else []
-                    for vm_id in vm_ids:
-                        try:
-                            stream_id = await stream_map.get(vm_id)
-                        except Exception:
-                            stream_id = None
-
-                        if stream_id is None:
-                            reason = "no stream mapped"
-                            should_terminate = True
-                        else:
-                            try:
-                                ok, msg = reader.verify_stream(int(stream_id), settings.PROVIDER_ID)
-                                should_terminate = not ok
-                                reason = msg if not ok else "ok"
-                            except Exception as e:
-                                # If verification cannot be performed, be conservative and keep the VM
-                                logger.warning(f"Stream verification error for VM {vm_id} (stream {stream_id}): {e}")
-                                should_terminate = False
-                                reason = f"verification error: {e}"
-
-                        if should_terminate:
-                            logger.info(
-                                f"Deleting VM {vm_id}: inactive stream (stream_id={stream_id}, reason={reason})"
-                            )
-                            try:
-                                await self.vm_service.delete_vm(vm_id)
-                            except Exception as e:
-                                logger.warning(f"Failed to delete VM {vm_id}: {e}")
-                            try:
-                                await stream_map.remove(vm_id)
-                            except Exception:
-                                pass
-
-                    # Re-sync after any terminations to ensure ads reflect capacity
-                    try:
-                        vm_resources = await self.vm_service.get_all_vms_resources()
-                        await self.vm_service.resource_tracker.sync_with_multipass(vm_resources)
-                    except Exception as e:
-                        logger.warning(f"Post-termination resource sync failed: {e}")
-                else:
-                    logger.info("Payments not configured; skipping startup stream checks")
-            except Exception as e:
-                logger.warning(f"Failed to reconcile VMs with payment streams: {e}")
+            # Cross-check running VMs against payment streams in the background. If a
+            # VM has no active stream, it is no longer rented: terminate it and free
+            # resources. Until then every existing VM stays reserved, so advertising
+            # and serving can start right away without over-committing capacity.
+            if settings.STREAM_PAYMENT_ADDRESS and not settings.STREAM_PAYMENT_ADDRESS.lower().endswith("0000000000000000000000000000000000000000") and settings.POLYGON_RPC_URL:
+                self._reconcile_task = asyncio.create_task(
+                    self._reconcile_streams(app, vm_resources),
+                    name="stream-reconcile",
+                )
+            else:
+                logger.info("Payments not configured; skipping startup stream checks")
 
             await self.advertisement_service.start()
             # Start pricing auto-updater; trigger re-advertise after updates
@@ -129,6 +94,94 @@ class ProviderService:
             await self.cleanup()
             raise
 
+    async def wait_for_reconciliation(self) -> None:
+        """Wait until the startup stream reconciliation (if any) has finished."""
+        if self._reconcile_task:
+            await asyncio.shield(self._reconcile_task)
+
+    async def _reconcile_streams(self, app: FastAPI, vm_resources: dict) -> None:
+        """Delete VMs whose payment stream is missing or inactive.
+
+        Streams are verified concurrently against a single block timestamp and
+        the resulting deletions run in parallel, both bounded so a large host
+        does not flood the RPC endpoint or multipass.
+        """
+        from .config import settings
+
+        try:
+            stream_map = app.container.stream_map()
+            reader = app.container.stream_reader()
+            vm_ids = list(vm_resources.keys())
+            if not vm_ids:
+                return
+            try:
+                block = await asyncio.to_thread(reader.web3.eth.get_block, "latest")
+                now = int(block["timestamp"])
+            except Exception as e:
+                logger.debug(f"Could not read chain time for stream reconciliation: {e}")
+                now = None
+
+            verify_slots = asyncio.Semaphore(_RECONCILE_VERIFY_CONCURRENCY)
+
+            async def _check(vm_id: str):
+                try:
+                    stream_id = await stream_map.get(vm_id)
+                except Exception:
+                    stream_id = None
+                if stream_id is None:
+                    return vm_id, stream_id, True, "no stream mapped"
+                try:
+                    async with verify_slots:
+                        ok, msg = await asyncio.to_thread(
+                            reader.verify_stream, int(stream_id), settings.PROVIDER_ID, now
+                        )
+                    return vm_id, stream_id, not ok, msg if not ok else "ok"
+                except Exception as e:
+                    # If verification cannot be performed, be conservative and keep the VM
+                    logger.warning(f"Stream verification error for VM {vm_id} (stream {stream_id}): {e}")
+                    return vm_id, stream_id, False, f"verification error: {e}"
+
+            results = await asyncio.gather(*(_check(vm_id) for vm_id in vm_ids))
+
+            delete_slots = asyncio.Semaphore(_RECONCILE_DELETE_CONCURRENCY)
+
+            async def _terminate(vm_id: str, stream_id, reason: str):
+                logger.info(
+                    f"Deleting VM {vm_id}: inactive stream (stream_id={stream_id}, reason={reason})"
+                )
+                async with delete_slots:
+                    try:
+                        await self.vm_service.delete_vm(vm_id)
+                    except VMNotFoundError:
+                        pass
+                    except Exception as e:
+                        # The VM may still be running: keep its reservation and stream
+                        # mapping so capacity is not over-committed and a later pass retries
+                        logger.warning(f"Failed to delete VM {vm_id}: {e}")
+                        return
+                try:
+                    await stream_map.remove(vm_id)
+                except Exception:
+                    pass
+                # delete_vm releases what it can see; drop any reservation left from the startup sync
+                tracker = self.vm_service.resource_tracker
+                try:
+                    leftover = tracker.get_allocated_resources_for(vm_id)
+                    if leftover is not None:
+                        await tracker.deallocate(leftover, vm_id)
+                except Exception as e:
+                    logger.warning(f"Failed to release resources of VM {vm_id}: {e}")
+
+            await asyncio.gather(*(
+                _terminate(vm_id, stream_id, reason)
+                for vm_id, stream_id, should_terminate, reason in results
+                if should_terminate
+            ))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Failed to reconcile VMs with payment streams: {e}")
+
     async def cleanup(self):
         """Cleanup provider components."""
         logger.process("🔄 Cleaning up provider...")
@@ -140,6 +193,12 @@ class ProviderService:
         except Exception:
             pass
 
+        # Stop checking ports that were not verified before startup finished
+        try:
+            await self.port_manager.stop_verification()
+        except Exception:
+            pass
+
         # Optionally stop all running VMs based on configuration (default: keep running)
         try:
             if bool(getattr(settings, "STOP_VMS_ON_EXIT", False)):
@@ -175,6 +234,14 @@ class ProviderService:
                 pass
             except Exception:
                 pass
+        if self._reconcile_task and not self._reconcile_task.done():
+            self._reconcile_task.cancel()
+            try:
+                await self._reconcile_task
+            except asyncio.CancelledError:
+                pass
+            except Exception:
+                pass
         if self._stream_monitor:
             await self._stream_monitor.stop()
         logger.success("✨ Provider cleanup complete")
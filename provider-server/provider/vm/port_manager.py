@@ -45,6 +45,7 @@ class PortManager:
         self._used_ports: dict[str, int] = {}  # vm_id -> port
         self.verified_ports: Set[int] = set()
         self._existing_ports = existing_ports or set()
+        self._verification_task: Optional[asyncio.Task] = None
 
         # Initialize port verifier with default servers
         if settings.DEV_MODE:
@@ -108,22 +109,77 @@ class PortManager:
 
             # Clear existing verified ports before verification
             self.verified_ports.clear()
-            results = {}
-            if not self.skip_verification:
-                try:
-                    results = await self.port_verifier.verify_ports(ssh_ports)
-                except RuntimeError as e:
-                    logger.error(f"Port verification failed: {e}")
-                    display.print_summary(
-                        PortVerificationResult(
-                            port=self.discovery_port,
-                            accessible=False,
-                            error=str(e)
-                        ),
-                        {}
-                    )
-                    return False
+            first_verified = asyncio.Event()
+
+            def on_result(result: PortVerificationResult) -> None:
+                # Verified ports can be allocated while the rest of the range is checked
+                if result.accessible:
+                    with self.lock:
+                        self.verified_ports.add(result.port)
+                    first_verified.set()
+
+            verification = asyncio.ensure_future(
+                self.port_verifier.verify_ports(ssh_ports, on_result=on_result))
+            waiter = asyncio.ensure_future(first_verified.wait())
+            await asyncio.wait({verification, waiter}, return_when=asyncio.FIRST_COMPLETED)
+            waiter.cancel()
+            if not verification.done():
+                logger.info(
+                    f"{len(self.verified_ports)} SSH ports verified, checking the rest of the range in the background")
+                self._verification_task = asyncio.create_task(
+                    self._finish_verification(verification), name="port-verification")
+                return True
+            try:
+                results = verification.result()
+            except RuntimeError as e:
+                logger.error(f"Port verification failed: {e}")
+                display.print_summary(
+                    PortVerificationResult(
+                        port=self.discovery_port,
+                        accessible=False,
+                        error=str(e)
+                    ),
+                    {}
+                )
+                return False
+
+        return await self._report(display, results)
+
+    async def _finish_verification(self, verification: "asyncio.Future") -> None:
+        """Log a summary of the range once the background check is done.
 
+        The provider is already serving by then, so the outcome is logged
+        rather than shown with the interactive startup display.
+        """
+        try:
+            results = await verification
+        except Exception as e:
+            # Ports verified before the failure stay available
+            logger.error(
+                f"Background port verification failed: {e}; "
+                f"keeping the {len(self.verified_ports)} SSH ports verified before the failure")
+            return
+
+        # Accessible ports were already added as they were verified, and at
+        # least one was before the check moved to the background
+        ssh_results = {port: result for port,
+                       result in results.items() if port != self.discovery_port}
+        inaccessible = sorted(port for port, result in ssh_results.items() if not result.accessible)
+        verified = len(ssh_results) - len(inaccessible)
+
+        if inaccessible:
+            logger.warning(
+                f"Background port verification finished: {verified} of {len(ssh_results)} "
+                f"SSH ports verified, not accessible: {', '.join(map(str, inaccessible))}")
+        else:
+            logger.info(f"Background port verification finished: all {verified} SSH ports verified")
+
+    async def _report(self, display: PortVerificationDisplay, results: Dict[int, PortVerificationResult]) -> bool:
+        """Display verification results and keep the accessible ports.
+
+        Returns:
+            bool: True if required ports were verified successfully
+        """
         # Add provider port as verified since we already checked it
         results[self.discovery_port] = PortVerificationResult(
             port=self.discovery_port,
@@ -163,8 +219,9 @@ class PortManager:
         await display.print_ssh_status(ssh_results)
 
         # Store verified ports
-        self.verified_ports = {
-            port for port, result in ssh_results.items() if result.accessible}
+        with self.lock:
+            self.verified_ports = {
+                port for port, result in ssh_results.items() if result.accessible}
 
         # Only show critical issues and quick fix if there are problems
         if not discovery_result.accessible or not self.verified_ports:
@@ -186,6 +243,16 @@ class PortManager:
                 f"Successfully verified {len(self.verified_ports)} SSH ports")
             return True
 
+    async def stop_verification(self) -> None:
+        """Cancel port verification still running in the background, if any."""
+        task, self._verification_task = self._verification_task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
     def _load_state(self) -> None:
         """Load port assignments from state file."""
         try:
@@ -23,13 +23,18 @@ class StubResourceTracker:
 
 
 class StubResponse:
-    def __init__(self):
-        self.ok = True
+    def __init__(self, status=200, body=None):
+        self.ok = status < 400
+        self.status = status
         self._text = "ok"
+        self._body = body or {}
 
     async def text(self):
         return self._text
 
+    async def json(self):
+        return self._body
+
     async def __aenter__(self):
         return self
 
@@ -45,7 +50,13 @@ class StubSession:
         # capture payload
         self.capture["url"] = url
         self.capture["json"] = json
-        return StubResponse()
+        self.capture.setdefault("calls", []).append("POST")
+        return StubResponse(body={"content_hash": "h1"})
+
+    def patch(self, url, headers=None, timeout=None):
+        self.capture.setdefault("calls", []).append("PATCH")
+        self.capture["if_match"] = headers["If-Match"]
+        return StubResponse(status=self.capture.get("patch_status", 204))
 
     async def close(self):
         pass
@@ -75,6 +86,32 @@ async def test_discovery_advertiser_includes_pricing(monkeypatch):
     assert payload["pricing"]["glm_per_gb_ram_month"] == 5.0
 
 
+@pytest.mark.asyncio
+async def test_discovery_advertiser_heartbeats_unchanged_advertisement(monkeypatch):
+    resources = {"cpu": 2, "memory": 2, "storage": 10}
+    rt = StubResourceTracker(resources)
+    adv = DiscoveryServerAdvertiser(rt, discovery_url="http://x", provider_id="p1")
+    capture = {}
+    adv.session = StubSession(capture)
+    monkeypatch.setattr(adv, "_get_public_ip", lambda: asyncio.sleep(0, result="1.2.3.4"))
+
+    await adv.post_advertisement()
+    await adv.post_advertisement()
+    assert capture["calls"] == ["POST", "PATCH"]
+    assert capture["if_match"] == '"h1"'
+
+    # Changed resources are posted in full
+    resources["cpu"] = 1
+    await adv.post_advertisement()
+    assert capture["calls"][-1] == "POST"
+
+    # A rejected heartbeat (expired or changed server-side) falls back to a full POST
+    capture["patch_status"] = 412
+    capture["calls"] = []
+    await adv.post_advertisement()
+    assert capture["calls"] == ["PATCH", "POST"]
+
+
 @pytest.mark.asyncio
 async def test_golem_base_advertiser_annotations_include_pricing(monkeypatch):
     # Stub client to capture created entity
@@ -0,0 +1,156 @@
+import asyncio
+import json
+
+import pytest
+from aiohttp import web
+
+from provider.network.port_verifier import PortVerificationResult, PortVerifier
+
+
+async def _serve(handler):
+    app = web.Application()
+    app.router.add_post("/check-ports", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+@pytest.fixture
+def public_ip(monkeypatch):
+    async def fake_public_ip(self):
+        return "1.2.3.4"
+
+    monkeypatch.setattr(PortVerifier, "_get_public_ip", fake_public_ip)
+
+
+async def test_streamed_results_are_reported_as_they_arrive(public_ip):
+    first_seen = asyncio.Event()
+    requests = []
+
+    async def check_ports(request):
+        body = await request.json()
+        requests.append((request.headers.get("Accept"), body))
+        resp = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        await resp.prepare(request)
+        await resp.write(b'{"port":50801,"accessible":true,"error":null}\n')
+        # The rest of the stream waits until the verifier has seen the first port
+        await asyncio.wait_for(first_seen.wait(), 5)
+        await resp.write(b'{"port":50800,"accessible":false,"error":"Connection refused"}\n')
+        await resp.write(b'{"success":true,"message":"Successfully verified 1 out of 2 ports"}\n')
+        await resp.write_eof()
+        return resp
+
+    runner, url = await _serve(check_ports)
+    seen = []
+
+    def on_result(result):
+        seen.append((result.port, result.accessible))
+        first_seen.set()
+
+    try:
+        results = await PortVerifier([url]).verify_external_access({50800, 50801}, on_result=on_result)
+    finally:
+        await runner.cleanup()
+
+    assert requests == [("application/x-ndjson", {"provider_ip": "1.2.3.4", "ports": [50800, 50801]})]
+    assert seen == [(50801, True), (50800, False)]
+    assert results[50801].accessible and results[50801].verified_by == url
+    assert not results[50800].accessible and results[50800].error == "Connection refused"
+    assert [a.success for a in results[50800].attempts] == [True]
+
+
+async def test_json_checkers_are_still_supported_and_only_get_pending_ports(public_ip):
+    asked = []
+
+    async def streaming(request):
+        asked.append(("streaming", (await request.json())["ports"]))
+        resp = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        await resp.prepare(request)
+        await resp.write(json.dumps({"port": 50800, "accessible": True, "error": None}).encode() + b"\n")
+        await resp.write(json.dumps({"port": 50801, "accessible": False, "error": "Connection timed out"}).encode() + b"\n")
+        await resp.write_eof()
+        return resp
+
+    async def legacy(request):
+        asked.append(("legacy", (await request.json())["ports"]))
+        return web.json_response({
+            "success": True,
+            "results": {"50801": {"accessible": True, "error": None}},
+            "message": "Successfully verified 1 out of 1 ports",
+        })
+
+    first, first_url = await _serve(streaming)
+    second, second_url = await _serve(legacy)
+    try:
+        results = await PortVerifier([first_url, second_url]).verify_external_access({50800, 50801})
+    finally:
+        await first.cleanup()
+        await second.cleanup()
+
+    assert asked == [("streaming", [50800, 50801]), ("legacy", [50801])]
+    assert results[50800].verified_by == first_url
+    assert results[50801].verified_by == second_url
+
+
+async def test_verified_ports_are_released_for_use_during_verification(monkeypatch):
+    verifier = PortVerifier(["http://checker"])
+    released = []
+
+    async def fake_external(ports, on_result=None):
+        for port in sorted(ports):
+            await on_result(PortVerificationResult(port=port, accessible=True, attempts=[]))
+            # The verified port can be bound again while the others are still held
+            server = await asyncio.start_server(lambda r, w: None, "0.0.0.0", port)
+            server.close()
+            await server.wait_closed()
+            released.append(port)
+        return {}
+
+    monkeypatch.setattr(verifier, "verify_external_access", fake_external)
+    sock_ports = []
+    for _ in range(2):
+        server = await asyncio.start_server(lambda r, w: None, "0.0.0.0", 0)
+        sock_ports.append(server.sockets[0].getsockname()[1])
+        server.close()
+        await server.wait_closed()
+
+    await verifier.verify_ports(sock_ports)
+    assert released == sorted(sock_ports)
+
+
+async def test_ports_are_reported_only_after_their_listener_has_closed(monkeypatch):
+    verifier = PortVerifier(["http://checker"])
+    closed = set()
+
+    class _Listener:
+        def __init__(self, port):
+            self.port = port
+
+        def close(self):
+            pass
+
+        async def wait_closed(self):
+            await asyncio.sleep(0)
+            closed.add(self.port)
+
+    async def fake_local(ports, listeners):
+        listeners.update({port: _Listener(port) for port in ports})
+        yield set(ports)
+
+    async def fake_external(ports, on_result=None):
+        for port in sorted(ports):
+            await on_result(PortVerificationResult(port=port, accessible=True, attempts=[]))
+        return {}
+
+    monkeypatch.setattr(verifier, "verify_local_binding", fake_local)
+    monkeypatch.setattr(verifier, "verify_external_access", fake_external)
+    reported = []
+
+    def on_result(result):
+        reported.append((result.port, result.port in closed))
+
+    await verifier.verify_ports([50800, 50801], on_result=on_result)
+    assert reported == [(50800, True), (50801, True)]
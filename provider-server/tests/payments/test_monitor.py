@@ -238,3 +238,144 @@ async def test_monitor_deletes_when_stream_ended(monkeypatch):
     assert vm_service.stopped == []
     assert vm_service.deleted == ["vm-end"]
     assert client.withdrawn == []
+
+
+@pytest.mark.asyncio
+async def test_monitor_sleeps_until_stop_time_and_skips_healthy_reads(monkeypatch):
+    now = 6_000_000
+    stream = {
+        "token": "0xglm",
+        "sender": "0xreq",
+        "recipient": "0xprov",
+        "startTime": now - 10_000,
+        "stopTime": now + 60 + 7,  # runs out 7s after the first check
+        "ratePerSecond": 10,
+        "deposit": 200_000,
+        "withdrawn": 0,
+        "halted": False,
+    }
+
+    class CountingReader(DummyReader):
+        def __init__(self, *a):
+            super().__init__(*a)
+            self.reads = 0
+
+        def get_stream(self, stream_id):
+            self.reads += 1
+            return super().get_stream(stream_id)
+
+    class S(DummySettings):
+        STREAM_MONITOR_INTERVAL_SECONDS = 60
+        STREAM_WITHDRAW_ENABLED = False
+
+    stream_map = DummyStreamMap({"vm-late": 21})
+    vm_service = DummyVMService()
+    reader = CountingReader(now, stream)
+    mon = StreamMonitor(stream_map=stream_map, vm_service=vm_service, reader=reader, client=None, settings=S())
+
+    # Freeze the local clock so only the simulated chain time advances
+    clock = {"t": 1_000.0}
+    monkeypatch.setattr("provider.payments.monitor.time.time", lambda: clock["t"])
+    delays = []
+
+    async def fake_sleep(delay):
+        delays.append(delay)
+        clock["t"] += delay
+        reader._now += int(delay)
+        if len(delays) >= 4:
+            raise asyncio.CancelledError
+
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+
+    await mon._run()
+    # First check schedules the next wake-up exactly at stopTime instead of a full interval
+    assert delays[1] == 7
+    assert vm_service.deleted == ["vm-late"]
+    # One read on discovery, one at the deadline; no reads in between
+    assert reader.reads == 2
+
+
+@pytest.mark.asyncio
+async def test_monitor_picks_up_new_mappings_and_forgets_removed(monkeypatch):
+    now = 7_000_000
+    stream = {
+        "token": "0xglm",
+        "sender": "0xreq",
+        "recipient": "0xprov",
+        "startTime": now - 10,
+        "stopTime": now + 100_000,
+        "ratePerSecond": 10,
+        "deposit": 200_000,
+        "withdrawn": 0,
+        "halted": False,
+    }
+    stream_map = DummyStreamMap({"vm-a": 1})
+    reader = DummyReader(now, stream)
+
+    class S(DummySettings):
+        STREAM_WITHDRAW_ENABLED = False
+
+    mon = StreamMonitor(stream_map=stream_map, vm_service=DummyVMService(), reader=reader, client=None, settings=S())
+    await mon._sync_stream_map()
+    assert set(mon._deadlines) == {"vm-a"}
+
+    stream_map._mapping.pop("vm-a")
+    stream_map._mapping["vm-b"] = 2
+    await mon._sync_stream_map()
+    assert set(mon._deadlines) == {"vm-b"}
+    assert mon._pop_due(now) == [("vm-b", 2)]
+
+
+@pytest.mark.asyncio
+async def test_monitor_notices_halt_within_one_interval(monkeypatch):
+    now = 8_000_000
+    stream = {
+        "token": "0xglm",
+        "sender": "0xreq",
+        "recipient": "0xprov",
+        "startTime": now - 10,
+        "stopTime": now + 100_000,  # far from exhausted
+        "ratePerSecond": 10,
+        "deposit": 2_000_000,
+        "withdrawn": 0,
+        "halted": False,
+    }
+
+    class S(DummySettings):
+        STREAM_MONITOR_INTERVAL_SECONDS = 30
+        STREAM_WITHDRAW_ENABLED = False
+
+    class CountingReader(DummyReader):
+        def __init__(self, *a):
+            super().__init__(*a)
+            self.reads = 0
+
+        def get_stream(self, stream_id):
+            self.reads += 1
+            return super().get_stream(stream_id)
+
+    stream_map = DummyStreamMap({"vm-halt": 31})
+    vm_service = DummyVMService()
+    reader = CountingReader(now, stream)
+    mon = StreamMonitor(stream_map=stream_map, vm_service=vm_service, reader=reader, client=None, settings=S())
+
+    clock = {"t": 1_000.0}
+    monkeypatch.setattr("provider.payments.monitor.time.time", lambda: clock["t"])
+    since_halt = []
+
+    async def fake_sleep(delay):
+        if vm_service.deleted or sum(since_halt) > 600:
+            raise asyncio.CancelledError
+        if reader.reads and not reader._stream["halted"]:
+            # The requestor halts the stream right after the first healthy read
+            reader._stream["halted"] = True
+        if reader._stream["halted"]:
+            since_halt.append(delay)
+        clock["t"] += delay
+        reader._now += int(delay)
+
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+
+    await mon._run()
+    assert vm_service.deleted == ["vm-halt"]
+    assert sum(since_halt) <= 30
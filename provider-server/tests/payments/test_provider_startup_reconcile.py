@@ -34,10 +34,18 @@ class DummyResourceTracker:
     def __init__(self):
         self.sync_calls = 0
         self.last_resources = None
+        self.allocated = {}
 
     async def sync_with_multipass(self, vm_resources):
         self.sync_calls += 1
         self.last_resources = vm_resources
+        self.allocated = dict(vm_resources)
+
+    def get_allocated_resources_for(self, vm_id):
+        return self.allocated.get(vm_id)
+
+    async def deallocate(self, resources, vm_id=None):
+        self.allocated.pop(vm_id, None)
 
 
 class DummyVMService:
@@ -46,8 +54,10 @@ class DummyVMService:
         self.provider = DummyProvider()
         self.resource_tracker = DummyResourceTracker()
         self.deleted = []
+        self.resource_queries = 0
 
     async def get_all_vms_resources(self):
+        self.resource_queries += 1
         return dict(self._resources)
 
     async def delete_vm(self, vm_id: str):
@@ -77,7 +87,11 @@ class DummyReader:
         # validity_by_stream: {stream_id: (ok, msg)}
         self.validity = validity_by_stream
 
-    def verify_stream(self, sid, expected_recipient):
+        self.calls = []
+        self.web3 = types.SimpleNamespace(eth=types.SimpleNamespace(get_block=lambda _: {"timestamp": 1_000}))
+
+    def verify_stream(self, sid, expected_recipient, now=None):
+        self.calls.append((int(sid), now))
         return self.validity.get(int(sid), (False, "not found"))
 
 
@@ -150,13 +164,16 @@ async def test_startup_terminates_vms_without_active_stream(monkeypatch):
     app = DummyApp(stream_map, reader)
 
     await provider_service.setup(app)  # type: ignore[arg-type]
+    # Advertising starts without waiting for reconciliation
+    assert adv.started is True
+    await provider_service.wait_for_reconciliation()
 
     # Assert VM was deleted and mapping removed
     assert vm_service.deleted == ["vm-a"]
     assert stream_map.removed == ["vm-a"]
-    # Synced before and after termination
-    assert vm_service.resource_tracker.sync_calls >= 2
-    assert adv.started is True
+    # Resources are listed once; the deleted VM's reservation is released without a re-scan
+    assert vm_service.resource_queries == 1
+    assert vm_service.resource_tracker.allocated == {}
 
 
 @pytest.mark.asyncio
@@ -187,11 +204,13 @@ async def test_startup_keeps_vms_with_active_stream(monkeypatch):
     app = DummyApp(stream_map, reader)
 
     await provider_service.setup(app)  # type: ignore[arg-type]
+    await provider_service.wait_for_reconciliation()
 
-    # No deletions or removals; still synced twice and advertising started
+    # No deletions or removals; the VM stays reserved and advertising started
     assert vm_service.deleted == []
     assert stream_map.removed == []
-    assert vm_service.resource_tracker.sync_calls >= 2
+    assert "vm-b" in vm_service.resource_tracker.allocated
+    assert reader.calls == [(42, 1_000)]
     assert adv.started is True
 
 
@@ -229,7 +248,7 @@ async def test_startup_skips_stream_checks_when_payments_disabled(monkeypatch):
             return {}
 
     class RaisingReader:
-        def verify_stream(self, *_):
+        def verify_stream(self, *_, **__):
             raise AssertionError("verify_stream should not be called")
 
     app = DummyApp(RaisingStreamMap(), RaisingReader())
@@ -240,3 +259,101 @@ async def test_startup_skips_stream_checks_when_payments_disabled(monkeypatch):
     assert vm_service.deleted == []
     assert vm_service.resource_tracker.sync_calls >= 1
     assert adv.started is True
+
+
+@pytest.mark.asyncio
+async def test_startup_verifies_streams_concurrently_with_one_block_read(monkeypatch):
+    import threading
+    import time
+
+    from provider import service as ps
+    from provider.config import settings
+
+    settings.STREAM_PAYMENT_ADDRESS = "0x1234567890abcdef1234567890abcdef12345678"
+    settings.POLYGON_RPC_URL = "http://localhost"
+    settings.STREAM_MONITOR_ENABLED = False
+    settings.STREAM_WITHDRAW_ENABLED = False
+
+    import provider.security.faucet as faucet_mod
+    monkeypatch.setattr(faucet_mod, "FaucetClient", lambda *a, **k: types.SimpleNamespace(get_funds=lambda *_: asyncio.sleep(0)))
+    monkeypatch.setattr(ps, "PricingAutoUpdater", DummyPricingUpdater)
+
+    n = 8
+    vm_resources = {f"vm-{i}": VMResources(cpu=1, memory=1, storage=10) for i in range(n)}
+    vm_service = DummyVMService(vm_resources)
+    provider_service = ProviderService(
+        vm_service=vm_service, advertisement_service=DummyAdvertisementService(), port_manager=DummyPortManager()
+    )
+
+    class SlowReader(DummyReader):
+        def __init__(self, *a):
+            super().__init__(*a)
+            self.blocks = 0
+            self.in_flight = 0
+            self.peak = 0
+            self._lock = threading.Lock()
+
+            def get_block(_):
+                self.blocks += 1
+                return {"timestamp": 1_000}
+
+            self.web3 = types.SimpleNamespace(eth=types.SimpleNamespace(get_block=get_block))
+
+        def verify_stream(self, sid, expected_recipient, now=None):
+            with self._lock:
+                self.in_flight += 1
+                self.peak = max(self.peak, self.in_flight)
+            time.sleep(0.05)
+            with self._lock:
+                self.in_flight -= 1
+            return super().verify_stream(sid, expected_recipient, now)
+
+    # Even-numbered VMs have valid streams; odd ones are unpaid
+    stream_map = DummyStreamMap({f"vm-{i}": i for i in range(n)})
+    reader = SlowReader({i: (True, "ok") for i in range(0, n, 2)})
+    app = DummyApp(stream_map, reader)
+
+    await provider_service.setup(app)  # type: ignore[arg-type]
+    await provider_service.wait_for_reconciliation()
+
+    assert reader.blocks == 1
+    assert all(now == 1_000 for _, now in reader.calls)
+    assert reader.peak > 1
+    assert sorted(vm_service.deleted) == [f"vm-{i}" for i in range(1, n, 2)]
+    assert sorted(vm_service.resource_tracker.allocated) == [f"vm-{i}" for i in range(0, n, 2)]
+
+
+@pytest.mark.asyncio
+async def test_startup_keeps_reservation_when_delete_fails(monkeypatch):
+    from provider import service as ps
+    from provider.config import settings
+
+    settings.STREAM_PAYMENT_ADDRESS = "0x1234567890abcdef1234567890abcdef12345678"
+    settings.POLYGON_RPC_URL = "http://localhost"
+    settings.STREAM_MONITOR_ENABLED = False
+    settings.STREAM_WITHDRAW_ENABLED = False
+
+    import provider.security.faucet as faucet_mod
+    monkeypatch.setattr(faucet_mod, "FaucetClient", lambda *a, **k: types.SimpleNamespace(get_funds=lambda *_: asyncio.sleep(0)))
+    monkeypatch.setattr(ps, "PricingAutoUpdater", DummyPricingUpdater)
+
+    class FailingVMService(DummyVMService):
+        async def delete_vm(self, vm_id: str):
+            raise RuntimeError("multipass delete failed")
+
+    vm_resources = {"vm-d": VMResources(cpu=2, memory=4, storage=20)}
+    vm_service = FailingVMService(vm_resources)
+    provider_service = ProviderService(
+        vm_service=vm_service, advertisement_service=DummyAdvertisementService(), port_manager=DummyPortManager()
+    )
+    # Unpaid stream, so reconciliation tries to delete the VM
+    stream_map = DummyStreamMap({"vm-d": 7})
+    app = DummyApp(stream_map, DummyReader({}))
+
+    await provider_service.setup(app)  # type: ignore[arg-type]
+    await provider_service.wait_for_reconciliation()
+
+    # The VM may still be running: its reservation and stream mapping survive for a retry
+    assert "vm-d" in vm_service.resource_tracker.allocated
+    assert stream_map.removed == []
+    assert await stream_map.get("vm-d") == 7
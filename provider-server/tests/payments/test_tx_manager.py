@@ -0,0 +1,253 @@
+"""Tests for the transaction manager shared by the provider and the requestor.
+
+The two packages ship separately, so each keeps its own copy of
+``payments/tx_manager.py``. These tests run against both copies and check
+that they have not drifted apart.
+"""
+import asyncio
+import importlib
+import threading
+import types
+from pathlib import Path
+
+import pytest
+from web3.exceptions import TimeExhausted, Web3RPCError
+
+# The requestor's copy, when the repository is checked out as a whole
+REQUESTOR_ROOT = Path(__file__).resolve().parents[3] / "requestor-server"
+
+
+@pytest.fixture(params=["provider", "requestor"])
+def tx_manager(request, monkeypatch):
+    if request.param == "requestor":
+        if not (REQUESTOR_ROOT / "requestor" / "payments" / "tx_manager.py").exists():
+            pytest.skip("requestor-server is not checked out next to provider-server")
+        monkeypatch.syspath_prepend(str(REQUESTOR_ROOT))
+    return importlib.import_module(f"{request.param}.payments.tx_manager")
+
+
+class DummyEth:
+    def __init__(self, chain_nonce=5):
+        self.chain_nonce = chain_nonce
+        self.sent = []
+        self.mined = {}
+        self.gas_price = 100
+        self.send_errors = []
+
+    def get_transaction_count(self, addr, block_identifier="latest"):
+        return self.chain_nonce
+
+    def send_raw_transaction(self, raw):
+        if self.send_errors:
+            raise self.send_errors.pop(0)
+        self.sent.append(raw)
+        return types.SimpleNamespace(hex=lambda n=len(self.sent): f"0x{n:02x}")
+
+    def wait_for_transaction_receipt(self, tx_hash, timeout=None):
+        if tx_hash.hex() in self.mined:
+            return self.mined[tx_hash.hex()]
+        raise TimeExhausted("not mined")
+
+    def get_transaction_receipt(self, tx_hash):
+        from web3.exceptions import TransactionNotFound
+
+        if tx_hash.hex() in self.mined:
+            return self.mined[tx_hash.hex()]
+        raise TransactionNotFound("missing")
+
+
+class Signer:
+    address = "0xme"
+
+    def sign_transaction(self, tx):
+        return types.SimpleNamespace(raw_transaction=dict(tx))
+
+
+def _manager(tx_manager, eth, **kw):
+    return tx_manager.TransactionManager(types.SimpleNamespace(eth=eth), Signer(), **kw)
+
+
+def _fn():
+    return types.SimpleNamespace(build_transaction=lambda params: {"to": "withdraw", **params})
+
+
+def test_provider_and_requestor_copies_are_identical(tx_manager):
+    provider_copy = Path(__file__).resolve().parents[2] / "provider" / "payments" / "tx_manager.py"
+    assert Path(tx_manager.__file__).read_text() == provider_copy.read_text()
+
+
+def test_nonce_manager_hands_out_unique_nonces_across_threads(tx_manager):
+    nm = tx_manager.NonceManager(types.SimpleNamespace(eth=DummyEth(chain_nonce=10)), "0xme")
+    seen = []
+    lock = threading.Lock()
+
+    def worker():
+        for _ in range(50):
+            n = nm.allocate()
+            with lock:
+                seen.append(n)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(seen) == list(range(10, 410))
+
+
+def test_nonce_manager_recycles_released_nonces(tx_manager):
+    nm = tx_manager.NonceManager(types.SimpleNamespace(eth=DummyEth(chain_nonce=0)), "0xme")
+    a, b, c = nm.allocate(), nm.allocate(), nm.allocate()
+    nm.release(b)
+    assert nm.allocate() == b
+    nm.release(c)
+    assert nm.allocate() == c
+    assert a == 0
+
+
+def test_submit_keeps_several_transactions_in_flight(tx_manager):
+    eth = DummyEth(chain_nonce=3)
+    mgr = _manager(tx_manager, eth)
+    first = mgr.submit(_fn())
+    second = mgr.submit(_fn())
+    assert (first.nonce, second.nonce) == (3, 4)
+    assert [p.nonce for p in mgr.pending] == [3, 4]
+
+    eth.mined[first.tx_hash.hex()] = types.SimpleNamespace(status=1)
+    assert mgr.wait(first).status == 1
+    assert [p.nonce for p in mgr.pending] == [4]
+
+
+def test_rejected_broadcast_releases_nonce(tx_manager):
+    eth = DummyEth(chain_nonce=0)
+    mgr = _manager(tx_manager, eth)
+    assert mgr.submit(_fn()).nonce == 0
+    eth.send_errors = [Web3RPCError("insufficient funds for gas")]
+    with pytest.raises(Web3RPCError):
+        mgr.submit(_fn())
+    # The node answered with an error, so nonce 1 is free again without asking it
+    eth.chain_nonce = 100
+    assert mgr.submit(_fn()).nonce == 1
+
+
+def test_legacy_rpc_error_releases_nonce(tx_manager):
+    eth = DummyEth(chain_nonce=0)
+    eth.send_errors = [ValueError({"code": -32000, "message": "insufficient funds for gas"})]
+    mgr = _manager(tx_manager, eth)
+    with pytest.raises(ValueError):
+        mgr.submit(_fn())
+    eth.chain_nonce = 100
+    assert mgr.submit(_fn()).nonce == 0
+
+
+def test_ambiguous_broadcast_failure_keeps_nonce_and_resyncs(tx_manager):
+    eth = DummyEth(chain_nonce=0)
+    mgr = _manager(tx_manager, eth)
+    assert mgr.submit(_fn()).nonce == 0
+    # The node took nonce 1 but the reply was lost
+    eth.send_errors = [TimeoutError("read timed out")]
+    with pytest.raises(TimeoutError):
+        mgr.submit(_fn())
+    eth.chain_nonce = 2
+    assert mgr.submit(_fn()).nonce == 2
+
+
+def test_failed_build_releases_nonce(tx_manager):
+    mgr = _manager(tx_manager, DummyEth(chain_nonce=0))
+
+    def build(params):
+        raise RuntimeError("execution reverted")
+
+    with pytest.raises(RuntimeError):
+        mgr.submit(types.SimpleNamespace(build_transaction=build))
+    assert mgr.submit(_fn()).nonce == 0
+
+
+def test_nonce_conflict_resyncs_from_chain(tx_manager):
+    eth = DummyEth(chain_nonce=0)
+    mgr = _manager(tx_manager, eth)
+    assert mgr.submit(_fn()).nonce == 0
+    # Another process sent two transactions meanwhile
+    eth.chain_nonce = 3
+    eth.send_errors = [ValueError("nonce too low")]
+    assert mgr.submit(_fn()).nonce == 3
+
+
+def test_stuck_transaction_is_rebroadcast_with_bumped_fees(tx_manager):
+    eth = DummyEth(chain_nonce=0)
+    mgr = _manager(tx_manager, eth, max_fee_bumps=2)
+    pending = mgr.submit(
+        types.SimpleNamespace(
+            build_transaction=lambda params: {**params, "maxFeePerGas": 100, "maxPriorityFeePerGas": 10}
+        )
+    )
+
+    orig_wait = eth.wait_for_transaction_receipt
+
+    def wait(tx_hash, timeout=None):
+        # Only the replacement gets mined
+        if len(pending.tx_hashes) == 2:
+            eth.mined[tx_hash.hex()] = types.SimpleNamespace(status=1)
+        return orig_wait(tx_hash, timeout)
+
+    eth.wait_for_transaction_receipt = wait
+    receipt = mgr.wait(pending)
+    assert receipt.status == 1
+    assert pending.fee_bumps == 1
+    replacement = eth.sent[-1]
+    assert replacement["nonce"] == 0
+    assert replacement["maxFeePerGas"] == 125
+    assert replacement["maxPriorityFeePerGas"] == 12
+
+
+def test_wait_gives_up_after_max_fee_bumps(tx_manager):
+    eth = DummyEth(chain_nonce=0)
+    mgr = _manager(tx_manager, eth, max_fee_bumps=1)
+    pending = mgr.submit(_fn())
+    with pytest.raises(TimeExhausted):
+        mgr.wait(pending)
+    assert pending.fee_bumps == 1
+    assert mgr.pending == []
+    # Without fee fields, the replacement is priced from the node's gas price
+    assert eth.sent[-1]["gasPrice"] == 125
+
+
+def test_original_receipt_found_after_replacement(tx_manager):
+    eth = DummyEth(chain_nonce=0)
+    mgr = _manager(tx_manager, eth, max_fee_bumps=3)
+    pending = mgr.submit(_fn())
+    first_hash = pending.tx_hash.hex()
+
+    orig_wait = eth.wait_for_transaction_receipt
+
+    def wait(tx_hash, timeout=None):
+        if len(pending.tx_hashes) == 2:
+            # The cheaper original landed instead of the replacement
+            eth.mined[first_hash] = types.SimpleNamespace(status=1)
+        return orig_wait(tx_hash, timeout)
+
+    eth.wait_for_transaction_receipt = wait
+    assert mgr.wait(pending).status == 1
+    assert pending.fee_bumps == 1
+    assert mgr.pending == []
+
+
+@pytest.mark.asyncio
+async def test_send_async_confirms_off_the_event_loop(tx_manager):
+    eth = DummyEth(chain_nonce=0)
+    eth.wait_for_transaction_receipt = lambda h, timeout=None: types.SimpleNamespace(status=1)
+    mgr = _manager(tx_manager, eth)
+    results = await asyncio.gather(*(mgr.send_async(_fn()) for _ in range(5)))
+    assert sorted(p.nonce for p, _ in results) == [0, 1, 2, 3, 4]
+    assert all(r.status == 1 for _, r in results)
+
+
+def test_concurrent_submits_broadcast_in_nonce_order(tx_manager):
+    eth = DummyEth(chain_nonce=0)
+    mgr = _manager(tx_manager, eth)
+    threads = [threading.Thread(target=mgr.submit, args=(_fn(),)) for _ in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert [tx["nonce"] for tx in eth.sent] == list(range(20))
@@ -0,0 +1,88 @@
+import asyncio
+import logging
+
+import pytest
+
+from provider.network.port_verifier import PortVerificationResult
+from provider.utils.port_display import PortVerificationDisplay
+from provider.vm.port_manager import PortManager
+
+
+class _Verifier:
+    def __init__(self, last_accessible=True, error=None):
+        self.finish = asyncio.Event()
+        self.last_accessible = last_accessible
+        self.error = error
+
+    async def verify_ports(self, ports, on_result=None):
+        results = {}
+        for port in ports[:2]:
+            results[port] = PortVerificationResult(port=port, accessible=True, attempts=[])
+            on_result(results[port])
+        await self.finish.wait()
+        if self.error is not None:
+            raise self.error
+        results[ports[2]] = PortVerificationResult(port=ports[2], accessible=self.last_accessible, attempts=[])
+        on_result(results[ports[2]])
+        return results
+
+
+async def _no_animation(self, text, duration=1.0):
+    return None
+
+
+async def test_initialize_returns_with_first_verified_ports(tmp_path, monkeypatch, caplog):
+    monkeypatch.setattr(PortVerificationDisplay, "animate_verification", _no_animation)
+    manager = PortManager(start_port=50800, end_port=50810, state_file=str(tmp_path / "ports.json"),
+                          port_check_servers=["http://checker"], discovery_port=7466)
+    verifier = _Verifier()
+    manager.port_verifier = verifier
+
+    assert await asyncio.wait_for(manager.initialize(), 5) is True
+    assert manager.verified_ports == {50800, 50801}
+    assert manager.allocate_port("vm-1") in {50800, 50801}
+
+    # The rest of the range is logged once the background check finishes
+    verifier.finish.set()
+    with caplog.at_level(logging.INFO, logger="provider.vm.port_manager"):
+        await asyncio.wait_for(manager._verification_task, 5)
+    assert manager.verified_ports == {50800, 50801, 50802}
+    assert "Background port verification finished: all 3 SSH ports verified" in caplog.text
+
+
+@pytest.mark.parametrize(
+    "verifier, message",
+    [
+        (_Verifier(last_accessible=False), "2 of 3 SSH ports verified, not accessible: 50802"),
+        (_Verifier(error=RuntimeError("checkers gone")), "failed: checkers gone; keeping the 2 SSH ports"),
+    ],
+)
+async def test_background_outcome_is_logged_without_the_display(tmp_path, monkeypatch, caplog, verifier, message):
+    async def replayed(*args, **kwargs):
+        raise AssertionError("the startup display must not be replayed")
+
+    monkeypatch.setattr(PortVerificationDisplay, "animate_verification", _no_animation)
+    manager = PortManager(start_port=50800, end_port=50810, state_file=str(tmp_path / "ports.json"),
+                          port_check_servers=["http://checker"], discovery_port=7466)
+    manager.port_verifier = verifier
+    assert await manager.initialize() is True
+
+    monkeypatch.setattr(PortVerificationDisplay, "print_ssh_status", replayed)
+    verifier.finish.set()
+    with caplog.at_level(logging.WARNING, logger="provider.vm.port_manager"):
+        await asyncio.wait_for(manager._verification_task, 5)
+    assert message in caplog.text
+    assert manager.verified_ports == {50800, 50801}
+
+
+async def test_stop_verification_cancels_background_check(tmp_path, monkeypatch):
+    monkeypatch.setattr(PortVerificationDisplay, "animate_verification", _no_animation)
+    manager = PortManager(start_port=50800, end_port=50810, state_file=str(tmp_path / "ports.json"),
+                          port_check_servers=["http://checker"], discovery_port=7466)
+    manager.port_verifier = _Verifier()
+
+    assert await manager.initialize() is True
+    task = manager._verification_task
+    await manager.stop_verification()
+    assert task.cancelled() and manager._verification_task is None
+    assert manager.verified_ports == {50800, 50801}
@@ -132,12 +132,16 @@ def vm():
 @click.option('--driver', type=click.Choice(['central', 'golem-base']), default=None, help='Discovery driver to use')
 @click.option('--payments-network', type=str, default=None, help='Filter by payments network profile (default: current config)')
 @click.option('--all-payments', is_flag=True, help='Do not filter by payments network (show all)')
+@click.option('--cheapest', type=click.IntRange(min=1), default=None,
+              help='Show only the N cheapest providers for the spec (requires --cpu, --memory and --storage)')
 @click.option('--json', 'as_json', is_flag=True, help='Output in JSON format')
 @click.option('--network', type=click.Choice(['development', 'testnet', 'mainnet']), default=None,
               help='Override network filter for this command')
 @async_command
-async def list_providers(cpu: Optional[int], memory: Optional[int], storage: Optional[int], country: Optional[str], platform: Optional[str], driver: Optional[str], payments_network: Optional[str] = None, all_payments: bool = False, as_json: bool = False, network: Optional[str] = None):
+async def list_providers(cpu: Optional[int], memory: Optional[int], storage: Optional[int], country: Optional[str], platform: Optional[str], driver: Optional[str], payments_network: Optional[str] = None, all_payments: bool = False, cheapest: Optional[int] = None, as_json: bool = False, network: Optional[str] = None):
     """List available providers matching requirements."""
+    if cheapest and not (cpu and memory and storage):
+        raise click.UsageError("--cheapest requires --cpu, --memory and --storage")
     try:
         if as_json:
             os.environ["GOLEM_SILENCE_LOGS"] = "1"
@@ -168,22 +172,36 @@ async def list_providers(cpu: Optional[int], memory: Optional[int], storage: Opt
             # If a full spec is provided, enable per-provider estimate display
             if cpu and memory and storage:
                 provider_service.estimate_spec = (cpu, memory, storage)
-            try:
-                providers = await provider_service.find_providers(
+            if cheapest:
+                # Ranked by the discovery service, or locally if it cannot rank
+                providers = await provider_service.find_cheapest_providers(
                     cpu=cpu,
                     memory=memory,
                     storage=storage,
                     country=country,
                     platform=platform,
+                    limit=cheapest,
                     driver=driver,
                     payments_network=eff_pn,
                     include_all_payments=bool(all_payments),
                 )
-            except TypeError:
-                # Backward compatibility with older/dummy service stubs in tests
-                providers = await provider_service.find_providers(
-                    cpu=cpu, memory=memory, storage=storage, country=country, platform=platform, driver=driver
-                )
+            else:
+                try:
+                    providers = await provider_service.find_providers(
+                        cpu=cpu,
+                        memory=memory,
+                        storage=storage,
+                        country=country,
+                        platform=platform,
+                        driver=driver,
+                        payments_network=eff_pn,
+                        include_all_payments=bool(all_payments),
+                    )
+                except TypeError:
+                    # Backward compatibility with older/dummy service stubs in tests
+                    providers = await provider_service.find_providers(
+                        cpu=cpu, memory=memory, storage=storage, country=country, platform=platform, driver=driver
+                    )
 
         if not providers:
             logger.warning("No providers found matching criteria")
@@ -22,6 +22,15 @@ class Database:
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
             """)
+            # Migration: stream_id column caches the VM's payment stream for the monitor
+            async with db.execute("PRAGMA table_info(vms)") as cursor:
+                columns = {row[1] for row in await cursor.fetchall()}
+            if "stream_id" not in columns:
+                await db.execute("ALTER TABLE vms ADD COLUMN stream_id INTEGER")
+                await db.execute(
+                    "UPDATE vms SET stream_id = json_extract(config, '$.stream_id') "
+                    "WHERE json_valid(config) AND json_type(config, '$.stream_id') = 'integer'"
+                )
             await db.commit()
 
     async def save_vm(
@@ -33,13 +42,21 @@ class Database:
         status: str = 'running'
     ) -> None:
         """Save VM details."""
+        stream_id = config.get("stream_id")
         async with aiosqlite.connect(self.db_path) as db:
             await db.execute(
                 """
-                INSERT INTO vms (name, provider_ip, vm_id, config, status)
-                VALUES (?, ?, ?, ?, ?)
+                INSERT INTO vms (name, provider_ip, vm_id, config, status, stream_id)
+                VALUES (?, ?, ?, ?, ?, ?)
                 """,
-                (name, provider_ip, vm_id, json.dumps(config), status)
+                (
+                    name,
+                    provider_ip,
+                    vm_id,
+                    json.dumps(config),
+                    status,
+                    int(stream_id) if isinstance(stream_id, int) else None,
+                )
             )
             await db.commit()
 
@@ -98,6 +115,15 @@ class Database:
             )
             await db.commit()
 
+    async def set_vm_stream_id(self, name: str, stream_id: int) -> None:
+        """Record the payment stream backing a VM."""
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute(
+                "UPDATE vms SET stream_id = ? WHERE name = ?",
+                (int(stream_id), name)
+            )
+            await db.commit()
+
     async def list_vms(self) -> List[Dict]:
         """List all VMs."""
         async with aiosqlite.connect(self.db_path) as db:
@@ -8,7 +8,10 @@ class ProviderError(RequestorError):
 
 class DiscoveryError(RequestorError):
     """Discovery service error."""
-    pass
+    def __init__(self, message: str, status: int = None):
+        # HTTP status of the discovery response, if it answered with an error
+        self.status = status
+        super().__init__(message)
 
 class SSHError(RequestorError):
     """SSH-related error."""
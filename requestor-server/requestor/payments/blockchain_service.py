@@ -1,12 +1,22 @@
 from __future__ import annotations
 
+import asyncio
+import threading
 from dataclasses import dataclass
-from typing import Optional, Any, Dict
+from typing import Optional, Any, Dict, Iterable, Tuple
 
 from web3 import Web3
 from eth_account import Account
 from golem_streaming_abi import STREAM_PAYMENT_ABI, ERC20_ABI
 
+from ..utils.logging import setup_logger
+from .tx_manager import TransactionManager
+
+logger = setup_logger(__name__)
+
+# Upper bound on calls per JSON-RPC batch; public nodes reject very large batches
+_MAX_BATCH_SIZE = 50
+
 
 @dataclass
 class StreamPaymentConfig:
@@ -32,12 +42,14 @@ class StreamPaymentClient:
             self.erc20 = self.web3.eth.contract(
                 address=self.token_address, abi=ERC20_ABI
             )
-
-    def _send(self, fn) -> Dict[str, Any]:
-        base = {
-            "from": self.account.address,
-            "nonce": self.web3.eth.get_transaction_count(self.account.address),
-        }
+        self.transactions = TransactionManager(self.web3, self.account)
+        self._allowance_lock = threading.Lock()
+        self._allowance_in_flight = 0
+
+    def _tx_params(self, fn, value: Optional[int] = None) -> Dict[str, Any]:
+        base: Dict[str, Any] = {"from": self.account.address}
+        if value is not None:
+            base["value"] = int(value)
         # Fill chainId
         try:
             base["chainId"] = getattr(self.web3.eth, "chain_id", None) or self.web3.eth.chain_id
@@ -45,7 +57,7 @@ class StreamPaymentClient:
             pass
         # Try gas estimation and fee fields
         try:
-            tx_preview = fn.build_transaction(base)
+            tx_preview = fn.build_transaction(dict(base))
             gas = self.web3.eth.estimate_gas(tx_preview)
             base["gas"] = gas
         except Exception:
@@ -55,25 +67,55 @@ class StreamPaymentClient:
             max_fee = getattr(self.web3.eth, "max_priority_fee", None)
             if max_fee is not None:
                 base.setdefault("maxPriorityFeePerGas", max_fee)
-            base.setdefault("maxFeePerGas", getattr(self.web3.eth, "gas_price", lambda: None)() or self.web3.eth.gas_price)
+            base.setdefault("maxFeePerGas", self.web3.eth.gas_price)
         except Exception:
+            # Legacy pricing cannot be combined with EIP-1559 fee fields
+            base.pop("maxPriorityFeePerGas", None)
             try:
                 base.setdefault("gasPrice", self.web3.eth.gas_price)
             except Exception:
                 pass
+        return base
+
+    def _send(self, fn, value: Optional[int] = None) -> Dict[str, Any]:
+        pending, receipt = self.transactions.send(fn, self._tx_params(fn, value))
+        return {"transactionHash": pending.tx_hash.hex(), "status": receipt.status, "logs": receipt.logs}
+
+    async def _send_async(self, fn, value: Optional[int] = None) -> Dict[str, Any]:
+        params = await asyncio.to_thread(self._tx_params, fn, value)
+        pending, receipt = await self.transactions.send_async(fn, params)
+        return {"transactionHash": pending.tx_hash.hex(), "status": receipt.status, "logs": receipt.logs}
+
+    def _reserve_allowance(self, amount_wei: int) -> None:
+        """Make sure the contract may spend ``amount_wei`` on top of in-flight spends.
+
+        Approvals replace the previous allowance, so the amount approved covers every
+        spending transaction that has been submitted but not yet confirmed. The
+        approval is broadcast under the lock, so a later approval never covers less
+        than an earlier one, but mined outside it so top-ups that need approvals overlap.
+        """
+        approval = None
+        with self._allowance_lock:
+            needed = self._allowance_in_flight + int(amount_wei)
+            try:
+                allowance = self.erc20.functions.allowance(self.account.address, self.contract.address).call()
+            except Exception:
+                allowance = 0
+            if int(allowance) < needed:
+                approve = self.erc20.functions.approve(self.contract.address, needed)
+                approval = self.transactions.submit(approve, self._tx_params(approve))
+            self._allowance_in_flight += int(amount_wei)
+        if approval is not None:
+            # Wait for the approval: gas estimation of the spending call reverts until it is mined
+            try:
+                self.transactions.wait(approval)
+            except Exception:
+                self._release_allowance(amount_wei)
+                raise
 
-        tx = fn.build_transaction(base)
-        # In production, sign and send raw; in tests, Account may be a dummy without signer
-        if hasattr(self.account, "sign_transaction"):
-            signed = self.account.sign_transaction(tx)
-            raw = getattr(signed, "rawTransaction", None) or getattr(signed, "raw_transaction", None)
-            if raw is None:
-                raise RuntimeError("sign_transaction did not return raw transaction bytes")
-            tx_hash = self.web3.eth.send_raw_transaction(raw)
-        else:
-            tx_hash = self.web3.eth.send_transaction(tx)
-        receipt = self.web3.eth.wait_for_transaction_receipt(tx_hash)
-        return {"transactionHash": tx_hash.hex(), "status": receipt.status, "logs": receipt.logs}
+    def _release_allowance(self, amount_wei: int) -> None:
+        with self._allowance_lock:
+            self._allowance_in_flight = max(self._allowance_in_flight - int(amount_wei), 0)
 
     def create_stream(self, provider_address: str, deposit_wei: int, rate_per_second_wei: int) -> int:
         tx_value = None
@@ -81,41 +123,22 @@ class StreamPaymentClient:
 
         if not self.native_eth:
             # Approve deposit for the StreamPayment contract (only if needed)
-            try:
-                allowance = self.erc20.functions.allowance(self.account.address, self.contract.address).call()
-            except Exception:
-                allowance = 0
-            if int(allowance) < int(deposit_wei):
-                approve = self.erc20.functions.approve(self.contract.address, int(deposit_wei))
-                self._send(approve)
+            self._reserve_allowance(int(deposit_wei))
         else:
             tx_value = int(deposit_wei)
 
-        # Create stream
+        # Create stream; include ETH value if native
         fn = self.contract.functions.createStream(
             token_param,
             Web3.to_checksum_address(provider_address),
             int(deposit_wei),
             int(rate_per_second_wei),
         )
-        # Include ETH value if native
-        if tx_value is not None:
-            # Build/send with value field
-            base = {
-                "from": self.account.address,
-                "nonce": self.web3.eth.get_transaction_count(self.account.address),
-                "value": tx_value,
-            }
-            tx = fn.build_transaction(base)
-            signed = self.account.sign_transaction(tx)
-            raw = getattr(signed, "rawTransaction", None) or getattr(signed, "raw_transaction", None)
-            if raw is None:
-                raise RuntimeError("sign_transaction did not return raw transaction bytes")
-            tx_hash = self.web3.eth.send_raw_transaction(raw)
-            receipt = self.web3.eth.wait_for_transaction_receipt(tx_hash)
-            tx_receipt = {"transactionHash": tx_hash.hex(), "status": receipt.status, "logs": receipt.logs}
-        else:
-            tx_receipt = self._send(fn)
+        try:
+            tx_receipt = self._send(fn, value=tx_value)
+        finally:
+            if not self.native_eth:
+                self._release_allowance(int(deposit_wei))
 
         # Try to parse StreamCreated event for streamId
         try:
@@ -129,6 +152,44 @@ class StreamPaymentClient:
         # As a fallback, cannot easily fetch return value from a tx; caller should query later
         raise RuntimeError("create_stream: could not parse streamId from receipt")
 
+    def read_streams(self, stream_ids: Iterable[int]) -> Tuple[int, Dict[int, tuple]]:
+        """Read the latest block timestamp and several ``streams()`` tuples.
+
+        Calls are sent as JSON-RPC batches. Providers without batch support fall
+        back to individual calls; streams that cannot be read are left out.
+        """
+        ids = [int(sid) for sid in dict.fromkeys(stream_ids)]
+        try:
+            return self._read_streams_batched(ids)
+        except Exception as e:
+            logger.warning(f"batched read of {len(ids)} streams failed, reading them one by one: {e}")
+        now = int(self.web3.eth.get_block("latest")["timestamp"])
+        streams: Dict[int, tuple] = {}
+        for sid in ids:
+            try:
+                streams[sid] = tuple(self.contract.functions.streams(sid).call())
+            except Exception:
+                continue
+        return now, streams
+
+    def _read_streams_batched(self, ids: list) -> Tuple[int, Dict[int, tuple]]:
+        now: Optional[int] = None
+        streams: Dict[int, tuple] = {}
+        # The first batch also carries the block read so all streams share its timestamp
+        chunks = [ids[i:i + _MAX_BATCH_SIZE] for i in range(0, len(ids), _MAX_BATCH_SIZE)] or [[]]
+        for chunk in chunks:
+            with self.web3.batch_requests() as batch:
+                if now is None:
+                    batch.add(self.web3.eth.get_block("latest"))
+                for sid in chunk:
+                    batch.add(self.contract.functions.streams(sid))
+                results = list(batch.execute())
+            if now is None:
+                now = int(results.pop(0)["timestamp"])
+            for sid, row in zip(chunk, results):
+                streams[sid] = tuple(row)
+        return int(now), streams
+
     def withdraw(self, stream_id: int) -> str:
         fn = self.contract.functions.withdraw(int(stream_id))
         receipt = self._send(fn)
@@ -140,31 +201,24 @@ class StreamPaymentClient:
         return receipt["transactionHash"]
 
     def top_up(self, stream_id: int, amount_wei: int) -> str:
-        if not self.native_eth:
-            # Approve first (only if needed)
-            try:
-                allowance = self.erc20.functions.allowance(self.account.address, self.contract.address).call()
-            except Exception:
-                allowance = 0
-            if int(allowance) < int(amount_wei):
-                approve = self.erc20.functions.approve(self.contract.address, int(amount_wei))
-                self._send(approve)
-            fn = self.contract.functions.topUp(int(stream_id), int(amount_wei))
-            receipt = self._send(fn)
-            return receipt["transactionHash"]
-        else:
+        fn = self.contract.functions.topUp(int(stream_id), int(amount_wei))
+        if self.native_eth:
             # Native ETH mode: send value along with call
-            fn = self.contract.functions.topUp(int(stream_id), int(amount_wei))
-            base = {
-                "from": self.account.address,
-                "nonce": self.web3.eth.get_transaction_count(self.account.address),
-                "value": int(amount_wei),
-            }
-            tx = fn.build_transaction(base)
-            signed = self.account.sign_transaction(tx)
-            raw = getattr(signed, "rawTransaction", None) or getattr(signed, "raw_transaction", None)
-            if raw is None:
-                raise RuntimeError("sign_transaction did not return raw transaction bytes")
-            tx_hash = self.web3.eth.send_raw_transaction(raw)
-            self.web3.eth.wait_for_transaction_receipt(tx_hash)
-            return tx_hash.hex()
+            return self._send(fn, value=int(amount_wei))["transactionHash"]
+        # Approve first (only if needed)
+        self._reserve_allowance(int(amount_wei))
+        try:
+            return self._send(fn)["transactionHash"]
+        finally:
+            self._release_allowance(int(amount_wei))
+
+    async def top_up_async(self, stream_id: int, amount_wei: int) -> str:
+        """Like :meth:`top_up`, but confirms off the event loop so top-ups can overlap."""
+        fn = self.contract.functions.topUp(int(stream_id), int(amount_wei))
+        if self.native_eth:
+            return (await self._send_async(fn, value=int(amount_wei)))["transactionHash"]
+        await asyncio.to_thread(self._reserve_allowance, int(amount_wei))
+        try:
+            return (await self._send_async(fn))["transactionHash"]
+        finally:
+            self._release_allowance(int(amount_wei))
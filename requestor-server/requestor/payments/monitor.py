@@ -1,5 +1,5 @@
 import asyncio
-from typing import Optional
+from typing import Dict, List, Optional
 
 from ..services.database_service import DatabaseService
 from ..provider.client import ProviderClient
@@ -7,8 +7,20 @@ from ..config import config
 from ..utils.logging import setup_logger
 from .blockchain_service import StreamPaymentClient, StreamPaymentConfig
 
+# Upper bound on providers asked for stream mappings at once
+_MAX_CONCURRENT_RESOLVES = 8
+# Upper bound on top-up transactions awaiting confirmation at once
+_MAX_CONCURRENT_TOPUPS = 8
+
 
 class RequestorStreamMonitor:
+    """Keeps the streams of running VMs funded.
+
+    Each tick reads chain time and every stream in one batched RPC round trip,
+    then submits the needed top-ups concurrently. Stream ids learned from
+    providers are cached in the requestor DB so they are only resolved once.
+    """
+
     def __init__(self, db: DatabaseService):
         self.db = db
         self._task: Optional[asyncio.Task] = None
@@ -21,6 +33,8 @@ class RequestorStreamMonitor:
                 private_key=config.ethereum_private_key,
             )
         )
+        self._topups: Dict[int, asyncio.Task] = {}
+        self._topup_slots = asyncio.Semaphore(_MAX_CONCURRENT_TOPUPS)
 
     def start(self):
         if not config.stream_monitor_enabled:
@@ -40,22 +54,124 @@ class RequestorStreamMonitor:
                 pass
             self._logger.info("Requestor stream auto-topup stopped")
 
-    async def _resolve_stream_id(self, vm: dict) -> Optional[int]:
+    def _resolve_stream_id(self, vm: dict) -> Optional[int]:
         # Prefer local DB recorded stream_id
+        sid = vm.get("stream_id")
+        if isinstance(sid, int):
+            return sid
         sid = vm.get("config", {}).get("stream_id")
         if isinstance(sid, int):
             return sid
-        # Ask provider for mapping
+        return None
+
+    async def _resolve_from_provider(self, provider_ip: str, vms: List[dict]) -> Dict[str, int]:
+        """Ask one provider for the streams of its VMs over a single session."""
+        resolved: Dict[str, int] = {}
         try:
-            provider_url = config.get_provider_url(vm["provider_ip"])
+            provider_url = config.get_provider_url(provider_ip)
             async with ProviderClient(provider_url) as client:
-                status = await client.get_vm_stream_status(vm["vm_id"])
-                sid = status.get("stream_id")
-                self._logger.debug(f"Resolved stream for VM {vm['name']}: {sid}")
-                return int(sid) if sid is not None else None
+                for vm in vms:
+                    try:
+                        status = await client.get_vm_stream_status(vm["vm_id"])
+                    except Exception as e:
+                        self._logger.debug(f"Could not resolve stream for VM {vm['name']}: {e}")
+                        continue
+                    sid = status.get("stream_id")
+                    self._logger.debug(f"Resolved stream for VM {vm['name']}: {sid}")
+                    if sid is not None:
+                        resolved[vm["name"]] = int(sid)
+        except Exception as e:
+            self._logger.debug(f"Could not resolve streams from provider {provider_ip}: {e}")
+        for name, sid in resolved.items():
+            try:
+                await self.db.set_vm_stream_id(name, sid)
+            except Exception as e:
+                self._logger.debug(f"Could not cache stream {sid} for VM {name}: {e}")
+        return resolved
+
+    async def _stream_ids(self, vms: List[dict]) -> Dict[str, int]:
+        """Map VM name to stream id, resolving unknown mappings per provider concurrently."""
+        stream_ids: Dict[str, int] = {}
+        unresolved: Dict[str, List[dict]] = {}
+        for vm in vms:
+            sid = self._resolve_stream_id(vm)
+            if sid is not None:
+                stream_ids[vm["name"]] = sid
+            else:
+                unresolved.setdefault(vm["provider_ip"], []).append(vm)
+        if unresolved:
+            slots = asyncio.Semaphore(_MAX_CONCURRENT_RESOLVES)
+
+            async def _bounded(provider_ip: str, provider_vms: List[dict]) -> Dict[str, int]:
+                async with slots:
+                    return await self._resolve_from_provider(provider_ip, provider_vms)
+
+            for resolved in await asyncio.gather(*(_bounded(ip, v) for ip, v in unresolved.items())):
+                stream_ids.update(resolved)
+        return stream_ids
+
+    async def _check_streams(self, min_remaining: int, target_seconds: int) -> None:
+        # Only manage running VMs
+        vms = [vm for vm in await self.db.list_vms() if vm.get("status") == "running"]
+        self._logger.debug(f"stream monitor tick: {len(vms)} running VMs to check")
+        if not vms:
+            return
+        stream_ids = await self._stream_ids(vms)
+        if not stream_ids:
+            self._logger.debug("no streams mapped for running VMs")
+            return
+        # Read chain time and every stream tuple in one batched round trip
+        try:
+            now, streams = await asyncio.to_thread(self._sp.read_streams, stream_ids.values())
         except Exception as e:
-            self._logger.debug(f"Could not resolve stream for VM {vm['name']}: {e}")
-            return None
+            self._logger.warning(f"could not read streams: {e}")
+            return
+        for name, stream_id in stream_ids.items():
+            s = streams.get(stream_id)
+            if s is None:
+                self._logger.warning(f"stream lookup failed for {stream_id}")
+                continue
+            token, sender, recipient, startTime, stopTime, ratePerSecond, deposit, withdrawn, halted = s
+            if bool(halted):
+                # Respect terminated streams
+                self._logger.debug(f"skip stream {stream_id} halted=true")
+                continue
+            if stream_id in self._topups:
+                self._logger.debug(f"skip stream {stream_id}: top-up still in flight")
+                continue
+            remaining = max(int(stopTime) - now, 0)
+            self._logger.debug(
+                f"VM {name} stream {stream_id}: remaining={remaining}s rate={int(ratePerSecond)}"
+            )
+            if remaining < min_remaining:
+                # Top up to reach target_seconds of runway
+                deficit = max(target_seconds - remaining, 0)
+                add_wei = int(deficit) * int(ratePerSecond)
+                if add_wei <= 0:
+                    continue
+                self._topups[stream_id] = asyncio.create_task(
+                    self._top_up(name, stream_id, add_wei, target_seconds),
+                    name=f"stream-topup-{stream_id}",
+                )
+            else:
+                self._logger.debug(
+                    f"stream {stream_id} healthy (remaining={remaining}s >= {min_remaining}s)"
+                )
+
+    async def _top_up(self, name: str, stream_id: int, add_wei: int, target_seconds: int) -> None:
+        """Top up in the background so slow confirmations do not hold up the next tick."""
+        try:
+            async with self._topup_slots:
+                self._logger.info(
+                    f"⛽ topping up stream {stream_id} by {add_wei} wei to reach {target_seconds}s"
+                )
+                await self._sp.top_up_async(int(stream_id), int(add_wei))
+            self._logger.success(f"topped up stream {stream_id} (+{add_wei} wei); VM={name}")
+        except Exception as e:
+            # Ignore failures; will retry next tick
+            self._logger.warning(f"top-up failed for stream {stream_id}: {e}")
+        finally:
+            self._topups.pop(stream_id, None)
 
     async def _run(self):
         interval = max(int(config.stream_monitor_interval_seconds), 5)
@@ -63,64 +179,17 @@ class RequestorStreamMonitor:
         target_seconds = max(int(config.stream_topup_target_seconds), min_remaining)
         while True:
             try:
-                vms = await self.db.list_vms()
-                self._logger.debug(f"stream monitor tick: {len(vms)} VMs to check")
-                for vm in vms:
-                    # Only manage running VMs
-                    if vm.get("status") != "running":
-                        self._logger.debug(f"skip VM {vm.get('name')} status={vm.get('status')}")
-                        continue
-                    stream_id = await self._resolve_stream_id(vm)
-                    if stream_id is None:
-                        self._logger.debug(f"skip VM {vm.get('name')} no stream mapped")
-                        continue
-                    # Read on-chain stream tuple via contract
-                    try:
-                        token, sender, recipient, startTime, stopTime, ratePerSecond, deposit, withdrawn, halted = (
-                            self._sp.contract.functions.streams(int(stream_id)).call()
-                        )
-                    except Exception as e:
-                        self._logger.warning(f"stream lookup failed for {stream_id}: {e}")
-                        continue
-                    if bool(halted):
-                        # Respect terminated streams
-                        self._logger.debug(f"skip stream {stream_id} halted=true")
-                        continue
-                    # Compute remaining seconds using chain time
-                    try:
-                        now = int(self._sp.web3.eth.get_block("latest")["timestamp"])
-                    except Exception as e:
-                        self._logger.warning(f"could not get chain time: {e}")
-                        continue
-                    remaining = max(int(stopTime) - now, 0)
-                    self._logger.debug(
-                        f"VM {vm.get('name')} stream {stream_id}: remaining={remaining}s rate={int(ratePerSecond)}"
-                    )
-                    if remaining < min_remaining:
-                        # Top up to reach target_seconds of runway
-                        deficit = max(target_seconds - remaining, 0)
-                        add_wei = int(deficit) * int(ratePerSecond)
-                        if add_wei <= 0:
-                            continue
-                        try:
-                            self._logger.info(
-                                f"⛽ topping up stream {stream_id} by {add_wei} wei to reach {target_seconds}s"
-                            )
-                            self._sp.top_up(int(stream_id), int(add_wei))
-                            self._logger.success(
-                                f"topped up stream {stream_id} (+{add_wei} wei); VM={vm.get('name')}"
-                            )
-                        except Exception as e:
-                            # Ignore failures; will retry next tick
-                            self._logger.warning(f"top-up failed for stream {stream_id}: {e}")
-                    else:
-                        self._logger.debug(
-                            f"stream {stream_id} healthy (remaining={remaining}s >= {min_remaining}s)"
-                        )
+                await self._check_streams(min_remaining, target_seconds)
                 await asyncio.sleep(interval)
             except asyncio.CancelledError:
                 break
             except Exception as e:
                 # Keep the monitor resilient
                 self._logger.error(f"requestor stream monitor error: {e}")
-                await asyncio.sleep(interval)
+                try:
+                    await asyncio.sleep(interval)
+                except asyncio.CancelledError:
+                    break
+        if self._topups:
+            # Let submitted top-ups finish recording their outcome
+            await asyncio.wait(list(self._topups.values()), timeout=5)
@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from web3 import exceptions as web3_exceptions
+from web3.exceptions import TimeExhausted, TransactionNotFound
+
+from ..utils.logging import setup_logger
+
+logger = setup_logger(__name__)
+
+# RPC error fragments that mean our local view of the account nonce is stale
+_NONCE_ERRORS = (
+    "nonce too low",
+    "already known",
+    "known transaction",
+    "replacement transaction underpriced",
+)
+
+
+def _is_nonce_error(err: Exception) -> bool:
+    msg = str(err).lower()
+    return any(fragment in msg for fragment in _NONCE_ERRORS)
+
+
+def _is_rejection(err: Exception) -> bool:
+    """True if the node answered the broadcast with an error, so it did not take the transaction.
+
+    Transport failures (timeouts, dropped connections) are not rejections:
+    the node may have accepted the transaction before the reply was lost.
+    """
+    rpc_error = getattr(web3_exceptions, "Web3RPCError", None)
+    if rpc_error is not None and isinstance(err, rpc_error):
+        return True
+    # Older web3 raises ValueError with the JSON-RPC error object
+    return isinstance(err, ValueError) and bool(err.args) and isinstance(err.args[0], dict)
+
+
+class NonceManager:
+    """Hands out nonces for a single sending account.
+
+    The counter is seeded from the chain's pending transaction count and then
+    advanced locally, so concurrent senders in this process never reuse a
+    nonce. Nonces whose transaction never reached the node, or was rejected
+    by it, are recycled.
+    """
+
+    def __init__(self, web3, address: str):
+        self.web3 = web3
+        self.address = address
+        self._lock = threading.Lock()
+        self._next: Optional[int] = None
+        self._released: List[int] = []
+
+    def allocate(self) -> int:
+        with self._lock:
+            if self._released:
+                return heapq.heappop(self._released)
+            if self._next is None:
+                self._next = int(self.web3.eth.get_transaction_count(self.address, "pending"))
+            nonce = self._next
+            self._next += 1
+            return nonce
+
+    def release(self, nonce: int) -> None:
+        """Return a nonce whose transaction is known not to be on the node."""
+        with self._lock:
+            if self._next is not None and nonce == self._next - 1:
+                self._next -= 1
+            else:
+                heapq.heappush(self._released, nonce)
+
+    def resync(self) -> None:
+        """Drop local state so the next allocation re-reads the chain."""
+        with self._lock:
+            self._next = None
+            self._released.clear()
+
+
+@dataclass
+class PendingTransaction:
+    nonce: int
+    tx: Dict[str, Any]
+    tx_hashes: List[Any] = field(default_factory=list)
+    fee_bumps: int = 0
+
+    @property
+    def tx_hash(self) -> Any:
+        return self.tx_hashes[-1]
+
+
+class TransactionManager:
+    """Signs, broadcasts and confirms transactions for one account.
+
+    Transactions are submitted with locally managed nonces so several can be
+    in flight at once. Waiting for a receipt re-broadcasts the transaction
+    with bumped fees whenever it stays unmined for ``receipt_timeout`` seconds.
+    """
+
+    def __init__(
+        self,
+        web3,
+        account,
+        *,
+        receipt_timeout: float = 120.0,
+        max_fee_bumps: int = 3,
+        fee_bump_percent: int = 125,
+    ):
+        self.web3 = web3
+        self.account = account
+        self.nonces = NonceManager(web3, account.address)
+        self.receipt_timeout = receipt_timeout
+        self.max_fee_bumps = max_fee_bumps
+        # Nodes reject same-nonce replacements that raise fees by less than 10%
+        self.fee_bump_percent = max(int(fee_bump_percent), 111)
+        self._lock = threading.Lock()
+        # Serializes nonce allocation and broadcast so transactions reach the node in nonce order
+        self._submit_lock = threading.Lock()
+        self._pending: Dict[int, PendingTransaction] = {}
+
+    @property
+    def pending(self) -> List[PendingTransaction]:
+        with self._lock:
+            return [self._pending[n] for n in sorted(self._pending)]
+
+    def submit(self, fn, tx_params: Optional[Dict[str, Any]] = None) -> PendingTransaction:
+        """Build, sign and broadcast a contract call without waiting for it to be mined."""
+        try:
+            return self._submit(fn, tx_params)
+        except Exception as e:
+            if not _is_nonce_error(e):
+                raise
+            # Another process (e.g. a CLI command) used our nonce; retry once from chain state
+            logger.warning(f"nonce conflict for {self.account.address}, resyncing: {e}")
+            self.nonces.resync()
+            return self._submit(fn, tx_params)
+
+    def _submit(self, fn, tx_params: Optional[Dict[str, Any]]) -> PendingTransaction:
+        # Some nodes and L2 sequencers reject a nonce ahead of the account's pending one
+        with self._submit_lock:
+            nonce = self.nonces.allocate()
+            params = dict(tx_params or {})
+            params.update({"from": self.account.address, "nonce": nonce})
+            try:
+                tx = fn.build_transaction(params)
+                raw = self._sign(tx)
+            except Exception:
+                # Nothing reached the node
+                self.nonces.release(nonce)
+                raise
+            try:
+                tx_hash = self._send(tx, raw)
+            except Exception as e:
+                if _is_nonce_error(e):
+                    pass  # submit() resyncs
+                elif _is_rejection(e):
+                    self.nonces.release(nonce)
+                else:
+                    # The node may hold the transaction already; trust its pending count
+                    logger.warning(f"broadcast of nonce {nonce} failed without a node reply, resyncing: {e}")
+                    self.nonces.resync()
+                raise
+        pending = PendingTransaction(nonce=nonce, tx=tx, tx_hashes=[tx_hash])
+        with self._lock:
+            self._pending[nonce] = pending
+        return pending
+
+    def _sign(self, tx: Dict[str, Any]) -> Optional[Any]:
+        # In tests, Account may be a dummy without a signer
+        if not hasattr(self.account, "sign_transaction"):
+            return None
+        signed = self.account.sign_transaction(tx)
+        raw = getattr(signed, "rawTransaction", None) or getattr(signed, "raw_transaction", None)
+        if raw is None:
+            raise RuntimeError("sign_transaction did not return raw transaction bytes")
+        return raw
+
+    def _send(self, tx: Dict[str, Any], raw: Optional[Any]) -> Any:
+        if raw is None:
+            return self.web3.eth.send_transaction(tx)
+        return self.web3.eth.send_raw_transaction(raw)
+
+    def _broadcast(self, tx: Dict[str, Any]) -> Any:
+        return self._send(tx, self._sign(tx))
+
+    def wait(self, pending: PendingTransaction) -> Any:
+        """Block until one broadcast of ``pending`` is mined, bumping fees while it is stuck.
+
+        ``pending`` stops being tracked once this returns or raises.
+        """
+        try:
+            while True:
+                try:
+                    return self.web3.eth.wait_for_transaction_receipt(
+                        pending.tx_hash, timeout=self.receipt_timeout
+                    )
+                except TimeExhausted:
+                    # An earlier, cheaper broadcast may have been mined in the meantime
+                    receipt = self._find_replaced_receipt(pending)
+                    if receipt is not None:
+                        return receipt
+                    if pending.fee_bumps >= self.max_fee_bumps:
+                        raise
+                    self._bump_fees(pending)
+        finally:
+            with self._lock:
+                self._pending.pop(pending.nonce, None)
+
+    async def wait_async(self, pending: PendingTransaction) -> Any:
+        return await asyncio.to_thread(self.wait, pending)
+
+    def send(self, fn, tx_params: Optional[Dict[str, Any]] = None) -> tuple[PendingTransaction, Any]:
+        pending = self.submit(fn, tx_params)
+        return pending, self.wait(pending)
+
+    async def send_async(
+        self, fn, tx_params: Optional[Dict[str, Any]] = None
+    ) -> tuple[PendingTransaction, Any]:
+        pending = await asyncio.to_thread(self.submit, fn, tx_params)
+        return pending, await self.wait_async(pending)
+
+    def _find_replaced_receipt(self, pending: PendingTransaction) -> Any:
+        for tx_hash in pending.tx_hashes[:-1]:
+            try:
+                return self.web3.eth.get_transaction_receipt(tx_hash)
+            except TransactionNotFound:
+                continue
+        return None
+
+    def _bump_fees(self, pending: PendingTransaction) -> None:
+        tx = dict(pending.tx)
+        bumped = False
+        for key in ("maxFeePerGas", "maxPriorityFeePerGas", "gasPrice"):
+            if tx.get(key) is not None:
+                old = int(tx[key])
+                tx[key] = max(old * self.fee_bump_percent // 100, old + 1)
+                bumped = True
+        if not bumped:
+            tx["gasPrice"] = int(self.web3.eth.gas_price) * self.fee_bump_percent // 100
+        try:
+            tx_hash = self._broadcast(tx)
+        except Exception as e:
+            if not _is_nonce_error(e):
+                raise
+            # The original landed while we were preparing the replacement
+            logger.debug(f"fee bump for nonce {pending.nonce} not needed: {e}")
+            pending.fee_bumps += 1
+            return
+        pending.tx = tx
+        pending.tx_hashes.append(tx_hash)
+        pending.fee_bumps += 1
+        logger.warning(
+            f"transaction with nonce {pending.nonce} unmined after {self.receipt_timeout}s; "
+            f"re-broadcast with bumped fees ({pending.fee_bumps}/{self.max_fee_bumps})"
+        )
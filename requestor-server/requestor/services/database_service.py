@@ -62,6 +62,13 @@ class DatabaseService:
         except Exception as e:
             raise DatabaseError(f"Failed to update VM status: {str(e)}")
 
+    async def set_vm_stream_id(self, name: str, stream_id: int) -> None:
+        """Record the payment stream backing a VM."""
+        try:
+            await self.db.set_vm_stream_id(name, stream_id)
+        except Exception as e:
+            raise DatabaseError(f"Failed to update VM stream: {str(e)}")
+
     async def list_vms(self) -> List[Dict]:
         """List all VMs."""
         try:
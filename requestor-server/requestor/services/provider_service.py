@@ -1,13 +1,18 @@
 """Provider discovery and management service."""
 from typing import Dict, List, Optional
+import asyncio
 import aiohttp
 import time
 from datetime import datetime, timezone
 from ..errors import DiscoveryError, ProviderError
 from ..config import config
+from ..utils.chain_clock import ChainClock
 from golem_base_sdk import GolemBaseClient
 from golem_base_sdk.types import EntityKey, GenericBytes
 
+# Upper bound on Golem Base metadata lookups in flight while listing providers
+_METADATA_FETCH_CONCURRENCY = 32
+
 
 class ProviderService:
     """Service for provider operations."""
@@ -15,6 +20,7 @@ class ProviderService:
     def __init__(self):
         self.session = None
         self.golem_base_client = None
+        self.chain_clock: Optional[ChainClock] = None
         # Optional spec (cpu, memory, storage) to compute estimates for display
         self.estimate_spec: Optional[tuple[int, int, int]] = None
 
@@ -90,6 +96,97 @@ class ProviderService:
         else:
             return await self._find_providers_central(cpu, memory, storage, country, platform)
 
+    async def find_cheapest_providers(
+        self,
+        cpu: int,
+        memory: int,
+        storage: int,
+        country: Optional[str] = None,
+        platform: Optional[str] = None,
+        limit: int = 10,
+        driver: Optional[str] = None,
+        payments_network: Optional[str] = None,
+        include_all_payments: bool = False,
+    ) -> List[Dict]:
+        """Find the providers that run the spec most cheaply, each with an ``estimate``.
+
+        The central discovery service ranks providers itself. With Golem Base, or
+        a discovery service without the match endpoint, the ranking is computed
+        here from the advertised prices.
+        """
+        discovery_driver = driver or config.discovery_driver
+        if discovery_driver != "golem-base":
+            try:
+                return await self._match_providers_central(cpu, memory, storage, country, platform, limit)
+            except DiscoveryError as e:
+                if e.status != 404:
+                    raise
+                # Older discovery services do not rank; list and rank here instead
+
+        providers = await self.find_providers(
+            cpu, memory, storage, country, platform,
+            driver=discovery_driver,
+            payments_network=payments_network,
+            include_all_payments=include_all_payments,
+        )
+        ranked = []
+        for provider in providers:
+            estimate = self.compute_estimate(provider, (cpu, memory, storage))
+            if estimate is not None:
+                ranked.append({**provider, 'estimate': estimate})
+        ranked.sort(key=lambda p: (p['estimate']['usd_per_month'], p.get('provider_id') or ''))
+        return ranked[:limit]
+
+    async def _query_discovery(self, path: str, params: Dict) -> List[Dict]:
+        """GET a list of providers from the central discovery service.
+
+        Parameters that are None are left out of the query. In development,
+        providers are reached through localhost.
+        """
+        params = {k: v for k, v in params.items() if v is not None}
+        try:
+            async with self.session.get(
+                f"{config.discovery_url}{path}",
+                params=params
+            ) as response:
+                if not response.ok:
+                    raise DiscoveryError(
+                        f"Failed to query discovery service: {await response.text()}",
+                        status=response.status,
+                    )
+                providers = await response.json()
+        except DiscoveryError:
+            raise
+        except aiohttp.ClientError as e:
+            raise DiscoveryError(
+                f"Failed to connect to discovery service: {str(e)}")
+        except Exception as e:
+            raise DiscoveryError(f"Error querying discovery service: {str(e)}")
+
+        if config.environment == "development":
+            for provider in providers:
+                provider['ip_address'] = 'localhost'
+        return providers
+
+    async def _match_providers_central(
+        self,
+        cpu: int,
+        memory: int,
+        storage: int,
+        country: Optional[str],
+        platform: Optional[str],
+        limit: int,
+    ) -> List[Dict]:
+        """Ask the central discovery service for the cheapest providers for a spec."""
+        return await self._query_discovery("/api/v1/advertisements/match", {
+            'cpu': cpu,
+            'memory': memory,
+            'storage': storage,
+            'country': country,
+            'platform': platform,
+            'limit': limit,
+        })
+
     async def _find_providers_golem_base(
         self,
         cpu: Optional[int] = None,
@@ -131,12 +228,20 @@ class ProviderService:
 
             results = await self.golem_base_client.query_entities(query)
 
-            providers = []
-            for result in results:
+            # The SDK has no multi-entity metadata call, so fetch them concurrently
+            fetch_slots = asyncio.Semaphore(_METADATA_FETCH_CONCURRENCY)
+
+            async def _fetch_metadata(result):
                 entity_key = EntityKey(
                     GenericBytes.from_hex_string(result.entity_key)
                 )
-                metadata = await self.golem_base_client.get_entity_metadata(entity_key)
+                async with fetch_slots:
+                    return await self.golem_base_client.get_entity_metadata(entity_key)
+
+            all_metadata = await asyncio.gather(*(_fetch_metadata(r) for r in results))
+
+            providers = []
+            for metadata in all_metadata:
                 annotations = {
                     ann.key: ann.value for ann in metadata.string_annotations}
                 annotations.update(
@@ -180,43 +285,13 @@ class ProviderService:
         platform: Optional[str] = None
     ) -> List[Dict]:
         """Find providers using the central discovery service."""
-        try:
-            # Build query parameters
-            params = {
-                k: v for k, v in {
-                    'cpu': cpu,
-                    'memory': memory,
-                    'storage': storage,
-                    'country': country,
-                    'platform': platform,
-                }.items() if v is not None
-            }
-
-            # Query discovery service
-            async with self.session.get(
-                f"{config.discovery_url}/api/v1/advertisements",
-                params=params
-            ) as response:
-                if not response.ok:
-                    raise DiscoveryError(
-                        f"Failed to query discovery service: {await response.text()}"
-                    )
-                providers = await response.json()
-
-            # Process provider IPs based on environment
-            for provider in providers:
-                provider['ip_address'] = (
-                    'localhost' if config.environment == "development"
-                    else provider.get('ip_address')
-                )
-
-            return providers
-
-        except aiohttp.ClientError as e:
-            raise DiscoveryError(
-                f"Failed to connect to discovery service: {str(e)}")
-        except Exception as e:
-            raise DiscoveryError(f"Error finding providers: {str(e)}")
+        return await self._query_discovery("/api/v1/advertisements", {
+            'cpu': cpu,
+            'memory': memory,
+            'storage': storage,
+            'country': country,
+            'platform': platform,
+        })
 
     async def verify_provider(self, provider_id: str) -> Dict:
         """Verify provider exists and is available."""
@@ -271,32 +346,27 @@ class ProviderService:
                 f"Failed to check resource availability: {str(e)}"
             )
 
+    def _chain_clock(self) -> ChainClock:
+        """Golem Base chain clock, shared by every row of a listing."""
+        if self.chain_clock is None:
+            # Resolve the client per fetch so a reconnect is picked up
+            self.chain_clock = ChainClock(
+                lambda: self.golem_base_client.http_client().eth.get_block('latest')
+            )
+        return self.chain_clock
+
     async def _format_block_timestamp(self, block_number: int) -> str:
         """Format a block number into a human-readable 'time ago' string.
 
-        The Golem Base chain uses ~2 seconds per block.
-        We also guard against negative diffs that can occur when adverts are
-        extended before expiry (expires_at increases), which would otherwise
-        make the derived "created_at" appear in the future.
+        The latest block is fetched once and shared by concurrently formatted
+        rows (see ``ChainClock``). Block numbers ahead of the chain, which occur
+        when adverts are extended before expiry (expires_at increases), count
+        as now rather than appearing in the future.
         """
         if not self.golem_base_client:
             return "N/A"
         try:
-            latest_block = await self.golem_base_client.http_client().eth.get_block('latest')
-            block_diff = latest_block.number - block_number
-            if block_diff < 0:
-                block_diff = 0
-            # Approximate time: ~2s per block
-            seconds_ago = block_diff * 2
-            
-            if seconds_ago < 60:
-                return f"{int(seconds_ago)}s ago"
-            elif seconds_ago < 3600:
-                return f"{int(seconds_ago / 60)}m ago"
-            elif seconds_ago < 86400:
-                return f"{int(seconds_ago / 3600)}h ago"
-            else:
-                return f"{int(seconds_ago / 86400)}d ago"
+            return await self._chain_clock().time_ago(block_number)
         except Exception:
             return "N/A"
 
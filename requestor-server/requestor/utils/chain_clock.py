@@ -0,0 +1,83 @@
+"""Cached view of a chain's latest block.
+
+Commands that label many entries with how long ago a block was (such as the
+provider listing) ask for the latest block through one ``ChainClock``: the
+first caller fetches it, concurrent callers share that fetch and later callers
+reuse the answer for ``ttl`` seconds.
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+# Golem Base produces a block roughly every 2 seconds
+SECONDS_PER_BLOCK = 2.0
+
+
+def format_age(seconds: float) -> str:
+    """Format a duration as a short 'time ago' label, e.g. ``5m ago``."""
+    if seconds < 60:
+        return f"{int(seconds)}s ago"
+    elif seconds < 3600:
+        return f"{int(seconds / 60)}m ago"
+    elif seconds < 86400:
+        return f"{int(seconds / 3600)}h ago"
+    else:
+        return f"{int(seconds / 86400)}d ago"
+
+
+class ChainClock:
+    """Latest block of a chain, fetched at most once per ``ttl`` seconds.
+
+    ``fetch_latest`` is an async callable returning a block with a ``number``
+    attribute, e.g. ``lambda: w3.eth.get_block('latest')`` on an async Web3.
+    Failed fetches are not cached.
+    """
+
+    def __init__(
+        self,
+        fetch_latest: Callable[[], Awaitable[Any]],
+        ttl: float = 5.0,
+        seconds_per_block: float = SECONDS_PER_BLOCK,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._fetch_latest = fetch_latest
+        self.ttl = ttl
+        self.seconds_per_block = seconds_per_block
+        self._clock = clock
+        self._block: Any = None
+        self._fetched_at = 0.0
+        self._inflight: Optional[asyncio.Future] = None
+
+    async def _refresh(self) -> Any:
+        try:
+            block = await self._fetch_latest()
+        finally:
+            self._inflight = None
+        self._block = block
+        self._fetched_at = self._clock()
+        return block
+
+    async def latest_block(self) -> Any:
+        """Return the latest block, from cache while it is fresh."""
+        if self._block is not None and self._clock() - self._fetched_at < self.ttl:
+            return self._block
+        if self._inflight is None:
+            self._inflight = asyncio.ensure_future(self._refresh())
+        # Shielded so a cancelled caller does not cancel the fetch others await
+        return await asyncio.shield(self._inflight)
+
+    async def latest_number(self) -> int:
+        """Return the latest block number."""
+        return (await self.latest_block()).number
+
+    async def seconds_since(self, block_number: int) -> float:
+        """Approximate seconds elapsed since ``block_number``.
+
+        Never negative: a block number ahead of the chain (e.g. derived from an
+        expiry that was extended) counts as now.
+        """
+        return max(0, await self.latest_number() - block_number) * self.seconds_per_block
+
+    async def time_ago(self, block_number: int) -> str:
+        """Short 'time ago' label for ``block_number``, e.g. ``3h ago``."""
+        return format_age(await self.seconds_since(block_number))
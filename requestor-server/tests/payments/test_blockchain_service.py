@@ -43,10 +43,10 @@ class DummyWeb3:
     def __init__(self, _provider=None):
         self.eth = types.SimpleNamespace(
             default_account=None,
-            get_transaction_count=lambda addr: 0,
+            get_transaction_count=lambda addr, block_identifier="latest": 0,
             send_transaction=lambda tx: types.SimpleNamespace(hex=lambda: "0xabc"),
             send_raw_transaction=lambda raw: types.SimpleNamespace(hex=lambda: "0xabc"),
-            wait_for_transaction_receipt=lambda h: types.SimpleNamespace(status=1, logs=[{"data": "ok"}]),
+            wait_for_transaction_receipt=lambda h, timeout=None: types.SimpleNamespace(status=1, logs=[{"data": "ok"}]),
             contract=lambda address=None, abi=None: DummyContract(),
         )
         self.middleware_onion = types.SimpleNamespace(add=lambda *a, **kw: None)
@@ -98,10 +98,10 @@ def test_create_stream_raises_when_no_event(monkeypatch):
             # override eth.contract to return NoEventContract
             self.eth = types.SimpleNamespace(
                 default_account=None,
-                get_transaction_count=lambda addr: 0,
+                get_transaction_count=lambda addr, block_identifier="latest": 0,
                 send_transaction=lambda tx: types.SimpleNamespace(hex=lambda: "0xabc"),
                 send_raw_transaction=lambda raw: types.SimpleNamespace(hex=lambda: "0xabc"),
-                wait_for_transaction_receipt=lambda h: types.SimpleNamespace(status=1, logs=[{"data": "ok"}]),
+                wait_for_transaction_receipt=lambda h, timeout=None: types.SimpleNamespace(status=1, logs=[{"data": "ok"}]),
                 contract=lambda address=None, abi=None: NoEventContract(),
             )
 
@@ -123,3 +123,40 @@ def test_top_up_happy_path(monkeypatch):
     client.erc20 = DummyERC20()
     tx = client.top_up(42, 12345)
     assert tx == "0xabc"
+
+
+def test_read_streams_batches_block_and_stream_calls(monkeypatch):
+    from requestor.payments import blockchain_service as bs
+    monkeypatch.setattr(bs, "Web3", DummyWeb3)
+    monkeypatch.setattr(bs, "Account", types.SimpleNamespace(from_key=lambda k: types.SimpleNamespace(address="0xme")))
+    monkeypatch.setattr(bs, "_MAX_BATCH_SIZE", 2)
+    client = StreamPaymentClient(StreamPaymentConfig("http://localhost", "0xcontract", "0x" + "0" * 40, "0x01"))
+
+    batches = []
+
+    class Batch:
+        def __init__(self):
+            self.calls = []
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def add(self, call):
+            self.calls.append(call)
+
+        def execute(self):
+            batches.append(list(self.calls))
+            return [{"timestamp": 77} if c == "block" else ("row", c) for c in self.calls]
+
+    client.web3.batch_requests = Batch
+    client.web3.eth.get_block = lambda _: "block"
+    client.contract.functions.streams = lambda sid: sid
+
+    now, streams = client.read_streams([3, 1, 2, 3])
+    assert now == 77
+    assert streams == {3: ("row", 3), 1: ("row", 1), 2: ("row", 2)}
+    # One block read, stream calls chunked by the batch size
+    assert batches == [["block", 3, 1], [2]]
@@ -41,13 +41,13 @@ class DummyWeb3:
     def __init__(self, _provider=None):
         self.eth = types.SimpleNamespace(
             default_account=None,
-            get_transaction_count=lambda addr: 0,
+            get_transaction_count=lambda addr, block_identifier="latest": 0,
             estimate_gas=lambda tx: 21000,
             gas_price=42,
             chain_id=31337,
             max_priority_fee=None,
             send_raw_transaction=lambda raw: types.SimpleNamespace(hex=lambda: "0xabc"),
-            wait_for_transaction_receipt=lambda h: types.SimpleNamespace(status=1, logs=[{"data": "ok"}]),
+            wait_for_transaction_receipt=lambda h, timeout=None: types.SimpleNamespace(status=1, logs=[{"data": "ok"}]),
             contract=lambda address=None, abi=None: DummyContract(),
         )
 
@@ -87,3 +87,48 @@ def test_send_path_eip1559_and_gas_estimation(monkeypatch):
     client.erc20 = DummyERC20()
     tx = client.top_up(1, 123)
     assert tx == "0xabc"
+
+
+def test_tx_params_do_not_mix_legacy_and_eip1559_fees(monkeypatch):
+    from requestor.payments import blockchain_service as bs
+
+    class FeeWeb3(DummyWeb3):
+        def __init__(self, _provider=None):
+            super().__init__(_provider)
+            self.eth.max_priority_fee = 2
+
+    monkeypatch.setattr(bs, "Web3", FeeWeb3)
+    monkeypatch.setattr(bs, "Account", types.SimpleNamespace(from_key=lambda k: types.SimpleNamespace(address="0xme")))
+    client = StreamPaymentClient(StreamPaymentConfig("http://localhost", "0xcontract", "0x" + "0" * 40, "0x01"))
+    params = client._tx_params(client.contract.functions.topUp(1, 10))
+    assert params["maxPriorityFeePerGas"] == 2
+    assert params["maxFeePerGas"] == 42
+    assert "gasPrice" not in params
+
+
+def test_tx_params_legacy_fallback_drops_eip1559_fees(monkeypatch):
+    from requestor.payments import blockchain_service as bs
+
+    class FlakyGasPriceEth(types.SimpleNamespace):
+        reads = 0
+
+        @property
+        def gas_price(self):
+            FlakyGasPriceEth.reads += 1
+            if FlakyGasPriceEth.reads == 1:
+                raise ValueError("gas price unavailable")
+            return 42
+
+    class FeeWeb3(DummyWeb3):
+        def __init__(self, _provider=None):
+            super().__init__(_provider)
+            fields = {k: v for k, v in vars(self.eth).items() if k != "gas_price"}
+            self.eth = FlakyGasPriceEth(**{**fields, "max_priority_fee": 2})
+
+    monkeypatch.setattr(bs, "Web3", FeeWeb3)
+    monkeypatch.setattr(bs, "Account", types.SimpleNamespace(from_key=lambda k: types.SimpleNamespace(address="0xme")))
+    client = StreamPaymentClient(StreamPaymentConfig("http://localhost", "0xcontract", "0x" + "0" * 40, "0x01"))
+    params = client._tx_params(client.contract.functions.topUp(1, 10))
+    assert params["gasPrice"] == 42
+    assert "maxPriorityFeePerGas" not in params
+    assert "maxFeePerGas" not in params
@@ -0,0 +1,128 @@
+import asyncio
+import threading
+import types
+
+import pytest
+
+from requestor.payments.blockchain_service import StreamPaymentClient, StreamPaymentConfig
+
+
+class DummyERC20:
+    def __init__(self, ledger):
+        ledger_ref = ledger
+
+        class Funcs:
+            def allowance(self, *a):
+                return types.SimpleNamespace(call=lambda: ledger_ref["allowance"])
+
+            def approve(self, spender, amount):
+                return types.SimpleNamespace(
+                    build_transaction=lambda kwargs: {"to": "approve", "amount": amount, **kwargs}
+                )
+
+        self.functions = Funcs()
+
+
+class DummyContract:
+    def __init__(self):
+        self.address = "0xstream"
+
+        class Funcs:
+            def topUp(self, sid, amount):
+                return types.SimpleNamespace(
+                    build_transaction=lambda kwargs: {"to": "topUp", "amount": amount, **kwargs}
+                )
+
+        self.functions = Funcs()
+
+
+def _client(monkeypatch, ledger):
+    from requestor.payments import blockchain_service as bs
+
+    sent = []
+    lock = threading.Lock()
+
+    def send_raw(raw):
+        with lock:
+            sent.append(raw)
+            if raw["to"] == "approve":
+                ledger["allowance"] = raw["amount"]
+            return types.SimpleNamespace(hex=lambda n=len(sent): f"0x{n:02x}")
+
+    class W:
+        HTTPProvider = staticmethod(lambda url: None)
+
+        def __init__(self, _provider=None):
+            self.eth = types.SimpleNamespace(
+                default_account=None,
+                get_transaction_count=lambda addr, block_identifier="latest": 7,
+                send_raw_transaction=send_raw,
+                wait_for_transaction_receipt=lambda h, timeout=None: types.SimpleNamespace(status=1, logs=[]),
+                contract=lambda address=None, abi=None: DummyContract(),
+                chain_id=31337,
+            )
+
+        @staticmethod
+        def to_checksum_address(addr):
+            return addr
+
+    class Signer:
+        address = "0xme"
+
+        def sign_transaction(self, tx):
+            return types.SimpleNamespace(rawTransaction=tx)
+
+    monkeypatch.setattr(bs, "Web3", W)
+    monkeypatch.setattr(bs, "Account", types.SimpleNamespace(from_key=lambda k: Signer()))
+    client = StreamPaymentClient(StreamPaymentConfig("http://localhost", "0xcontract", "0xglm", "0x01"))
+    client.erc20 = DummyERC20(ledger)
+    return client, sent
+
+
+@pytest.mark.asyncio
+async def test_concurrent_top_ups_use_distinct_nonces_and_cover_allowance(monkeypatch):
+    ledger = {"allowance": 0}
+    client, sent = _client(monkeypatch, ledger)
+
+    txs = await asyncio.gather(*(client.top_up_async(sid, 100) for sid in range(4)))
+
+    assert len(set(txs)) == 4
+    nonces = [tx["nonce"] for tx in sent]
+    assert len(nonces) == len(set(nonces))
+    assert sorted(nonces) == list(range(7, 7 + len(sent)))
+    # Every approval covers the top-ups already submitted but not yet confirmed
+    top_ups = [tx for tx in sent if tx["to"] == "topUp"]
+    assert len(top_ups) == 4
+    assert client._allowance_in_flight == 0
+
+
+def test_sync_top_up_skips_approval_when_allowance_suffices(monkeypatch):
+    ledger = {"allowance": 1_000}
+    client, sent = _client(monkeypatch, ledger)
+    client.top_up(1, 500)
+    assert [tx["to"] for tx in sent] == ["topUp"]
+
+
+def test_approvals_are_mined_outside_the_allowance_lock(monkeypatch):
+    ledger = {"allowance": 0}
+    client, sent = _client(monkeypatch, ledger)
+    both_broadcast = threading.Event()
+
+    def wait_for_receipt(tx_hash, timeout=None):
+        # Confirm approvals only once both are on the wire: a lock held while
+        # waiting would keep the second one from ever being broadcast
+        if sum(tx["to"] == "approve" for tx in sent) >= 2:
+            both_broadcast.set()
+        assert both_broadcast.wait(5)
+        return types.SimpleNamespace(status=1, logs=[])
+
+    client.web3.eth.wait_for_transaction_receipt = wait_for_receipt
+    threads = [threading.Thread(target=client._reserve_allowance, args=(100,)) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(10)
+
+    assert both_broadcast.is_set()
+    assert [tx["amount"] for tx in sent] == [100, 200]
+    assert client._allowance_in_flight == 200
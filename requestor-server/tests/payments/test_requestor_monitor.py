@@ -26,7 +26,7 @@ async def test_requestor_monitor_topups_when_below_min(monkeypatch):
     mon = RequestorStreamMonitor(db)
 
     # Resolve stream id without network
-    async def fake_resolve(vm):
+    def fake_resolve(vm):
         return 42
     monkeypatch.setattr(mon, "_resolve_stream_id", fake_resolve)
 
@@ -58,9 +58,9 @@ async def test_requestor_monitor_topups_when_below_min(monkeypatch):
 
     # Capture top_up calls
     calls = {"args": []}
-    def top_up(sid, amount):
+    async def top_up_async(sid, amount):
         calls["args"].append((sid, amount))
-    monkeypatch.setattr(mon._sp, "top_up", top_up)
+    monkeypatch.setattr(mon._sp, "top_up_async", top_up_async)
 
     # Make sleep cancel after first iteration
     async def fake_sleep(_):
@@ -73,3 +73,134 @@ async def test_requestor_monitor_topups_when_below_min(monkeypatch):
     # Expect a top-up to 3600s target: deficit = 3600 - 1000 = 2600; add_wei = deficit * rate
     assert calls["args"] == [(42, 2600 * rate)]
 
+
+
+def _stream(now, remaining, rate=10, halted=False):
+    return ("0x0", "0xsender", "0xrecipient", now - 10_000, now + remaining, rate, 0, 0, halted)
+
+
+@pytest.mark.asyncio
+async def test_requestor_monitor_reads_once_and_tops_up_concurrently(monkeypatch):
+    now = 1_000_000
+    vms = [
+        {"name": f"vm-{i}", "provider_ip": "127.0.0.1", "vm_id": f"id-{i}", "status": "running",
+         "stream_id": i, "config": {}}
+        for i in range(6)
+    ]
+    vms.append({"name": "stopped", "provider_ip": "127.0.0.1", "vm_id": "x", "status": "stopped",
+                "stream_id": 99, "config": {}})
+    mon = RequestorStreamMonitor(DummyDB(vms))
+
+    reads = []
+
+    def read_streams(ids):
+        ids = list(ids)
+        reads.append(ids)
+        # Even streams are low on runway, stream 5 is halted
+        return now, {
+            i: _stream(now, 100 if i % 2 == 0 else 10_000, halted=(i == 5)) for i in ids
+        }
+
+    monkeypatch.setattr(mon._sp, "read_streams", read_streams)
+
+    in_flight = {"now": 0, "peak": 0}
+    release = asyncio.Event()
+    calls = []
+
+    async def top_up_async(sid, amount):
+        calls.append((sid, amount))
+        in_flight["now"] += 1
+        in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+        await release.wait()
+        in_flight["now"] -= 1
+
+    monkeypatch.setattr(mon._sp, "top_up_async", top_up_async)
+
+    await mon._check_streams(3600, 3600)
+    await asyncio.sleep(0)
+    assert reads == [[0, 1, 2, 3, 4, 5]]
+    assert sorted(calls) == [(0, 3500 * 10), (2, 3500 * 10), (4, 3500 * 10)]
+    assert in_flight["peak"] == 3
+
+    # Streams with a top-up still in flight are not topped up twice
+    await mon._check_streams(3600, 3600)
+    await asyncio.sleep(0)
+    assert len(calls) == 3
+
+    release.set()
+    await asyncio.wait(list(mon._topups.values()))
+    assert mon._topups == {}
+
+
+@pytest.mark.asyncio
+async def test_requestor_monitor_caches_stream_ids_from_provider(monkeypatch):
+    from requestor.payments import monitor as monitor_mod
+
+    class CachingDB(DummyDB):
+        def __init__(self, vms):
+            super().__init__(vms)
+            self.cached = {}
+
+        async def set_vm_stream_id(self, name, sid):
+            self.cached[name] = sid
+            for vm in self._vms:
+                if vm["name"] == name:
+                    vm["stream_id"] = sid
+
+    vms = [
+        {"name": "a", "provider_ip": "1.1.1.1", "vm_id": "id-a", "status": "running", "config": {}},
+        {"name": "b", "provider_ip": "1.1.1.1", "vm_id": "id-b", "status": "running", "config": {}},
+        {"name": "c", "provider_ip": "2.2.2.2", "vm_id": "id-c", "status": "running", "config": {}},
+    ]
+    db = CachingDB(vms)
+    mon = RequestorStreamMonitor(db)
+
+    sessions = []
+
+    class FakeProviderClient:
+        def __init__(self, url):
+            self.url = url
+
+        async def __aenter__(self):
+            sessions.append(self.url)
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        async def get_vm_stream_status(self, vm_id):
+            return {"stream_id": {"id-a": 1, "id-b": 2, "id-c": 3}[vm_id]}
+
+    monkeypatch.setattr(monitor_mod, "ProviderClient", FakeProviderClient)
+    monkeypatch.setattr(mon._sp, "read_streams", lambda ids: (0, {i: _stream(0, 10_000) for i in ids}))
+
+    await mon._check_streams(3600, 3600)
+    assert db.cached == {"a": 1, "b": 2, "c": 3}
+    # One session per provider
+    assert len(sessions) == 2
+
+    await mon._check_streams(3600, 3600)
+    assert len(sessions) == 2
+
+
+def test_read_streams_falls_back_without_batch_support(monkeypatch):
+    from requestor.payments import blockchain_service
+
+    now = 500
+    mon = RequestorStreamMonitor(DummyDB([]))
+    warnings = []
+    monkeypatch.setattr(blockchain_service.logger, "warning", warnings.append)
+
+    class Fn:
+        def __init__(self, sid):
+            self.sid = sid
+
+        def call(self):
+            if self.sid == 2:
+                raise ValueError("revert")
+            return _stream(now, self.sid)
+
+    mon._sp.contract = types.SimpleNamespace(functions=types.SimpleNamespace(streams=Fn))
+    mon._sp.web3 = types.SimpleNamespace(eth=types.SimpleNamespace(get_block=lambda _: {"timestamp": now}))
+    assert mon._sp.read_streams([1, 2, 1]) == (now, {1: _stream(now, 1)})
+    assert len(warnings) == 1 and "batched read of 2 streams failed" in warnings[0]
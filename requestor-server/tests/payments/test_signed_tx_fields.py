@@ -38,9 +38,9 @@ class DummyWeb3:
     def __init__(self, _provider=None):
         self.eth = types.SimpleNamespace(
             default_account=None,
-            get_transaction_count=lambda addr: 0,
+            get_transaction_count=lambda addr, block_identifier="latest": 0,
             send_raw_transaction=lambda raw: types.SimpleNamespace(hex=lambda: "0xabc"),
-            wait_for_transaction_receipt=lambda h: types.SimpleNamespace(status=1, logs=[{"data": "ok"}]),
+            wait_for_transaction_receipt=lambda h, timeout=None: types.SimpleNamespace(status=1, logs=[{"data": "ok"}]),
             contract=lambda address=None, abi=None: DummyContract(),
             gas_price=1,
             chain_id=31337,
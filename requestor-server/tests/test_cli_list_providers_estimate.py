@@ -163,3 +163,52 @@ def test_list_providers_json_no_pricing_has_no_estimate(monkeypatch):
     data = json.loads(result.output)
     assert 'providers' in data and len(data['providers']) == 1
     assert 'estimate' not in data['providers'][0]
+
+
+def test_list_providers_cheapest_uses_ranked_lookup(monkeypatch):
+    runner = CliRunner()
+    from requestor.cli import commands as cmds
+
+    calls = {}
+
+    class StubProviderService:
+        def __init__(self):
+            self.estimate_spec = None
+        async def __aenter__(self):
+            return self
+        async def __aexit__(self, exc_type, exc, tb):
+            return False
+        async def find_providers(self, **kwargs):
+            raise AssertionError("--cheapest should use the ranked lookup")
+        async def find_cheapest_providers(self, **kwargs):
+            calls.update(kwargs)
+            return [{
+                'provider_id': '0xcheap',
+                'ip_address': '1.2.3.4',
+                'country': 'SE',
+                'resources': {'cpu': 8, 'memory': 16, 'storage': 200},
+                'pricing': {
+                    'usd_per_core_month': 1.0,
+                    'usd_per_gb_ram_month': 1.0,
+                    'usd_per_gb_storage_month': 0.1,
+                },
+                'estimate': {'usd_per_month': 8.0, 'usd_per_hour': 0.010959, 'glm_per_month': None},
+            }]
+        def compute_estimate(self, provider, spec):
+            from requestor.services.provider_service import ProviderService as RealPS
+            return RealPS.compute_estimate(self, provider, spec)
+
+    monkeypatch.setattr(cmds, 'ProviderService', StubProviderService)
+
+    result = runner.invoke(
+        cli, ['vm', 'providers', '--cpu', '2', '--memory', '4', '--storage', '20', '--cheapest', '3', '--json']
+    )
+    assert result.exit_code == 0
+    assert calls['limit'] == 3 and calls['cpu'] == 2
+    data = json.loads(result.stdout)
+    assert data['providers'][0]['provider_id'] == '0xcheap'
+    assert data['providers'][0]['estimate']['usd_per_month'] == 8.0
+
+    result = runner.invoke(cli, ['vm', 'providers', '--cpu', '2', '--cheapest', '3'])
+    assert result.exit_code != 0
+    assert '--cheapest requires' in result.output
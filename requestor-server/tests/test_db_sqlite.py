@@ -76,3 +76,30 @@ async def test_fetchall_empty(tmp_path):
     await db.init()
     rows = await db.fetchall("SELECT * FROM vms")
     assert rows == []
+
+
+@pytest.mark.asyncio
+async def test_stream_id_column_cached_and_migrated(tmp_path):
+    import aiosqlite
+    import json
+
+    path = tmp_path / "t.db"
+    # Database created before the stream_id column existed
+    async with aiosqlite.connect(path) as conn:
+        await conn.execute(
+            "CREATE TABLE vms (name TEXT PRIMARY KEY, provider_ip TEXT NOT NULL, vm_id TEXT NOT NULL, "
+            "config TEXT NOT NULL, status TEXT NOT NULL DEFAULT 'running', created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+        )
+        await conn.execute(
+            "INSERT INTO vms (name, provider_ip, vm_id, config) VALUES (?, ?, ?, ?)",
+            ("old", "ip", "id", json.dumps({"stream_id": 7})),
+        )
+        await conn.commit()
+    db = Database(path)
+    await db.init()
+    assert (await db.get_vm("old"))["stream_id"] == 7
+
+    await db.save_vm("new", "ip", "id2", {"cpu": 1}, "running")
+    assert (await db.get_vm("new"))["stream_id"] is None
+    await db.set_vm_stream_id("new", 9)
+    assert {vm["name"]: vm["stream_id"] for vm in await db.list_vms()} == {"old": 7, "new": 9}
@@ -85,3 +85,236 @@ async def test_verify_provider_missing(monkeypatch):
     monkeypatch.setattr(svc, "find_providers", fake_find)
     with pytest.raises(ProviderError):
         await svc.verify_provider("b")
+
+
+@pytest.mark.asyncio
+async def test_find_cheapest_providers_uses_discovery_match(monkeypatch):
+    from requestor.services import provider_service as ps
+
+    captured = {}
+
+    class Resp:
+        ok = True
+
+        async def json(self):
+            return [{"provider_id": "cheap", "ip_address": "1.2.3.4", "estimate": {"usd_per_month": 1.0}}]
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+    class Session:
+        def get(self, url, params=None):
+            captured.update(url=url, params=params)
+            return Resp()
+
+    monkeypatch.setattr(ps.config, "discovery_url", "http://disc")
+    monkeypatch.setattr(ps.config, "environment", "development")
+    svc = ProviderService()
+    svc.session = Session()
+    providers = await svc.find_cheapest_providers(2, 4, 20, country="SE", limit=3, driver="central")
+    assert captured["url"] == "http://disc/api/v1/advertisements/match"
+    assert captured["params"] == {"cpu": 2, "memory": 4, "storage": 20, "country": "SE", "limit": 3}
+    assert providers[0]["provider_id"] == "cheap"
+    assert providers[0]["ip_address"] == "localhost"
+
+
+@pytest.mark.asyncio
+async def test_find_cheapest_providers_ranks_locally_without_match_endpoint(monkeypatch):
+    from requestor.services import provider_service as ps
+
+    def pricing(core):
+        return {"usd_per_core_month": core, "usd_per_gb_ram_month": 1.0, "usd_per_gb_storage_month": 0.1}
+
+    listed = [
+        {"provider_id": "dear", "ip_address": "1.1.1.1", "pricing": pricing(5.0)},
+        {"provider_id": "unpriced", "ip_address": "1.1.1.2"},
+        {"provider_id": "cheap", "ip_address": "1.1.1.3", "pricing": pricing(1.0)},
+    ]
+    requested = []
+
+    class Resp:
+        def __init__(self, url):
+            self.ok = not url.endswith("/match")
+            self.status = 200 if self.ok else 404
+
+        async def json(self):
+            return [dict(p) for p in listed]
+
+        async def text(self):
+            return "Not Found"
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+    class Session:
+        def get(self, url, params=None):
+            requested.append(url)
+            return Resp(url)
+
+    monkeypatch.setattr(ps.config, "discovery_url", "http://disc")
+    monkeypatch.setattr(ps.config, "environment", "production")
+    svc = ProviderService()
+    svc.session = Session()
+    providers = await svc.find_cheapest_providers(2, 4, 20, limit=5, driver="central")
+    assert requested == ["http://disc/api/v1/advertisements/match", "http://disc/api/v1/advertisements"]
+    assert [p["provider_id"] for p in providers] == ["cheap", "dear"]
+    assert providers[0]["estimate"]["usd_per_month"] == pytest.approx(2 + 4 + 2)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("query", [
+    lambda svc: svc.find_providers(cpu=2, driver="central"),
+    lambda svc: svc.find_cheapest_providers(2, 4, 20, driver="central"),
+])
+async def test_central_discovery_queries_share_error_handling(monkeypatch, query):
+    import aiohttp
+    from requestor.errors import DiscoveryError
+    from requestor.services import provider_service as ps
+
+    class Resp:
+        ok = False
+        status = 503
+
+        async def text(self):
+            return "overloaded"
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+    class Session:
+        def __init__(self, error=None):
+            self.error = error
+
+        def get(self, url, params=None):
+            if self.error is not None:
+                raise self.error
+            return Resp()
+
+    monkeypatch.setattr(ps.config, "discovery_url", "http://disc")
+    svc = ProviderService()
+    svc.session = Session()
+    with pytest.raises(DiscoveryError, match="Failed to query discovery service: overloaded"):
+        await query(svc)
+    svc.session = Session(aiohttp.ClientConnectionError("refused"))
+    with pytest.raises(DiscoveryError, match="Failed to connect to discovery service: refused"):
+        await query(svc)
+
+
+@pytest.mark.asyncio
+async def test_find_cheapest_providers_ranks_golem_base_results_locally(monkeypatch):
+    svc = ProviderService()
+
+    def provider(pid, core):
+        return {
+            "provider_id": pid,
+            "pricing": {"usd_per_core_month": core, "usd_per_gb_ram_month": 1.0, "usd_per_gb_storage_month": 0.1},
+        }
+
+    async def fake_find(*a, **k):
+        assert k["driver"] == "golem-base"
+        return [provider("dear", 5.0), {"provider_id": "unpriced", "pricing": {}}, provider("cheap", 1.0)]
+
+    monkeypatch.setattr(svc, "find_providers", fake_find)
+    ranked = await svc.find_cheapest_providers(2, 4, 20, limit=5, driver="golem-base")
+    assert [p["provider_id"] for p in ranked] == ["cheap", "dear"]
+    assert ranked[0]["estimate"]["usd_per_month"] == 8.0
+
+
+@pytest.mark.asyncio
+async def test_golem_base_metadata_fetched_concurrently_in_order(monkeypatch):
+    import asyncio
+    from requestor.services import provider_service as ps
+
+    monkeypatch.setattr(ps, "_METADATA_FETCH_CONCURRENCY", 4)
+    monkeypatch.setattr(ps, "GenericBytes", SimpleNamespace(from_hex_string=lambda s: s))
+    monkeypatch.setattr(ps, "EntityKey", lambda k: k)
+    in_flight = {"now": 0, "peak": 0}
+
+    class Client:
+        async def query_entities(self, q):
+            return [SimpleNamespace(entity_key=f"k{i}") for i in range(10)]
+
+        async def get_entity_metadata(self, key):
+            in_flight["now"] += 1
+            in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+            # Later keys answer sooner, so completion order differs from query order
+            await asyncio.sleep(0.001 * (10 - int(key[1:])))
+            in_flight["now"] -= 1
+            return SimpleNamespace(
+                string_annotations=[SimpleNamespace(key="golem_provider_id", value=key)],
+                numeric_annotations=[],
+                expires_at_block=100,
+            )
+
+    svc = ProviderService()
+    svc.golem_base_client = Client()
+    providers = await svc._find_providers_golem_base()
+    assert [p["provider_id"] for p in providers] == [f"k{i}" for i in range(10)]
+    assert in_flight["peak"] == 4
+
+
+@pytest.mark.asyncio
+async def test_listing_rows_share_one_latest_block_lookup(monkeypatch):
+    import asyncio
+
+    monkeypatch.setattr(click, "style", lambda x, **k: x)
+    calls = []
+
+    class Eth:
+        async def get_block(self, arg):
+            calls.append(arg)
+            await asyncio.sleep(0)
+            return SimpleNamespace(number=1000)
+
+    class Client:
+        def http_client(self):
+            return SimpleNamespace(eth=Eth())
+
+    svc = ProviderService()
+    svc.golem_base_client = Client()
+    provider = {
+        "provider_id": "pid",
+        "provider_name": "name",
+        "ip_address": "1.2.3.4",
+        "country": "PL",
+        "resources": {"cpu": 2, "memory": 4, "storage": 10},
+    }
+    rows = await asyncio.gather(*(
+        svc.format_provider_row({**provider, "created_at_block": 1000 - 30 * i}) for i in range(200)
+    ))
+    assert calls == ["latest"]
+    assert rows[0][-1] == "0s ago"
+    assert rows[2][-1] == "2m ago"
+
+
+@pytest.mark.asyncio
+async def test_chain_clock_follows_replaced_golem_base_client():
+    class Client:
+        def __init__(self, number):
+            self.number = number
+
+        def http_client(self):
+            number = self.number
+
+            class Eth:
+                async def get_block(self, arg):
+                    if number is None:
+                        raise ConnectionError("rpc down")
+                    return SimpleNamespace(number=number)
+
+            return SimpleNamespace(eth=Eth())
+
+    svc = ProviderService()
+    svc.golem_base_client = Client(None)
+    assert await svc._format_block_timestamp(1000) == "N/A"
+    svc.golem_base_client = Client(1030)
+    assert await svc._format_block_timestamp(1000) == "1m ago"
@@ -0,0 +1,67 @@
+import asyncio
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+import sys
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from requestor.utils.chain_clock import ChainClock, format_age
+
+
+class FakeChain:
+    def __init__(self, number=1000):
+        self.number = number
+        self.calls = 0
+        self.fail = False
+
+    async def get_latest(self):
+        self.calls += 1
+        await asyncio.sleep(0)
+        if self.fail:
+            raise ConnectionError("rpc down")
+        return SimpleNamespace(number=self.number)
+
+
+def test_format_age():
+    assert format_age(59) == "59s ago"
+    assert format_age(120) == "2m ago"
+    assert format_age(7200) == "2h ago"
+    assert format_age(2 * 86400) == "2d ago"
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_fetch():
+    chain = FakeChain()
+    clock = ChainClock(chain.get_latest)
+    labels = await asyncio.gather(*(clock.time_ago(1000 - i * 30) for i in range(200)))
+    assert chain.calls == 1
+    assert labels[0] == "0s ago"
+    assert labels[1] == "1m ago"
+
+
+@pytest.mark.asyncio
+async def test_refetches_after_ttl_and_clamps_future_blocks():
+    chain = FakeChain()
+    now = [0.0]
+    clock = ChainClock(chain.get_latest, ttl=5.0, clock=lambda: now[0])
+    assert await clock.seconds_since(1010) == 0
+    now[0] = 4.0
+    chain.number = 1003
+    assert await clock.latest_number() == 1000
+    now[0] = 5.0
+    assert await clock.latest_number() == 1003
+    assert chain.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_fetch_is_not_cached():
+    chain = FakeChain()
+    chain.fail = True
+    clock = ChainClock(chain.get_latest)
+    with pytest.raises(ConnectionError):
+        await clock.latest_number()
+    chain.fail = False
+    assert await clock.latest_number() == 1000
+    assert chain.calls == 2